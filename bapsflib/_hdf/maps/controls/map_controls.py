@@ -13,6 +13,7 @@ import h5py
 from bapsflib.utils.errors import HDFMappingError
 from typing import (Dict, Tuple, Union)
 
+from ..snapshot import HDFSnapshotMixin
 from .n5700ps import HDFMapControlN5700PS
 from .nixyz import HDFMapControlNIXYZ
 from .nixz import HDFMapControlNIXZ
@@ -24,7 +25,7 @@ from .waveform import HDFMapControlWaveform
 ControlMap = Union[HDFMapControlTemplate, HDFMapControlCLTemplate]
 
 
-class HDFMapControls(dict):
+class HDFMapControls(HDFSnapshotMixin, dict):
     """
     A dictionary that contains mapping objects for all the discovered
     control devices in the HDF5 data group.  The dictionary keys are
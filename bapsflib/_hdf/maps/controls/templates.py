@@ -16,11 +16,12 @@ from abc import (ABC, abstractmethod)
 from typing import (Iterable, List, Union)
 from warnings import warn
 
+from ..snapshot import HDFSnapshotMixin
 from .clparse import CLParse
 from .contype import ConType
 
 
-class HDFMapControlTemplate(ABC):
+class HDFMapControlTemplate(HDFSnapshotMixin, ABC):
     # noinspection PySingleQuotedDocstring
     '''
     Template class for all control mapping classes to inherit from.
@@ -13,12 +13,13 @@ import h5py
 from bapsflib.utils.errors import HDFMappingError
 from typing import (Dict, Tuple)
 
+from ..snapshot import HDFSnapshotMixin
 from .sis3301 import HDFMapDigiSIS3301
 from .siscrate import HDFMapDigiSISCrate
 from .templates import HDFMapDigiTemplate
 
 
-class HDFMapDigitizers(dict):
+class HDFMapDigitizers(HDFSnapshotMixin, dict):
     """
     A dictionary that contains mapping objects for all the discovered
     digitizers in the HDF5 data group.  The dictionary keys are the
@@ -16,8 +16,10 @@ from abc import ABC, abstractmethod
 from typing import (Any, Dict, List, Tuple, Union)
 from warnings import warn
 
+from ..snapshot import HDFSnapshotMixin
 
-class HDFMapDigiTemplate(ABC):
+
+class HDFMapDigiTemplate(HDFSnapshotMixin, ABC):
     # noinspection PySingleQuotedDocstring
     '''
     Template class for all digitizer mapping classes to inherit from.
@@ -109,6 +111,42 @@ class HDFMapDigiTemplate(ABC):
         """
         raise NotImplementedError
 
+    def _update_nshotnum(self, nrows: Dict[str, int], changed=None):
+        """
+        Update the :code:`'nshotnum'` of the adc setup dictionaries
+        in :data:`configs` without re-building the configurations.
+
+        :param nrows: number of rows keyed by the full HDF5 path of
+            the digitizer datasets
+        :param changed: collection of dataset paths that changed, only
+            setups containing one of these datasets are updated
+            (DEFAULT :code:`None` updates all setups)
+        """
+        gpath = self.info['group path'] + '/'
+        for cname in self.active_configs:
+            for adc in self.configs[cname]['adc']:
+                for brd, chs, setup in self.configs[cname][adc]:
+                    paths = []
+                    for ch in chs:
+                        try:
+                            dname = self.construct_dataset_name(
+                                brd, ch, config_name=cname, adc=adc)
+                        except (KeyError, ValueError):
+                            continue
+                        if gpath + dname in nrows:
+                            paths.append(gpath + dname)
+                    if not paths or (
+                            changed is not None
+                            and not any(path in changed
+                                        for path in paths)):
+                        continue
+
+                    # all channels of a board should record the same
+                    # number of shots
+                    nshotnum = {nrows[path] for path in paths}
+                    setup['nshotnum'] = nshotnum.pop() \
+                        if len(nshotnum) == 1 else -1
+
     @property
     def active_configs(self) -> List[str]:
         """List of active digitizer configurations"""
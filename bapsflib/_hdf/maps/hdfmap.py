@@ -12,7 +12,7 @@ import h5py
 import numpy as np
 import os
 
-from typing import (List, Union)
+from typing import (Dict, List, Tuple, Union)
 from warnings import warn
 
 from .controls import HDFMapControls
@@ -22,6 +22,8 @@ from .digitizers import HDFMapDigitizers
 from .digitizers.templates import HDFMapDigiTemplate
 from .msi import HDFMapMSI
 from .msi.templates import HDFMapMSITemplate
+from .snapshot import (attach_hdf_obj, HDFSnapshotMixin)
+from bapsflib.utils.errors import HDFMappingError
 
 
 # define type aliases
@@ -29,8 +31,12 @@ ControlMap = Union[HDFMapControlTemplate, HDFMapControlCLTemplate]
 DigiMap = HDFMapDigiTemplate
 MSIMap = HDFMapMSITemplate
 
+#: Group membership and dataset shapes of a device group, keyed by
+#: HDF5 path (groups have a shape of :code:`None`)
+GroupSignature = Dict[str, Union[None, Tuple[int, ...]]]
 
-class HDFMap(object):
+
+class HDFMap(HDFSnapshotMixin):
     """
     Constructs a complete file mapping of the HDF5 file.  This is
     utilized by the HDF5 utility classes (in module
@@ -81,6 +87,13 @@ class HDFMap(object):
         self.__attach_controls()
         self.__attach_unknowns()
 
+        # record the structure of the mapped device groups
+        self._signatures = {}  # type: Dict[str, GroupSignature]
+        for _, devices in self.__device_maps():
+            for name, _map in devices.items():
+                self._signatures[name] = \
+                    self._group_signature(_map.group)
+
     def __repr__(self):
         filename = self._hdf_obj.filename
         if isinstance(filename, (bytes, np.bytes_)):
@@ -135,6 +148,16 @@ class HDFMap(object):
             warn("MSI ('{}') does NOT exist.".format(msi_path))
             self.__msi = {}
 
+    def __device_maps(self):
+        """
+        Iterator of :code:`(device type, device mapping dictionary)`
+        pairs, where the device type is :code:`'msi'`,
+        :code:`'digitizer'`, or :code:`'control'`.
+        """
+        yield 'msi', self.__msi
+        yield 'digitizer', self.__digitizers
+        yield 'control', self.__controls
+
     def __attach_unknowns(self):
         """
         Attaches the :attr:`__unknowns` list, which contains all the
@@ -169,6 +192,53 @@ class HDFMap(object):
                         self.__unknowns.append(
                             self._hdf_obj[path][item].name)
 
+    def attach(self, hdf_obj: h5py.File):
+        """
+        Attach a mapping snapshot to the open HDF5 file **hdf_obj**.
+
+        A pickled :class:`HDFMap` is a snapshot of the mapping that
+        carries no HDF5 objects (see
+        :class:`~.snapshot.HDFSnapshotMixin`).  Attaching the unpickled
+        snapshot to the file it was built from restores the HDF5
+        objects without re-mapping the file.
+
+        :param hdf_obj: the HDF5 file object
+        :type hdf_obj: :class:`h5py.File`
+
+        :Example:
+
+            >>> fmap = HDFMap(file_obj, 'Raw data + config',
+            ...               'Raw data + config', 'MSI')
+            >>> snapshot = pickle.dumps(fmap)
+            >>>
+            >>> # ... in another process
+            >>> fmap = pickle.loads(snapshot)
+            >>> fmap.attach(h5py.File('sample.hdf5', 'r'))
+        """
+        if not isinstance(hdf_obj, h5py.File):
+            raise TypeError("arg `hdf_obj` not an h5py.File object")
+
+        attach_hdf_obj(self, hdf_obj)
+
+    def _group_signature(self, group: h5py.Group) -> GroupSignature:
+        """
+        Record the group membership and dataset shapes of **group**.
+        (In SWMR mode, datasets are refreshed first.)
+        """
+        swmr = self._hdf_obj.swmr_mode
+        signature = {}
+
+        def record(name, obj):
+            if isinstance(obj, h5py.Dataset):
+                if swmr:
+                    obj.refresh()
+                signature[obj.name] = obj.shape
+            else:
+                signature[obj.name] = None
+
+        group.visititems(record)
+        return signature
+
     @property
     def controls(self) -> Union[dict, HDFMapControls]:
         """
@@ -272,6 +342,123 @@ class HDFMap(object):
         """
         return self.__msi
 
+    def refresh(self) -> Dict[str, List[str]]:
+        """
+        Update the mapping to changes in the HDF5 file without
+        re-mapping the whole file.  The group membership and dataset
+        shapes of each device group are compared against those
+        recorded when the device was mapped, and only the affected
+        device mappings are updated:
+
+        * new device groups are mapped and vanished devices dropped
+        * if a device group gained or lost members (e.g. a new
+          configuration group), its :code:`configs` are re-built
+        * if only digitizer datasets were extended, just the
+          :code:`'nshotnum'` of the affected adc setups is updated
+        * extended control device datasets need no update
+
+        :return: dictionary of the device names that were
+            :code:`'added'`, :code:`'removed'`, :code:`'remapped'`, or
+            :code:`'extended'`
+
+        :Example:
+
+            >>> fmap = HDFMap(file_obj, 'Raw data + config',
+            ...               'Raw data + config', 'MSI')
+            >>>
+            >>> # ... the DAQ appends shots
+            >>> fmap.refresh()
+            {'added': [], 'removed': [], 'remapped': [],
+             'extended': ['SIS crate']}
+        """
+        changes = {'added': [], 'removed': [], 'remapped': [],
+                   'extended': []}
+        dict_classes = {'control': HDFMapControls,
+                        'digitizer': HDFMapDigitizers,
+                        'msi': HDFMapMSI}
+        for device, devices in list(self.__device_maps()):
+            path = self.DEVICE_PATHS[device]
+            if path not in self._hdf_obj:
+                continue
+            group = self._hdf_obj[path]
+            if not isinstance(devices, dict_classes[device]):
+                # device group did not exist when mapped
+                devices = dict_classes[device](group)
+                if device == 'control':
+                    self.__controls = devices
+                elif device == 'digitizer':
+                    self.__digitizers = devices
+                else:
+                    self.__msi = devices
+                for name, _map in devices.items():
+                    self._signatures[name] = \
+                        self._group_signature(_map.group)
+                    changes['added'].append(name)
+                continue
+
+            # drop vanished devices
+            for name in list(devices):
+                if name not in group \
+                        or not isinstance(group[name], h5py.Group):
+                    del devices[name]
+                    del self._signatures[name]
+                    changes['removed'].append(name)
+
+            for name in group:
+                if name not in devices.mappable_devices \
+                        or not isinstance(group[name], h5py.Group):
+                    continue
+
+                # map new devices
+                map_class = devices._defined_mapping_classes[name]
+                if name not in devices:
+                    try:
+                        devices[name] = map_class(group[name])
+                    except HDFMappingError:
+                        continue
+                    self._signatures[name] = \
+                        self._group_signature(group[name])
+                    changes['added'].append(name)
+                    continue
+
+                # compare against the recorded structure
+                _map = devices[name]
+                old = self._signatures[name]
+                new = self._group_signature(group[name])
+                if new == old:
+                    continue
+                self._signatures[name] = new
+
+                if device != 'msi' and set(new) == set(old):
+                    # only dataset shapes changed
+                    if device == 'digitizer':
+                        nrows = {key: val[0]
+                                 for key, val in new.items()
+                                 if val is not None and len(val)}
+                        changed = [key for key in new
+                                   if new[key] != old[key]]
+                        _map._update_nshotnum(nrows, changed=changed)
+                    changes['extended'].append(name)
+                    continue
+
+                # re-build configurations
+                configs = _map._configs
+                _map._configs = {}
+                try:
+                    _map._build_configs()
+                except HDFMappingError:
+                    _map._configs = configs
+                    del devices[name]
+                    del self._signatures[name]
+                    changes['removed'].append(name)
+                    continue
+                changes['remapped'].append(name)
+
+        if changes['added'] or changes['removed']:
+            self.__attach_unknowns()
+
+        return changes
+
     @property
     def unknowns(self) -> List[str]:
         """
@@ -13,6 +13,7 @@ import h5py
 from bapsflib.utils.errors import HDFMappingError
 from typing import Dict
 
+from ..snapshot import HDFSnapshotMixin
 from .discharge import HDFMapMSIDischarge
 from .gaspressure import HDFMapMSIGasPressure
 from .heater import HDFMapMSIHeater
@@ -21,7 +22,7 @@ from .magneticfield import HDFMapMSIMagneticField
 from .templates import HDFMapMSITemplate
 
 
-class HDFMapMSI(dict):
+class HDFMapMSI(HDFSnapshotMixin, dict):
     """
     A dictionary containing mapping objects for all the discovered
     MSI diagnostic HDF5 groups.  The dictionary keys are the MSI
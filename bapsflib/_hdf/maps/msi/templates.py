@@ -13,8 +13,10 @@ import h5py
 
 from abc import (ABC, abstractmethod)
 
+from ..snapshot import HDFSnapshotMixin
 
-class HDFMapMSITemplate(ABC):
+
+class HDFMapMSITemplate(HDFSnapshotMixin, ABC):
     # noinspection PySingleQuotedDocstring
     '''
     Template class for all MSI diagnostic mapping classes to inherit
@@ -0,0 +1,70 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+"""
+Support for pickling the mapping objects.  A pickled mapping is a
+snapshot of the mapping with every HDF5 object replaced by a
+:class:`HDFPathRef`, so the snapshot can be sent to other processes
+without re-mapping the HDF5 file.
+"""
+import h5py
+
+from collections import namedtuple
+
+HDFPathRef = namedtuple('HDFPathRef', ['name', 'filename'])
+HDFPathRef.__new__.__defaults__ = (None,)
+HDFPathRef.__doc__ = """
+Placeholder for a HDF5 object in a pickled mapping snapshot.
+"""
+HDFPathRef.name.__doc__ = "internal HDF5 path of the object"
+HDFPathRef.filename.__doc__ = (
+    "name of the HDF5 file if the object was the file object, "
+    "otherwise :code:`None`")
+
+
+class HDFSnapshotMixin(object):
+    """
+    Mixin for mapping classes that makes them picklable.  Any HDF5
+    object in the instance :code:`__dict__` is pickled as a
+    :class:`HDFPathRef`.  The unpickled snapshot carries no HDF5
+    objects until it is re-attached to an open file with
+    :func:`attach_hdf_obj`.
+    """
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key, val in state.items():
+            if isinstance(val, h5py.File):
+                state[key] = HDFPathRef(val.name, filename=val.filename)
+            elif isinstance(val, (h5py.Group, h5py.Dataset)):
+                state[key] = HDFPathRef(val.name)
+
+        return state
+
+
+def attach_hdf_obj(obj: HDFSnapshotMixin, hdf_obj: h5py.File):
+    """
+    Re-attach the mapping snapshot **obj** (and all of its nested
+    mapping objects) to the open HDF5 file **hdf_obj** by replacing
+    every :class:`HDFPathRef` with the HDF5 object it refers to.
+
+    :param obj: mapping object unpickled from a snapshot
+    :param hdf_obj: the HDF5 file object the snapshot was made from
+    """
+    for key, val in obj.__dict__.items():
+        if isinstance(val, HDFPathRef):
+            obj.__dict__[key] = hdf_obj if val.filename is not None \
+                else hdf_obj[val.name]
+        elif isinstance(val, HDFSnapshotMixin):
+            attach_hdf_obj(val, hdf_obj)
+
+    if isinstance(obj, dict):
+        for val in obj.values():
+            if isinstance(val, HDFSnapshotMixin):
+                attach_hdf_obj(val, hdf_obj)
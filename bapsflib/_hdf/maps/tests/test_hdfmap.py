@@ -11,8 +11,12 @@
 # License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
 #   license terms and contributor agreement.
 #
+import h5py
+import pickle
 import unittest as ut
 
+from unittest import mock
+
 from .fauxhdfbuilder import FauxHDFBuilder
 from ..controls import HDFMapControls
 from ..controls.templates import HDFMapControlTemplate
@@ -21,6 +25,7 @@ from ..digitizers.templates import HDFMapDigiTemplate
 from ..hdfmap import HDFMap
 from ..msi import HDFMapMSI
 from ..msi.templates import HDFMapMSITemplate
+from ..snapshot import HDFPathRef
 
 
 class TestHDFMap(ut.TestCase):
@@ -314,6 +319,99 @@ class TestHDFMap(ut.TestCase):
         self.assertEqual(_map.unknowns, ['/MSI/Not a MSI'])
         del self.f['MSI/Not a MSI']
 
+    def test_pickle(self):
+        """Test pickling the mapping as a snapshot."""
+        self.f.add_module('Waveform')
+        self.f.add_module('SIS 3301')
+        self.f.add_module('Discharge')
+        _map = self.map
+        snapshot = pickle.loads(pickle.dumps(_map))
+        self.assertIsInstance(snapshot, self.MAP_CLASS)
+
+        # snapshot carries no HDF5 objects
+        self.assertEqual(list(snapshot.controls), list(_map.controls))
+        self.assertEqual(list(snapshot.digitizers),
+                         list(_map.digitizers))
+        self.assertEqual(list(snapshot.msi), list(_map.msi))
+        self.assertEqual(snapshot.unknowns, _map.unknowns)
+        for dmap in (snapshot.controls['Waveform'],
+                     snapshot.digitizers['SIS 3301'],
+                     snapshot.msi['Discharge']):
+            self.assertIsInstance(dmap.group, HDFPathRef)
+        self.assertEqual(snapshot.digitizers['SIS 3301'].configs,
+                         _map.digitizers['SIS 3301'].configs)
+
+        # attaching restores the HDF5 objects
+        with self.assertRaises(TypeError):
+            snapshot.attach(None)
+        snapshot.attach(self.f)
+        for name in ('Waveform', 'SIS 3301', 'Discharge'):
+            group = snapshot.get(name).group
+            self.assertIsInstance(group, h5py.Group)
+            self.assertEqual(group.name, _map.get(name).group.name)
+        self.assertEqual(repr(snapshot), repr(_map))
+
+    def test_refresh(self):
+        """Test incremental updates of the mapping."""
+        self.f.add_module('Waveform')
+        self.f.add_module('SIS crate')
+        self.f.add_module('Discharge')
+        _map = self.map
+        no_changes = {'added': [], 'removed': [], 'remapped': [],
+                      'extended': []}
+        self.assertEqual(_map.refresh(), no_changes)
+
+        # extending digitizer datasets only updates 'nshotnum'
+        dmap = _map.digitizers['SIS crate']
+        gpath = dmap.info['group path'] + '/'
+        dset_names = ('config01 [Slot 5: SIS 3302 ch 1]',
+                      'config01 [Slot 5: SIS 3302 ch 1] headers')
+        nshotnum = dmap.configs['config01']['SIS 3302'][0][2][
+            'nshotnum']
+        for name in dset_names:
+            data = self.f[gpath + name][...]
+            del self.f[gpath + name]
+            self.f.create_dataset(gpath + name,
+                                  data=data.repeat(2, axis=0))
+        with mock.patch.object(type(dmap), '_build_configs',
+                               side_effect=dmap._build_configs) \
+                as mock_bc:
+            self.assertEqual(_map.refresh(),
+                             dict(no_changes, extended=['SIS crate']))
+            self.assertFalse(mock_bc.called)
+        self.assertEqual(
+            dmap.configs['config01']['SIS 3302'][0][2]['nshotnum'],
+            2 * nshotnum)
+        self.assertEqual(
+            dmap.configs['config01']['SIS 3305'][0][2]['nshotnum'],
+            nshotnum)
+        self.assertEqual(_map.refresh(), no_changes)
+
+        # a new member group re-builds only the affected configs
+        cgroup = dmap.group['config01']
+        cgroup.create_group('foo')
+        with mock.patch.object(type(dmap), '_build_configs',
+                               side_effect=dmap._build_configs) \
+                as mock_bc:
+            self.assertEqual(_map.refresh(),
+                             dict(no_changes, remapped=['SIS crate']))
+            self.assertEqual(mock_bc.call_count, 1)
+        self.assertIs(_map.digitizers['SIS crate'], dmap)
+        self.assertEqual(
+            dmap.configs['config01']['SIS 3302'][0][2]['nshotnum'],
+            2 * nshotnum)
+
+        # new and vanished devices
+        unknowns = _map.unknowns
+        self.f.add_module('SIS 3301')
+        self.f.remove_module('Waveform')
+        self.assertEqual(_map.refresh(),
+                         dict(no_changes, added=['SIS 3301'],
+                              removed=['Waveform']))
+        self.assertIn('SIS 3301', _map.digitizers)
+        self.assertNotIn('Waveform', _map.controls)
+        self.assertEqual(_map.unknowns, unknowns)
+
     def test_not_h5py_group(self):
         """Test error if object to map is not h5py.Group"""
         with self.assertRaises(TypeError):
@@ -12,8 +12,16 @@
 This package contains an assortment of utility classes used to
 access and interface with the HDF5 files generated at BaPSF.
 """
-__all__ = ['file', 'hdfoverview', 'hdfreadcontrols', 'hdfreaddata',
-           'hdfreadmsi', 'helpers']
+__all__ = ['file', 'filepool', 'hdfiterdata', 'hdfoverview',
+           'hdfreadaveraged', 'hdfreadchannels', 'hdfreadcontrols',
+           'hdfreadcorrelation', 'hdfreadcube', 'hdfreaddata',
+           'hdfreadmoments', 'hdfreadmsi', 'hdfreadplan',
+           'hdfreadprobe', 'hdfreadspectra', 'hdfreadspectrogram',
+           'hdfsignalstats', 'helpers', 'signalfilter', 'spatialindex']
 
-from . import (file, hdfoverview, hdfreadcontrols, hdfreaddata,
-               hdfreadmsi, helpers)
+from . import (file, filepool, hdfiterdata, hdfoverview,
+               hdfreadaveraged, hdfreadchannels, hdfreadcontrols,
+               hdfreadcorrelation, hdfreadcube, hdfreaddata,
+               hdfreadmoments, hdfreadmsi, hdfreadplan, hdfreadprobe,
+               hdfreadspectra, hdfreadspectrogram, hdfsignalstats,
+               helpers, signalfilter, spatialindex)
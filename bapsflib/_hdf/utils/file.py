@@ -8,14 +8,45 @@
 # License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
 #   license terms and contributor agreement.
 #
+import asyncio
+import functools
 import h5py
+import math
+import numpy as np
 import os
+import pickle
+import sys
+import threading
+import time
 import warnings
 
+from concurrent.futures import ThreadPoolExecutor
+
 from bapsflib._hdf.maps import (HDFMap, HDFMapControls,
                                 HDFMapDigitizers, HDFMapMSI)
 from typing import (Any, Dict, List, Tuple, Union)
 
+#: Default size (in bytes) of the HDF5 raw data chunk cache.
+_RDCC_DEFAULT_NBYTES = 1024 ** 2
+
+#: Upper limit (in bytes) of the per-dataset raw data chunk cache
+#: built by a :code:`cache_policy`.
+_RDCC_MAX_NBYTES = 256 * 1024 ** 2
+
+#: Upper limit (in bytes) of the raw data chunk caches of all the
+#: chunked digitizer datasets of a file together (HDF5 gives every
+#: open dataset its own cache).
+_RDCC_MAX_FILE_NBYTES = 1024 ** 3
+
+#: :class:`h5py.File` chunk cache and page buffer keywords, and the
+#: h5py version introducing them.
+_CACHE_KWARGS_H5PY = {
+    'rdcc_nbytes': (2, 9),
+    'rdcc_nslots': (2, 9),
+    'rdcc_w0': (2, 9),
+    'page_buf_size': (3, 0),
+}
+
 
 class File(h5py.File):
     """
@@ -26,7 +57,9 @@ class File(h5py.File):
     """
     def __init__(self, name: str, mode='r',
                  control_path='/', digitizer_path='/', msi_path='/',
-                 silent=False, **kwargs):
+                 silent=False, cache_policy=None, max_async_reads=2,
+                 max_memory=None, file_map=None, swmr=False,
+                 **kwargs):
         """
         :param name: name (and path) of file on disk
         :param mode: readonly :code:`'r'` (DEFAULT) and read/write
@@ -39,6 +72,26 @@ class File(h5py.File):
             devices
         :param silent: set :code:`True` to suppress warnings
             (:code:`False` DEFAULT)
+        :param str cache_policy: :code:`None` (DEFAULT) to use the
+            HDF5 default raw data chunk cache, or one of
+            :code:`'auto'`, :code:`'sequential'`, or :code:`'random'`
+            to size the chunk cache from the chunk layout of the
+            digitizer datasets (see :meth:`_build_chunk_cache`)
+        :param int max_async_reads: maximum number of reads the
+            :code:`aread_*` coroutines run concurrently on this file
+            (DEFAULT :code:`2`)
+        :param int max_memory: default memory budget (in bytes) of
+            :meth:`read_data` and :meth:`read_msi`, a read estimated
+            to need more raises a :code:`MemoryError` before reading
+            any signal (DEFAULT :code:`None`, no budget)
+        :param file_map: a mapping snapshot of the file (see
+            :meth:`spec`) to attach instead of re-mapping the file
+            (DEFAULT :code:`None`)
+        :type file_map: :class:`~bapsflib._hdf.maps.hdfmap.HDFMap`
+        :param bool swmr: set :code:`True` to open the file in
+            single-writer/multiple-reader (SWMR) read mode and follow
+            shots as they are written (see :meth:`poll_new_shots` and
+            :meth:`iter_new_data`) (DEFAULT :code:`False`)
         :param kwargs:  additional keywords passed on to
             :class:`h5py.File`
 
@@ -51,13 +104,106 @@ class File(h5py.File):
             ...          msi_path='MSI')
             >>> type(f)
             bapsflib._hdf.utils.file.File
+            >>>
+            >>> # open HDF5 file with a chunk cache sized for
+            >>> # shot-major reads
+            >>> f = File('sample.hdf5',
+            ...          digitizer_path='Raw data + config',
+            ...          cache_policy='sequential')
+            >>> f.chunk_cache['rdcc_nbytes']
+            10485760
+
+        .. note::
+
+            Any :code:`rdcc_nbytes`, :code:`rdcc_nslots`,
+            :code:`rdcc_w0`, or :code:`page_buf_size` keyword passed
+            in :data:`kwargs` takes precedence over the values
+            derived from :data:`cache_policy`.
         """
         # initialize
         if mode not in ('r', 'r+'):
             raise ValueError(
                 "Only `mode` readonly 'r' and read/write 'r+' are "
                 "supported.")
+
+        # -- record settings for `spec()` --
+        self._spec_kwargs = {
+            'control_path': control_path,
+            'digitizer_path': digitizer_path,
+            'msi_path': msi_path,
+            'silent': silent,
+            'cache_policy': cache_policy,
+            'max_async_reads': max_async_reads,
+            'max_memory': max_memory,
+            'swmr': swmr,
+        }
+        self._spec_kwargs.update(kwargs)
         kwargs['mode'] = mode
+
+        if swmr:
+            if mode != 'r':
+                raise ValueError(
+                    "`swmr=True` requires readonly `mode` 'r'")
+            kwargs['swmr'] = True
+
+        if file_map is not None and not isinstance(file_map, HDFMap):
+            raise TypeError(
+                "`file_map` is NOT type `"
+                + HDFMap.__module__ + "." + HDFMap.__qualname__ + "`")
+
+        # -- executor for the aread_* coroutines --
+        # - created on first use
+        if not isinstance(max_async_reads, int) \
+                or isinstance(max_async_reads, bool) \
+                or max_async_reads < 1:
+            raise ValueError(
+                "`max_async_reads` must be an int >= 1, got "
+                "{}".format(max_async_reads))
+        self._max_async_reads = max_async_reads
+        self._async_executor = None
+
+        # -- default memory budget of the reads --
+        from .helpers import condition_max_memory
+
+        self._max_memory = condition_max_memory(max_memory)
+
+        # -- size raw data chunk cache --
+        # - HDF5 only accepts the chunk cache settings at file open,
+        #   so the digitizer chunk layout has to be examined before
+        #   the file is opened and mapped
+        #
+        # - the layout is only inspected if the chunk cache keywords
+        #   are not all given (e.g. re-opening from a spec(), which
+        #   records the derived keywords)
+        # - keywords the installed h5py does not support are dropped
+        #
+        rdcc_keys = ('rdcc_nbytes', 'rdcc_nslots', 'rdcc_w0')
+        if cache_policy is None:
+            self._chunk_cache = {}
+        elif all(key in kwargs for key in rdcc_keys):
+            self._chunk_cache = {'policy': cache_policy}
+            for key in rdcc_keys + ('page_buf_size',):
+                if key in kwargs:
+                    self._chunk_cache[key] = kwargs[key]
+        else:
+            self._chunk_cache = self._build_chunk_cache(
+                name, digitizer_path, cache_policy)
+            for key, val in self._chunk_cache.items():
+                if key != 'policy':
+                    kwargs.setdefault(key, val)
+                    self._spec_kwargs.setdefault(key, val)
+        h5py_version = tuple(h5py.version.version_tuple[0:2])
+        dropped = [key for key, version in _CACHE_KWARGS_H5PY.items()
+                   if key in kwargs and h5py_version < version]
+        for key in dropped:
+            del kwargs[key]
+            self._spec_kwargs.pop(key, None)
+            self._chunk_cache.pop(key, None)
+        if dropped and not silent:
+            warnings.warn(
+                "h5py {} does not support ".format(h5py.version.version)
+                + "the keyword(s) {}, ".format(dropped)
+                + "the HDF5 default is used instead")
         h5py.File.__init__(self, name, **kwargs)
 
         # -- define device paths --
@@ -77,11 +223,162 @@ class File(h5py.File):
             warnings.simplefilter(warn_filter)
 
             # create map
-            self._map_file()
+            if file_map is None:
+                self._map_file()
+            else:
+                file_map.attach(self)
+                self._file_map = file_map
 
             # build `_info` attribute
             self._build_info()
 
+        # -- record dataset extents for SWMR following --
+        self._swmr = swmr
+        self._extents = {}  # type: Dict[str, int]
+
+        # -- cached spatial indexes of the control devices --
+        self._spatial_indexes = {}  # type: Dict[Tuple[str, Any], Any]
+        if swmr:
+            self._update_extents()
+
+    def __reduce__(self):
+        # pickle as a spec that re-opens the file on unpickling
+        return FileSpec.open, (self.spec(),)
+
+    @staticmethod
+    def _build_chunk_cache(name: str, digitizer_path: str,
+                           cache_policy: str) -> Dict[str, Any]:
+        """
+        Builds the HDF5 raw data chunk cache (and page buffer) settings
+        for :data:`cache_policy` based on the chunk layout of the
+        datasets in the digitizer group :data:`digitizer_path`.
+
+        :param name: name (and path) of file on disk
+        :param digitizer_path: internal HDF5 path to group containing
+            digitizer devices
+        :param cache_policy: one of :code:`'auto'`,
+            :code:`'sequential'`, or :code:`'random'`
+        :return: dictionary of :class:`h5py.File` keywords
+            (:code:`'rdcc_nbytes'`, :code:`'rdcc_nslots'`,
+            :code:`'rdcc_w0'`, and, for paged files,
+            :code:`'page_buf_size'`) plus the :code:`'policy'` used
+
+        .. csv-table:: Chunk cache sizing per policy, where a chunk
+                       "band" is the set of chunks spanning all time
+                       samples of one chunk row of shots.
+            :header: "Policy", "Description"
+            :widths: 20, 60
+
+            ":code:`'sequential'`", "
+            Holds two chunk bands, so shot-major block reads never
+            evict a chunk before all of its shots are read.  Fully read
+            chunks are preempted first (:code:`rdcc_w0 = 1.0`).
+            "
+            ":code:`'random'`", "
+            Holds as many chunk bands of the dataset as fit in the
+            cache limit, since any shot can be requested next.
+            (:code:`rdcc_w0 = 0.75`)
+            "
+            ":code:`'auto'`", "
+            Holds one chunk band for datasets whose chunks span more
+            than one shot (where shot-major reads revisit chunks).
+            (:code:`rdcc_w0 = 0.75`)
+            "
+
+        The cache is sized for the most demanding digitizer dataset and
+        is never smaller than the HDF5 default of 1 MB.  Since HDF5
+        gives every open dataset its own cache, the cache limit is the
+        smaller of 256 MB and an equal share, among the chunked
+        digitizer datasets, of 1 GB for the whole file.
+
+        .. note::
+
+            The chunk cache keywords require h5py >= 2.9 and
+            :code:`'page_buf_size'` h5py >= 3.0.  On older h5py
+            versions :class:`File` drops them and uses the HDF5
+            defaults.
+        """
+        if cache_policy not in ('auto', 'sequential', 'random'):
+            raise ValueError(
+                "`cache_policy` must be one of 'auto', 'sequential', "
+                "or 'random', got '{}'".format(cache_policy))
+
+        # gather chunk layouts of the 2D digitizer datasets
+        # - layout = (chunk shape, dataset shape, itemsize)
+        layouts = []
+        page_size = None
+        with h5py.File(name, 'r') as hf:
+            if digitizer_path in hf:
+                group = hf[digitizer_path]
+                for dname in group:
+                    digi_group = group.get(dname)
+                    if not isinstance(digi_group, h5py.Group):
+                        continue
+                    for dset_name in digi_group:
+                        dset = digi_group.get(dset_name)
+                        if isinstance(dset, h5py.Dataset) \
+                                and dset.chunks is not None \
+                                and dset.ndim == 2 \
+                                and dset.dtype.names is None:
+                            layouts.append((dset.chunks, dset.shape,
+                                            dset.dtype.itemsize))
+
+            # files created with a paged file space strategy can use
+            # a page buffer
+            fcpl = hf.id.get_create_plist()
+            if hasattr(fcpl, 'get_file_space_strategy'):
+                strategy = fcpl.get_file_space_strategy()[0]
+                if strategy == h5py.h5f.FSPACE_STRATEGY_PAGE:
+                    page_size = fcpl.get_file_space_page_size()
+
+        # size cache
+        # - every open dataset gets its own cache, so the per-dataset
+        #   size is capped by a share of the file-level total
+        w0 = 1.0 if cache_policy == 'sequential' else 0.75
+        max_nbytes = min(
+            _RDCC_MAX_NBYTES,
+            max(_RDCC_MAX_FILE_NBYTES // max(len(layouts), 1),
+                _RDCC_DEFAULT_NBYTES))
+        nbytes = _RDCC_DEFAULT_NBYTES
+        nchunks = 0
+        for chunks, shape, itemsize in layouts:
+            chunk_nbytes = int(chunks[0] * chunks[1] * itemsize)
+            band_nchunks = int(math.ceil(shape[1] / chunks[1]))
+            if cache_policy == 'sequential':
+                dset_nchunks = 2 * band_nchunks
+            elif cache_policy == 'random':
+                nbands = int(math.ceil(shape[0] / chunks[0]))
+                max_nbands = max(
+                    max_nbytes // (band_nchunks * chunk_nbytes), 1)
+                dset_nchunks = band_nchunks * min(nbands, max_nbands)
+            elif chunks[0] > 1:
+                # 'auto' and the chunks span multiple shots
+                dset_nchunks = band_nchunks
+            else:
+                # 'auto' and each shot is stored in its own chunks
+                dset_nchunks = 1
+
+            nbytes = max(nbytes,
+                         min(dset_nchunks * chunk_nbytes, max_nbytes))
+            nchunks = max(nchunks, nbytes // chunk_nbytes)
+
+        # HDF5 recommends the number of hash slots be a prime ~100
+        # times the number of chunks that fit in the cache
+        nslots = _next_prime(max(100 * nchunks, 521))
+
+        settings = {
+            'policy': cache_policy,
+            'rdcc_nbytes': int(nbytes),
+            'rdcc_nslots': nslots,
+            'rdcc_w0': w0,
+        }
+        if page_size is not None:
+            settings['page_buf_size'] = int(
+                max(page_size,
+                    math.ceil(nbytes / page_size) * page_size))
+
+        return settings
+
     def _build_info(self):
         """Builds the general :attr:`info` dictionary for the file."""
         # define file keys
@@ -98,6 +395,258 @@ class File(h5py.File):
             digitizer_path=self.DIGITIZER_PATH,
             msi_path=self.MSI_PATH)
 
+    def _mapped_dsets(self) -> List[h5py.Dataset]:
+        """
+        List of all datasets in the mapped digitizer groups and the
+        mapped control device datasets.
+        """
+        dsets = []
+        for dmap in self.digitizers.values():
+            for item in dmap.group.values():
+                if isinstance(item, h5py.Dataset):
+                    dsets.append(item)
+        for cmap in self.controls.values():
+            for cconfig in cmap.configs.values():
+                for path in cconfig['dset paths']:
+                    dset = self.get(path)
+                    if isinstance(dset, h5py.Dataset):
+                        dsets.append(dset)
+
+        return dsets
+
+    def _update_extents(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Refresh the extents of the mapped datasets (see
+        :meth:`_mapped_dsets`) and update the :code:`'nshotnum'` of
+        the digitizer adc setups whose datasets grew.
+
+        :return: dictionary of :code:`(old, new)` number of rows keyed
+            by the path of each dataset that grew
+        """
+        grown = {}
+        for dset in self._mapped_dsets():
+            if self._swmr:
+                dset.refresh()
+            nrows = dset.shape[0] if len(dset.shape) else 0
+            old = self._extents.get(dset.name, None)
+            self._extents[dset.name] = nrows
+            if old is not None and nrows > old:
+                grown[dset.name] = (old, nrows)
+
+        # update 'nshotnum' of the digitizer adc setups
+        if grown:
+            for dmap in self.digitizers.values():
+                dmap._update_nshotnum(self._extents, changed=grown)
+
+        return grown
+
+    async def _run_async(self, func, *args, **kwargs):
+        """
+        Run **func** on the file's :attr:`async_executor` without
+        blocking the event loop.
+        """
+        loop = asyncio.get_event_loop()
+        func = functools.partial(func, *args, **kwargs)
+        return await loop.run_in_executor(self.async_executor, func)
+
+    async def aread_controls(
+            self, controls: List[Union[str, Tuple[str, Any]]],
+            shotnum=slice(None),
+            intersection_set=True, silent=False, **kwargs):
+        """
+        Coroutine version of :meth:`read_controls`.  The read is run
+        on the file's :attr:`async_executor`.
+
+        :rtype: :class:`~.hdfreadcontrols.HDFReadControls`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # read the '6K Compumotor' control device data
+            >>> cdata = await f.aread_controls(['6K Compumotor'])
+        """
+        return await self._run_async(self.read_controls, controls,
+                                     shotnum=shotnum,
+                                     intersection_set=intersection_set,
+                                     silent=silent, **kwargs)
+
+    async def aread_data(self, board: int, channel: int,
+                         index=slice(None), shotnum=slice(None),
+                         digitizer=None, adc=None,
+                         config_name=None, keep_bits=False,
+                         add_controls=None, intersection_set=True,
+                         chunk_size=None, silent=False, **kwargs):
+        """
+        Coroutine version of :meth:`read_data`.  The digitizer data is
+        read in blocks of :data:`chunk_size` shot numbers (see
+        :meth:`iter_data`) on the file's :attr:`async_executor`, so a
+        cancelled read stops at the next block boundary.
+
+        Takes the same arguments as :meth:`read_data`, plus:
+
+        :param int chunk_size: number of shot numbers per block.
+            (DEFAULT blocks are ~32 MB and aligned to the HDF5 chunks
+            of the digitizer dataset)
+
+        :rtype: :class:`~.hdfreaddata.HDFReadData`
+
+        .. note::
+
+            Keywords :data:`where`, :data:`layout`, :data:`missing`,
+            and :data:`max_memory` act on the whole read, so with any
+            of them the read is done as a single executor job (and
+            cancellation is only honored before it starts).
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # read board 1, channel 1 while the event loop keeps
+            >>> # serving other requests
+            >>> data = await f.aread_data(1, 1, digitizer='SIS crate',
+            ...                           adc='SIS 3302',
+            ...                           config_name='config01')
+            >>> type(data)
+            bapsflib._hdf.utils.hdfreaddata.HDFReadData
+        """
+        from .hdfreaddata import HDFReadData
+
+        read_kwargs = {
+            'index': index,
+            'shotnum': shotnum,
+            'digitizer': digitizer,
+            'adc': adc,
+            'config_name': config_name,
+            'keep_bits': keep_bits,
+            'add_controls': add_controls,
+            'intersection_set': intersection_set,
+            'silent': silent,
+        }
+        if set(kwargs) - {'filter'}:
+            # the keywords act on the whole read
+            return await self._run_async(self.read_data, board, channel,
+                                         **read_kwargs, **kwargs)
+
+        data_iter = await self._run_async(
+            self.iter_data, board, channel,
+            chunk_size=chunk_size,
+            filter=kwargs.get('filter', None),
+            **read_kwargs)
+        if len(data_iter) == 0:
+            # nothing to read in blocks, let `read_data` build the
+            # (empty) array
+            return await self._run_async(self.read_data, board, channel,
+                                         **read_kwargs, **kwargs)
+
+        # read one block per executor job, so cancellation is
+        # honored between blocks
+        blocks = []
+        for block_id in range(len(data_iter)):
+            blocks.append(await self._run_async(
+                data_iter.read_block, block_id, in_thread=True))
+
+        if len(blocks) == 1:
+            return blocks[0]
+        data = np.concatenate(
+            [np.asarray(block) for block in blocks]).view(HDFReadData)
+        data._info = blocks[0].info.copy()
+        return data
+
+    async def aread_msi(self, msi_diag: str, silent=False, **kwargs):
+        """
+        Coroutine version of :meth:`read_msi`.  The read is run on the
+        file's :attr:`async_executor`.
+
+        :rtype: :class:`~.hdfreadmsi.HDFReadMSI`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # read 'Interferometer array'
+            >>> mdata = await f.aread_msi('Interferometer array')
+        """
+        return await self._run_async(self.read_msi, msi_diag,
+                                     silent=silent, **kwargs)
+
+    async def asignal_stats(self, board: int, channel: int,
+                            index=slice(None), shotnum=slice(None),
+                            digitizer=None, adc=None,
+                            config_name=None, keep_bits=False,
+                            chunk_size=None, prefetch=1,
+                            silent=False):
+        """
+        Coroutine version of :meth:`signal_stats`.  The statistics are
+        computed on the file's :attr:`async_executor`, so the channels
+        of a run can be processed concurrently.
+
+        :rtype: :class:`~.hdfsignalstats.HDFSignalStats`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # statistics of every channel on board 1
+            >>> stats = await asyncio.gather(
+            ...     *[f.asignal_stats(1, ch) for ch in range(8)])
+        """
+        return await self._run_async(self.signal_stats, board, channel,
+                                     index=index,
+                                     shotnum=shotnum,
+                                     digitizer=digitizer,
+                                     adc=adc,
+                                     config_name=config_name,
+                                     keep_bits=keep_bits,
+                                     chunk_size=chunk_size,
+                                     prefetch=prefetch,
+                                     silent=silent)
+
+    @property
+    def async_executor(self) -> ThreadPoolExecutor:
+        """
+        Thread pool executor running the :code:`aread_*` coroutines.
+        Its :code:`max_workers` limits the number of concurrent reads
+        on the file, and it is shut down when the file is closed.
+        """
+        if self._async_executor is None:
+            ekwargs = {'max_workers': self._max_async_reads}
+            if sys.version_info >= (3, 6):
+                ekwargs['thread_name_prefix'] = \
+                    'bapsflib-aread-{:x}'.format(id(self))
+            self._async_executor = ThreadPoolExecutor(**ekwargs)
+        return self._async_executor
+
+    @property
+    def chunk_cache(self) -> Dict[str, Any]:
+        """
+        Raw data chunk cache settings derived from the
+        :code:`cache_policy` used to open the file.  Empty if no
+        :code:`cache_policy` was given.
+        """
+        return self._chunk_cache
+
+    def close(self):
+        """
+        Close the file.  Any pending :code:`aread_*` reads are finished
+        before the file is closed, unless :meth:`close` is called from
+        one of the :attr:`async_executor` threads (which can not wait
+        on itself).
+        """
+        if self._async_executor is not None:
+            thread = threading.current_thread()
+            in_executor = (
+                thread in set(self._async_executor._threads)
+                or thread.name.startswith(
+                    'bapsflib-aread-{:x}_'.format(id(self))))
+            self._async_executor.shutdown(wait=not in_executor)
+            self._async_executor = None
+        super().close()
+
     @property
     def controls(self) -> HDFMapControls:
         """Dictionary of control device mappings."""
@@ -121,6 +670,254 @@ class File(h5py.File):
         """
         return self._info
 
+    def iter_channels(self, channels, index=slice(None),
+                      shotnum=slice(None), digitizer=None, adc=None,
+                      config_name=None, keep_bits=False,
+                      add_controls=None, chunk_size=None, prefetch=0,
+                      filter=None, resample_to=None, silent=False):
+        """
+        Iterates over the shot aligned digitizer data of several
+        channels in blocks of shot numbers.  Every iteration returns a
+        list with one :class:`~.hdfreaddata.HDFReadData` array per
+        channel, all holding the same shot numbers.  (see
+        :class:`~.hdfiterdata.HDFIterChannels` for details)
+
+        Takes the same arguments as :meth:`iter_data`, but with
+        :code:`intersection_set=True` and:
+
+        :param channels: list of the :code:`(board, channel)`, or
+            :code:`(board, channel, adc)`, of each channel
+        :param resample_to: the clock rate (in Hz), or the entry of
+            :data:`channels`, all channels are resampled to
+
+        :rtype: :class:`~.hdfiterdata.HDFIterChannels`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # read board 1, channels 1 and 2 in blocks of 500
+            >>> # shots
+            >>> for ch1, ch2 in f.iter_channels([(1, 1), (1, 2)],
+            ...                                 chunk_size=500):
+            ...     np.array_equal(ch1['shotnum'], ch2['shotnum'])
+            True
+        """
+        from .hdfiterdata import HDFIterChannels
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data_iter = HDFIterChannels(self, channels,
+                                        index=index,
+                                        shotnum=shotnum,
+                                        digitizer=digitizer,
+                                        adc=adc,
+                                        config_name=config_name,
+                                        keep_bits=keep_bits,
+                                        add_controls=add_controls,
+                                        chunk_size=chunk_size,
+                                        prefetch=prefetch,
+                                        filter=filter,
+                                        resample_to=resample_to,
+                                        silent=silent)
+
+        return data_iter
+
+    def iter_data(self, board: int, channel: int,
+                  index=slice(None), shotnum=slice(None),
+                  digitizer=None, adc=None,
+                  config_name=None, keep_bits=False, add_controls=None,
+                  intersection_set=True, chunk_size=None, prefetch=0,
+                  filter=None, silent=False):
+        """
+        Iterates over digitizer data in blocks of shot numbers, with
+        control device data attached when requested.  (see
+        :class:`~.hdfiterdata.HDFIterData` for details)
+
+        Takes the same arguments as :meth:`read_data`, plus:
+
+        :param int chunk_size: number of shot numbers per block.
+            (DEFAULT blocks are ~32 MB and aligned to the HDF5 chunks
+            of the digitizer dataset)
+        :param int prefetch: number of blocks a background thread
+            reads ahead of the consumer. (DEFAULT :code:`0`)
+        :param filter: filter applied to every block as it is read
+        :type filter: :class:`~.signalfilter.SignalFilter`
+
+        :rtype: :class:`~.hdfiterdata.HDFIterData`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # read board 1, channel 1 in blocks of 500 shots while
+            >>> # the next block is read in the background
+            >>> for data in f.iter_data(1, 1, chunk_size=500,
+            ...                         prefetch=1):
+            ...     type(data)
+            bapsflib._hdf.utils.hdfreaddata.HDFReadData
+        """
+        from .hdfiterdata import HDFIterData
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data_iter = HDFIterData(self, board, channel,
+                                    index=index,
+                                    shotnum=shotnum,
+                                    digitizer=digitizer,
+                                    adc=adc,
+                                    config_name=config_name,
+                                    keep_bits=keep_bits,
+                                    add_controls=add_controls,
+                                    intersection_set=intersection_set,
+                                    chunk_size=chunk_size,
+                                    prefetch=prefetch,
+                                    filter=filter,
+                                    silent=silent)
+
+        return data_iter
+
+    def iter_new_data(self, board: int, channel: int,
+                      digitizer=None, adc=None, config_name=None,
+                      keep_bits=False, add_controls=None,
+                      intersection_set=True, from_start=False,
+                      interval=1.0, timeout=None, silent=False):
+        """
+        Follow a digitizer dataset while it is being written.  The
+        file is polled (see :meth:`poll_new_shots`) every
+        :data:`interval` seconds and each batch of newly written shots
+        is yielded as a :class:`~.hdfreaddata.HDFReadData` array.
+        Only the new rows of the datasets are read.
+
+        Takes the same arguments as :meth:`read_data`, plus:
+
+        :param bool from_start: :code:`True` to start with the shots
+            already in the file, :code:`False` (DEFAULT) to only yield
+            shots written after the call
+        :param float interval: seconds between polls
+            (DEFAULT :code:`1.0`)
+        :param float timeout: stop after :data:`timeout` seconds
+            without new shots (DEFAULT :code:`None` follows forever)
+
+        :rtype: Iterator[:class:`~.hdfreaddata.HDFReadData`]
+
+        :Example:
+
+            >>> # open a file that is still being written by the DAQ
+            >>> f = File('run.hdf5', swmr=True)
+            >>>
+            >>> # quick-look at the shots of board 1, channel 1 as
+            >>> # they come in
+            >>> for data in f.iter_new_data(1, 1, interval=0.5,
+            ...                             timeout=60.):
+            ...     print(data['shotnum'][-1], data['signal'].mean())
+
+        .. note::
+
+            With :code:`add_controls` and :code:`intersection_set=True`,
+            shots are only yielded once the control devices have
+            recorded them.  Digitizer rows written ahead of the
+            control devices are held back and yielded with a later
+            batch.
+        """
+        # resolve the digitizer header dataset
+        _fmap = self.file_map
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            if digitizer is None:
+                _dmap = _fmap.main_digitizer
+                if _dmap is None:
+                    raise ValueError(
+                        "No main digitizer is identified..."
+                        "need to specify `digitizer` kwarg")
+            elif digitizer in _fmap.digitizers:
+                _dmap = _fmap.digitizers[digitizer]
+            else:
+                raise ValueError(
+                    "Specified Digitizer '{}'".format(digitizer)
+                    + " is not among known digitizers "
+                    "({})".format(list(_fmap.digitizers)))
+            kwargs = {'return_info': True}
+            if config_name is not None:
+                kwargs['config_name'] = config_name
+            if adc is not None:
+                kwargs['adc'] = adc
+            dname, d_info = _dmap.construct_dataset_name(
+                board, channel, **kwargs)
+        config_name = d_info['configuration name']
+        adc = d_info['adc']
+        dhpath = _dmap.info['group path'] + '/' \
+            + _dmap.construct_header_dataset_name(
+                board, channel, config_name=config_name, adc=adc)
+
+        # control datasets whose shot numbers gate the digitizer rows
+        # - with intersection_set=True a digitizer row is held back
+        #   (pending) until every control device has recorded its shot
+        cdsets = []
+        if bool(add_controls) and intersection_set:
+            from .helpers import condition_controls
+
+            with warnings.catch_warnings():
+                warnings.simplefilter(warn_filter)
+                add_controls = condition_controls(self, add_controls)
+            for cname, cconfn in add_controls:
+                cconfig = self.controls[cname].configs[cconfn]
+                cdsets.append((cconfig['dset paths'][0],
+                               cconfig['shotnum']['dset field'][0]))
+        shotnumkey = \
+            _dmap.configs[config_name]['shotnum']['dset field'][0]
+
+        self.poll_new_shots()
+        cursor = 0 if from_start else self.get(dhpath).shape[0]
+        pending = np.empty(0, dtype=np.int64)
+        last_time = time.monotonic()
+        while True:
+            nrows = self.get(dhpath).shape[0]
+            index = np.concatenate(
+                (pending, np.arange(cursor, nrows, dtype=np.int64)))
+            cursor = max(cursor, nrows)
+            if index.shape[0] != 0 and len(cdsets) != 0:
+                # hold back rows not yet recorded by the controls
+                # - no dataset objects are held across the yield, an
+                #   open dataset object goes stale on a SWMR refresh
+                sn = self.get(dhpath)[index.tolist(), shotnumkey]
+                recorded = np.ones(index.shape, dtype=bool)
+                for cdset_path, cshotnumkey in cdsets:
+                    recorded &= np.isin(
+                        sn, self.get(cdset_path)[cshotnumkey])
+                pending = index[~recorded]
+                index = index[recorded]
+
+            if index.shape[0] != 0:
+                data = self.read_data(
+                    board, channel, index=index,
+                    digitizer=_dmap.device_name, adc=adc,
+                    config_name=config_name, keep_bits=keep_bits,
+                    add_controls=add_controls,
+                    intersection_set=intersection_set, silent=silent)
+                last_time = time.monotonic()
+                yield data
+            elif timeout is not None \
+                    and time.monotonic() - last_time >= timeout:
+                return
+            else:
+                time.sleep(interval)
+
+            self.poll_new_shots()
+
+    @property
+    def max_memory(self) -> Union[None, int]:
+        """
+        Default memory budget (in bytes) of :meth:`read_data` and
+        :meth:`read_msi`, :code:`None` for no budget.
+        """
+        return self._max_memory
+
     @property
     def msi(self) -> HDFMapMSI:
         """Dictionary of MSI device mappings."""
@@ -135,10 +932,225 @@ class File(h5py.File):
 
         return HDFOverview(self)
 
+    def plan_read(self, board: int, channel: int,
+                  index=slice(None), shotnum=slice(None),
+                  digitizer=None, adc=None, config_name=None,
+                  keep_bits=False, add_controls=None,
+                  intersection_set=True, layout='records',
+                  missing='fill', silent=False):
+        """
+        Plans a :meth:`read_data` read without reading any digitizer
+        or control device data.  The returned plan holds the
+        conditioned shot numbers, dataset indices, and dtype, the
+        estimated bytes, read calls, chunks, and peak memory of the
+        read, and performs the read when executed. (see
+        :class:`~.hdfreadplan.HDFReadPlan` for details)
+
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadplan.HDFReadPlan`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # plan and inspect the read
+            >>> plan = f.plan_read(1, 1, digitizer='SIS crate',
+            ...                    add_controls=['6K Compumotor'])
+            >>> plan.estimates['peak memory']
+            2721440000
+            >>>
+            >>> # read channels 1 and 2
+            >>> data1 = plan.execute()
+            >>> data2 = plan.execute(channel=2)
+        """
+        from .hdfreadplan import HDFReadPlan
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            plan = HDFReadPlan(self, board, channel,
+                               index=index,
+                               shotnum=shotnum,
+                               digitizer=digitizer,
+                               adc=adc,
+                               config_name=config_name,
+                               keep_bits=keep_bits,
+                               add_controls=add_controls,
+                               intersection_set=intersection_set,
+                               layout=layout,
+                               missing=missing)
+
+        return plan
+
+    def poll_new_shots(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Check for newly written shots.  The extents of the mapped
+        digitizer and control device datasets are refreshed (required
+        to see new data in SWMR mode, see :class:`File`) and the
+        :code:`'nshotnum'` of the affected digitizer adc setups is
+        updated.
+
+        :return: dictionary of :code:`(previous, current)` number of
+            rows keyed by the path of every dataset that grew since
+            the last poll
+
+        :Example:
+
+            >>> f = File('run.hdf5', swmr=True)
+            >>> f.poll_new_shots()
+            {'/Raw data + config/SIS 3301/config01 [0:0]': (100, 120),
+             '/Raw data + config/SIS 3301/config01 [0:0] headers':
+                 (100, 120)}
+        """
+        return self._update_extents()
+
+    def read_averaged(self, board: int, channel: int,
+                      by='xyz', stats=('mean', 'std'),
+                      index=slice(None), shotnum=slice(None),
+                      digitizer=None, adc=None, config_name=None,
+                      keep_bits=False, add_controls=None,
+                      chunk_size=None, prefetch=1, silent=False):
+        """
+        Reads digitizer data and averages the shots grouped by the
+        value(s) of control device field(s) (e.g. the probe position).
+        The shots are streamed in blocks, so the full shot number by
+        time array is never held in memory.  See
+        :class:`~.hdfreadaveraged.HDFReadAveraged` for more detail.
+
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param by: name of the control device field(s) the shots are
+            grouped by, or of control device(s) in
+            :data:`add_controls` to group by all their state values,
+            e.g. :code:`'Waveform'` averages each command of the
+            command list (DEFAULT :code:`'xyz'`)
+        :type by: Union[str, Iterable[Union[str, Tuple[str, Any]]]]
+        :param stats: statistics computed for each group, among
+            :code:`'mean'`, :code:`'std'`, :code:`'var'`,
+            :code:`'min'`, and :code:`'max'`
+            (DEFAULT :code:`('mean', 'std')`)
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadaveraged.HDFReadAveraged`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # average board 1, channel 1 at each probe position
+            >>> avg = f.read_averaged(1, 1,
+            ...                       add_controls=['6K Compumotor'])
+            >>> avg['xyz'].shape, avg['mean'].shape
+            ((121, 3), (121, 100))
+        """
+        from .hdfreadaveraged import HDFReadAveraged
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadAveraged(self, board, channel,
+                                   by=by,
+                                   stats=stats,
+                                   index=index,
+                                   shotnum=shotnum,
+                                   digitizer=digitizer,
+                                   adc=adc,
+                                   config_name=config_name,
+                                   keep_bits=keep_bits,
+                                   add_controls=add_controls,
+                                   chunk_size=chunk_size,
+                                   prefetch=prefetch,
+                                   silent=silent)
+
+        return data
+
+    def read_channels(self, channels, shotnum=slice(None),
+                      digitizer=None, adc=None, config_name=None,
+                      keep_bits=False, add_controls=None,
+                      intersection_set=True, filter=None,
+                      silent=False):
+        """
+        Reads the shot aligned data of several digitizer channels,
+        possibly of different digitizers and configurations, with one
+        shared table of control device data.  See
+        :class:`~.hdfreadchannels.HDFReadChannels` for more detail.
+
+        :param channels: list of the :code:`(board, channel)` or
+            :code:`(board, channel, adc)` of each channel, or of
+            dictionaries with keys :code:`'board'`,
+            :code:`'channel'`, and optionally :code:`'digitizer'`,
+            :code:`'config_name'`, and :code:`'adc'`
+        :param str digitizer: digitizer of the channels not specifying
+            one
+        :param str adc: analog-digital-converter of the channels not
+            specifying one
+        :param str config_name: digitizer configuration of the
+            channels not specifying one
+        :param bool intersection_set: :code:`True` (DEFAULT) reads
+            only the shot numbers recorded on every channel and by
+            every control device, :code:`False` reads the union
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadchannels.HDFReadChannels`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # a 'SIS 3301' and a 'SIS crate' channel
+            >>> data = f.read_channels(
+            ...     [{'board': 1, 'channel': 1,
+            ...       'digitizer': 'SIS 3301'},
+            ...      {'board': 1, 'channel': 1,
+            ...       'digitizer': 'SIS crate', 'adc': 'SIS 3302'}],
+            ...     add_controls=['6K Compumotor'])
+            >>> len(data), data.controls.shape
+            (2, (100,))
+        """
+        from .hdfreadchannels import HDFReadChannels
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadChannels(self, channels,
+                                   shotnum=shotnum,
+                                   digitizer=digitizer,
+                                   adc=adc,
+                                   config_name=config_name,
+                                   keep_bits=keep_bits,
+                                   add_controls=add_controls,
+                                   intersection_set=intersection_set,
+                                   filter=filter)
+
+        return data
+
     def read_controls(self,
                       controls: List[Union[str, Tuple[str, Any]]],
                       shotnum=slice(None),
                       intersection_set=True,
+                      missing='fill',
                       silent=False, **kwargs):
         """
         Reads data from control device datasets.  See
@@ -172,6 +1184,15 @@ class File(h5py.File):
             :class:`~.hdfreadcontrols.HDFReadControls`
             for details)
 
+        :param str missing:
+
+            :code:`'fill'` (DEFAULT) NULL fills the entries of shot
+            numbers missing in a control device dataset.
+            :code:`'mask'` only keeps the shot numbers recorded by at
+            least one device, leaves the other entries zero, and flags
+            the valid entries of each device in :code:`info['valid']`
+            (every entry is valid with :code:`intersection_set=True`)
+
         :param bool silent:
 
             :code:`False` (DEFAULT).  Set :code:`True` to ignore any
@@ -221,16 +1242,165 @@ class File(h5py.File):
             data = HDFReadControls(self, controls,
                                    shotnum=shotnum,
                                    intersection_set=intersection_set,
+                                   missing=missing,
                                    **kwargs)
 
         return data
 
+    def read_correlation(self, channels, by=None, maxlag=None,
+                         nperseg=256, noverlap=None, window='hann',
+                         detrend='constant', index=slice(None),
+                         shotnum=slice(None), digitizer=None,
+                         adc=None, config_name=None, keep_bits=False,
+                         add_controls=None, chunk_size=None,
+                         prefetch=1, resample_to=None, silent=False):
+        """
+        Reads the shot aligned digitizer data of several channels and
+        computes the cross-correlation, time delay, and coherence of
+        every pair of channels, per shot or averaged per group of
+        shots.  The shots are streamed in blocks and transformed with
+        batched FFTs.  See
+        :class:`~.hdfreadcorrelation.HDFReadCorrelation` for more
+        detail.
+
+        :param channels: list of the :code:`(board, channel)` of two or
+            more channels
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by.  :code:`'shotnum'` gives the estimates of every shot
+            and :code:`None` (DEFAULT) averages all shots.
+        :param int maxlag: largest lag (in samples) of the
+            cross-correlations
+        :param int nperseg: length of each Welch segment of the
+            coherence (DEFAULT :code:`256`)
+        :param noverlap: see :func:`scipy.signal.welch`
+        :param window: see :func:`scipy.signal.welch`
+        :param detrend: see :func:`scipy.signal.welch`
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by background
+            threads (DEFAULT :code:`1`)
+        :param resample_to: the clock rate (in Hz), or the entry of
+            :data:`channels`, all channels are resampled to
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadcorrelation.HDFReadCorrelation`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # delay between board 1, channels 1 and 2 of each shot
+            >>> corr = f.read_correlation([(1, 1), (1, 2)],
+            ...                           by='shotnum', maxlag=100)
+            >>> corr['delay'].shape
+            (1000, 1)
+        """
+        from .hdfreadcorrelation import HDFReadCorrelation
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadCorrelation(self, channels,
+                                      by=by,
+                                      maxlag=maxlag,
+                                      nperseg=nperseg,
+                                      noverlap=noverlap,
+                                      window=window,
+                                      detrend=detrend,
+                                      index=index,
+                                      shotnum=shotnum,
+                                      digitizer=digitizer,
+                                      adc=adc,
+                                      config_name=config_name,
+                                      keep_bits=keep_bits,
+                                      add_controls=add_controls,
+                                      chunk_size=chunk_size,
+                                      prefetch=prefetch,
+                                      resample_to=resample_to,
+                                      silent=silent)
+
+        return data
+
+    def read_cube(self, board: int, channel: int, add_controls,
+                  motion_list=None, tol=0.1, reduce=None,
+                  index=slice(None), shotnum=slice(None),
+                  digitizer=None, adc=None, config_name=None,
+                  keep_bits=False, chunk_size=None, prefetch=1,
+                  silent=False):
+        """
+        Reads digitizer data into a :code:`(nx, ny, nz,
+        nshots_per_pos, nt)` data cube (or :code:`(nx, ny, nz, nt)`
+        with :code:`reduce='mean'`) on the grid of a probe drive
+        motion list.  See :class:`~.hdfreadcube.HDFReadCube` for more
+        detail.
+
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param add_controls: control devices to add, one of which must
+            define motion lists (e.g. :code:`['6K Compumotor']`)
+        :param str motion_list: name of the motion list defining the
+            grid (DEFAULT :code:`None` if there is only one)
+        :param float tol: tolerance, as a fraction of the grid
+            spacing, for a shot to be on a grid point
+            (DEFAULT :code:`0.1`)
+        :param str reduce: :code:`None` (DEFAULT) to keep every shot,
+            or :code:`'mean'` to average the shots at each position
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadcube.HDFReadCube`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # build data cube for board 1, channel 1
+            >>> cube = f.read_cube(1, 1, [('6K Compumotor', 2)])
+            >>> cube.shape
+            (11, 11, 1, 10, 100)
+        """
+        from .hdfreadcube import HDFReadCube
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadCube(self, board, channel, add_controls,
+                               motion_list=motion_list,
+                               tol=tol,
+                               reduce=reduce,
+                               index=index,
+                               shotnum=shotnum,
+                               digitizer=digitizer,
+                               adc=adc,
+                               config_name=config_name,
+                               keep_bits=keep_bits,
+                               chunk_size=chunk_size,
+                               prefetch=prefetch,
+                               silent=silent)
+
+        return data
+
     def read_data(self, board: int, channel: int,
                   index=slice(None), shotnum=slice(None),
                   digitizer=None, adc=None,
                   config_name=None, keep_bits=False, add_controls=None,
-                  intersection_set=True, silent=False,
-                  **kwargs):
+                  intersection_set=True, where=None, filter=None,
+                  layout='records', missing='fill', max_memory=None,
+                  silent=False, **kwargs):
         """
         Reads data from digitizer datasets and attaches control device
         data when requested. (see :class:`.hdfreaddata.HDFReadData`
@@ -273,12 +1443,65 @@ class File(h5py.File):
             :math:`shotnum \le 0`. (see
             :class:`~.hdfreaddata.HDFReadData` for details)
 
+        :param dict where:
+
+            Control device conditions evaluated before any digitizer
+            data is read, e.g.
+            :code:`{'Waveform': ('FREQ', '==', 50000.)}`.  Each key is
+            a control device (as in :data:`add_controls`) and each
+            value a :code:`(field, op, value)` tuple, or a list of
+            them, on the device's state values.  Only the control
+            device datasets are scanned and only the digitizer rows of
+            the shot numbers satisfying all conditions are read. Can
+            not be combined with :data:`index`. (see
+            :func:`~.helpers.select_shotnum_where` for details)
+
+        :param filter:
+
+            Filter applied in place along the time axis of every shot
+            of the voltage signal, designed for the time step size of
+            the digitizer data, e.g.
+            :code:`SignalFilter('lowpass', 1e6)`. (see
+            :class:`~.signalfilter.SignalFilter` for details)
+
+        :type filter: :class:`~.signalfilter.SignalFilter`
+
+        :param str layout:
+
+            :code:`'records'` (DEFAULT) returns a structured array.
+            :code:`'columns'` returns a
+            :class:`~.hdfreaddata.HDFDataColumns` where
+            :code:`'signal'`, :code:`'shotnum'`, :code:`'xyz'`, and
+            every control device field are separate C-contiguous
+            arrays, for vectorized processing of :code:`'signal'`
+            without copying.
+
+        :param str missing:
+
+            :code:`'fill'` (DEFAULT) NULL fills the entries of shot
+            numbers missing in the digitizer or a control device
+            dataset.  :code:`'mask'` (requires
+            :code:`layout='columns'`) stores the :code:`'signal'` of
+            the recorded shots only and flags the valid entries of
+            each source (every entry is valid with
+            :code:`intersection_set=True`, see
+            :class:`~.hdfreaddata.HDFDataColumns`)
+
+        :param int max_memory:
+
+            Memory budget (in bytes) of the read.  If the estimated
+            memory of the read exceeds it, a :code:`MemoryError`
+            stating the estimate is raised before any control device
+            data or signal is read.
+            (DEFAULT :code:`None` uses :attr:`max_memory`)
+
         :param bool silent:
 
             :code:`False` (DEFAULT).  Set :code:`True` to ignore any
             UserWarnings (soft-warnings)
 
-        :rtype: :class:`~.hdfreaddata.HDFReadData`
+        :rtype: :class:`~.hdfreaddata.HDFReadData` or
+            :class:`~.hdfreaddata.HDFDataColumns`
 
         :Example:
 
@@ -322,10 +1545,22 @@ class File(h5py.File):
             >>> #       digitizer hookup
         """
         from .hdfreaddata import HDFReadData
+        from .helpers import select_shotnum_where
 
         warn_filter = 'ignore' if silent else 'default'
         with warnings.catch_warnings():
             warnings.simplefilter(warn_filter)
+            if where is not None:
+                if not (isinstance(index, slice)
+                        and index == slice(None)):
+                    raise ValueError(
+                        "`where` can not be combined with `index`, "
+                        "use `shotnum` instead")
+                shotnum = select_shotnum_where(self, where,
+                                               shotnum=shotnum)
+                if shotnum.size == 0:
+                    raise ValueError(
+                        "No shot numbers satisfy `where`.")
             data = HDFReadData(self, board, channel,
                                index=index,
                                shotnum=shotnum,
@@ -335,16 +1570,98 @@ class File(h5py.File):
                                keep_bits=keep_bits,
                                add_controls=add_controls,
                                intersection_set=intersection_set,
+                               filter=filter,
+                               layout=layout,
+                               missing=missing,
+                               max_memory=(self.max_memory
+                                           if max_memory is None
+                                           else max_memory),
                                **kwargs)
 
         return data
 
-    def read_msi(self, msi_diag: str, silent=False, **kwargs):
+    def read_moments(self, board: int, channel: int, by=None,
+                     bins=None, hist_range=None,
+                     index=slice(None), shotnum=slice(None),
+                     digitizer=None, adc=None, config_name=None,
+                     keep_bits=False, add_controls=None,
+                     chunk_size=None, prefetch=1, silent=False):
+        """
+        Reads digitizer data and computes the mean, variance, skewness,
+        kurtosis, extremes, and (optionally) amplitude histogram of the
+        signal samples, pooled over the shots of each group.  The shots
+        are streamed in blocks, so the statistics are computed in one
+        read pass with constant memory.  See
+        :class:`~.hdfreadmoments.HDFReadMoments` for more detail.
+
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by.  :code:`None` (DEFAULT) pools all shots.
+        :param bins: number of histogram bins (requires
+            :data:`hist_range`) or the bin edges
+        :param hist_range: :code:`(lower, upper)` histogram range
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadmoments.HDFReadMoments`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # kurtosis and PDF of board 1, channel 1 per position
+            >>> mom = f.read_moments(1, 1, by='xyz', bins=100,
+            ...                      hist_range=(-1., 1.),
+            ...                      add_controls=['6K Compumotor'])
+            >>> mom['kurtosis'].shape, mom['hist'].shape
+            ((121,), (121, 100))
+        """
+        from .hdfreadmoments import HDFReadMoments
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadMoments(self, board, channel,
+                                  by=by,
+                                  bins=bins,
+                                  hist_range=hist_range,
+                                  index=index,
+                                  shotnum=shotnum,
+                                  digitizer=digitizer,
+                                  adc=adc,
+                                  config_name=config_name,
+                                  keep_bits=keep_bits,
+                                  add_controls=add_controls,
+                                  chunk_size=chunk_size,
+                                  prefetch=prefetch,
+                                  silent=silent)
+
+        return data
+
+    def read_msi(self, msi_diag: str, max_memory=None, silent=False,
+                 **kwargs):
         """
         Reads data from MSI Diagnostic datasets.  See
         :class:`~.hdfreadmsi.HDFReadMSI` for more detail.
 
         :param msi_diag: name of MSI diagnostic
+        :param int max_memory:
+
+            Memory budget (in bytes) of the read.  If the size of the
+            returned array exceeds it, a :code:`MemoryError` is
+            raised before the array is allocated.
+            (DEFAULT :code:`None` uses :attr:`max_memory`)
+
         :param bool silent:
 
             :code:`False` (DEFAULT).  Set :code:`True` to ignore any
@@ -371,6 +1688,456 @@ class File(h5py.File):
         warn_filter = 'ignore' if silent else 'default'
         with warnings.catch_warnings():
             warnings.simplefilter(warn_filter)
-            data = HDFReadMSI(self, msi_diag, **kwargs)
+            data = HDFReadMSI(self, msi_diag,
+                              max_memory=(self.max_memory
+                                          if max_memory is None
+                                          else max_memory),
+                              **kwargs)
+
+        return data
+
+    def read_probe(self, receptacle: int, channels=None,
+                   shotnum=slice(None), digitizer=None, adc=None,
+                   config_name=None, keep_bits=False,
+                   add_controls=None, intersection_set=True,
+                   filter=None, silent=False):
+        """
+        Reads every digitizer channel of the probe on a
+        :code:`'6K Compumotor'` receptacle, as listed in its probe
+        list, together with the receptacle's position and rotation.
+        See :class:`~.hdfreadprobe.HDFReadProbe` for more detail.
+
+        :param int receptacle: receptacle number of the probe
+        :param channels: the probe's channels, if not listed in (or to
+            override) the probe list (see :meth:`read_channels`)
+        :param add_controls: control devices added to the
+            receptacle's :code:`'6K Compumotor'` configuration
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_channels`.
+
+        :rtype: :class:`~.hdfreadprobe.HDFReadProbe`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # all tips of the probe on receptacle 2
+            >>> data = f.read_probe(2)
+            >>> data.stack().shape, data.controls['xyz'].shape
+            ((4, 1000, 20000), (1000, 3))
+        """
+        from .hdfreadprobe import HDFReadProbe
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadProbe(self, receptacle,
+                                channels=channels,
+                                shotnum=shotnum,
+                                digitizer=digitizer,
+                                adc=adc,
+                                config_name=config_name,
+                                keep_bits=keep_bits,
+                                add_controls=add_controls,
+                                intersection_set=intersection_set,
+                                filter=filter)
 
         return data
+
+    def read_spectra(self, board: int, channel: int, cross=None,
+                     by=None, nperseg=256, noverlap=None,
+                     window='hann', detrend='constant',
+                     scaling='density', index=slice(None),
+                     shotnum=slice(None), digitizer=None, adc=None,
+                     config_name=None, keep_bits=False,
+                     add_controls=None, chunk_size=None, prefetch=1,
+                     silent=False):
+        """
+        Reads digitizer data and computes the shot averaged Welch power
+        spectral density of a channel, and optionally its cross
+        spectral density with a second channel, per group of shots.
+        The shots are streamed in blocks, so memory scales with the
+        number of frequencies.  See
+        :class:`~.hdfreadspectra.HDFReadSpectra` for more detail.
+
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param cross: :code:`(board, channel)` of the second channel
+            of the cross spectral density
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by.  :code:`None` (DEFAULT) averages all shots.
+        :param int nperseg: length of each Welch segment
+            (DEFAULT :code:`256`)
+        :param noverlap: see :func:`scipy.signal.welch`
+        :param window: see :func:`scipy.signal.welch`
+        :param detrend: see :func:`scipy.signal.welch`
+        :param scaling: see :func:`scipy.signal.welch`
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadspectra.HDFReadSpectra`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # PSD of board 1, channel 1 and its CSD with channel 2
+            >>> spec = f.read_spectra(1, 1, cross=(1, 2), nperseg=512)
+            >>> spec.info['frequency'].shape, spec['csd'].shape
+            ((257,), (1, 257))
+        """
+        from .hdfreadspectra import HDFReadSpectra
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadSpectra(self, board, channel,
+                                  cross=cross,
+                                  by=by,
+                                  nperseg=nperseg,
+                                  noverlap=noverlap,
+                                  window=window,
+                                  detrend=detrend,
+                                  scaling=scaling,
+                                  index=index,
+                                  shotnum=shotnum,
+                                  digitizer=digitizer,
+                                  adc=adc,
+                                  config_name=config_name,
+                                  keep_bits=keep_bits,
+                                  add_controls=add_controls,
+                                  chunk_size=chunk_size,
+                                  prefetch=prefetch,
+                                  silent=silent)
+
+        return data
+
+    def read_spectrogram(self, board: int, channel: int, by=None,
+                         nperseg=256, noverlap=None, window='hann',
+                         detrend='constant', scaling='density',
+                         mode='psd', out=None, index=slice(None),
+                         shotnum=slice(None), digitizer=None,
+                         adc=None, config_name=None, keep_bits=False,
+                         add_controls=None, chunk_size=None,
+                         prefetch=1, silent=False):
+        """
+        Reads digitizer data and computes the spectrogram of a channel
+        for every shot, or ensemble averaged per group of shots.  The
+        shots are streamed in blocks and the spectrograms can be
+        written incrementally to a preallocated array or HDF5 dataset.
+        See :class:`~.hdfreadspectrogram.HDFReadSpectrogram` for more
+        detail.
+
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by.  :code:`'shotnum'` computes the spectrogram of every
+            shot and :code:`None` (DEFAULT) averages all shots.
+        :param int nperseg: length of each segment
+            (DEFAULT :code:`256`)
+        :param noverlap: see :func:`scipy.signal.spectrogram`
+        :param window: see :func:`scipy.signal.spectrogram`
+        :param detrend: see :func:`scipy.signal.spectrogram`
+        :param scaling: see :func:`scipy.signal.spectrogram`
+        :param str mode: :code:`'psd'` (DEFAULT), :code:`'complex'`,
+            or :code:`'magnitude'`
+        :param out: array-like of shape
+            :code:`(>= ngroups, nfreq, nframes)` the spectrograms are
+            written to
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfreadspectrogram.HDFReadSpectrogram`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # spectrogram of board 1, channel 1 averaged per
+            >>> # probe position
+            >>> spec = f.read_spectrogram(
+            ...     1, 1, by='xyz', nperseg=512,
+            ...     add_controls=['6K Compumotor'])
+            >>> spec['spectrogram'].shape
+            (121, 257, 22)
+        """
+        from .hdfreadspectrogram import HDFReadSpectrogram
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            data = HDFReadSpectrogram(self, board, channel,
+                                      by=by,
+                                      nperseg=nperseg,
+                                      noverlap=noverlap,
+                                      window=window,
+                                      detrend=detrend,
+                                      scaling=scaling,
+                                      mode=mode,
+                                      out=out,
+                                      index=index,
+                                      shotnum=shotnum,
+                                      digitizer=digitizer,
+                                      adc=adc,
+                                      config_name=config_name,
+                                      keep_bits=keep_bits,
+                                      add_controls=add_controls,
+                                      chunk_size=chunk_size,
+                                      prefetch=prefetch,
+                                      silent=silent)
+
+        return data
+
+    def refresh(self, silent=False) -> Dict[str, List[str]]:
+        """
+        Update :attr:`file_map` to changes in the HDF5 file (e.g. new
+        configuration groups or extended datasets) without re-mapping
+        the whole file.  Only the affected device mappings are
+        updated, see :meth:`~bapsflib._hdf.maps.hdfmap.HDFMap.refresh`.
+
+        :param bool silent: set :code:`True` to suppress mapping
+            warnings (DEFAULT :code:`False`)
+        :return: dictionary of the device names that were
+            :code:`'added'`, :code:`'removed'`, :code:`'remapped'`, or
+            :code:`'extended'`
+
+        :Example:
+
+            >>> f = File('run.hdf5', mode='r',
+            ...          control_path='Raw data + config',
+            ...          digitizer_path='Raw data + config',
+            ...          msi_path='MSI')
+            >>>
+            >>> # ... the DAQ adds configuration 'config02'
+            >>> f.refresh()
+            {'added': [], 'removed': [], 'remapped': ['SIS crate'],
+             'extended': []}
+        """
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            changes = self.file_map.refresh()
+
+        # drop spatial indexes of re-mapped control devices
+        dropped = changes['remapped'] + changes['removed']
+        for key in list(self._spatial_indexes):
+            if key[0] in dropped:
+                del self._spatial_indexes[key]
+
+        # keep SWMR extents in sync
+        if self._swmr:
+            self._update_extents()
+
+        return changes
+
+    def signal_stats(self, board: int, channel: int,
+                     index=slice(None), shotnum=slice(None),
+                     digitizer=None, adc=None, config_name=None,
+                     keep_bits=False, chunk_size=None, prefetch=1,
+                     silent=False):
+        """
+        Computes the per-shot minimum, maximum, mean, RMS, and ADC
+        saturation flag of a digitizer signal.  The shots are streamed
+        in blocks of the raw ADC dtype, so the full (voltage) shot
+        number by time array is never allocated.  See
+        :class:`~.hdfsignalstats.HDFSignalStats` for more detail.
+
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param bool keep_bits: :code:`True` to keep the statistics in
+            bits, :code:`False` (DEFAULT) to convert them to voltage
+        :param int chunk_size: number of shots read per block
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        All other parameters follow :meth:`read_data`.
+
+        :rtype: :class:`~.hdfsignalstats.HDFSignalStats`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # shots of board 1, channel 1 that saturated the ADC
+            >>> stats = f.signal_stats(1, 1)
+            >>> stats['shotnum'][stats['saturated']]
+            array([12, 13], dtype=uint32)
+        """
+        from .hdfsignalstats import HDFSignalStats
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            stats = HDFSignalStats(self, board, channel,
+                                   index=index,
+                                   shotnum=shotnum,
+                                   digitizer=digitizer,
+                                   config_name=config_name,
+                                   adc=adc,
+                                   keep_bits=keep_bits,
+                                   chunk_size=chunk_size,
+                                   prefetch=prefetch,
+                                   silent=silent)
+
+        return stats
+
+    def spatial_index(self, control, silent=False):
+        """
+        Spatial index of the probe positions recorded by a control
+        device.  The index is built on first request and cached on the
+        file.  It is re-built if the control device dataset has grown
+        since.  See :class:`~.spatialindex.SpatialIndex` for more
+        detail.
+
+        :param control: name of the control device, or a
+            :code:`(name, configuration name)` tuple if the device
+            has more than one configuration
+        :param bool silent:
+
+            :code:`False` (DEFAULT).  Set :code:`True` to ignore any
+            UserWarnings (soft-warnings)
+
+        :rtype: :class:`~.spatialindex.SpatialIndex`
+
+        :Example:
+
+            >>> # open HDF5 file
+            >>> f = File('sample.hdf5')
+            >>>
+            >>> # read only the shots within 1 cm of (x, y) = (0, 0)
+            >>> sindex = f.spatial_index(('6K Compumotor', 2))
+            >>> sn = sindex.query_radius((0., 0.), 1., axes='xy')
+            >>> data = f.read_data(1, 1, shotnum=sn,
+            ...                    add_controls=[('6K Compumotor', 2)])
+        """
+        from .helpers import condition_controls
+        from .spatialindex import SpatialIndex
+
+        warn_filter = 'ignore' if silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            key = condition_controls(self, [control])[0]
+            sindex = self._spatial_indexes.get(key, None)
+            if sindex is not None:
+                cconfig = self.controls[key[0]].configs[key[1]]
+                dset = self.get(cconfig['dset paths'][0])
+                if dset.shape[0] != sindex.nrows:
+                    sindex = None
+            if sindex is None:
+                sindex = SpatialIndex(self, key)
+                self._spatial_indexes[key] = sindex
+
+        return sindex
+
+    def spec(self) -> 'FileSpec':
+        """
+        Picklable description of the open file, including a snapshot of
+        :attr:`file_map`.  Calling :meth:`FileSpec.open` (e.g. in a
+        :mod:`multiprocessing` worker) re-opens the file with the same
+        settings and attaches the mapping snapshot instead of
+        re-mapping the file.  Pickling a :class:`File` pickles its
+        spec.
+
+        :rtype: :class:`FileSpec`
+
+        :Example:
+
+            >>> from concurrent.futures import ProcessPoolExecutor
+            >>>
+            >>> def get_data(spec, board, channel):
+            ...     with spec.open() as f:
+            ...         return f.read_data(board, channel)
+            >>>
+            >>> f = File('sample.hdf5')
+            >>> with ProcessPoolExecutor() as pool:
+            ...     data = list(pool.map(get_data, [f.spec()] * 2,
+            ...                          [1, 1], [1, 2]))
+        """
+        filename = self.filename
+        if isinstance(filename, bytes):
+            filename = filename.decode('utf-8')
+
+        return FileSpec(type(self), os.path.abspath(filename),
+                        self.mode, self._spec_kwargs, self.file_map)
+
+
+class FileSpec(object):
+    """
+    Picklable description of an open :class:`File` (see
+    :meth:`File.spec`).  The mapping is held as a pickled snapshot, so
+    a :class:`FileSpec` carries no HDF5 objects.
+    """
+    def __init__(self, file_class: type, name: str, mode: str,
+                 kwargs: Dict[str, Any], file_map: HDFMap):
+        """
+        :param file_class: :class:`File` (sub)class to re-open the file
+            with
+        :param name: absolute path of the file on disk
+        :param mode: mode the file was opened with
+        :param kwargs: keywords the file was opened with (passed on to
+            :class:`File`)
+        :param file_map: mapping of the file
+        """
+        self.file_class = file_class
+        self.name = name
+        self.mode = mode
+        self.kwargs = kwargs.copy()
+        self._file_map = pickle.dumps(file_map)
+
+    def __repr__(self):
+        return "<{} of {} '{}'>".format(self.__class__.__name__,
+                                        self.file_class.__name__,
+                                        os.path.basename(self.name))
+
+    def open(self) -> File:
+        """
+        Re-open the file and attach the mapping snapshot.
+
+        .. note::
+
+            The file is initialized through :meth:`File.__init__` with
+            the recorded keywords, so any subclass constructor is
+            bypassed.
+        """
+        f = self.file_class.__new__(self.file_class)
+        File.__init__(f, self.name, mode=self.mode,
+                      file_map=pickle.loads(self._file_map),
+                      **self.kwargs)
+        return f
+
+
+def _next_prime(n: int) -> int:
+    """Smallest prime number greater than or equal to **n**."""
+    n = max(int(n), 2)
+    while True:
+        if all(n % ii for ii in range(2, int(math.sqrt(n)) + 1)):
+            return n
+        n += 1
@@ -0,0 +1,190 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import contextlib
+import os
+import threading
+
+from collections import OrderedDict
+from typing import (Any, Dict, Hashable, Tuple)
+
+from .file import File
+
+#: Key for an open file in :class:`FilePool`.
+PoolKey = Tuple[type, str, Tuple[Tuple[str, Hashable], ...]]
+
+
+class FilePool(object):
+    """
+    A pool of open, already mapped, BaPSF HDF5 files
+    (:class:`~.file.File`) shared between callers.  Files are keyed by
+    their class, absolute file path, and open settings.  Each
+    :meth:`acquire` increments the file's reference count and each
+    :meth:`release` decrements it.  When more than :attr:`max_open`
+    files are open, the least recently used files that are not
+    referenced are closed.
+
+    :Example:
+
+        >>> pool = FilePool(max_open=4)
+        >>> with pool.open(File, 'test.hdf5',
+        ...                control_path='Raw data + config',
+        ...                digitizer_path='Raw data + config',
+        ...                msi_path='MSI') as bf:
+        ...     data = bf.read_data(1, 1)
+        >>>
+        >>> # bf stays open (and mapped) for the next caller
+        >>> len(pool)
+        1
+        >>> pool.close_all()
+    """
+    def __init__(self, max_open=8):
+        """
+        :param int max_open: maximum number of files kept open,
+            referenced or not (DEFAULT :code:`8`)
+        """
+        if not isinstance(max_open, int) or isinstance(max_open, bool) \
+                or max_open < 1:
+            raise ValueError(
+                "`max_open` must be an int >= 1, got "
+                "{}".format(max_open))
+        self._max_open = max_open
+
+        # key -> [file object, reference count]
+        self._files = OrderedDict()  # type: Dict[PoolKey, list]
+        self._lock = threading.RLock()
+
+    def __contains__(self, item):
+        with self._lock:
+            return any(entry[0] is item
+                       for entry in self._files.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._files)
+
+    @staticmethod
+    def _build_key(file_class: type, filename: str,
+                   settings: Dict[str, Any]) -> PoolKey:
+        """Build the pool key for a file and its open settings."""
+        return (file_class, os.path.abspath(filename),
+                tuple(sorted(settings.items())))
+
+    def _close_unused(self):
+        """
+        Close least recently used, unreferenced files until no more
+        than :attr:`max_open` files are open.
+        """
+        for key in list(self._files):
+            if len(self._files) <= self._max_open:
+                break
+
+            f, refcount = self._files[key]
+            if refcount == 0:
+                del self._files[key]
+                f.close()
+
+    def acquire(self, file_class: type, filename: str,
+                **settings) -> File:
+        """
+        Get an open file from the pool, opening (and mapping) it if
+        needed.  The file's reference count is incremented, so every
+        :meth:`acquire` must be paired with a :meth:`release`.
+
+        :param file_class: :class:`~.file.File` (sub)class used to open
+            the file
+        :param filename: name of the HDF5 file
+        :param settings: keywords passed on to :data:`file_class`
+        """
+        key = self._build_key(file_class, filename, settings)
+        with self._lock:
+            entry = self._files.get(key, None)
+            if entry is not None and not bool(entry[0]):
+                # file was closed outside of the pool
+                del self._files[key]
+                entry = None
+
+            if entry is None:
+                entry = [file_class(filename, **settings), 0]
+                self._files[key] = entry
+
+            entry[1] += 1
+            self._files.move_to_end(key)
+            self._close_unused()
+
+            return entry[0]
+
+    def close_all(self):
+        """
+        Close all files in the pool, including those still
+        referenced.
+        """
+        with self._lock:
+            for f, refcount in self._files.values():
+                f.close()
+            self._files.clear()
+
+    @property
+    def max_open(self) -> int:
+        """
+        Maximum number of files kept open, referenced or not.
+        Referenced files are never closed by the pool, so more files
+        can be open while in use.
+        """
+        return self._max_open
+
+    @contextlib.contextmanager
+    def open(self, file_class: type, filename: str, **settings):
+        """
+        Context manager that :meth:`acquire`'s a file on entry and
+        :meth:`release`'s it on exit.  (Same arguments as
+        :meth:`acquire`.)
+        """
+        f = self.acquire(file_class, filename, **settings)
+        try:
+            yield f
+        finally:
+            self.release(f)
+
+    def refcount(self, f: File) -> int:
+        """
+        Reference count of file object **f**. (:code:`0` if **f** is
+        not in the pool)
+        """
+        with self._lock:
+            for entry in self._files.values():
+                if entry[0] is f:
+                    return entry[1]
+
+        return 0
+
+    def release(self, f: File):
+        """
+        Release a file obtained from :meth:`acquire`.  The file remains
+        open in the pool until it becomes the least recently used
+        unreferenced file and the pool is full.
+
+        :param f: file object returned by :meth:`acquire`
+        """
+        with self._lock:
+            for entry in self._files.values():
+                if entry[0] is f:
+                    entry[1] = max(entry[1] - 1, 0)
+                    break
+            else:
+                raise ValueError("File object is not in the pool.")
+
+            self._close_unused()
+
+
+#: Shared pool used by the :func:`~bapsflib.utils.decorators.with_bf`
+#: and :func:`~bapsflib.utils.decorators.with_lapdf` decorators when
+#: :code:`pool=True`.
+default_pool = FilePool()
@@ -0,0 +1,691 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+#
+import astropy.units as u
+import copy
+import numpy as np
+import queue
+import threading
+import warnings
+
+from fractions import Fraction
+from scipy import signal as sps
+from typing import (Iterator, List, Tuple, Union)
+
+from .file import File
+from .hdfreaddata import HDFReadData
+from .helpers import (condition_control_shotnum, condition_controls,
+                      condition_index_shotnum)
+
+#: Targeted size (in bytes) of the :code:`'signal'` field of one
+#: block when :code:`chunk_size` is not specified.
+_BLOCK_NBYTES = 32 * 1024 ** 2
+
+#: Largest up- or down-sampling factor of a polyphase resampling.
+_RESAMPLE_MAX_FACTOR = 1000
+
+#: A :code:`(board, channel)` or :code:`(board, channel, adc)` tuple.
+ChannelSpec = Union[Tuple[int, int], Tuple[int, int, str]]
+
+
+class HDFIterData(object):
+    """
+    Iterates over digitizer data in blocks of shot numbers.  Each
+    iteration returns a :class:`~.hdfreaddata.HDFReadData` array
+    for the next block of shot numbers, so the full shot number by
+    time array never needs to be held in memory.
+
+    All of the shot number, index, and control device conditioning is
+    done once when the iterator is constructed.  The blocks are then
+    read either serially, or by a background thread that reads (and
+    converts to voltage) the next :data:`prefetch` blocks while the
+    current block is being processed.
+
+    .. note::
+
+        * With :code:`intersection_set=True` the digitizer and control
+          device shot numbers are intersected up-front, so every block
+          holds exactly :data:`chunk_size` shot numbers (except for
+          the last block).
+        * h5py serializes all HDF5 calls, so prefetching overlaps the
+          HDF5 reads with the consumer's computation, but does not
+          parallelize the HDF5 reads themselves.
+        * Warnings raised while reading a block on the background
+          thread follow the global warning filters.
+    """
+    __example_doc__ = """
+    :Example: Here digitizer data is processed 1000 shots at a time
+        while the next block is read in the background:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # iterate over board 1, channel 1
+        >>> # - this is equivalent to
+        >>> #   f.iter_data(1, 1, chunk_size=1000, prefetch=1)
+        >>> for data in HDFIterData(f, 1, 1, chunk_size=1000,
+        ...                         prefetch=1):
+        ...     spectra = np.fft.rfft(data['signal'], axis=1)
+        ...     # do something with the spectra
+    """
+
+    def __init__(self,
+                 hdf_file: File,
+                 board: int, channel: int,
+                 index=slice(None),
+                 shotnum=slice(None),
+                 digitizer=None,
+                 config_name=None,
+                 adc=None,
+                 keep_bits=False,
+                 add_controls=None,
+                 intersection_set=True,
+                 chunk_size=None,
+                 prefetch=0,
+                 filter=None,
+                 silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param index: dataset row indices to be sliced (overridden
+            by :code:`shotnum`)
+        :type index: Union[int, List[int], slice, numpy.ndarray]
+        :param shotnum: HDF5 file shot number(s) indicating data
+            entries to be extracted (overrides :code:`index`)
+        :type shotnum: Union[int, List[int], slice, numpy.ndarray]
+        :param str digitizer: digitizer name
+        :param str adc: name of analog-digital-converter
+        :param str config_name: name of the digitizer configuration
+        :param bool keep_bits: set :code:`True` to keep data in bits,
+            :code:`False` (DEFAULT) to convert data to voltage
+        :param add_controls: a list indicating the desired control
+            device names and their configuration name (if more than one
+            configuration exists)
+        :type add_controls: Union[str, Iterable[str, Tuple[str, Any]]]
+        :param bool intersection_set: :code:`True` (DEFAULT) will force
+            the returned shot numbers to be the intersection of
+            :data:`shotnum` and the shot numbers contained in each
+            control device and digitizer dataset. :code:`False` will
+            return the union of shot numbers.
+        :param int chunk_size: number of shot numbers per block.  If
+            :code:`None` (DEFAULT), then blocks are sized to ~32 MB of
+            :code:`'signal'` data and aligned to the HDF5 chunk layout
+            of the digitizer dataset.
+        :param int prefetch: number of blocks read ahead by a
+            background thread. :code:`0` (DEFAULT) reads every block
+            on demand, :code:`1` double-buffers the reads.
+        :param filter: filter applied to every block as it is read
+            (see :class:`~.hdfreaddata.HDFReadData`)
+        :type filter: :class:`~.signalfilter.SignalFilter`
+        :param bool silent: :code:`False` (DEFAULT).  Set :code:`True`
+            to ignore any UserWarnings raised while reading a block
+            on the consumer's thread
+        """
+        # ---- Condition hdf_file                                   ----
+        if not isinstance(hdf_file, File):
+            raise TypeError(
+                "`hdf_file` is NOT type `"
+                + File.__module__ + "." + File.__qualname__ + "`")
+        self._hdf_file = hdf_file
+        _fmap = hdf_file.file_map
+
+        # ---- Condition `prefetch`                                 ----
+        if not isinstance(prefetch, (int, np.integer)) \
+                or isinstance(prefetch, bool) or prefetch < 0:
+            raise ValueError(
+                "`prefetch` must be an int >= 0, got "
+                "{}".format(prefetch))
+        self._prefetch = int(prefetch)
+
+        # ---- Condition `add_controls`                             ----
+        if bool(add_controls) and not bool(_fmap.controls):
+            raise ValueError(
+                'There are no control devices in the HDF5 file.')
+        if bool(add_controls):
+            controls = condition_controls(hdf_file, add_controls)
+        else:
+            controls = []
+
+        # ---- Condition `digitizer`, `config_name`, and `adc`      ----
+        # - these are resolved here so the block reads never have to
+        #   guess (and warn) again
+        #
+        if not bool(_fmap.digitizers):
+            raise ValueError(
+                "There are no digitizers in the HDF5 file.")
+        elif digitizer is None:
+            if not bool(_fmap.main_digitizer):
+                raise ValueError(
+                    "No main digitizer is identified..."
+                    "need to specify `digitizer` kwarg")
+
+            why = ("Digitizer not specified so assuming the "
+                   "'main_digitizer' "
+                   "({})".format(_fmap.main_digitizer.device_name)
+                   + " defined in the mappings.")
+            warnings.warn(why)
+            _dmap = _fmap.main_digitizer
+        else:
+            try:
+                _dmap = _fmap.digitizers[digitizer]
+            except KeyError:
+                raise ValueError(
+                    "Specified Digitizer '{}'".format(digitizer)
+                    + " is not among known digitizers "
+                    "({})".format(list(_fmap.digitizers)))
+        dkwargs = {'return_info': True}
+        if config_name is not None:
+            dkwargs['config_name'] = config_name
+        if adc is not None:
+            dkwargs['adc'] = adc
+        dname, d_info = _dmap.construct_dataset_name(
+            board, channel, **dkwargs)
+        dkwargs.update({'config_name': d_info['configuration name'],
+                        'adc': d_info['adc']})
+        dhname = _dmap.construct_header_dataset_name(
+            board, channel, **dkwargs)
+        dpath = _dmap.info['group path'] + '/'
+        dset = hdf_file.get(dpath + dname)
+        dheader = hdf_file.get(dpath + dhname)
+        shotnumkey = _dmap.configs[d_info['configuration name']][
+            'shotnum']['dset field'][0]
+
+        # ---- Condition `chunk_size`                               ----
+        if chunk_size is None:
+            itemsize = dset.dtype.itemsize if keep_bits \
+                else np.dtype(np.float32).itemsize
+            chunk_size = max(
+                _BLOCK_NBYTES // (itemsize * max(dset.shape[1], 1)),
+                1)
+            if dset.chunks is not None:
+                # align to the chunk rows of the dataset
+                chunk_size = max(
+                    chunk_size - (chunk_size % dset.chunks[0]),
+                    dset.chunks[0])
+        elif not isinstance(chunk_size, (int, np.integer)) \
+                or isinstance(chunk_size, bool) or chunk_size < 1:
+            raise ValueError(
+                "`chunk_size` must be an int >= 1, got "
+                "{}".format(chunk_size))
+        self._chunk_size = int(chunk_size)
+
+        # ---- Condition `index` and `shotnum`                      ----
+        # - follows the same rules as HDFReadData
+        index, shotnum, sni = condition_index_shotnum(
+            index, shotnum, dheader, shotnumkey, intersection_set)
+
+        # intersect with control device shot numbers
+        # - this ensures no block will result in a NULL array
+        if intersection_set and len(controls) != 0:
+            cshotnum = condition_control_shotnum(hdf_file, controls,
+                                                 shotnum, True)[0]
+            new_sn_mask = np.isin(shotnum, cshotnum)
+            shotnum = shotnum[new_sn_mask]
+            index = index[new_sn_mask]
+            sni = sni[new_sn_mask]
+
+        # ---- Define blocks                                        ----
+        # - blocks are read by digitizer `index` if the digitizer
+        #   recorded every shot number (always with
+        #   intersection_set=True)
+        # - otherwise blocks are read by `shotnum` so missing entries
+        #   are NaN filled
+        #
+        if sni.all():
+            self._read_by = 'index'
+            rows = np.asarray(index)
+        else:
+            self._read_by = 'shotnum'
+            rows = shotnum
+        self._shotnum = shotnum
+        self._blocks = [
+            rows[ii:ii + self._chunk_size]
+            for ii in range(0, rows.shape[0], self._chunk_size)
+        ]
+
+        # arguments for each block read
+        self._read_kwargs = {
+            'digitizer': _dmap.device_name,
+            'config_name': d_info['configuration name'],
+            'adc': d_info['adc'],
+            'keep_bits': keep_bits,
+            'add_controls': controls if len(controls) else None,
+            'intersection_set': intersection_set,
+        }
+        if filter is not None:
+            self._read_kwargs['filter'] = filter
+        self._board = board
+        self._channel = channel
+        self._silent = silent
+
+    def __iter__(self) -> Iterator[HDFReadData]:
+        if self._prefetch == 0:
+            for block_id in range(len(self._blocks)):
+                yield self.read_block(block_id)
+        else:
+            yield from self._iter_prefetch()
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def _iter_prefetch(self) -> Iterator[HDFReadData]:
+        """
+        Reads blocks on a background thread that stays, at most,
+        :attr:`prefetch` blocks ahead of the consumer.
+        """
+        buffer = queue.Queue(maxsize=self._prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def producer():
+            try:
+                for block_id in range(len(self._blocks)):
+                    if stop.is_set():
+                        return
+                    item = self.read_block(block_id, in_thread=True)
+                    while not stop.is_set():
+                        try:
+                            buffer.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+            except Exception as err:
+                item = err
+            else:
+                item = done
+
+            # hand off the end of iteration (or error)
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+        thread = threading.Thread(target=producer,
+                                  name='HDFIterData-prefetch',
+                                  daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is done:
+                    break
+                elif isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # stop the producer if the consumer quits early
+            stop.set()
+            thread.join()
+
+    @property
+    def blocks(self) -> List[np.ndarray]:
+        """
+        List of the digitizer dataset row indices (or shot numbers if
+        :code:`intersection_set=False`) read for each block.
+        """
+        return self._blocks
+
+    @property
+    def chunk_size(self) -> int:
+        """Number of shot numbers per block."""
+        return self._chunk_size
+
+    @property
+    def prefetch(self) -> int:
+        """Number of blocks read ahead by the background thread."""
+        return self._prefetch
+
+    def read_block(self, block_id: int,
+                   in_thread=False) -> HDFReadData:
+        """
+        Read block **block_id**.
+
+        :param block_id: index of the block in :attr:`blocks`
+        :param in_thread: :code:`True` if the block is being read
+            off the consumer's thread (e.g. by the prefetch thread or
+            an executor).  (The warning filters are global, so they
+            are only modified when reading on the consumer's thread.)
+        """
+        kwargs = {self._read_by: self._blocks[block_id]}
+        kwargs.update(self._read_kwargs)
+        if in_thread:
+            return HDFReadData(self._hdf_file, self._board,
+                               self._channel, **kwargs)
+
+        warn_filter = 'ignore' if self._silent else 'default'
+        with warnings.catch_warnings():
+            warnings.simplefilter(warn_filter)
+            return HDFReadData(self._hdf_file, self._board,
+                               self._channel, **kwargs)
+
+    @property
+    def shotnum(self) -> np.ndarray:
+        """All shot numbers covered by the iterator."""
+        return self._shotnum
+
+
+# add example to __init__ docstring
+HDFIterData.__init__.__doc__ += "\n"
+for line in HDFIterData.__example_doc__.splitlines():
+    HDFIterData.__init__.__doc__ += "    " + line + "\n"
+
+
+class HDFIterChannels(object):
+    """
+    Iterates over the shot aligned digitizer data of several channels
+    in blocks of shot numbers.  Each iteration returns a list with one
+    :class:`~.hdfreaddata.HDFReadData` array per channel (in the order
+    of :data:`channels`), all holding the same shot numbers.
+
+    The shot number conditioning is done once for the first channel
+    (see :class:`~.hdfiterdata.HDFIterData`) and the remaining
+    channels are read for the resulting shot numbers, so only shots
+    recorded on every channel (and by every control device in
+    :data:`add_controls`) are iterated over.
+
+    Channels of different analog-digital-converters (e.g. the
+    :code:`'SIS 3302'` and :code:`'SIS 3305'` of the
+    :code:`'SIS crate'`) have different clock rates and sample
+    averages.  With :data:`resample_to` every block is resampled, as
+    it is read, to a common time step size with
+    :func:`scipy.signal.resample_poly`, which is vectorized over the
+    shots of the block.  The :code:`'clock rate'` and
+    :code:`'sample average'` of :attr:`~.hdfreaddata.HDFReadData.info`
+    are updated accordingly.
+
+    .. note::
+
+        * The channels are read from the same digitizer
+          configuration.
+        * The control device data is only attached to the blocks of
+          the first channel.
+        * Every channel has its own prefetch thread.
+        * Resampling changes the number of samples, but not the
+          duration, of a channel's shots.  Channels recorded for
+          different durations keep different numbers of samples.
+    """
+    __example_doc__ = """
+    :Example: Here three channels are processed 500 shots at a time:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # iterate over board 1, channels 1, 2, and 3
+        >>> # - this is equivalent to
+        >>> #   f.iter_channels([(1, 1), (1, 2), (1, 3)],
+        >>> #                   chunk_size=500)
+        >>> for blocks in HDFIterChannels(f, [(1, 1), (1, 2), (1, 3)],
+        ...                               chunk_size=500):
+        ...     signals = np.stack([data['signal']
+        ...                         for data in blocks])
+        ...     # do something with the (3, 500, nt) signals
+        >>>
+        >>> # a 'SIS 3305' channel on the time base of a 'SIS 3302'
+        >>> # channel
+        >>> channels = [(1, 1, 'SIS 3302'), (1, 1, 'SIS 3305')]
+        >>> for blocks in HDFIterChannels(f, channels,
+        ...                               digitizer='SIS crate',
+        ...                               resample_to=channels[0]):
+        ...     [data.dt for data in blocks]
+        [<Quantity 1.e-08 s>, <Quantity 1.e-08 s>]
+    """
+
+    def __init__(self,
+                 hdf_file: File,
+                 channels: List[ChannelSpec],
+                 index=slice(None),
+                 shotnum=slice(None),
+                 digitizer=None,
+                 config_name=None,
+                 adc=None,
+                 keep_bits=False,
+                 add_controls=None,
+                 chunk_size=None,
+                 prefetch=0,
+                 filter=None,
+                 resample_to=None,
+                 silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param channels: list of the :code:`(board, channel)` of each
+            channel, or :code:`(board, channel, adc)` to read the
+            channel from an analog-digital-converter other than
+            :data:`adc`
+        :param index: dataset row indices (of the first channel) to be
+            sliced (overridden by :code:`shotnum`)
+        :param adc: name of the analog-digital-converter of the
+            channels not specifying one
+        :param chunk_size: number of shot numbers per block (see
+            :class:`~.hdfiterdata.HDFIterData`, DEFAULT sizing is done
+            for the first channel)
+        :param resample_to: the clock rate (in Hz, or a frequency
+            :class:`~astropy.units.Quantity`), or the entry of
+            :data:`channels` whose time step size, all channels are
+            resampled to.  :code:`None` (DEFAULT) does not resample.
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`, with
+        :code:`intersection_set=True`.
+        """
+        # ---- Condition `channels`                                 ----
+        if not isinstance(channels, (list, tuple)) \
+                or len(channels) == 0:
+            raise ValueError(
+                "`channels` must be a list of (board, channel) tuples")
+        channels = list(channels)
+        for ii, spec in enumerate(channels):
+            if not isinstance(spec, tuple) or len(spec) not in (2, 3) \
+                    or (len(spec) == 3 and not isinstance(spec[2],
+                                                          str)):
+                raise ValueError(
+                    "`channels` must be a list of (board, channel) or "
+                    "(board, channel, adc) tuples, got {}".format(spec))
+            channels[ii] = (int(spec[0]), int(spec[1])) + spec[2:]
+        if len(set(channels)) != len(channels):
+            raise ValueError(
+                "`channels` has duplicate entries {}".format(channels))
+        self._channels = channels
+
+        # ---- Condition `resample_to`                              ----
+        if resample_to is not None:
+            if keep_bits:
+                raise ValueError(
+                    "`resample_to` can not be used with "
+                    "`keep_bits=True`")
+            if isinstance(resample_to, tuple):
+                if resample_to not in channels:
+                    raise ValueError(
+                        "`resample_to` channel {} ".format(resample_to)
+                        + "is not in `channels`")
+            else:
+                if isinstance(resample_to, u.Quantity):
+                    resample_to = resample_to.to(u.Hz).value
+                if not isinstance(resample_to,
+                                  (int, float, np.number)) \
+                        or isinstance(resample_to, bool) \
+                        or resample_to <= 0:
+                    raise ValueError(
+                        "`resample_to` must be a positive clock rate "
+                        "or an entry of `channels`, got "
+                        "{}".format(resample_to))
+                resample_to = float(resample_to)
+        self._resample_to = resample_to
+
+        # ---- Build block iterators                                ----
+        # - the first channel conditions the shot numbers, every other
+        #   channel is read for those shot numbers in the same blocks
+        ikwargs = {'digitizer': digitizer,
+                   'config_name': config_name,
+                   'adc': adc,
+                   'keep_bits': keep_bits,
+                   'intersection_set': True,
+                   'chunk_size': chunk_size,
+                   'prefetch': prefetch,
+                   'filter': filter,
+                   'silent': silent}
+        # - a channel not specifying its adc is read from `adc`, or
+        #   the (resolved) adc of the first channel
+        adcs = [spec[2] if len(spec) == 3 else adc
+                for spec in channels]
+        first = HDFIterData(hdf_file, *channels[0][0:2],
+                            index=index,
+                            shotnum=shotnum,
+                            add_controls=add_controls,
+                            **dict(ikwargs, adc=adcs[0]))
+        ikwargs['chunk_size'] = first.chunk_size
+        for key in ('digitizer', 'config_name', 'adc'):
+            ikwargs[key] = first._read_kwargs[key]
+        adcs = [ikwargs['adc'] if val is None else val
+                for val in adcs]
+        iters = [first]  # type: List[HDFIterData]
+        shotnum = first.shotnum
+        for spec, chadc in zip(channels[1:], adcs[1:]):
+            iters.append(HDFIterData(hdf_file, *spec[0:2],
+                                     shotnum=shotnum,
+                                     **dict(ikwargs, adc=chadc)))
+            shotnum = iters[-1].shotnum
+
+        # re-build the iterators of the channels that recorded shots
+        # missing on a later channel
+        for ii, spec in enumerate(channels):
+            if np.array_equal(iters[ii].shotnum, shotnum):
+                continue
+            iters[ii] = HDFIterData(
+                hdf_file, *spec[0:2], shotnum=shotnum,
+                add_controls=add_controls if ii == 0 else None,
+                **dict(ikwargs, adc=adcs[ii]))
+        self._iters = iters
+
+    def __iter__(self) -> Iterator[List[HDFReadData]]:
+        ratios = None  # type: Union[None, List[Tuple[int, int]]]
+        for blocks in zip(*self._iters):
+            blocks = list(blocks)
+            for data in blocks[1:]:
+                if not np.array_equal(data['shotnum'],
+                                      blocks[0]['shotnum']):
+                    raise ValueError(
+                        "Shot numbers of the channels do not align")
+
+            if self._resample_to is not None:
+                if ratios is None:
+                    ratios = self._resample_ratios(blocks)
+                blocks = [self._resample_block(data, *ratio)
+                          for data, ratio in zip(blocks, ratios)]
+            yield blocks
+
+    def __len__(self):
+        return len(self._iters[0])
+
+    def _resample_ratios(
+            self, blocks: List[HDFReadData]) -> List[Tuple[int, int]]:
+        """
+        The :code:`(up, down)` factors resampling each channel of
+        **blocks** to the clock rate :attr:`resample_to`.
+        """
+        rates = []  # type: List[float]
+        for spec, data in zip(self._channels, blocks):
+            if data.dt is None:
+                raise ValueError(
+                    "The time step size of channel {} ".format(spec)
+                    + "is unknown, can not resample")
+            rates.append(1.0 / data.dt.to(u.s).value)
+        if isinstance(self._resample_to, tuple):
+            rate = rates[self._channels.index(self._resample_to)]
+        else:
+            rate = self._resample_to
+
+        ratios = []
+        for spec, chrate in zip(self._channels, rates):
+            ratio = Fraction(rate / chrate).limit_denominator(
+                _RESAMPLE_MAX_FACTOR)
+            if ratio.numerator == 0 \
+                    or ratio.numerator > _RESAMPLE_MAX_FACTOR:
+                raise ValueError(
+                    "Can not resample channel {} from ".format(spec)
+                    + "{} Hz to {} Hz".format(chrate, rate))
+            if abs(float(ratio) * chrate - rate) > 1e-6 * rate:
+                warnings.warn(
+                    "Channel {} is resampled to ".format(spec)
+                    + "{} Hz ".format(float(ratio) * chrate)
+                    + "instead of {} Hz".format(rate))
+            ratios.append((ratio.numerator, ratio.denominator))
+        return ratios
+
+    @staticmethod
+    def _resample_block(data: HDFReadData, up: int,
+                        down: int) -> HDFReadData:
+        """
+        Resample the :code:`'signal'` of **data** by the factor
+        **up** / **down**.
+        """
+        if up == down:
+            return data
+        signal = sps.resample_poly(data['signal'], up, down, axis=-1)
+        dtype = []
+        for name in data.dtype.names:
+            if name == 'signal':
+                dtype.append((name, data.dtype[name].base,
+                              signal.shape[1:]))
+            else:
+                dtype.append((name, data.dtype[name]))
+        resampled = np.empty(data.shape, dtype=dtype)
+        for name in data.dtype.names:
+            resampled[name] = signal if name == 'signal' \
+                else data[name]
+
+        obj = resampled.view(HDFReadData)
+        obj._info = copy.deepcopy(data.info)
+        obj._plasma = data._plasma.copy()
+        crate = data.info['clock rate']
+        avg = data.info['sample average']
+        obj._info.update({
+            'clock rate': (crate * up / (down * (avg or 1))).to(
+                crate.unit),
+            'sample average': None,
+        })
+        return obj
+
+    @property
+    def channels(self) -> List[ChannelSpec]:
+        """:code:`(board, channel)` of each channel."""
+        return self._channels
+
+    @property
+    def chunk_size(self) -> int:
+        """Number of shot numbers per block."""
+        return self._iters[0].chunk_size
+
+    @property
+    def iters(self) -> List[HDFIterData]:
+        """Block iterator of each channel."""
+        return self._iters
+
+    @property
+    def resample_to(self) -> Union[None, float, ChannelSpec]:
+        """
+        Clock rate (in Hz), or the channel, the channels are
+        resampled to (:code:`None` if not resampled).
+        """
+        return self._resample_to
+
+    @property
+    def shotnum(self) -> np.ndarray:
+        """All shot numbers covered by the iterator."""
+        return self._iters[0].shotnum
+
+
+# add example to __init__ docstring
+HDFIterChannels.__init__.__doc__ += "\n"
+for line in HDFIterChannels.__example_doc__.splitlines():
+    HDFIterChannels.__init__.__doc__ += "    " + line + "\n"
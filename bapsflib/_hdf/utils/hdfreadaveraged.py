@@ -0,0 +1,226 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import copy
+import numpy as np
+
+from typing import (Iterable, Union)
+
+from .file import File
+from .hdfiterdata import HDFIterData
+from .hdfreadmoments import SignalMoments
+from .helpers import (build_group_keys, condition_by)
+
+#: Statistics :class:`HDFReadAveraged` can compute per group.
+AVERAGED_STATS = ('mean', 'std', 'var', 'min', 'max')
+
+
+class HDFReadAveraged(np.ndarray):
+    """
+    Reads digitizer data and averages the shots of each group, where a
+    group is every shot sharing the same value(s) of the control
+    device field(s) :data:`by` (e.g. the probe position
+    :code:`'xyz'`, or the :code:`'FREQ'` of a :code:`'Waveform'`
+    command list).  The shots are streamed in blocks (see
+    :class:`~.hdfiterdata.HDFIterData`) and only the running moments
+    of each group are kept, so the full shot number by time array is
+    never held in memory.
+
+    The returned array is a 1D structured array with one entry per
+    group (in the order groups are first encountered) and fields:
+
+    * the :data:`by` field(s), the group key (a control device named
+      in :data:`by` contributes all of its state value fields)
+    * :code:`'nshots'`, the number of shots in the group
+    * one :code:`(nt,)` field per requested statistic in
+      :data:`stats` (:code:`'mean'`, :code:`'std'`, :code:`'var'`,
+      :code:`'min'`, or :code:`'max'`)
+
+    .. note::
+
+        * Naming a command list control device (e.g.
+          :code:`by='Waveform'`) groups the shots by the command each
+          shot executed and returns the parsed state values (e.g.
+          :code:`'FREQ'`) of each command, i.e. a conditional average
+          over the command list.
+        * :code:`'std'` and :code:`'var'` are population statistics
+          (:code:`ddof=0`) and, like :code:`'mean'`, are float64.
+          :code:`'min'` and :code:`'max'` keep the :code:`'signal'`
+          dtype.
+        * Only shots recorded by both the digitizer and the control
+          devices are averaged (i.e. :code:`intersection_set=True`).
+    """
+    __example_doc__ = """
+    :Example: Here the shots of each probe position are averaged:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # average board 1, channel 1 over each position
+        >>> # - this is equivalent to
+        >>> #   f.read_averaged(1, 1, add_controls=['6K Compumotor'])
+        >>> avg = HDFReadAveraged(f, 1, 1,
+        ...                       add_controls=['6K Compumotor'])
+        >>> avg.dtype
+        dtype([('xyz', '<f4', (3,)), ('nshots', '<u4'),
+               ('mean', '<f8', (100,)), ('std', '<f8', (100,))])
+        >>> avg['mean'].shape
+        (121, 100)
+        >>>
+        >>> # average each frequency of a Waveform command list
+        >>> avg = HDFReadAveraged(f, 1, 1, by='Waveform',
+        ...                       stats=('mean', 'var'),
+        ...                       add_controls=['Waveform'])
+        >>> avg[['FREQ', 'nshots']]
+        array([(40000., 34), (80000., 33), (120000., 33)],
+              dtype=[('FREQ', '<f8'), ('nshots', '<u4')])
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                board: int, channel: int,
+                by: Union[str, Iterable[str]] = 'xyz',
+                stats: Iterable[str] = ('mean', 'std'),
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                add_controls=None,
+                chunk_size=None,
+                prefetch=1,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param by: name of the control device field(s) the shots are
+            grouped by, or of control device(s) in
+            :data:`add_controls` to group by all their state values
+            (DEFAULT :code:`'xyz'`)
+        :param stats: statistics computed for each group
+            (DEFAULT :code:`('mean', 'std')`)
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`.
+        """
+        # ---- Condition `by` and `stats`                           ----
+        stats = (stats,) if isinstance(stats, str) else tuple(stats)
+        invalid = [stat for stat in stats if stat not in AVERAGED_STATS]
+        if len(stats) == 0 or len(invalid) != 0:
+            raise ValueError(
+                "`stats` must be among {}, ".format(AVERAGED_STATS)
+                + "got {}".format(stats))
+
+        if not bool(add_controls):
+            raise ValueError(
+                "`add_controls` must specify the control device(s) "
+                "recording the `by` field(s)")
+        by = condition_by(hdf_file, by, add_controls)
+
+        # ---- Stream blocks                                        ----
+        data_iter = HDFIterData(hdf_file, board, channel,
+                                index=index,
+                                shotnum=shotnum,
+                                digitizer=digitizer,
+                                config_name=config_name,
+                                adc=adc,
+                                keep_bits=keep_bits,
+                                add_controls=add_controls,
+                                intersection_set=True,
+                                chunk_size=chunk_size,
+                                prefetch=prefetch,
+                                silent=silent)
+        moments = None  # type: Union[None, SignalMoments]
+        info = None
+        for data in data_iter:
+            keys = build_group_keys(data, by)
+            if moments is None:
+                order = 2 if 'std' in stats or 'var' in stats else 1
+                moments = SignalMoments(
+                    key_dtype=keys.dtype,
+                    sample_shape=data['signal'].shape[1:],
+                    order=order)
+                value_dtype = data['signal'].dtype
+                info = copy.deepcopy(data.info)
+            moments.update(data['signal'], keys)
+
+        if moments is None:
+            raise ValueError("No shots to average.")
+
+        # ---- Build averaged array                                 ----
+        nt = moments.mean.shape[1]
+        dtype = [(field, moments.keys.dtype[field]) for field in by]
+        dtype.append(('nshots', np.uint32))
+        for stat in stats:
+            sdtype = value_dtype if stat in ('min', 'max') \
+                else np.float64
+            dtype.append((stat, sdtype, (nt,)))
+        data = np.empty(moments.keys.shape[0], dtype=dtype)
+        for field in by:
+            data[field] = moments.keys[field]
+        data['nshots'] = moments.count
+        for stat in stats:
+            # 'min' and 'max' are cast back to the 'signal' dtype
+            data[stat] = getattr(moments, stat)
+
+        obj = data.view(cls)
+        info.update({
+            'by': by,
+            'stats': stats,
+            'nshots': int(np.sum(moments.count)),
+        })
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'by': None,
+            'stats': None,
+            'nshots': None,
+        })
+
+    @property
+    def info(self) -> dict:
+        """
+        A dictionary of metadata for the averaged data.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data,
+        plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'by'`", "
+            tuple of the field names the shots were grouped by
+            "
+            ":code:`'stats'`", "
+            tuple of the computed statistics
+            "
+            ":code:`'nshots'`", "
+            total number of averaged shots
+            "
+        """
+        return self._info
+
+
+# add example to __new__ docstring
+HDFReadAveraged.__new__.__doc__ += "\n"
+for line in HDFReadAveraged.__example_doc__.splitlines():
+    HDFReadAveraged.__new__.__doc__ += "    " + line + "\n"
@@ -0,0 +1,342 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+
+from typing import (Any, Dict, Iterator, List, Tuple, Union)
+from warnings import warn
+
+from .file import File
+from .hdfreadcontrols import HDFReadControls
+from .hdfreaddata import HDFReadData
+from .helpers import (build_sndr_for_simple_dset, condition_controls,
+                      condition_shotnum, do_shotnum_intersection)
+
+#: A :code:`(board, channel)` or :code:`(board, channel, adc)` tuple,
+#: or a dictionary with keys :code:`'board'`, :code:`'channel'`, and
+#: optionally :code:`'digitizer'`, :code:`'config_name'`, and
+#: :code:`'adc'`.
+ChannelSpec = Union[Tuple[int, int], Tuple[int, int, str],
+                    Dict[str, Any]]
+
+#: Keys of a channel specification dictionary.
+_SPEC_KEYS = ('board', 'channel', 'digitizer', 'config_name', 'adc')
+
+
+class HDFReadChannels(object):
+    """
+    Reads the shot aligned data of several digitizer channels, which
+    can be recorded by different digitizers (e.g. the
+    :code:`'SIS 3301'` and the :code:`'SIS crate'`) and digitizer
+    configurations, together with one table of control device data.
+
+    The shot numbers are conditioned once over the header datasets of
+    every channel (and the control device datasets), then every
+    channel is read for those shot numbers, so entry :code:`i` of
+    every channel and of :attr:`controls` belongs to shot number
+    :code:`shotnum[i]`.
+
+    * With :code:`intersection_set=True` (DEFAULT) only the shot
+      numbers recorded on every channel and by every control device
+      are read.
+    * With :code:`intersection_set=False` every requested shot number
+      is read, and the entries of a channel (control device) that did
+      not record a shot are NULL filled (see
+      :class:`~.hdfreaddata.HDFReadData` and
+      :class:`~.hdfreadcontrols.HDFReadControls`).
+
+    .. note::
+
+        * The control device data is read only once, into
+          :attr:`controls`, and is not attached to the channel data
+          (the :code:`'xyz'` field of every channel is NaN).
+        * Channels are read with their own digitizer's clock rate and
+          number of samples, see
+          :class:`~.hdfiterdata.HDFIterChannels` to resample them to
+          a common time base.
+    """
+    __example_doc__ = """
+    :Example: Here a 'SIS 3301' channel and the 'SIS 3305' channel of
+        the 'SIS crate' are read for the shots both recorded:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # - this is equivalent to
+        >>> #   f.read_channels(channels,
+        >>> #                   add_controls=['6K Compumotor'])
+        >>> channels = [
+        ...     {'board': 1, 'channel': 1, 'digitizer': 'SIS 3301'},
+        ...     {'board': 1, 'channel': 1, 'digitizer': 'SIS crate',
+        ...      'adc': 'SIS 3305'},
+        ... ]
+        >>> data = HDFReadChannels(f, channels,
+        ...                        add_controls=['6K Compumotor'])
+        >>> [d.info['digitizer'] for d in data]
+        ['SIS 3301', 'SIS crate']
+        >>> data[1]['signal'].shape, data.controls['xyz'].shape
+        ((100, 20000), (100, 3))
+        >>> np.array_equal(data[1]['shotnum'], data.shotnum)
+        True
+    """
+
+    def __init__(self,
+                 hdf_file: File,
+                 channels: List[ChannelSpec],
+                 shotnum=slice(None),
+                 digitizer=None,
+                 config_name=None,
+                 adc=None,
+                 keep_bits=False,
+                 add_controls=None,
+                 intersection_set=True,
+                 filter=None):
+        """
+        :param hdf_file: HDF5 file object
+        :param channels: list of the :code:`(board, channel)` or
+            :code:`(board, channel, adc)` of each channel, or of
+            dictionaries with keys :code:`'board'`,
+            :code:`'channel'`, and optionally :code:`'digitizer'`,
+            :code:`'config_name'`, and :code:`'adc'`
+        :param shotnum: HDF5 file shot number(s) indicating data
+            entries to be extracted
+        :type shotnum: Union[int, List[int], slice, numpy.ndarray]
+        :param str digitizer: name of the digitizer of the channels
+            not specifying one
+        :param str config_name: name of the digitizer configuration of
+            the channels not specifying one
+        :param str adc: name of the analog-digital-converter of the
+            channels not specifying one
+        :param add_controls: a list indicating the desired control
+            device names and their configuration name (if more than one
+            configuration exists)
+        :type add_controls: Union[str, Iterable[str, Tuple[str, Any]]]
+        :param bool intersection_set: :code:`True` (DEFAULT) will force
+            the returned shot numbers to be the intersection of
+            :data:`shotnum` and the shot numbers contained in each
+            channel and control device dataset. :code:`False` will
+            return the union of shot numbers.
+
+        All other parameters follow
+        :class:`~.hdfreaddata.HDFReadData`.
+        """
+        # ---- Condition hdf_file                                   ----
+        if not isinstance(hdf_file, File):
+            raise TypeError(
+                "`hdf_file` is NOT type `"
+                + File.__module__ + "." + File.__qualname__ + "`")
+        _fmap = hdf_file.file_map
+
+        # ---- Condition `add_controls`                             ----
+        if bool(add_controls) and not bool(_fmap.controls):
+            raise ValueError(
+                'There are no control devices in the HDF5 file.')
+        if bool(add_controls):
+            controls = condition_controls(hdf_file, add_controls)
+        else:
+            controls = []
+
+        # ---- Condition `channels`                                 ----
+        if not isinstance(channels, (list, tuple)) \
+                or len(channels) == 0:
+            raise ValueError(
+                "`channels` must be a list of channel specifications")
+        defaults = {'digitizer': digitizer,
+                    'config_name': config_name,
+                    'adc': adc}
+        specs = []  # type: List[Dict[str, Any]]
+        dheaders = {}
+        shotnumkeys = {}
+        for spec in channels:
+            spec = self._resolve_spec(hdf_file, spec, defaults)
+            key = tuple(spec[name] for name in _SPEC_KEYS)
+            if key in dheaders:
+                raise ValueError(
+                    "`channels` has duplicate entries {}".format(spec))
+            dheaders[key], shotnumkeys[key] = spec.pop('header')
+            specs.append(spec)
+        self._channels = specs
+
+        # ---- Condition `shotnum`                                  ----
+        # - the shot numbers are conditioned over the header datasets
+        #   of every channel
+        shotnum = condition_shotnum(shotnum, dheaders, shotnumkeys)
+        if intersection_set:
+            sni_dict = {}
+            index_dict = {}
+            for key, dheader in dheaders.items():
+                index_dict[key], sni_dict[key] = \
+                    build_sndr_for_simple_dset(shotnum, dheader,
+                                               shotnumkeys[key])
+            shotnum = do_shotnum_intersection(shotnum, sni_dict,
+                                              index_dict)[0]
+
+        # ---- Read control device data                             ----
+        # - with intersection_set=True this drops the shot numbers
+        #   missing in a control device dataset
+        if len(controls) != 0:
+            cdata = HDFReadControls(hdf_file, controls,
+                                    assume_controls_conditioned=True,
+                                    shotnum=shotnum,
+                                    intersection_set=intersection_set)
+            shotnum = cdata['shotnum']
+        else:
+            cdata = None
+        self._controls = cdata
+        self._shotnum = shotnum
+
+        # ---- Read channels                                        ----
+        data = []  # type: List[HDFReadData]
+        for spec in specs:
+            data.append(HDFReadData(hdf_file, spec['board'],
+                                    spec['channel'],
+                                    shotnum=shotnum,
+                                    digitizer=spec['digitizer'],
+                                    config_name=spec['config_name'],
+                                    adc=spec['adc'],
+                                    keep_bits=keep_bits,
+                                    intersection_set=intersection_set,
+                                    filter=filter))
+            if not np.array_equal(data[-1]['shotnum'],
+                                  shotnum):  # pragma: no cover
+                # this should never happen
+                raise ValueError(
+                    "Shot numbers of channel {} ".format(spec)
+                    + "do not align")
+        self._data = data
+
+    def __getitem__(self, item: int) -> HDFReadData:
+        return self._data[item]
+
+    def __iter__(self) -> Iterator[HDFReadData]:
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def _resolve_spec(hdf_file: File, spec: ChannelSpec,
+                      defaults: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Resolve the digitizer, configuration, and analog-digital-
+        converter of channel **spec**.  The returned dictionary has the
+        keys :code:`_SPEC_KEYS` plus :code:`'header'`, the
+        :code:`(header dataset, shot number field)` of the channel.
+        """
+        if isinstance(spec, tuple) and len(spec) in (2, 3) \
+                and (len(spec) == 2 or isinstance(spec[2], str)):
+            spec = dict(zip(('board', 'channel', 'adc'), spec))
+        elif not isinstance(spec, dict) \
+                or not {'board', 'channel'} <= set(spec) \
+                or not set(spec) <= set(_SPEC_KEYS):
+            raise ValueError(
+                "channel specification must be a (board, channel) or "
+                "(board, channel, adc) tuple, or a dictionary with "
+                "keys 'board', 'channel', and optionally "
+                "'digitizer', 'config_name', and 'adc', got "
+                "{}".format(spec))
+        spec = dict(defaults, **{key: val for key, val in spec.items()
+                                 if val is not None})
+        board = int(spec['board'])
+        channel = int(spec['channel'])
+
+        # resolve digitizer
+        _fmap = hdf_file.file_map
+        if not bool(_fmap.digitizers):
+            raise ValueError(
+                "There are no digitizers in the HDF5 file.")
+        elif spec['digitizer'] is None:
+            if not bool(_fmap.main_digitizer):
+                raise ValueError(
+                    "No main digitizer is identified..."
+                    "need to specify `digitizer` kwarg")
+
+            why = ("Digitizer not specified so assuming the "
+                   "'main_digitizer' "
+                   "({})".format(_fmap.main_digitizer.device_name)
+                   + " defined in the mappings.")
+            warn(why)
+            _dmap = _fmap.main_digitizer
+        else:
+            try:
+                _dmap = _fmap.digitizers[spec['digitizer']]
+            except KeyError:
+                raise ValueError(
+                    "Specified Digitizer '{}'".format(spec['digitizer'])
+                    + " is not among known digitizers "
+                    "({})".format(list(_fmap.digitizers)))
+
+        # resolve configuration and adc
+        dkwargs = {'return_info': True}
+        for key in ('config_name', 'adc'):
+            if spec[key] is not None:
+                dkwargs[key] = spec[key]
+        d_info = _dmap.construct_dataset_name(board, channel,
+                                              **dkwargs)[1]
+        dkwargs.update({'config_name': d_info['configuration name'],
+                        'adc': d_info['adc']})
+        dhname = _dmap.construct_header_dataset_name(board, channel,
+                                                     **dkwargs)
+        dheader = hdf_file.get(_dmap.info['group path'] + '/' + dhname)
+        shotnumkey = _dmap.configs[d_info['configuration name']][
+            'shotnum']['dset field'][0]
+
+        return {'board': board,
+                'channel': channel,
+                'digitizer': _dmap.device_name,
+                'config_name': d_info['configuration name'],
+                'adc': d_info['adc'],
+                'header': (dheader, shotnumkey)}
+
+    @property
+    def channels(self) -> List[Dict[str, Any]]:
+        """
+        Resolved specification (:code:`'board'`, :code:`'channel'`,
+        :code:`'digitizer'`, :code:`'config_name'`, and
+        :code:`'adc'`) of each channel.
+        """
+        return self._channels
+
+    @property
+    def controls(self) -> Union[None, HDFReadControls]:
+        """
+        Control device data of the shot numbers :attr:`shotnum`
+        (:code:`None` if no control devices were added).
+        """
+        return self._controls
+
+    @property
+    def data(self) -> List[HDFReadData]:
+        """Read data of each channel."""
+        return self._data
+
+    @property
+    def shotnum(self) -> np.ndarray:
+        """Shot numbers of the read data."""
+        return self._shotnum
+
+    def stack(self) -> np.ndarray:
+        """
+        Stack the :code:`'signal'` of every channel into one
+        :code:`(nchannels, nshots, nt)` array (the channels must have
+        the same number of samples).
+        """
+        nts = {data['signal'].shape[1] for data in self._data}
+        if len(nts) != 1:
+            raise ValueError(
+                "Channels have different numbers of samples "
+                "{}, can not stack".format(sorted(nts)))
+        return np.stack([data['signal'] for data in self._data])
+
+
+# add example to __init__ docstring
+HDFReadChannels.__init__.__doc__ += "\n"
+for line in HDFReadChannels.__example_doc__.splitlines():
+    HDFReadChannels.__init__.__doc__ += "    " + line + "\n"
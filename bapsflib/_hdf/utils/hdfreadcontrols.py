@@ -92,6 +92,7 @@ class HDFReadControls(np.ndarray):
                 controls: ControlsType,
                 shotnum=slice(None),
                 intersection_set=True,
+                missing='fill',
                 **kwargs):
         """
         :param hdf_file: HDF5 file object
@@ -107,6 +108,15 @@ class HDFReadControls(np.ndarray):
             :data:`shotnum` and the shot numbers contained in each
             control device dataset. :code:`False` will return the union
             instead of the intersection
+        :param str missing: how the entries of the shot numbers missing
+            in a control device dataset are represented.
+            :code:`'fill'` (DEFAULT) gives them NULL values,
+            :code:`'mask'` only keeps the shot numbers recorded by at
+            least one control device, leaves the entries missing in
+            the other devices zero, and records which entries are valid
+            in :code:`info['valid']`.  With
+            :code:`intersection_set=True` no entry is missing, so both
+            give the same array (and every entry is valid).
 
         Behavior of :data:`shotnum` and :data:`intersection_set`:
             * :data:`shotnum` indexing starts at 1
@@ -148,6 +158,12 @@ class HDFReadControls(np.ndarray):
             print('tt - hdf_file conditioning: '
                   '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
 
+        # ---- Condition `missing`                                  ----
+        if missing not in ('fill', 'mask'):
+            raise ValueError(
+                "`missing` must be 'fill' or 'mask', got "
+                "{}".format(missing))
+
         # ---- Examine file map object                              ----
         # grab instance of _fmap
         _fmap = hdf_file.file_map
@@ -271,6 +287,14 @@ class HDFReadControls(np.ndarray):
         if intersection_set:
             shotnum, sni_dict, index_dict = \
                 do_shotnum_intersection(shotnum, sni_dict, index_dict)
+        elif missing == 'mask':
+            # only keep the shot numbers recorded by a control device
+            # - `index` is unchanged since it only maps the recorded
+            #   entries
+            recorded = np.logical_or.reduce(list(sni_dict.values()))
+            shotnum = shotnum[recorded]
+            for cname in sni_dict:
+                sni_dict[cname] = sni_dict[cname][recorded]
 
         # print execution timing
         if timeit:  # pragma: no cover
@@ -304,7 +328,13 @@ class HDFReadControls(np.ndarray):
                   '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
 
         # Initialize Control Data
-        data = np.empty(shape, dtype=dtype)
+        # - missing='mask' leaves the entries missing in some of the
+        #   control devices zero instead of NULL filling them field by
+        #   field
+        if missing == 'mask':
+            data = np.zeros(shape, dtype=dtype)
+        else:
+            data = np.empty(shape, dtype=dtype)
         data['shotnum'] = shotnum
 
         # print execution timing
@@ -439,7 +469,7 @@ class HDFReadControls(np.ndarray):
                             data[nf_name][sni] = arr
 
                     # handle NaN fill
-                    if not intersection_set:
+                    if not intersection_set and missing == 'fill':
                         # overhead
                         sni_not = np.logical_not(sni)
                         dtype = data.dtype[nf_name].base
@@ -493,7 +523,13 @@ class HDFReadControls(np.ndarray):
             'controls': {},
             'probe name': None,
             'port': (None, None),
+            'valid': None,
         }
+        if missing == 'mask':
+            obj._info['valid'] = {
+                control[0]: sni_dict[control[0]].copy()
+                for control in controls
+            }
 
         # add control meta-info
         for control in controls:
@@ -539,11 +575,17 @@ class HDFReadControls(np.ndarray):
             'controls': None,
             'probe name': None,
             'port': (None, None),
+            'valid': None,
         })
 
     @property
     def info(self) -> dict:
-        """A dictionary of meta-info for the control device."""
+        """
+        A dictionary of meta-info for the control device.  With
+        :code:`missing='mask'`, :code:`'valid'` maps every control
+        device name to a boolean array flagging the entries (rows)
+        recorded by that device (:code:`None` otherwise).
+        """
         return self._info
 
 
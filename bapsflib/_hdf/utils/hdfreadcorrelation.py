@@ -0,0 +1,416 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import copy
+import itertools
+import numpy as np
+
+from scipy import signal as sps
+from typing import (Dict, Iterable, List, Tuple, Union)
+from warnings import warn
+
+from .file import File
+from .hdfiterdata import HDFIterChannels
+from .helpers import (add_to_groups, build_group_keys, condition_by,
+                      group_keys)
+
+
+def _next_fast_len(n: int) -> int:
+    """
+    Smallest 5-smooth number (:math:`2^a 3^b 5^c`) not less than
+    **n**, a fast FFT length for :mod:`numpy.fft`.
+    """
+    best = 1
+    while best < n:
+        best *= 2
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # smallest power of 2 bringing p35 to at least n
+            p = p35
+            while p < n:
+                p *= 2
+            best = min(best, p)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _peak_lag(xcorr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locate the maximum of the cross-correlations **xcorr** along the
+    last axis, refined by a parabolic fit through the neighboring
+    lags.
+
+    :return: the (fractional) index and the value of each maximum
+    """
+    imax = np.argmax(xcorr, axis=-1)
+    peak = xcorr[tuple(np.indices(imax.shape)) + (imax,)]
+    offset = np.zeros(imax.shape, dtype=np.float64)
+    inner = (imax > 0) & (imax < xcorr.shape[-1] - 1)
+    if np.any(inner):
+        ii = imax[inner]
+        rows = xcorr[inner]
+        y0 = rows[np.arange(rows.shape[0]), ii - 1]
+        y2 = rows[np.arange(rows.shape[0]), ii + 1]
+        curv = y0 - 2.0 * peak[inner] + y2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            offset[inner] = np.where(curv < 0,
+                                     0.5 * (y0 - y2) / curv, 0.0)
+    return imax + offset, peak
+
+
+class HDFReadCorrelation(np.ndarray):
+    """
+    Reads the shot aligned digitizer data of several channels and
+    computes, for every pair of channels, the normalized
+    cross-correlation, the time delay, and the magnitude-squared
+    coherence, averaged over the shots of each group.  A group is
+    every shot sharing the same value(s) of the control device
+    field(s) :data:`by` (e.g. the probe position :code:`'xyz'`), and
+    :code:`by='shotnum'` gives the estimates of every single shot.
+
+    The shots are streamed in blocks (see
+    :class:`~.hdfiterdata.HDFIterChannels`).  The mean removed signals
+    of a block are transformed with one batched (zero-padded) real
+    FFT per channel, and the cross-correlation of each pair is the
+    inverse FFT of the product of the spectra, so every block costs
+    one FFT per channel plus one inverse FFT per pair.  The coherence
+    is built from the Welch (cross) spectral densities summed over the
+    shots of a group.  Only the running sums of each group are kept.
+
+    The returned array is a 1D structured array with one entry per
+    group (in the order groups are first encountered) and fields:
+
+    * the :data:`by` field(s), the group key (none if :data:`by` is
+      :code:`None`, then all shots form one group)
+    * :code:`'nshots'`, the number of shots in the group
+    * :code:`'xcorr'`, the :code:`(npairs, nlags)` shot averaged
+      correlation coefficients of each pair at lags
+      :code:`info['lags']`
+    * :code:`'peak'`, the :code:`(npairs,)` maximum of
+      :code:`'xcorr'`
+    * :code:`'delay'`, the :code:`(npairs,)` lag of the maximum (in
+      seconds, or samples if the time step size is unknown), refined
+      to a fraction of a sample by a parabolic fit
+    * :code:`'coherence'`, the :code:`(npairs, nfreq)` coherence at
+      frequencies :code:`info['frequency']`
+
+    The channel pairs are listed in :code:`info['pairs']`.  A positive
+    delay of pair :code:`(a, b)` means the signal of channel
+    :code:`a` lags that of channel :code:`b`.
+
+    .. note::
+
+        * The correlation coefficient of each shot is normalized by
+          the energy of its (mean removed) signals before averaging.
+        * All channels must have the same time step size, channels of
+          different analog-digital-converters can be resampled to a
+          common one with :data:`resample_to`.
+    """
+    __example_doc__ = """
+    :Example: Here the delay between three probes is computed for
+        each probe position:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # board 1, channels 1, 2, and 3 at each position
+        >>> # - this is equivalent to
+        >>> #   f.read_correlation([(1, 1), (1, 2), (1, 3)],
+        >>> #                      by='xyz', maxlag=200,
+        >>> #                      add_controls=['6K Compumotor'])
+        >>> corr = HDFReadCorrelation(f, [(1, 1), (1, 2), (1, 3)],
+        ...                           by='xyz', maxlag=200,
+        ...                           add_controls=['6K Compumotor'])
+        >>> corr.dtype.names
+        ('xyz', 'nshots', 'xcorr', 'peak', 'delay', 'coherence')
+        >>> corr.info['pairs']
+        [((1, 1), (1, 2)), ((1, 1), (1, 3)), ((1, 2), (1, 3))]
+        >>> corr['xcorr'].shape, corr['delay'].shape
+        ((121, 3, 401), (121, 3))
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                channels: List[Tuple[int, int]],
+                by: Union[None, str, Iterable[str]] = None,
+                maxlag=None,
+                nperseg=256,
+                noverlap=None,
+                window='hann',
+                detrend='constant',
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                add_controls=None,
+                chunk_size=None,
+                prefetch=1,
+                resample_to=None,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param channels: list of the :code:`(board, channel)` of two or
+            more channels
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by (see :func:`~.helpers.condition_by`). :code:`'shotnum'`
+            gives the estimates of every shot and :code:`None`
+            (DEFAULT) averages all shots together.
+        :param int maxlag: largest lag (in samples) of the
+            cross-correlations (DEFAULT is the number of samples per
+            shot minus one)
+        :param int nperseg: length of each Welch segment of the
+            coherence (DEFAULT :code:`256`, limited to the number of
+            samples per shot)
+        :param noverlap: see :func:`scipy.signal.welch`
+        :param window: see :func:`scipy.signal.welch`
+        :param detrend: see :func:`scipy.signal.welch`
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by the
+            background threads (DEFAULT :code:`1`)
+        :param resample_to: clock rate, or entry of :data:`channels`,
+            the channels are resampled to (see
+            :class:`~.hdfiterdata.HDFIterChannels`).  Channels of
+            different durations are then cut to the shortest one.
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterChannels`.
+        """
+        # ---- Condition `by`, `channels`, and `maxlag`             ----
+        if by == 'shotnum':
+            by = ('shotnum',)
+        elif by is not None:
+            if not bool(add_controls):
+                raise ValueError(
+                    "`add_controls` must specify the control "
+                    "device(s) recording the `by` field(s)")
+            by = condition_by(hdf_file, by, add_controls)
+        if not isinstance(channels, (list, tuple)) \
+                or len(channels) < 2:
+            raise ValueError(
+                "`channels` must list at least two (board, channel) "
+                "tuples")
+        if maxlag is not None and (
+                not isinstance(maxlag, (int, np.integer))
+                or isinstance(maxlag, bool) or maxlag < 0):
+            raise ValueError(
+                "`maxlag` must be an int >= 0, got {}".format(maxlag))
+
+        # ---- Build block iterator                                 ----
+        data_iter = HDFIterChannels(hdf_file, channels,
+                                    index=index,
+                                    shotnum=shotnum,
+                                    digitizer=digitizer,
+                                    config_name=config_name,
+                                    adc=adc,
+                                    keep_bits=keep_bits,
+                                    add_controls=add_controls,
+                                    chunk_size=chunk_size,
+                                    prefetch=prefetch,
+                                    resample_to=resample_to,
+                                    silent=silent)
+        channels = data_iter.channels
+        pairs = list(itertools.combinations(range(len(channels)), 2))
+
+        # ---- Stream blocks                                        ----
+        gids = {}  # type: Dict[bytes, int]
+        keys = None
+        sums = None  # type: Union[None, Dict[str, np.ndarray]]
+        info = None
+        freq = None
+        wkwargs = {'window': window, 'noverlap': noverlap,
+                   'detrend': detrend, 'axis': -1}
+        for blocks in data_iter:
+            data = blocks[0]
+            if info is None:
+                info = copy.deepcopy(data.info)
+                dt = data.dt
+                for other in blocks[1:]:
+                    if (dt is None) != (other.dt is None) or (
+                            dt is not None
+                            and not np.isclose(dt.to(u.s).value,
+                                               other.dt.to(u.s).value)):
+                        raise ValueError(
+                            "The channels have different time step "
+                            "sizes ({} and {}), ".format(dt, other.dt)
+                            + "see `resample_to`")
+                if dt is None:
+                    warn("Unable to calculate the time step size..."
+                         "delays are in samples and frequencies in "
+                         "cycles per sample")
+                    fs = 1.0
+                else:
+                    fs = 1.0 / dt.to(u.s).value
+                nt = min(block['signal'].shape[1]
+                         for block in blocks)
+                nlag = nt - 1 if maxlag is None else min(maxlag, nt - 1)
+                nfft = _next_fast_len(2 * nt - 1)
+                wkwargs.update({'fs': fs, 'nperseg': min(nperseg, nt)})
+
+            # group keys
+            bkeys = build_group_keys(data, by)
+            row_gids, new = group_keys(bkeys, gids)
+
+            # batched spectra of the mean removed signals
+            signals = np.stack([block['signal'][:, :nt]
+                                for block in blocks])
+            signals = signals.astype(np.float64, copy=False)
+            signals = signals - signals.mean(axis=-1, keepdims=True)
+            energy = np.sum(signals * signals, axis=-1)
+            spectra = np.fft.rfft(signals, n=nfft, axis=-1)
+            freq, psd = sps.welch(signals, **wkwargs)
+
+            # per-shot estimates of each pair
+            # - xcorr[k] = sum_n a[n + k] * b[n], lags -nlag..nlag
+            xcorr = np.empty((data.shape[0], len(pairs), 2 * nlag + 1))
+            csd = np.empty((data.shape[0], len(pairs), freq.shape[0]),
+                           dtype=np.complex128)
+            for ip, (ia, ib) in enumerate(pairs):
+                circ = np.fft.irfft(spectra[ia] * np.conj(spectra[ib]),
+                                    n=nfft, axis=-1)
+                xcorr[:, ip, :nlag] = circ[:, nfft - nlag:]
+                xcorr[:, ip, nlag:] = circ[:, :nlag + 1]
+                norm = np.sqrt(energy[ia] * energy[ib])
+                xcorr[:, ip] /= np.where(norm == 0, np.inf,
+                                         norm)[:, None]
+                csd[:, ip] = sps.csd(signals[ia], signals[ib],
+                                     **wkwargs)[1]
+            values = {
+                'nshots': np.ones(data.shape[0], dtype=np.int64),
+                'xcorr': xcorr,
+                'psd': np.moveaxis(psd, 0, 1),
+                'csd': csd,
+            }
+
+            # add new groups and accumulate
+            if sums is None:
+                keys = bkeys[:0]
+                sums = {name: np.zeros((0,) + val.shape[1:],
+                                       dtype=val.dtype)
+                        for name, val in values.items()}
+            if new.shape[0] != 0:
+                keys = np.concatenate((keys, bkeys[new]))
+            for name, val in values.items():
+                sums[name] = add_to_groups(sums[name], row_gids, val)
+
+        if sums is None:
+            raise ValueError("No shots to correlate.")
+
+        # ---- Build correlation array                              ----
+        fields = () if by is None else by
+        nfreq = freq.shape[0]
+        npairs = len(pairs)
+        dtype = [(field, keys.dtype[field]) for field in fields]
+        dtype.extend([('nshots', np.uint32),
+                      ('xcorr', np.float64, (npairs, 2 * nlag + 1)),
+                      ('peak', np.float64, (npairs,)),
+                      ('delay', np.float64, (npairs,)),
+                      ('coherence', np.float64, (npairs, nfreq))])
+        data = np.empty(keys.shape[0], dtype=dtype)
+        for field in fields:
+            data[field] = keys[field]
+        data['nshots'] = sums['nshots']
+        data['xcorr'] = sums['xcorr'] / sums['nshots'][:, None, None]
+        ilag, data['peak'] = _peak_lag(data['xcorr'])
+        data['delay'] = (ilag - nlag) / fs
+
+        ia, ib = np.array(pairs).T
+        psd = sums['psd']
+        denom = psd[:, ia] * psd[:, ib]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            data['coherence'] = np.where(
+                denom == 0, 0.0, np.abs(sums['csd']) ** 2 / denom)
+
+        obj = data.view(cls)
+        lags = np.arange(-nlag, nlag + 1)
+        info.update({
+            'by': by,
+            'channels': channels,
+            'pairs': [(channels[ia], channels[ib])
+                      for ia, ib in pairs],
+            'lags': lags if dt is None else lags * dt.to(u.s),
+            'frequency': freq if dt is None else freq * u.Hz,
+            'nperseg': wkwargs['nperseg'],
+            'noverlap': noverlap,
+            'window': window,
+            'nshots': int(np.sum(sums['nshots'])),
+        })
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'by': None,
+            'channels': None,
+            'pairs': None,
+            'lags': None,
+            'frequency': None,
+            'nperseg': None,
+            'noverlap': None,
+            'window': None,
+            'nshots': None,
+        })
+
+    @property
+    def info(self) -> dict:
+        """
+        A dictionary of metadata for the correlations.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data
+        (of the first channel), plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'by'`", "
+            tuple of the field names the shots were grouped by
+            (:code:`None` if not grouped)
+            "
+            ":code:`'channels'`", "
+            :code:`(board, channel)` of each channel
+            "
+            ":code:`'pairs'`", "
+            :code:`(board, channel)` tuples of the two channels of
+            each pair
+            "
+            ":code:`'lags'`", "
+            lags of the cross-correlations (in seconds, unless the
+            time step size is unknown)
+            "
+            ":code:`'frequency'`", "
+            frequencies of the coherence (in Hz, unless the time step
+            size is unknown)
+            "
+            ":code:`'nperseg'`, :code:`'noverlap'`, :code:`'window'`",
+            "
+            Welch parameters of the coherence
+            "
+            ":code:`'nshots'`", "
+            total number of shots
+            "
+        """
+        return self._info
+
+
+# add example to __new__ docstring
+HDFReadCorrelation.__new__.__doc__ += "\n"
+for line in HDFReadCorrelation.__example_doc__.splitlines():
+    HDFReadCorrelation.__new__.__doc__ += "    " + line + "\n"
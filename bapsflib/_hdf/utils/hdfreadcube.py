@@ -0,0 +1,358 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import copy
+import numpy as np
+
+from typing import (Any, Dict, Tuple)
+from warnings import warn
+
+from .file import File
+from .hdfiterdata import HDFIterData
+from .hdfreadcontrols import HDFReadControls
+from .helpers import condition_controls
+
+
+class HDFReadCube(np.ndarray):
+    """
+    Reads digitizer data into a data cube on the probe motion grid
+    defined by a :ibf:`6K Compumotor` motion list (its
+    :code:`'delta'`, :code:`'center'`, and :code:`'npoints'`).  The
+    returned array has shape :code:`(nx, ny, nz, nshots_per_pos, nt)`
+    or, with :code:`reduce='mean'`, :code:`(nx, ny, nz, nt)`.
+
+    Each shot's recorded :code:`'xyz'` is mapped to its integer grid
+    coordinates in one vectorized step, then the digitizer data is
+    read in blocks (see :class:`~.hdfiterdata.HDFIterData`) and
+    written directly into the preallocated cube, so the cost is
+    linear in the size of the data.
+
+    .. note::
+
+        * The grid coordinates along an axis are
+          :code:`center + delta * (i - (npoints - 1) / 2)` for
+          :code:`i = 0, ..., npoints - 1`.
+        * A shot is on the grid if it is within :code:`tol * |delta|`
+          of a grid point on each axis with :code:`npoints > 1`.
+          Off-grid shots are dropped (with a warning).
+        * Grid positions with fewer than :code:`nshots_per_pos` shots
+          are padded with NaN (or :code:`0` if :code:`keep_bits=True`).
+          See the :code:`'counts'` and :code:`'shotnum'` items of
+          :attr:`info`.
+    """
+    __example_doc__ = """
+    :Example: Here a probe scan is assembled into a data cube:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # build cube for board 1, channel 1
+        >>> # - this is equivalent to
+        >>> #   f.read_cube(1, 1, ['6K Compumotor'])
+        >>> cube = HDFReadCube(f, 1, 1, ['6K Compumotor'])
+        >>> cube.shape
+        (11, 11, 1, 10, 100)
+        >>> cube.info['x'], cube.info['y']
+        (array([-5., -4., ... 4., 5.]), array([-5., -4., ... 4., 5.]))
+        >>>
+        >>> # or average the shots at each position
+        >>> cube = HDFReadCube(f, 1, 1, ['6K Compumotor'],
+        ...                    reduce='mean')
+        >>> cube.shape
+        (11, 11, 1, 100)
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                board: int, channel: int,
+                add_controls: Any,
+                motion_list=None,
+                tol=0.1,
+                reduce=None,
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                chunk_size=None,
+                prefetch=1,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param add_controls: a list indicating the desired control
+            device names and their configuration name, one of which
+            must define motion lists (e.g.
+            :code:`[('6K Compumotor', 2)]`)
+        :type add_controls: Union[str, Iterable[str, Tuple[str, Any]]]
+        :param str motion_list: name of the motion list defining the
+            grid (DEFAULT :code:`None` if the configuration has only
+            one motion list)
+        :param float tol: tolerance, as a fraction of the grid
+            spacing, for a shot position to be on a grid point
+            (DEFAULT :code:`0.1`)
+        :param str reduce: :code:`None` (DEFAULT) to keep every shot,
+            or :code:`'mean'` to average the shots at each position
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`.
+        """
+        # ---- Condition `reduce` and `tol`                         ----
+        if reduce not in (None, 'mean'):
+            raise ValueError(
+                "`reduce` must be None or 'mean', "
+                "got {}".format(reduce))
+        if not isinstance(tol, (int, float, np.number)) \
+                or isinstance(tol, bool) or not 0 <= tol < 0.5:
+            raise ValueError(
+                "`tol` must be a number in [0, 0.5), "
+                "got {}".format(tol))
+
+        # ---- Condition `add_controls` and find motion list        ----
+        if not isinstance(hdf_file, File):
+            raise TypeError(
+                "`hdf_file` is NOT type `"
+                + File.__module__ + "." + File.__qualname__ + "`")
+        if not bool(add_controls):
+            raise ValueError(
+                "`add_controls` must specify a control device with "
+                "motion lists")
+        controls = condition_controls(hdf_file, add_controls)
+        ml_configs = {}
+        for cname, cconfn in controls:
+            cconfig = hdf_file.file_map.controls[cname].configs[cconfn]
+            if 'motion lists' in cconfig:
+                ml_configs = cconfig['motion lists']
+                break
+        else:
+            raise ValueError(
+                "None of the controls {} ".format(controls)
+                + "define motion lists")
+        if motion_list is None:
+            if len(ml_configs) != 1:
+                raise ValueError(
+                    "Configuration has motion lists "
+                    "{}, ".format(list(ml_configs))
+                    + "`motion_list` must be specified")
+            motion_list = list(ml_configs)[0]
+        elif motion_list not in ml_configs:
+            raise ValueError(
+                "Motion list '{}' not among ".format(motion_list)
+                + "{}".format(list(ml_configs)))
+        ml = ml_configs[motion_list]
+        try:
+            delta = np.asarray(ml['delta'], dtype=np.float64)
+            center = np.asarray(ml['center'], dtype=np.float64)
+            npoints = np.asarray(ml['npoints'], dtype=np.int64)
+        except (TypeError, ValueError):
+            delta = center = np.array([np.nan])
+        if not (np.all(np.isfinite(delta))
+                and np.all(np.isfinite(center))):
+            raise ValueError(
+                "Motion list '{}' does not ".format(motion_list)
+                + "fully define the grid")
+
+        # grid coordinates
+        axes = tuple(
+            center[ii] + delta[ii]
+            * (np.arange(npoints[ii]) - 0.5 * (npoints[ii] - 1))
+            for ii in range(3))
+        grid_shape = tuple(int(n) for n in npoints)
+
+        # ---- Set up block reads                                   ----
+        data_iter = HDFIterData(hdf_file, board, channel,
+                                index=index,
+                                shotnum=shotnum,
+                                digitizer=digitizer,
+                                config_name=config_name,
+                                adc=adc,
+                                keep_bits=keep_bits,
+                                add_controls=controls,
+                                intersection_set=True,
+                                chunk_size=chunk_size,
+                                prefetch=prefetch,
+                                silent=silent)
+        sn = data_iter.shotnum
+        if sn.shape[0] == 0:
+            raise ValueError("No shots to build the cube.")
+
+        # ---- Map positions to grid coordinates                    ----
+        # - only the control tables are read here
+        cdata = HDFReadControls(hdf_file, controls, shotnum=sn,
+                                intersection_set=True)
+        xyz = cdata['xyz']
+        gidx, on_grid = cls._grid_index(xyz, axes, delta, tol)
+        if not np.all(on_grid):
+            warn("{} shots are off ".format(np.count_nonzero(~on_grid))
+                 + "the motion list grid and are dropped")
+        cell = np.ravel_multi_index(tuple(gidx.T), grid_shape)
+        cell[~on_grid] = -1
+        counts = np.bincount(cell[on_grid],
+                             minlength=int(np.prod(grid_shape)))
+
+        # slot of each shot within its grid cell
+        # - shots fill a cell's slots in shot number order
+        order = np.argsort(cell, kind='stable')
+        scell = cell[order]
+        slot = np.empty_like(cell)
+        slot[order] = np.arange(scell.shape[0]) \
+            - np.searchsorted(scell, scell, side='left')
+        nspp = int(counts.max()) if counts.size else 0
+
+        # ---- Fill cube                                            ----
+        data = None
+        info = None
+        for block in data_iter:
+            pos = np.searchsorted(sn, block['shotnum'])
+            bcell = cell[pos]
+            valid = bcell != -1
+            bcell = bcell[valid]
+            signal = block['signal'][valid]
+            if data is None:
+                nt = block['signal'].shape[1]
+                info = copy.deepcopy(block.info)
+                if reduce is None:
+                    fill = 0 \
+                        if np.issubdtype(signal.dtype, np.integer) \
+                        else np.nan
+                    data = np.full(grid_shape + (nspp, nt), fill,
+                                   dtype=signal.dtype)
+                    flat = data.reshape((-1, nspp, nt))
+                else:
+                    data = np.zeros(grid_shape + (nt,),
+                                    dtype=np.float64)
+                    flat = data.reshape((-1, nt))
+            if reduce is None:
+                flat[bcell, slot[pos][valid]] = signal
+            elif bcell.shape[0] != 0:
+                # sum each cell's shots
+                border = np.argsort(bcell, kind='stable')
+                bcell = bcell[border]
+                starts = np.flatnonzero(
+                    np.concatenate(([True], np.diff(bcell) != 0)))
+                flat[bcell[starts]] += np.add.reduceat(
+                    signal[border].astype(np.float64), starts, axis=0)
+        if reduce == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                flat /= counts[:, None]
+
+        # ---- Define obj to be returned                            ----
+        shotnums = np.zeros(grid_shape + (nspp,), dtype=np.uint32)
+        shotnums.reshape((-1, nspp))[cell[on_grid], slot[on_grid]] = \
+            sn[on_grid]
+        obj = data.view(cls)
+        info.update({
+            'motion list': motion_list,
+            'x': axes[0],
+            'y': axes[1],
+            'z': axes[2],
+            'counts': counts.reshape(grid_shape),
+            'shotnum': shotnums,
+            'reduce': reduce,
+            'tol': tol,
+        })
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'motion list': None,
+            'x': None,
+            'y': None,
+            'z': None,
+            'counts': None,
+            'shotnum': None,
+            'reduce': None,
+            'tol': None,
+        })
+
+    @staticmethod
+    def _grid_index(xyz: np.ndarray, axes: Tuple[np.ndarray, ...],
+                    delta: np.ndarray,
+                    tol: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map positions **xyz** to integer grid coordinates.
+
+        :param xyz: :code:`(nshots, 3)` array of positions
+        :param axes: grid coordinates along each axis
+        :param delta: grid spacing along each axis
+        :param tol: tolerance as a fraction of the grid spacing
+        :return: :code:`(nshots, 3)` array of grid coordinates and
+            a boolean mask of the shots that are on the grid
+        """
+        gidx = np.zeros(xyz.shape, dtype=np.int64)
+        on_grid = np.all(np.isfinite(xyz), axis=1)
+        for ii, coords in enumerate(axes):
+            if coords.shape[0] <= 1 or delta[ii] == 0:
+                # single point axis, any position is on the grid
+                continue
+            with np.errstate(invalid='ignore'):
+                idx = np.rint((xyz[:, ii] - coords[0]) / delta[ii])
+                idx = np.where(np.isfinite(idx), idx, -1).astype(
+                    np.int64)
+                inside = (idx >= 0) & (idx < coords.shape[0])
+                idx[~inside] = 0
+                close = np.abs(xyz[:, ii] - coords[idx]) \
+                    <= tol * abs(delta[ii])
+            on_grid &= inside & close
+            gidx[:, ii] = idx
+
+        return gidx, on_grid
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """
+        A dictionary of metadata for the data cube.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data,
+        plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'motion list'`", "
+            name of the motion list defining the grid
+            "
+            ":code:`'x'`, :code:`'y'`, :code:`'z'`", "
+            grid coordinates along each axis
+            "
+            ":code:`'counts'`", "
+            :code:`(nx, ny, nz)` array of the number of shots at each
+            grid position
+            "
+            ":code:`'shotnum'`", "
+            :code:`(nx, ny, nz, nshots_per_pos)` array of the shot
+            number in each slot of the cube (:code:`0` for empty
+            slots)
+            "
+            ":code:`'reduce'`", "
+            :code:`None` or :code:`'mean'`
+            "
+            ":code:`'tol'`", "
+            grid tolerance as a fraction of the grid spacing
+            "
+        """
+        return self._info
+
+
+# add example to __new__ docstring
+HDFReadCube.__new__.__doc__ += "\n"
+for line in HDFReadCube.__example_doc__.splitlines():
+    HDFReadCube.__new__.__doc__ += "    " + line + "\n"
@@ -16,13 +16,14 @@ import os
 import time
 
 from bapsflib.plasma import core
-from typing import Union
+from typing import (Dict, Tuple, Union)
 from warnings import warn
 
 from .file import File
-from .helpers import (build_sndr_for_simple_dset, condition_controls,
-                      condition_shotnum, do_shotnum_intersection)
+from .helpers import (check_memory_budget, condition_controls,
+                      condition_index_shotnum, condition_max_memory)
 from .hdfreadcontrols import HDFReadControls
+from .signalfilter import SignalFilter
 
 
 # noinspection PyInitNewSignature
@@ -108,7 +109,9 @@ class HDFReadData(np.ndarray):
                 adc=None,
                 keep_bits=False,
                 add_controls=None,
-                intersection_set=True, **kwargs):
+                intersection_set=True,
+                filter=None, layout='records', missing='fill',
+                max_memory=None, **kwargs):
         """
         :param hdf_file: HDF5 file object
         :param board: analog-digital-converter board number
@@ -133,6 +136,28 @@ class HDFReadData(np.ndarray):
             :data:`shotnum` and the shot numbers contained in each
             control device and digitizer dataset. :code:`False` will
             return the union of shot numbers.
+        :param filter: filter applied (in place) along the time axis
+            of every shot of the voltage signal, designed for the
+            :attr:`dt` of the data (requires :code:`keep_bits=False`)
+        :type filter: :class:`~.signalfilter.SignalFilter`
+        :param str layout: :code:`'records'` (DEFAULT) returns the
+            structured :class:`HDFReadData` array, :code:`'columns'`
+            returns a :class:`HDFDataColumns` holding every field as a
+            separate C-contiguous array
+        :param str missing: how the shot numbers missing in the
+            digitizer or a control device dataset are represented.
+            :code:`'fill'` (DEFAULT) NULL fills them, :code:`'mask'`
+            (requires :code:`layout='columns'`) stores the
+            :code:`'signal'` of the recorded shots only, with
+            :attr:`HDFDataColumns.valid` and
+            :attr:`HDFDataColumns.signal_rows` locating them.  With
+            :code:`intersection_set=True` no shot is missing, so
+            :code:`'mask'` only adds the (all valid) masks
+        :param int max_memory: memory budget (in bytes) of the read.
+            A :code:`MemoryError` with the estimated memory is raised,
+            before any control device data or :code:`'signal'` is
+            read, if the estimate exceeds the budget (DEFAULT
+            :code:`None`, no budget)
 
         Behavior of :data:`index`, :data:`shotnum` and
         :data:`intersection_set`:
@@ -156,6 +181,10 @@ class HDFReadData(np.ndarray):
         else:
             timeit = False
 
+        # already conditioned (index, shotnum, sni), passed by a
+        # HDFReadPlan to bypass the `index` and `shotnum` conditioning
+        conditioned_shots = kwargs.get('conditioned_shots', None)
+
         # ---- Condition hdf_file                                   ----
         # - `hdf_file` is a lapd.File object
         #
@@ -170,6 +199,34 @@ class HDFReadData(np.ndarray):
             print('tt - `hdf_file` conditioning: '
                   '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
 
+        # ---- Condition `filter`                                   ----
+        if filter is not None:
+            if not isinstance(filter, SignalFilter):
+                raise TypeError(
+                    "`filter` is NOT type `"
+                    + SignalFilter.__module__ + "."
+                    + SignalFilter.__qualname__ + "`")
+            if keep_bits:
+                raise ValueError(
+                    "`filter` can only be applied to the voltage "
+                    "signal (keep_bits=False)")
+
+        # ---- Condition `layout`                                   ----
+        if layout not in ('records', 'columns'):
+            raise ValueError(
+                "`layout` must be 'records' or 'columns', got "
+                "{}".format(layout))
+        if missing not in ('fill', 'mask'):
+            raise ValueError(
+                "`missing` must be 'fill' or 'mask', got "
+                "{}".format(missing))
+        if missing == 'mask' and layout != 'columns':
+            raise ValueError(
+                "`missing='mask'` requires `layout='columns'`")
+
+        # ---- Condition `max_memory`                               ----
+        max_memory = condition_max_memory(max_memory)
+
         # ---- Examine file map object                              ----
         # grab instance of `HDFMap`
         _fmap = hdf_file.file_map
@@ -306,140 +363,59 @@ class HDFReadData(np.ndarray):
         #       in shotnum, then its entry in the returned array will
         #       be given a NULL value depending on the dtype
         #
-        # Determine if indexing w.r.t. `index` or `shotnum`
-        index_with = 'index'
-        if isinstance(index, slice):
-            if index == slice(None):
-                if not isinstance(shotnum, slice):
-                    index_with = 'shotnum'
-                elif shotnum != slice(None):
-                    index_with = 'shotnum'
-
-        # Condition `index` and `shotnum` keywords
-        # - Valid indexing types are: int, list(int), slice(), and
-        #   np.ndarray
-        #
-        if index_with == 'index':
-            # Condition `index` keyword
-            #
-            # Note: I'm letting the slicing of dset[index, shotnumkey]
-            #       throw the appropriate errors
-            #
-            # Define `shotnum`
-            # - Note: h5py datasets can NOT be sliced using numpy arrays
-            #
-            # convert `index` to np.ndarray
-            sn_size = dheader.size
-            if isinstance(index, int):
-                index = np.array([index], dtype=np.int32)
-            elif isinstance(index, list):
-                index = np.array(index, dtype=np.int32)
-            elif isinstance(index, slice):
-                start, stop, step = index.indices(sn_size)
-                index = np.arange(start, stop, step, dtype=np.int32)
-            elif isinstance(index, type(Ellipsis)):
-                index = np.arange(0, sn_size, 1, dtype=np.int32)
-            elif isinstance(index, np.ndarray):
-                pass
-            else:
-                raise TypeError("Valid `index` type not passed.")
-
-            # convert (VALID) negative indices to positive
-            neg_index_mask = np.where((index < 0) & (index >= -sn_size),
-                                      True, False)
-            if np.any(neg_index_mask):
-                adj_ii = index[neg_index_mask] % sn_size
-                index[neg_index_mask] = adj_ii
-            index = np.unique(index)
-
-            # define `shotnum`
-            shotnum = dheader[index.tolist(), shotnumkey]
+        # - a HDFReadPlan passes its already conditioned
+        #   (index, shotnum, sni) with the keyword 'conditioned_shots'
+        if conditioned_shots is not None:
+            index, shotnum, sni = (np.array(arr)
+                                   for arr in conditioned_shots)
+        else:
+            index, shotnum, sni = condition_index_shotnum(
+                index, shotnum, dheader, shotnumkey, intersection_set)
 
-            # define sni
-            sni = np.ones(shotnum.shape[0], dtype=np.bool)
+        # print execution timing
+        if timeit:  # pragma: no cover
+            tt.append(time.time())
+            print('tt - condition index and shotnum: '
+                  '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
 
-            # print execution timing
-            if timeit:  # pragma: no cover
-                tt.append(time.time())
-                print('tt - condition index: '
-                      '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
-        else:
-            # Condition `shotnum` keyword
-            #
-            # convert `shotnum` to np.ndarray
-            '''
-            if isinstance(shotnum, slice):
-                # determine largest possible shot number
-                last_sn = dheader[-1, shotnumkey]
-                if shotnum.stop is not None:
-                    stop_sn = max(shotnum.stop, last_sn + 1)
-                else:
-                    stop_sn = last_sn + 1
-
-                # get the start, stop, and step for the shot number
-                # array
-                start, stop, step = shotnum.indices(stop_sn)
-
-                # determine smallest possible shot number
-                # - intersection_set = True
-                #   * start = max of first_sn and shotnum.start
-                # - intersection_set = False
-                #   * start = min of first_sn and shotnum.start
-                first_sn = [dheader[0, shotnumkey]]
-                if shotnum.start is not None:
-                    # ensure shot numbers are >= 1
-                    if start <= 0:
-                        start = 1
-                else:
-                    # start wasn't specified in slice object
-                    start = min(first_sn)
-
-                # adjust start for intersection_set
-                if intersection_set:
-                    first_sn.append(start)
-                    start = max(first_sn)
-
-                # re-define shotnum as a list
-                shotnum = np.arange(start, stop, step).tolist()
-            elif isinstance(shotnum, int):
-                shotnum = [shotnum]
-            elif isinstance(shotnum, list):
-                # ensure all elements are int
-                if not all(isinstance(sn, int) for sn in shotnum):
-                    raise ValueError('Valid `shotnum` not passed')
-            else:
-                raise ValueError('Valid `shotnum` not passed')
-            '''
-            # perform `shotnum` conditioning
-            # - `shotnum` is returned as a numpy array
-            shotnum = condition_shotnum(shotnum,
-                                        {'digi': dheader},
-                                        {'digi': shotnumkey})
-
-            # Calc. the corresponding `index` and `sni`
-            # - `shotnum` will be converted from list to np.array
-            # - `index` and `sni` will be np.array's
-            '''
-            index, shotnum, sni = \
-                condition_shotnum(shotnum, dheader, shotnumkey,
-                                  intersection_set)
-            '''
-            index, sni = build_sndr_for_simple_dset(shotnum, dheader,
-                                                    shotnumkey)
-
-            # perform intersection
-            if intersection_set:
-                shotnum, sni_dict, index_dict = \
-                    do_shotnum_intersection(shotnum, {'digi': sni},
-                                            {'digi': index})
-                sni = sni_dict['digi']
-                index = index_dict['digi']
+        # ---- Check memory budget                                  ----
+        # - done before the control device datasets and 'signal' are
+        #   read, so the control device fields are taken from the
+        #   mappings
+        # - the intersection with the control device shot numbers
+        #   can only drop shots, so the estimate is an upper bound
+        if max_memory is not None:
+            sigtype = np.float32 if not keep_bits else dset.dtype
+            dtype = [('shotnum', np.uint32, 1),
+                     ('signal', sigtype, dset.shape[1]),
+                     ('xyz', np.float32, 3)]
+            cdtype = [('shotnum', np.uint32, 1)]
+            for cname, cconfn in controls:
+                cconfig = _fmap.controls[cname].configs[cconfn]
+                for field_name, fconfig in \
+                        cconfig['state values'].items():
+                    cdtype.append((field_name, fconfig['dtype'],
+                                   fconfig['shape']))
+            cdtype = np.dtype(cdtype)
+            for subdtype in cdtype.descr:
+                if subdtype[0] not in [d[0] for d in dtype]:
+                    dtype.append(subdtype)
 
-            # print execution timing
-            if timeit:  # pragma: no cover
-                tt.append(time.time())
-                print('tt - condition shotnum: '
-                      '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
+            nshots = shotnum.shape[0]
+            nsig = np.count_nonzero(sni) if missing == 'mask' \
+                else nshots
+            nbytes = estimate_read_memory(np.dtype(dtype), nshots,
+                                          nsig, dset, index.shape[0],
+                                          keep_bits)
+            if len(controls) != 0:
+                nbytes += nshots * cdtype.itemsize
+            check_memory_budget(
+                nbytes, max_memory,
+                "Reading board {} channel {} ".format(board, channel)
+                + "({} shots x {} samples)".format(nshots,
+                                                   dset.shape[1]),
+                hint="read fewer shots with `shotnum` or iterate "
+                     "over blocks of shots with File.iter_data()")
 
         # ---- Retrieve Control Data                                ----
         # 1. retrieve the numpy array for control data
@@ -455,7 +431,8 @@ class HDFReadData(np.ndarray):
             cdata = HDFReadControls(hdf_file, controls,
                                     assume_controls_conditioned=True,
                                     shotnum=shotnum,
-                                    intersection_set=intersection_set)
+                                    intersection_set=intersection_set,
+                                    missing=missing)
 
             # print execution timing
             if timeit:  # pragma: no cover
@@ -499,7 +476,16 @@ class HDFReadData(np.ndarray):
                   '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
 
         # Initialize data array
-        data = np.empty(shape, dtype=dtype)
+        # - layout='columns' allocates every field separately, so
+        #   'signal' is not strided by the record size
+        # - missing='mask' allocates 'signal' for the recorded shots
+        #   only
+        if missing == 'mask':
+            data = HDFDataColumns.empty(shape, dtype, signal_mask=sni)
+        elif layout == 'columns':
+            data = HDFDataColumns.empty(shape, dtype)
+        else:
+            data = np.empty(shape, dtype=dtype)
 
         # print execution timing
         if timeit:  # pragma: no cover
@@ -512,7 +498,7 @@ class HDFReadData(np.ndarray):
 
         # fill 'signal' fields of data array
         index = index.tolist()
-        if intersection_set:
+        if intersection_set or missing == 'mask':
             # fill signal
             data['signal'] = dset[index, ...]
         else:
@@ -527,9 +513,18 @@ class HDFReadData(np.ndarray):
         # fill fields related to controls
         if len(controls) != 0:
             # Note: shot numbers of cdata and data are one-to-one
-            #       by this point so intersection_set is irrelevant
+            #       by this point so intersection_set is irrelevant,
+            #       except for missing='mask' where cdata only holds
+            #       the shot numbers recorded by a control device
             #
-            if not np.array_equal(data['shotnum'],
+            if missing == 'mask':
+                crows = np.isin(shotnum, cdata['shotnum'])
+                for field in cdata.dtype.names:
+                    if field != 'shotnum':
+                        data[field][...] = 0
+            else:
+                crows = np.s_[:]
+            if not np.array_equal(data['shotnum'][crows],
                                   cdata['shotnum']):  # pragma: no cover
                 # this should never happen
                 raise ValueError(
@@ -538,18 +533,27 @@ class HDFReadData(np.ndarray):
 
             # fill xyz
             if 'xyz' in cdata.dtype.names:
-                data['xyz'] = cdata['xyz']
+                data['xyz'][crows] = cdata['xyz']
             else:
                 data['xyz'] = np.nan
 
             # fill remaining controls
             for field in cdata.dtype.names:
                 if field not in ('shotnum', 'xyz'):
-                    data[field] = cdata[field]
+                    data[field][crows] = cdata[field]
         else:
             # fill xyz
             data['xyz'] = np.nan
 
+        # record the valid entries of each source
+        if missing == 'mask':
+            data.valid[d_info['digitizer']] = np.array(sni, dtype=bool)
+            if cdata is not None:
+                for cname, cvalid in cdata.info['valid'].items():
+                    valid = np.zeros(shape, dtype=bool)
+                    valid[crows] = cvalid
+                    data.valid[cname] = valid
+
         # print execution timing
         if timeit:  # pragma: no cover
             tt.append(time.time())
@@ -557,7 +561,7 @@ class HDFReadData(np.ndarray):
                   '{} ms'.format((tt[-1] - tt[-2]) * 1.E3))
 
         # Define obj to be returned
-        obj = data.view(cls)
+        obj = data if layout == 'columns' else data.view(cls)
 
         # get voltage offset
         try:
@@ -626,6 +630,11 @@ class HDFReadData(np.ndarray):
                 # update 'signal units'
                 obj._info['signal units'] = u.volt
 
+            # filter
+            # - shots are filtered in place, in blocks of rows
+            if filter is not None:
+                filter.apply(obj['signal'], obj.dt)
+
         # print execution timing
         if timeit:  # pragma: no cover
             tt.append(time.time())
@@ -987,6 +996,214 @@ for line in HDFReadData.__example_doc__.splitlines():
     HDFReadData.__new__.__doc__ += "    " + line + "\n"
 
 
+class HDFDataColumns(object):
+    """
+    Column (struct-of-arrays) layout of :class:`HDFReadData`, returned
+    by :code:`HDFReadData(..., layout='columns')`.  Every field
+    (:code:`'shotnum'`, :code:`'signal'`, :code:`'xyz'`, and the
+    control device fields) is a separately allocated C-contiguous
+    array, so :code:`data['signal']` can be handed to FFTs and
+    reductions without the copy the strided field of a structured
+    array requires.
+
+    Fields are accessed by name, like the fields of
+    :class:`HDFReadData`, and assigning to a field writes into its
+    array.  :attr:`info`, :attr:`dt`, and :attr:`dv` follow
+    :class:`HDFReadData`.
+
+    With :code:`missing='mask'` the missing entries of a union read
+    are not NULL filled.  Instead:
+
+    * :code:`'signal'` only holds the shots recorded by the digitizer,
+      :attr:`signal_rows` maps every shot number to its row of
+      :code:`'signal'` (:code:`-1` if not recorded)
+    * the control device fields of the shots a device did not record
+      are zero
+    * :attr:`valid` flags the entries recorded by each source (the
+      digitizer and every control device)
+
+    :Example:
+
+        >>> data = f.read_data(1, 1, layout='columns')
+        >>> data.names
+        ('shotnum', 'signal', 'xyz')
+        >>> data['signal'].flags['C_CONTIGUOUS']
+        True
+        >>> spectra = np.fft.rfft(data['signal'], axis=1)
+        >>>
+        >>> # union read with validity masks
+        >>> data = f.read_data(1, 1, layout='columns',
+        ...                    intersection_set=False, missing='mask',
+        ...                    add_controls=['6K Compumotor'])
+        >>> data['shotnum'].shape, data['signal'].shape
+        ((1000,), (800, 20000))
+        >>> list(data.valid)
+        ['SIS 3301', '6K Compumotor']
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray],
+                 info: Union[None, dict] = None,
+                 signal_rows: Union[None, np.ndarray] = None):
+        """
+        :param columns: dictionary of the field arrays, all with the
+            same length (except a :code:`'signal'` indexed by
+            **signal_rows**)
+        :param info: metadata dictionary (see :attr:`HDFReadData.info`)
+        :param signal_rows: row of :code:`'signal'` of every entry,
+            :code:`-1` for entries without a signal (see
+            :attr:`signal_rows`)
+        """
+        sizes = {col.shape[0] for name, col in columns.items()
+                 if signal_rows is None or name != 'signal'}
+        if signal_rows is not None:
+            sizes.add(signal_rows.shape[0])
+            if 'signal' in columns and columns['signal'].shape[0] \
+                    != np.count_nonzero(signal_rows >= 0):
+                raise ValueError(
+                    "'signal' must have a row for every entry of "
+                    "`signal_rows` >= 0")
+        if len(sizes) > 1:
+            raise ValueError(
+                "All columns must have the same length, got "
+                "{}".format(sorted(sizes)))
+        self._columns = columns
+        self._info = {} if info is None else info
+        self._signal_rows = signal_rows
+        self._valid = None if signal_rows is None \
+            else {}  # type: Union[None, Dict[str, np.ndarray]]
+
+    def __contains__(self, name: str):
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __setitem__(self, name: str, value):
+        self._columns[name][...] = value
+
+    @classmethod
+    def empty(cls, shape: Tuple[int, ...], dtype,
+              signal_mask: Union[None, np.ndarray] = None
+              ) -> 'HDFDataColumns':
+        """
+        Allocate an uninitialized column for every field of structured
+        **dtype**.
+
+        :param shape: shape of the (1D) record array
+        :param dtype: structured dtype of the record array
+        :param signal_mask: boolean array flagging the entries with a
+            signal, :code:`'signal'` is then only allocated for those
+            (DEFAULT :code:`None` allocates it for every entry)
+        """
+        dtype = np.dtype(dtype)
+        signal_rows = None
+        if signal_mask is not None:
+            signal_mask = np.asarray(signal_mask, dtype=bool)
+            signal_rows = np.full(signal_mask.shape, -1, dtype=np.intp)
+            signal_rows[signal_mask] = np.arange(
+                np.count_nonzero(signal_mask))
+        columns = {}
+        for name in dtype.names:
+            nrows = tuple(shape)
+            if name == 'signal' and signal_mask is not None:
+                nrows = (np.count_nonzero(signal_mask),)
+            columns[name] = np.empty(nrows + dtype[name].shape,
+                                     dtype=dtype[name].base)
+        return cls(columns, signal_rows=signal_rows)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """Field names, like :code:`HDFReadData.dtype.names`."""
+        return tuple(self._columns)
+
+    @property
+    def shape(self) -> Tuple[int]:
+        """Shape of the record array, :code:`(nshots,)`."""
+        if self._signal_rows is not None:
+            return self._signal_rows.shape
+        if len(self._columns) == 0:
+            return (0,)
+        return (next(iter(self._columns.values())).shape[0],)
+
+    @property
+    def signal_rows(self) -> Union[None, np.ndarray]:
+        """
+        Row of :code:`'signal'` holding each entry, :code:`-1` for
+        the entries (shot numbers) without a signal.  :code:`None`
+        unless read with :code:`missing='mask'`, then :code:`'signal'`
+        has a row for every entry.
+        """
+        return self._signal_rows
+
+    def to_records(self) -> HDFReadData:
+        """
+        Copy the columns into a structured :class:`HDFReadData`.  A
+        compact :code:`'signal'` (see :attr:`signal_rows`) is expanded,
+        with the missing rows NULL filled.
+        """
+        dtype = [(name, col.dtype, col.shape[1:])
+                 for name, col in self._columns.items()]
+        data = np.empty(self.shape, dtype=dtype)
+        for name, col in self._columns.items():
+            if name == 'signal' and self._signal_rows is not None:
+                present = self._signal_rows >= 0
+                data[name][present] = col
+                data[name][~present] = \
+                    0 if np.issubdtype(col.dtype, np.integer) \
+                    else np.nan
+            else:
+                data[name] = col
+        # - the ellipsis view runs __array_finalize__, which sets the
+        #   default metadata (e.g. the plasma parameters)
+        obj = data.view(HDFReadData)[...]
+        obj._info = copy.deepcopy(self._info)
+        if hasattr(self, '_plasma'):
+            obj._plasma = self._plasma.copy()
+        return obj
+
+    @property
+    def valid(self) -> Union[None, Dict[str, np.ndarray]]:
+        """
+        Boolean array, for each source (digitizer and control device
+        name), flagging the entries recorded by that source.
+        :code:`None` unless read with :code:`missing='mask'`.
+        """
+        return self._valid
+
+    dt = HDFReadData.dt
+    dv = HDFReadData.dv
+    info = HDFReadData.info
+
+
+def estimate_read_memory(dtype: np.dtype, nshots: int, nsig: int,
+                         dset, nread: int, keep_bits: bool) -> int:
+    """
+    Estimates the peak memory (in bytes) :class:`HDFReadData` needs
+    for the digitizer data of a read, not counting the control device
+    data.  This is the returned array plus the larger of the raw
+    :code:`'signal'` read buffer and the voltage conversion
+    temporaries.
+
+    :param dtype: dtype of the returned array
+    :param int nshots: number of returned shot numbers
+    :param int nsig: number of :code:`'signal'` rows allocated
+        (:code:`nshots` unless read with :code:`missing='mask'`)
+    :param dset: digitizer dataset
+    :type dset: :class:`h5py.Dataset`
+    :param int nread: number of digitizer dataset rows read
+    :param bool keep_bits: :code:`True` if the signal is kept in bits
+    """
+    sig_itemsize = dtype['signal'].itemsize
+    output = (nshots * (dtype.itemsize - sig_itemsize)
+              + nsig * sig_itemsize)
+    raw = nread * dset.dtype.itemsize * dset.shape[1]
+    convert = 0 if keep_bits else 2 * nsig * sig_itemsize
+    return int(output + max(raw, convert))
+
+
 '''
 def condition_shotnum(shotnum, dheader, shotnumkey,
                       intersection_set):
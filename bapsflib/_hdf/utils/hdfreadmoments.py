@@ -0,0 +1,536 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import copy
+import numpy as np
+
+from typing import (Dict, Iterable, Union)
+
+from .file import File
+from .hdfiterdata import HDFIterData
+from .helpers import (build_group_keys, condition_by, group_keys,
+                      NO_GROUP_KEY)
+
+
+class SignalMoments(object):
+    """
+    Streaming accumulator of the count, mean, central moments (up to
+    fourth order), minimum, maximum, and (optionally) histogram of the
+    samples of a signal, per group.  Each row of values passed to
+    :meth:`update` is assigned to a group by its key, and all of its
+    samples are pooled into that group.  With :data:`sample_shape`
+    the samples are not pooled, every sample position of a row (e.g.
+    every time step of a shot) gets its own moments.
+
+    Blocks are combined with the pairwise update of Chan et al.
+    (extended to third and fourth order by Pébay), so the result does
+    not depend on how the samples are split into blocks, and
+    accumulators filled on separate threads or processes can be
+    combined with :meth:`merge`.  The memory used is constant in the
+    number of samples.
+
+    :Example:
+
+        >>> # accumulate blocks of shots grouped by probe position
+        >>> moments = SignalMoments(key_dtype=[('xyz', '<f4', (3,))],
+        ...                         bins=100, hist_range=(-1., 1.))
+        >>> for data in f.iter_data(1, 1,
+        ...                         add_controls=['6K Compumotor']):
+        ...     moments.update(data['signal'], data[['xyz']])
+        >>>
+        >>> # combine accumulators filled by other workers
+        >>> moments.merge(other_moments)
+        >>> moments.keys['xyz'], moments.kurtosis
+    """
+
+    def __init__(self, key_dtype=None, bins=None, hist_range=None,
+                 sample_shape=None, order=4):
+        """
+        :param key_dtype: structured dtype of the group keys,
+            :code:`None` (DEFAULT) accumulates all samples in one group
+        :param bins: number of histogram bins (requires
+            :data:`hist_range`), or the monotonically increasing bin
+            edges.  :code:`None` (DEFAULT) skips the histogram.
+        :param hist_range: :code:`(lower, upper)` range of the
+            histogram when :data:`bins` is an int
+        :param sample_shape: shape of the rows of values when every
+            sample position keeps its own moments, :code:`None`
+            (DEFAULT) pools all samples of a row
+        :param int order: highest central moment accumulated, from
+            :code:`1` (mean only) to :code:`4` (DEFAULT)
+        """
+        key_dtype = NO_GROUP_KEY if key_dtype is None \
+            else np.dtype(key_dtype)
+        if key_dtype.names is None:
+            raise ValueError("`key_dtype` must be a structured dtype")
+        if order not in (1, 2, 3, 4):
+            raise ValueError(
+                "`order` must be 1, 2, 3, or 4, got {}".format(order))
+        if sample_shape is not None:
+            sample_shape = tuple(sample_shape)
+            if bins is not None:
+                raise ValueError(
+                    "A histogram requires the samples to be pooled "
+                    "(`sample_shape=None`)")
+        self.sample_shape = sample_shape
+        self.order = order
+
+        # ---- Condition histogram bins                             ----
+        if bins is None:
+            edges = None
+        elif isinstance(bins, (int, np.integer)) \
+                and not isinstance(bins, bool):
+            if bins < 1 or hist_range is None \
+                    or len(hist_range) != 2 \
+                    or not np.all(np.isfinite(hist_range)) \
+                    or hist_range[0] >= hist_range[1]:
+                raise ValueError(
+                    "An int `bins` must be >= 1 and requires a finite "
+                    "`hist_range` (lower, upper)")
+            edges = np.linspace(hist_range[0], hist_range[1], bins + 1)
+        else:
+            edges = np.asarray(bins, dtype=np.float64)
+            if edges.ndim != 1 or edges.shape[0] < 2 \
+                    or np.any(np.diff(edges) <= 0):
+                raise ValueError(
+                    "`bins` edges must be a monotonically increasing "
+                    "1D array of at least 2 edges")
+        self.bin_edges = edges
+
+        # group key (as bytes) -> group id
+        # - moments not accumulated (above `order`) are None
+        shape = (0,) if sample_shape is None else (0,) + sample_shape
+        self._gids = {}  # type: Dict[bytes, int]
+        self.keys = np.empty(0, dtype=key_dtype)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64) \
+            if order >= 2 else None
+        self.m3 = np.zeros(shape, dtype=np.float64) \
+            if order >= 3 else None
+        self.m4 = np.zeros(shape, dtype=np.float64) \
+            if order >= 4 else None
+        self.min = np.zeros(shape, dtype=np.float64)
+        self.max = np.zeros(shape, dtype=np.float64)
+        self.hist = None if edges is None \
+            else np.zeros((0, edges.shape[0] - 1), dtype=np.int64)
+
+    def __len__(self):
+        return self.keys.shape[0]
+
+    def _add_groups(self, keys: np.ndarray):
+        """Append new groups with keys **keys**."""
+        nnew = keys.shape[0]
+        self.keys = np.concatenate((self.keys, keys))
+        zeros = np.zeros((nnew,) + self.mean.shape[1:],
+                         dtype=np.float64)
+        self.count = np.concatenate(
+            (self.count, np.zeros(nnew, dtype=np.int64)))
+        self.mean = np.concatenate((self.mean, zeros))
+        for name in ('m2', 'm3', 'm4'):
+            if getattr(self, name) is not None:
+                setattr(self, name,
+                        np.concatenate((getattr(self, name), zeros)))
+        self.min = np.concatenate((self.min, zeros + np.inf))
+        self.max = np.concatenate((self.max, zeros - np.inf))
+        if self.hist is not None:
+            self.hist = np.concatenate(
+                (self.hist,
+                 np.zeros((nnew, self.hist.shape[1]), dtype=np.int64)))
+
+    def _combine(self, gids: np.ndarray, nb: np.ndarray,
+                 mb: np.ndarray, m2b: np.ndarray, m3b: np.ndarray,
+                 m4b: np.ndarray):
+        """
+        Combine the moments of a partition (**nb** samples with mean
+        **mb** and central moment sums **m2b**, **m3b**, **m4b**) into
+        the (unique) groups **gids**.  Sums above :attr:`order` are
+        ignored.
+        """
+        na = self._per_group(self.count[gids].astype(np.float64))
+        nbf = self._per_group(nb.astype(np.float64))
+        n = na + nbf
+        delta = mb - self.mean[gids]
+        m2a = None if self.m2 is None else self.m2[gids]
+        m3a = None if self.m3 is None else self.m3[gids]
+        if self.m4 is not None:
+            self.m4[gids] += m4b \
+                + delta ** 4 * na * nbf \
+                * (na ** 2 - na * nbf + nbf ** 2) / n ** 3 \
+                + 6.0 * delta ** 2 * (na ** 2 * m2b + nbf ** 2 * m2a) \
+                / n ** 2 \
+                + 4.0 * delta * (na * m3b - nbf * m3a) / n
+        if self.m3 is not None:
+            self.m3[gids] += m3b \
+                + delta ** 3 * na * nbf * (na - nbf) / n ** 2 \
+                + 3.0 * delta * (na * m2b - nbf * m2a) / n
+        if self.m2 is not None:
+            self.m2[gids] += m2b + delta ** 2 * na * nbf / n
+        self.mean[gids] += delta * nbf / n
+        self.count[gids] += nb.astype(np.int64)
+
+    def _per_group(self, arr: np.ndarray) -> np.ndarray:
+        """Broadcast per-group array **arr** against the moments."""
+        return arr.reshape((-1,) + (1,) * (self.mean.ndim - 1))
+
+    def _moment(self, name: str) -> np.ndarray:
+        """Get central moment sum **name**, if accumulated."""
+        moment = getattr(self, name)
+        if moment is None:
+            raise ValueError(
+                "'{}' is not accumulated with ".format(name)
+                + "`order={}`".format(self.order))
+        return moment
+
+    @property
+    def kurtosis(self) -> np.ndarray:
+        """Excess (Fisher) kurtosis of each group."""
+        m4 = self._moment('m4')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._per_group(self.count) * m4 / self.m2 ** 2 - 3.0
+
+    def merge(self, other: 'SignalMoments') -> 'SignalMoments':
+        """
+        Combine the groups of accumulator **other** into this one.
+
+        :param other: accumulator with the same key dtype and bins
+        :return: this accumulator
+        """
+        if other.keys.dtype != self.keys.dtype:
+            raise ValueError("Accumulators have different key dtypes")
+        if other.sample_shape != self.sample_shape \
+                or other.order != self.order:
+            raise ValueError(
+                "Accumulators have different sample shapes or orders")
+        if (self.bin_edges is None) != (other.bin_edges is None) \
+                or (self.bin_edges is not None
+                    and not np.array_equal(self.bin_edges,
+                                           other.bin_edges)):
+            raise ValueError("Accumulators have different bins")
+
+        filled = other.count > 0
+        if not np.any(filled):
+            return self
+        gids, new = group_keys(other.keys[filled], self._gids)
+        if new.shape[0] != 0:
+            self._add_groups(other.keys[filled][new])
+        sums = [None if moment is None else moment[filled]
+                for moment in (other.m2, other.m3, other.m4)]
+        self._combine(gids, other.count[filled], other.mean[filled],
+                      *sums)
+        self.min[gids] = np.minimum(self.min[gids], other.min[filled])
+        self.max[gids] = np.maximum(self.max[gids], other.max[filled])
+        if self.hist is not None:
+            self.hist[gids] += other.hist[filled]
+        return self
+
+    @property
+    def skewness(self) -> np.ndarray:
+        """Skewness of each group."""
+        m3 = self._moment('m3')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self._per_group(self.count)) * m3 \
+                / self.m2 ** 1.5
+
+    @property
+    def std(self) -> np.ndarray:
+        """Standard deviation (:code:`ddof=0`) of each group."""
+        return np.sqrt(self.var)
+
+    def update(self, values: np.ndarray, keys=None):
+        """
+        Accumulate the rows of **values** into the groups given by
+        **keys**.
+
+        :param values: array of samples, the first axis is the row
+            (e.g. shot) axis and all other axes are pooled (or, with
+            :attr:`sample_shape`, must have that shape)
+        :param keys: 1D structured array of the group key of each row
+            (of dtype :data:`key_dtype`), :code:`None` if the
+            accumulator has one group
+        """
+        values = np.asarray(values)
+        nrows = values.shape[0]
+        if nrows == 0:
+            return
+        pooled = self.sample_shape is None
+        if not pooled and values.shape[1:] != self.sample_shape:
+            raise ValueError(
+                "`values` rows must have shape "
+                "{}, got {}".format(self.sample_shape, values.shape[1:]))
+        values = values.reshape(nrows, -1)
+        if keys is None:
+            if self.keys.dtype != NO_GROUP_KEY:
+                raise ValueError(
+                    "`keys` are required for a grouped accumulator")
+            keys = np.zeros(nrows, dtype=NO_GROUP_KEY)
+        elif keys.dtype != self.keys.dtype \
+                or keys.shape != (nrows,):
+            raise ValueError(
+                "`keys` must be a 1D array of dtype "
+                "{} with one key per row".format(self.keys.dtype))
+
+        # identify the groups in the block
+        row_gids, new = group_keys(keys, self._gids)
+        if new.shape[0] != 0:
+            self._add_groups(keys[new])
+
+        # per-group block moments
+        # - the float64 samples and deviations of the block are the
+        #   only temporaries
+        # - pooled rows are reduced over their samples first
+        def reduce(arr):
+            return arr.sum(axis=1) if pooled else arr
+
+        order = np.argsort(row_gids, kind='stable')
+        row_gids = row_gids[order]
+        gids, starts, inv = np.unique(row_gids, return_index=True,
+                                      return_inverse=True)
+        vals = values[order].astype(np.float64)
+        nb = np.diff(np.append(starts, nrows))
+        if pooled:
+            nb = nb * vals.shape[1]
+            bshape = (-1,)
+        else:
+            bshape = (-1,) + self.sample_shape
+        mb = np.add.reduceat(reduce(vals), starts, axis=0) \
+            / (nb if pooled else nb[:, None])
+        msums = [None, None, None]
+        if self.order >= 2:
+            dev = vals - (mb[inv][:, None] if pooled else mb[inv])
+            dev2 = dev * dev
+            msums[0] = np.add.reduceat(reduce(dev2), starts, axis=0)
+            if self.order >= 3:
+                msums[1] = np.add.reduceat(reduce(dev2 * dev), starts,
+                                           axis=0)
+            if self.order >= 4:
+                msums[2] = np.add.reduceat(reduce(dev2 * dev2), starts,
+                                           axis=0)
+            del dev, dev2
+        msums = [None if msum is None else msum.reshape(bshape)
+                 for msum in msums]
+        self._combine(gids, nb, mb.reshape(bshape), *msums)
+        bmin = vals.min(axis=1) if pooled else vals
+        bmax = vals.max(axis=1) if pooled else vals
+        self.min[gids] = np.minimum(
+            self.min[gids],
+            np.minimum.reduceat(bmin, starts, axis=0).reshape(bshape))
+        self.max[gids] = np.maximum(
+            self.max[gids],
+            np.maximum.reduceat(bmax, starts, axis=0).reshape(bshape))
+
+        # histogram
+        # - samples outside the bin edges are not counted, the upper
+        #   edge is included in the last bin
+        if self.hist is not None:
+            nbins = self.hist.shape[1]
+            ibin = np.searchsorted(self.bin_edges, vals,
+                                   side='right') - 1
+            ibin[vals == self.bin_edges[-1]] = nbins - 1
+            valid = (ibin >= 0) & (ibin < nbins)
+            flat = (row_gids[:, None] * nbins + ibin)[valid]
+            self.hist += np.bincount(
+                flat, minlength=self.hist.size).reshape(
+                self.hist.shape)
+
+    @property
+    def var(self) -> np.ndarray:
+        """Variance (:code:`ddof=0`) of each group."""
+        m2 = self._moment('m2')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return m2 / self._per_group(self.count)
+
+
+class HDFReadMoments(np.ndarray):
+    """
+    Reads digitizer data and computes the moments (mean, variance,
+    skewness, and kurtosis), extremes, and amplitude histogram of the
+    signal samples, pooled over all shots in each group, where a group
+    is every shot sharing the same value(s) of the control device
+    field(s) :data:`by` (e.g. the probe position :code:`'xyz'`).  The
+    shots are streamed in blocks (see
+    :class:`~.hdfiterdata.HDFIterData`) into a
+    :class:`SignalMoments` accumulator, so everything is computed in
+    one read pass with constant memory.
+
+    The returned array is a 1D structured array with one entry per
+    group (in the order groups are first encountered) and fields:
+
+    * the :data:`by` field(s), the group key (none if :data:`by` is
+      :code:`None`, then all shots form one group)
+    * :code:`'nsamples'`, the number of samples in the group
+    * :code:`'mean'`, :code:`'var'` (:code:`ddof=0`),
+      :code:`'skewness'`, and :code:`'kurtosis'` (excess)
+    * :code:`'min'` and :code:`'max'`
+    * :code:`'hist'`, the :code:`(nbins,)` histogram counts (only if
+      :data:`bins` is given, the edges are in
+      :code:`info['bin edges']`)
+    """
+    __example_doc__ = """
+    :Example: Here the fluctuation statistics of each probe position
+        are computed:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # board 1, channel 1 at each position
+        >>> # - this is equivalent to
+        >>> #   f.read_moments(1, 1, by='xyz', bins=200,
+        >>> #                  hist_range=(-2., 2.),
+        >>> #                  add_controls=['6K Compumotor'])
+        >>> mom = HDFReadMoments(f, 1, 1, by='xyz', bins=200,
+        ...                      hist_range=(-2., 2.),
+        ...                      add_controls=['6K Compumotor'])
+        >>> mom.dtype.names
+        ('xyz', 'nsamples', 'mean', 'var', 'skewness', 'kurtosis',
+         'min', 'max', 'hist')
+        >>> mom['hist'].shape
+        (121, 200)
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                board: int, channel: int,
+                by: Union[None, str, Iterable[str]] = None,
+                bins=None,
+                hist_range=None,
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                add_controls=None,
+                chunk_size=None,
+                prefetch=1,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by (see :func:`~.helpers.condition_by`). :code:`None`
+            (DEFAULT) pools all shots into one group.
+        :param bins: number of histogram bins (requires
+            :data:`hist_range`) or the bin edges, :code:`None`
+            (DEFAULT) skips the histogram
+        :param hist_range: :code:`(lower, upper)` range of the
+            histogram (in the units of the signal)
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`.
+        """
+        # ---- Condition `by`                                       ----
+        if by is not None:
+            if not bool(add_controls):
+                raise ValueError(
+                    "`add_controls` must specify the control "
+                    "device(s) recording the `by` field(s)")
+            by = condition_by(hdf_file, by, add_controls)
+
+        # ---- Stream blocks                                        ----
+        data_iter = HDFIterData(hdf_file, board, channel,
+                                index=index,
+                                shotnum=shotnum,
+                                digitizer=digitizer,
+                                config_name=config_name,
+                                adc=adc,
+                                keep_bits=keep_bits,
+                                add_controls=add_controls,
+                                intersection_set=True,
+                                chunk_size=chunk_size,
+                                prefetch=prefetch,
+                                silent=silent)
+        moments = None  # type: Union[None, SignalMoments]
+        info = None
+        for data in data_iter:
+            keys = build_group_keys(data, by)
+            if moments is None:
+                moments = SignalMoments(key_dtype=keys.dtype, bins=bins,
+                                        hist_range=hist_range)
+                info = copy.deepcopy(data.info)
+            moments.update(data['signal'], keys)
+
+        if moments is None:
+            raise ValueError("No shots to compute moments for.")
+
+        # ---- Build moments array                                  ----
+        fields = () if by is None else by
+        dtype = [(field, moments.keys.dtype[field]) for field in fields]
+        dtype.append(('nsamples', np.uint64))
+        for stat in ('mean', 'var', 'skewness', 'kurtosis', 'min',
+                     'max'):
+            dtype.append((stat, np.float64))
+        if moments.hist is not None:
+            dtype.append(('hist', np.uint64, (moments.hist.shape[1],)))
+        data = np.empty(len(moments), dtype=dtype)
+        for field in fields:
+            data[field] = moments.keys[field]
+        data['nsamples'] = moments.count
+        for stat in ('mean', 'var', 'skewness', 'kurtosis', 'min',
+                     'max'):
+            data[stat] = getattr(moments, stat)
+        if moments.hist is not None:
+            data['hist'] = moments.hist
+
+        obj = data.view(cls)
+        info.update({
+            'by': by,
+            'bin edges': moments.bin_edges,
+            'nsamples': int(np.sum(moments.count)),
+        })
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'by': None,
+            'bin edges': None,
+            'nsamples': None,
+        })
+
+    @property
+    def info(self) -> dict:
+        """
+        A dictionary of metadata for the moments.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data,
+        plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'by'`", "
+            tuple of the field names the shots were grouped by
+            (:code:`None` if not grouped)
+            "
+            ":code:`'bin edges'`", "
+            edges of the histogram bins (:code:`None` if no histogram)
+            "
+            ":code:`'nsamples'`", "
+            total number of samples
+            "
+        """
+        return self._info
+
+
+# add example to __new__ docstring
+HDFReadMoments.__new__.__doc__ += "\n"
+for line in HDFReadMoments.__example_doc__.splitlines():
+    HDFReadMoments.__new__.__doc__ += "    " + line + "\n"
@@ -15,6 +15,7 @@ import numpy as np
 import os
 
 from .file import File
+from .helpers import (check_memory_budget, condition_max_memory)
 
 
 class HDFReadMSI(np.ndarray):
@@ -82,11 +83,16 @@ class HDFReadMSI(np.ndarray):
         4.88e-05
     """
 
-    def __new__(cls, hdf_file: File, dname: str, **kwargs):
+    def __new__(cls, hdf_file: File, dname: str, max_memory=None,
+                **kwargs):
         """
         :param hdf_file: HDF5 file object
         :type hdf_file: :class:`~bapsflib.lapd.File`
         :param str dname: name of desired MSI diagnostic
+        :param int max_memory: memory budget (in bytes) of the read.
+            A :code:`MemoryError` with the size of the array is
+            raised, before it is allocated, if the size exceeds the
+            budget (DEFAULT :code:`None`, no budget)
         """
         # ---- Condition `hdf_file`                                 ----
         # - `hdf_file` is a lapd.File object
@@ -96,6 +102,9 @@ class HDFReadMSI(np.ndarray):
                 "`hdf_file` is NOT type `"
                 + File.__module__ + "." + File.__qualname__ + "`")
 
+        # ---- Condition `max_memory`                               ----
+        max_memory = condition_max_memory(max_memory)
+
         # ---- Condition `dname`                                    ----
         # ensure `dname` is a string
         if not isinstance(dname, str):
@@ -187,6 +196,15 @@ class HDFReadMSI(np.ndarray):
         # define dtype
         dtype = np.dtype(dtype_list)
 
+        # check memory budget
+        # - the MSI datasets are read in full, so the array size
+        #   follows from the mapped shape
+        check_memory_budget(
+            dtype.itemsize * int(np.prod(_map.configs['shape'])),
+            max_memory,
+            "Reading MSI diagnostic '{}' ".format(dname)
+            + "({} shots)".format(_map.configs['shape'][0]))
+
         # ---- Define and Populate Numpy Array                      ----
         # create empty array
         data = np.empty(_map.configs['shape'], dtype=dtype)
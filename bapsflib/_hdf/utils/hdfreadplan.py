@@ -0,0 +1,425 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import h5py
+import numpy as np
+
+from typing import (Any, Dict, Tuple, Union)
+
+from .file import File
+from .hdfreadchannels import HDFReadChannels
+from .hdfreaddata import (HDFDataColumns, HDFReadData,
+                          estimate_read_memory)
+from .helpers import (condition_control_shotnum, condition_controls,
+                      condition_index_shotnum)
+
+
+class HDFReadPlan(object):
+    """
+    A dry-run of a :class:`~.hdfreaddata.HDFReadData` read.
+
+    The plan performs the conditioning of
+    :class:`~.hdfreaddata.HDFReadData` and
+    :class:`~.hdfreadcontrols.HDFReadControls` (digitizer dataset,
+    shot numbers, dataset indices, control devices, and output
+    dtype), reading only shot numbers, and estimates the cost of the
+    read in :attr:`estimates`.  The read is performed by
+    :meth:`execute`, which can be called any number of times and for
+    any channel sharing the planned dataset layout (same digitizer
+    configuration, adc, dataset shape, and dtype).
+
+    .. note::
+
+        * The estimates are approximate.  The bytes, read calls, and
+          chunks of the shot number lookups are upper bounds, and
+          :code:`'peak memory'` counts the returned array, the control
+          device array, and the larger of the raw signal read buffer
+          and the voltage conversion temporaries.
+        * :code:`'chunks'` counts the HDF5 chunks touched by the read,
+          so contiguous datasets add none.
+    """
+    __example_doc__ = """
+    :Example: Here a read of board 1, channel 1 is planned before
+        reading the channels 1 to 4 sharing its layout:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # - this is equivalent to
+        >>> #   f.plan_read(1, 1, add_controls=['6K Compumotor'])
+        >>> plan = HDFReadPlan(f, 1, 1, add_controls=['6K Compumotor'])
+        >>> plan.shape, plan.estimates['peak memory']
+        ((20000,), 2721440000)
+        >>>
+        >>> # read the channels
+        >>> data = [plan.execute(channel=ch) for ch in range(1, 5)]
+        >>> data[3].info['channel']
+        4
+    """
+
+    def __init__(self,
+                 hdf_file: File,
+                 board: int, channel: int,
+                 index=slice(None),
+                 shotnum=slice(None),
+                 digitizer=None,
+                 config_name=None,
+                 adc=None,
+                 keep_bits=False,
+                 add_controls=None,
+                 intersection_set=True,
+                 layout='records', missing='fill'):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param index: dataset row indices to be sliced (overridden
+            by :code:`shotnum`)
+        :type index: Union[int, List[int], slice, numpy.ndarray]
+        :param shotnum: HDF5 file shot number(s) indicating data
+            entries to be extracted (overrides :code:`index`)
+        :type shotnum: Union[int, List[int], slice, numpy.ndarray]
+
+        All other parameters follow
+        :class:`~.hdfreaddata.HDFReadData`.
+        """
+        # ---- Condition hdf_file                                   ----
+        if not isinstance(hdf_file, File):
+            raise TypeError(
+                "`hdf_file` is NOT type `"
+                + File.__module__ + "." + File.__qualname__ + "`")
+        _fmap = hdf_file.file_map
+
+        # ---- Condition `layout` and `missing`                     ----
+        if layout not in ('records', 'columns'):
+            raise ValueError(
+                "`layout` must be 'records' or 'columns', got "
+                "{}".format(layout))
+        if missing not in ('fill', 'mask'):
+            raise ValueError(
+                "`missing` must be 'fill' or 'mask', got "
+                "{}".format(missing))
+        if missing == 'mask' and layout != 'columns':
+            raise ValueError(
+                "`missing='mask'` requires `layout='columns'`")
+
+        # ---- Condition `add_controls`                             ----
+        if bool(add_controls) and not bool(_fmap.controls):
+            raise ValueError(
+                'There are no control devices in the HDF5 file.')
+        if bool(add_controls):
+            controls = condition_controls(hdf_file, add_controls)
+        else:
+            controls = []
+
+        # ---- Resolve digitizer dataset                            ----
+        spec = HDFReadChannels._resolve_spec(
+            hdf_file, {'board': board, 'channel': channel},
+            {'digitizer': digitizer,
+             'config_name': config_name,
+             'adc': adc})
+        dheader, shotnumkey = spec.pop('header')
+        dset = self._get_dset(hdf_file, spec)
+
+        # ---- Condition index and shotnum                          ----
+        # - follows HDFReadData
+        index, shotnum, sni = condition_index_shotnum(
+            index, shotnum, dheader, shotnumkey, intersection_set)
+
+        # ---- Condition control device shot numbers               ----
+        # - follows HDFReadControls, without reading the state values
+        cdset_dict = {}  # type: Dict[str, h5py.Dataset]
+        cindex_dict = {}  # type: Dict[str, np.ndarray]
+        cdtype = [('shotnum', np.uint32, 1)]
+        if len(controls) != 0:
+            for cname, cconfn in controls:
+                cconfig = _fmap.controls[cname].configs[cconfn]
+                cdset_dict[cname] = \
+                    hdf_file.get(cconfig['dset paths'][0])
+                for field_name, fconfig in \
+                        cconfig['state values'].items():
+                    cdtype.append((field_name, fconfig['dtype'],
+                                   fconfig['shape']))
+            cshotnum, cindex_dict, _ = condition_control_shotnum(
+                hdf_file, controls, shotnum, intersection_set)
+            if intersection_set:
+                new_sn_mask = np.isin(shotnum, cshotnum)
+                shotnum = shotnum[new_sn_mask]
+                index = index[new_sn_mask]
+                sni = np.ones(shotnum.shape[0], dtype=bool)
+
+        # ---- Define output dtype                                  ----
+        sigtype = np.float32 if not keep_bits else dset.dtype
+        dtype = [('shotnum', np.uint32, 1),
+                 ('signal', sigtype, dset.shape[1]),
+                 ('xyz', np.float32, 3)]
+        for subdtype in np.dtype(cdtype).descr:
+            if subdtype[0] not in [d[0] for d in dtype]:
+                dtype.append(subdtype)
+
+        self._hdf_file = hdf_file
+        self._controls = controls
+        self._dset = dset
+        self._dheader = dheader
+        self._dtype = np.dtype(dtype)
+        self._index = np.asarray(index)
+        self._shotnum = np.asarray(shotnum)
+        self._sni = np.asarray(sni, dtype=bool)
+        self._info = {
+            'board': spec['board'],
+            'channel': spec['channel'],
+            'digitizer': spec['digitizer'],
+            'configuration name': spec['config_name'],
+            'adc': spec['adc'],
+            'device dataset path': dset.name,
+            'controls': list(controls),
+            'keep_bits': keep_bits,
+            'intersection_set': intersection_set,
+            'layout': layout,
+            'missing': missing,
+        }
+
+        # ---- Estimate cost                                        ----
+        self._estimates = self._estimate(
+            dset, dheader, shotnumkey, cdset_dict, cindex_dict,
+            np.dtype(cdtype), _fmap)
+
+    def _estimate(self, dset: h5py.Dataset, dheader: h5py.Dataset,
+                  shotnumkey: str,
+                  cdset_dict: Dict[str, h5py.Dataset],
+                  cindex_dict: Dict[str, np.ndarray],
+                  cdtype: np.dtype, _fmap) -> Dict[str, int]:
+        """Estimate the cost of :meth:`execute`."""
+        nshots = self._shotnum.shape[0]
+        nread = self._index.shape[0]
+        nbytes = 0
+        ncalls = 0
+        nchunks = 0
+
+        # digitizer signal and header reads
+        # - the signal is read with one call
+        # - executed by shot number, the header shot numbers may be
+        #   read in full
+        nbytes += nread * dset.dtype.itemsize * dset.shape[1]
+        ncalls += 1
+        nchunks += _count_chunks(dset, self._index)
+        if self._sni.all():
+            hrows = self._index
+        else:
+            hrows = np.arange(dheader.shape[0])
+        nbytes += hrows.shape[0] * dheader.dtype[shotnumkey].itemsize
+        ncalls += 2
+        nchunks += _count_chunks(dheader, hrows)
+        if 'Offset' in (dheader.dtype.names or ()):
+            nbytes += dheader.dtype['Offset'].itemsize
+
+        # control device reads
+        # - one call per shot number lookup and dataset field
+        for cname, cconfn in self._controls:
+            cmap = _fmap.controls[cname]
+            cdset = cdset_dict[cname]
+            cindex = cindex_dict[cname]
+            cshotnumkey = cmap.configs[cconfn]['shotnum'][
+                'dset field'][0]
+            nbytes += (cdset.shape[0]
+                       * cdset.dtype[cshotnumkey].itemsize)
+            ncalls += 1
+            nchunks += _count_chunks(cdset, np.arange(cdset.shape[0]))
+            for fconfig in \
+                    cmap.configs[cconfn]['state values'].values():
+                for df_name in fconfig['dset field']:
+                    if df_name not in (cdset.dtype.names or ()):
+                        continue
+                    nbytes += (cindex.shape[0]
+                               * cdset.dtype[df_name].itemsize)
+                    ncalls += 1
+                    nchunks += _count_chunks(cdset, cindex)
+
+        # memory
+        # - with missing='mask' 'signal' holds the recorded shots only
+        sig_itemsize = self._dtype['signal'].itemsize
+        nsig = np.count_nonzero(self._sni) \
+            if self._info['missing'] == 'mask' else nshots
+        output = (nshots * (self._dtype.itemsize - sig_itemsize)
+                  + nsig * sig_itemsize)
+        cdata = nshots * cdtype.itemsize if self._controls else 0
+        peak = estimate_read_memory(self._dtype, nshots, nsig, dset,
+                                    nread, self._info['keep_bits'])
+        return {
+            'bytes read': int(nbytes),
+            'read calls': int(ncalls),
+            'chunks': int(nchunks),
+            'output bytes': int(output),
+            'peak memory': int(peak + cdata),
+        }
+
+    @staticmethod
+    def _get_dset(hdf_file: File,
+                  spec: Dict[str, Any]) -> h5py.Dataset:
+        """Get the digitizer dataset of channel **spec**."""
+        _dmap = hdf_file.file_map.digitizers[spec['digitizer']]
+        dname = _dmap.construct_dataset_name(
+            spec['board'], spec['channel'],
+            config_name=spec['config_name'], adc=spec['adc'])
+        return hdf_file.get(_dmap.info['group path'] + '/' + dname)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """dtype of the array returned by :meth:`execute`"""
+        return self._dtype
+
+    @property
+    def estimates(self) -> Dict[str, int]:
+        """
+        Estimated cost of :meth:`execute`.  The dict() keys are:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            "::
+
+                'bytes read'
+            ", "
+            bytes read from the HDF5 file
+            "
+            "::
+
+                'read calls'
+            ", "
+            number of dataset reads
+            "
+            "::
+
+                'chunks'
+            ", "
+            number of HDF5 chunks touched
+            "
+            "::
+
+                'output bytes'
+            ", "
+            size of the returned array
+            "
+            "::
+
+                'peak memory'
+            ", "
+            peak memory allocated by the read
+            "
+        """
+        return self._estimates
+
+    @property
+    def index(self) -> np.ndarray:
+        """digitizer dataset rows read"""
+        return self._index
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """
+        The resolved digitizer dataset (:code:`'board'`,
+        :code:`'channel'`, :code:`'digitizer'`,
+        :code:`'configuration name'`, :code:`'adc'`,
+        :code:`'device dataset path'`), the conditioned
+        :code:`'controls'`, and the read keywords.
+        """
+        return self._info
+
+    @property
+    def shape(self) -> Tuple[int]:
+        """shape of the array returned by :meth:`execute`"""
+        return self._shotnum.shape
+
+    @property
+    def shotnum(self) -> np.ndarray:
+        """shot numbers of the planned read"""
+        return self._shotnum
+
+    def execute(self, board=None, channel=None,
+                filter=None) -> Union[HDFReadData, HDFDataColumns]:
+        """
+        Perform the planned read.
+
+        :param int board: board number of the channel to read, DEFAULT
+            is the planned board
+        :param int channel: channel number of the channel to read,
+            DEFAULT is the planned channel
+        :param filter: filter applied to the voltage signal (see
+            :class:`~.hdfreaddata.HDFReadData`)
+        :type filter: :class:`~.signalfilter.SignalFilter`
+        :raises ValueError: if the channel does not share the planned
+            dataset layout or shot numbers
+        """
+        info = self._info
+        board = info['board'] if board is None else int(board)
+        channel = info['channel'] if channel is None else int(channel)
+        if (board, channel) != (info['board'], info['channel']):
+            spec = {'board': board,
+                    'channel': channel,
+                    'digitizer': info['digitizer'],
+                    'config_name': info['configuration name'],
+                    'adc': info['adc']}
+            dheader = HDFReadChannels._resolve_spec(
+                self._hdf_file, spec, {})['header'][0]
+            dset = self._get_dset(self._hdf_file, spec)
+            if dset.shape != self._dset.shape \
+                    or dset.dtype != self._dset.dtype \
+                    or dheader.shape != self._dheader.shape:
+                raise ValueError(
+                    "Board {} channel {} ".format(board, channel)
+                    + "does not share the planned dataset layout")
+
+        # the planned channel reuses the planned conditioning, other
+        # channels read by the planned rows if every shot is recorded
+        # by the digitizer, otherwise by the planned shot numbers
+        if (board, channel) == (info['board'], info['channel']):
+            kwargs = {'conditioned_shots': (self._index, self._shotnum,
+                                            self._sni)}
+        elif self._sni.all():
+            kwargs = {'index': self._index.copy()}
+        else:
+            kwargs = {'shotnum': self._shotnum.copy()}
+        data = HDFReadData(self._hdf_file, board, channel,
+                           digitizer=info['digitizer'],
+                           config_name=info['configuration name'],
+                           adc=info['adc'],
+                           keep_bits=info['keep_bits'],
+                           add_controls=self._controls,
+                           intersection_set=info['intersection_set'],
+                           filter=filter,
+                           layout=info['layout'],
+                           missing=info['missing'],
+                           max_memory=self._hdf_file.max_memory,
+                           **kwargs)
+        if not np.array_equal(data['shotnum'], self._shotnum):
+            raise ValueError(
+                "Shot numbers of board {} channel ".format(board)
+                + "{} do not match the plan".format(channel))
+        return data
+
+
+def _count_chunks(dset: h5py.Dataset, rows: np.ndarray) -> int:
+    """
+    Number of chunks of **dset** touched when reading rows **rows**
+    (0 for contiguous datasets).
+    """
+    if dset.chunks is None or rows.shape[0] == 0:
+        return 0
+    nchunks = np.unique(np.asarray(rows) // dset.chunks[0]).shape[0]
+    for size, csize in zip(dset.shape[1:], dset.chunks[1:]):
+        nchunks *= -(-size // csize)
+    return int(nchunks)
+
+
+# add example to __init__ docstring
+HDFReadPlan.__init__.__doc__ += "\n"
+for line in HDFReadPlan.__example_doc__.splitlines():
+    HDFReadPlan.__init__.__doc__ += "    " + line + "\n"
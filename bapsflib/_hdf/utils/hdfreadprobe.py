@@ -0,0 +1,178 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import copy
+import re
+
+from typing import (Any, Dict, List, Tuple, Union)
+
+from .file import File
+from .hdfreadchannels import (ChannelSpec, HDFReadChannels)
+
+#: Name of the control device whose probe lists map receptacles to
+#: probes.
+PROBE_CONTROL = '6K Compumotor'
+
+
+class HDFReadProbe(HDFReadChannels):
+    """
+    Reads every digitizer channel of the probe deployed on a
+    :code:`'6K Compumotor'` receptacle, together with the
+    receptacle's control device data (:code:`'xyz'`,
+    :code:`'ptip_rot_theta'`, and :code:`'ptip_rot_phi'`).
+
+    The probe's channels are taken from the :code:`'probe channels'`
+    of its probe list (see :func:`parse_probe_channels`) and are read
+    in one call with a single shot number conditioning (see
+    :class:`~.hdfreadchannels.HDFReadChannels`).  The
+    :code:`'probe name'` and :code:`'port'` of the
+    :attr:`~.hdfreaddata.HDFReadData.info` of every channel are filled
+    from the probe list.
+    """
+    __example_doc__ = """
+    :Example: Here the tips of the probe on receptacle 2 are read:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # - this is equivalent to f.read_probe(2)
+        >>> data = HDFReadProbe(f, 2)
+        >>> data.probe['probe name'], len(data)
+        ('langmuir', 4)
+        >>> data[0].info['port']
+        (27, None)
+        >>>
+        >>> # (ntips, nshots, nt) array of the tip signals
+        >>> data.stack().shape
+        (4, 1000, 20000)
+        >>> data.controls['xyz'].shape
+        (1000, 3)
+    """
+
+    def __init__(self,
+                 hdf_file: File,
+                 receptacle: int,
+                 channels: Union[None, List[ChannelSpec]] = None,
+                 shotnum=slice(None),
+                 digitizer=None,
+                 config_name=None,
+                 adc=None,
+                 keep_bits=False,
+                 add_controls=None,
+                 intersection_set=True,
+                 filter=None):
+        """
+        :param hdf_file: HDF5 file object
+        :param int receptacle: receptacle number of the probe
+        :param channels: the probe's channels (see
+            :class:`~.hdfreadchannels.HDFReadChannels`).  If
+            :code:`None` (DEFAULT), the channels are parsed from the
+            probe list's :code:`'probe channels'`.
+        :param add_controls: control devices added to the receptacle's
+            :code:`'6K Compumotor'` configuration
+
+        All other parameters follow
+        :class:`~.hdfreadchannels.HDFReadChannels`.
+        """
+        # ---- Condition hdf_file                                   ----
+        if not isinstance(hdf_file, File):
+            raise TypeError(
+                "`hdf_file` is NOT type `"
+                + File.__module__ + "." + File.__qualname__ + "`")
+
+        # ---- Get probe list                                       ----
+        try:
+            cmap = hdf_file.file_map.controls[PROBE_CONTROL]
+        except KeyError:
+            raise ValueError(
+                "There is no '{}' control ".format(PROBE_CONTROL)
+                + "device in the HDF5 file.")
+        if receptacle not in cmap.configs:
+            raise ValueError(
+                "Receptacle {} is not among the ".format(receptacle)
+                + "'{}' receptacles ".format(PROBE_CONTROL)
+                + "({})".format(list(cmap.configs)))
+        self._probe = copy.deepcopy(cmap.configs[receptacle]['probe'])
+
+        # ---- Condition `channels` and `add_controls`              ----
+        if channels is None:
+            channels = parse_probe_channels(
+                self._probe['probe channels'])
+            if len(channels) == 0:
+                raise ValueError(
+                    "The probe list of receptacle "
+                    "{} does not define ".format(receptacle)
+                    + "any 'probe channels', specify `channels`")
+        controls = [(PROBE_CONTROL, receptacle)]  # type: List[Any]
+        if bool(add_controls):
+            if isinstance(add_controls, str):
+                add_controls = [add_controls]
+            controls.extend(add_controls)
+
+        super().__init__(hdf_file, channels,
+                         shotnum=shotnum,
+                         digitizer=digitizer,
+                         config_name=config_name,
+                         adc=adc,
+                         keep_bits=keep_bits,
+                         add_controls=controls,
+                         intersection_set=intersection_set,
+                         filter=filter)
+
+        # ---- Fill probe metadata                                  ----
+        port = self._probe['port']
+        for data in self._data:
+            data._info.update({
+                'probe name': self._probe['probe name'],
+                'port': (None if port is None else int(port), None),
+            })
+
+    @property
+    def probe(self) -> Dict[str, Any]:
+        """
+        Probe list of the receptacle (the :code:`'probe'` entry of the
+        :code:`'6K Compumotor'` configuration).
+        """
+        return self._probe
+
+
+# add example to __init__ docstring
+HDFReadProbe.__init__.__doc__ += "\n"
+for line in HDFReadProbe.__example_doc__.splitlines():
+    HDFReadProbe.__init__.__doc__ += "    " + line + "\n"
+
+
+def parse_probe_channels(
+        value: Union[None, str]) -> List[Tuple[int, int]]:
+    """
+    Parse the :code:`'probe channels'` attribute of a probe list into
+    :code:`(board, channel)` tuples.  The channels are written as
+    :code:`board:channel` pairs, e.g. :code:`'1:1, 1:2'` or
+    :code:`'[1:1] [1:2]'`.
+
+    :param value: the :code:`'probe channels'` attribute
+    :return: list of :code:`(board, channel)` tuples, in order of
+        appearance (empty if **value** is :code:`None` or has no
+        pairs)
+
+    :Example:
+
+        >>> parse_probe_channels('1:1, 1:2,1:3')
+        [(1, 1), (1, 2), (1, 3)]
+    """
+    if value is None:
+        return []
+    pairs = re.findall(r'(\d+)\s*:\s*(\d+)', str(value))
+    channels = []  # type: List[Tuple[int, int]]
+    for pair in pairs:
+        spec = (int(pair[0]), int(pair[1]))
+        if spec not in channels:
+            channels.append(spec)
+    return channels
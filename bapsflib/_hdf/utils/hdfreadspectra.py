@@ -0,0 +1,302 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import copy
+import numpy as np
+
+from scipy import signal as sps
+from typing import (Dict, Iterable, Tuple, Union)
+from warnings import warn
+
+from .file import File
+from .hdfiterdata import HDFIterChannels
+from .helpers import (add_to_groups, build_group_keys, condition_by,
+                      group_keys)
+
+
+class HDFReadSpectra(np.ndarray):
+    """
+    Reads digitizer data and computes the Welch power spectral density
+    (PSD) of a channel, and optionally its cross spectral density (CSD)
+    with a second channel, averaged over the shots of each group.  A
+    group is every shot sharing the same value(s) of the control device
+    field(s) :data:`by` (e.g. the probe position :code:`'xyz'`).
+
+    The shots are streamed in blocks (see
+    :class:`~.hdfiterdata.HDFIterData`), each block is reduced to its
+    per-shot spectra with :func:`scipy.signal.welch` (or
+    :func:`scipy.signal.csd`) and only the running sum of each group is
+    kept, so memory scales with the number of frequencies instead of
+    the shot number by time array.  The sampling frequency is taken
+    from :attr:`~.hdfreaddata.HDFReadData.dt`.
+
+    The returned array is a 1D structured array with one entry per
+    group (in the order groups are first encountered) and fields:
+
+    * the :data:`by` field(s), the group key (none if :data:`by` is
+      :code:`None`, then all shots form one group)
+    * :code:`'nshots'`, the number of shots in the group
+    * :code:`'psd'`, the :code:`(nfreq,)` PSD of the channel
+    * :code:`'psd2'` and :code:`'csd'`, the PSD of the :data:`cross`
+      channel and the (complex) CSD of the two channels (only if
+      :data:`cross` is given)
+
+    The frequencies are in :code:`info['frequency']`.
+
+    .. note::
+
+        * Every shot has the same number of Welch segments, so the
+          average of the per-shot spectra equals the Welch estimate
+          over the segments of all the shots in a group.
+        * The :data:`cross` channel is read from the same digitizer
+          configuration and only shots recorded on both channels are
+          used.
+    """
+    __example_doc__ = """
+    :Example: Here the spectra of each probe position are computed:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # board 1, channels 1 and 2 at each position
+        >>> # - this is equivalent to
+        >>> #   f.read_spectra(1, 1, cross=(1, 2), by='xyz',
+        >>> #                  nperseg=1024,
+        >>> #                  add_controls=['6K Compumotor'])
+        >>> spec = HDFReadSpectra(f, 1, 1, cross=(1, 2), by='xyz',
+        ...                       nperseg=1024,
+        ...                       add_controls=['6K Compumotor'])
+        >>> spec.dtype.names
+        ('xyz', 'nshots', 'psd', 'psd2', 'csd')
+        >>> spec.info['frequency'].shape, spec['csd'].shape
+        ((513,), (121, 513))
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                board: int, channel: int,
+                cross: Union[None, Tuple[int, int]] = None,
+                by: Union[None, str, Iterable[str]] = None,
+                nperseg=256,
+                noverlap=None,
+                window='hann',
+                detrend='constant',
+                scaling='density',
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                add_controls=None,
+                chunk_size=None,
+                prefetch=1,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param cross: :code:`(board, channel)` of a second channel to
+            compute the cross spectral density with, :code:`None`
+            (DEFAULT) computes only the PSD
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by (see :func:`~.helpers.condition_by`). :code:`None`
+            (DEFAULT) averages all shots together.
+        :param int nperseg: length of each Welch segment (DEFAULT
+            :code:`256`, limited to the number of samples per shot)
+        :param noverlap: see :func:`scipy.signal.welch`
+        :param window: see :func:`scipy.signal.welch`
+        :param detrend: see :func:`scipy.signal.welch`
+        :param scaling: see :func:`scipy.signal.welch`
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`.
+        """
+        # ---- Condition `by` and `cross`                           ----
+        if by is not None:
+            if not bool(add_controls):
+                raise ValueError(
+                    "`add_controls` must specify the control "
+                    "device(s) recording the `by` field(s)")
+            by = condition_by(hdf_file, by, add_controls)
+        if cross is not None:
+            if not isinstance(cross, tuple) or len(cross) != 2:
+                raise ValueError(
+                    "`cross` must be a (board, channel) tuple")
+
+        # ---- Build block iterator                                 ----
+        # - the cross channel is read for the same shot numbers in the
+        #   same blocks
+        channels = [(board, channel)]
+        if cross is not None:
+            channels.append(cross)
+        data_iter = HDFIterChannels(hdf_file, channels,
+                                    index=index,
+                                    shotnum=shotnum,
+                                    digitizer=digitizer,
+                                    config_name=config_name,
+                                    adc=adc,
+                                    keep_bits=keep_bits,
+                                    add_controls=add_controls,
+                                    chunk_size=chunk_size,
+                                    prefetch=prefetch,
+                                    silent=silent)
+
+        # ---- Stream blocks                                        ----
+        gids = {}  # type: Dict[bytes, int]
+        keys = None
+        sums = None  # type: Union[None, Dict[str, np.ndarray]]
+        info = None
+        freq = None
+        wkwargs = {'window': window, 'noverlap': noverlap,
+                   'detrend': detrend, 'scaling': scaling,
+                   'axis': -1}
+        for blocks in data_iter:
+            data = blocks[0]
+            if info is None:
+                info = copy.deepcopy(data.info)
+                dt = data.dt
+                if dt is None:
+                    warn("Unable to calculate the time step size..."
+                         "frequencies are in cycles per sample")
+                    fs = 1.0
+                else:
+                    fs = 1.0 / dt.to(u.s).value
+                wkwargs.update({
+                    'fs': fs,
+                    'nperseg': min(nperseg, data['signal'].shape[1]),
+                })
+
+            # group keys
+            bkeys = build_group_keys(data, by)
+            row_gids, new = group_keys(bkeys, gids)
+
+            # per-shot spectra of the block
+            spectra = {}
+            freq, spectra['psd'] = sps.welch(data['signal'], **wkwargs)
+            if cross is not None:
+                spectra['psd2'] = sps.welch(blocks[1]['signal'],
+                                            **wkwargs)[1]
+                spectra['csd'] = sps.csd(data['signal'],
+                                         blocks[1]['signal'],
+                                         **wkwargs)[1]
+            spectra['nshots'] = np.ones(data.shape[0], dtype=np.int64)
+
+            # add new groups and accumulate
+            if sums is None:
+                keys = bkeys[:0]
+                sums = {
+                    name: np.zeros(
+                        (0,) + val.shape[1:],
+                        dtype=np.complex128 if name == 'csd'
+                        else (np.int64 if name == 'nshots'
+                              else np.float64))
+                    for name, val in spectra.items()
+                }
+            if new.shape[0] != 0:
+                keys = np.concatenate((keys, bkeys[new]))
+            for name, val in spectra.items():
+                sums[name] = add_to_groups(sums[name], row_gids, val)
+
+        if sums is None:
+            raise ValueError("No shots to compute spectra for.")
+
+        # ---- Build spectra array                                  ----
+        fields = () if by is None else by
+        nfreq = freq.shape[0]
+        dtype = [(field, keys.dtype[field]) for field in fields]
+        dtype.append(('nshots', np.uint32))
+        dtype.append(('psd', np.float64, (nfreq,)))
+        if cross is not None:
+            dtype.append(('psd2', np.float64, (nfreq,)))
+            dtype.append(('csd', np.complex128, (nfreq,)))
+        data = np.empty(keys.shape[0], dtype=dtype)
+        for field in fields:
+            data[field] = keys[field]
+        data['nshots'] = sums['nshots']
+        nshots = sums['nshots'][:, None]
+        for name in ('psd', 'psd2', 'csd'):
+            if name in sums:
+                data[name] = sums[name] / nshots
+
+        obj = data.view(cls)
+        info.update({
+            'by': by,
+            'cross': cross,
+            'frequency': freq if dt is None else freq * u.Hz,
+            'nperseg': wkwargs['nperseg'],
+            'noverlap': noverlap,
+            'window': window,
+            'scaling': scaling,
+            'nshots': int(np.sum(sums['nshots'])),
+        })
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'by': None,
+            'cross': None,
+            'frequency': None,
+            'nperseg': None,
+            'noverlap': None,
+            'window': None,
+            'scaling': None,
+            'nshots': None,
+        })
+
+    @property
+    def info(self) -> dict:
+        """
+        A dictionary of metadata for the spectra.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data
+        (of the first channel), plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'by'`", "
+            tuple of the field names the shots were grouped by
+            (:code:`None` if not grouped)
+            "
+            ":code:`'cross'`", "
+            :code:`(board, channel)` of the cross channel
+            (:code:`None` if not given)
+            "
+            ":code:`'frequency'`", "
+            frequencies of the spectra (in Hz, unless the time step
+            size is unknown)
+            "
+            ":code:`'nperseg'`, :code:`'noverlap'`, :code:`'window'`,
+            :code:`'scaling'`", "
+            Welch parameters
+            "
+            ":code:`'nshots'`", "
+            total number of shots
+            "
+        """
+        return self._info
+
+
+# add example to __new__ docstring
+HDFReadSpectra.__new__.__doc__ += "\n"
+for line in HDFReadSpectra.__example_doc__.splitlines():
+    HDFReadSpectra.__new__.__doc__ += "    " + line + "\n"
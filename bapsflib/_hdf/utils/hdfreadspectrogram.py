@@ -0,0 +1,399 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import copy
+import numpy as np
+
+from scipy import signal as sps
+from typing import (Dict, Iterable, Tuple, Union)
+from warnings import warn
+
+from .file import File
+from .hdfiterdata import HDFIterData
+from .helpers import (add_to_groups, build_group_keys, condition_by,
+                      group_keys)
+
+
+def _build_result(key_dtype: np.dtype, fields: Tuple[str, ...],
+                  ngroups: int, shape: Tuple[int, int], mode: str,
+                  out) -> np.ndarray:
+    """
+    Allocate the structured array of :class:`HDFReadSpectrogram`,
+    with the key **fields** of **key_dtype**, :code:`'nshots'`, and
+    (if **out** is :code:`None`) a :code:`'spectrogram'` field of
+    **shape**.
+    """
+    dtype = [(field, key_dtype[field]) for field in fields]
+    dtype.append(('nshots', np.uint32))
+    if out is None:
+        sdtype = np.complex128 if mode == 'complex' else np.float64
+        dtype.append(('spectrogram', sdtype, shape))
+    return np.empty(ngroups, dtype=dtype)
+
+
+class HDFReadSpectrogram(np.ndarray):
+    """
+    Reads digitizer data and computes the spectrogram (short-time
+    Fourier transform) of a channel, either for every shot
+    (:code:`by='shotnum'`) or ensemble averaged over the shots of each
+    group.  A group is every shot sharing the same value(s) of the
+    control device field(s) :data:`by` (e.g. the probe position
+    :code:`'xyz'`).
+
+    The shots are streamed in blocks (see
+    :class:`~.hdfiterdata.HDFIterData`) and each block is transformed
+    with :func:`scipy.signal.spectrogram`.  Per-shot spectrograms are
+    written block by block into the returned array or into
+    :data:`out`, which can be a preallocated array, a
+    :class:`numpy.memmap`, or a :class:`h5py.Dataset` of an output
+    HDF5 file, so the shot by frequency by frame array never has to be
+    held in memory.  Grouped spectrograms keep the running sum of each
+    group in memory (one :code:`(nfreq, nframes)` array per group) and
+    only the final group means are written to :data:`out`.
+
+    The returned array is a 1D structured array with one entry per
+    group (in the order groups are first encountered) and fields:
+
+    * the :data:`by` field(s), the group key (none if :data:`by` is
+      :code:`None`, then all shots form one group)
+    * :code:`'nshots'`, the number of shots in the group
+    * :code:`'spectrogram'`, the :code:`(nfreq, nframes)`
+      spectrogram (only if :data:`out` is :code:`None`, otherwise
+      entry :code:`i` of the array is written to :code:`out[i]`)
+
+    The frequencies and frame times are in :code:`info['frequency']`
+    and :code:`info['time']`.
+    """
+    __example_doc__ = """
+    :Example: Here the spectrogram of every shot is written to an
+        output HDF5 file:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # size the output dataset
+        >>> nshots = 10000
+        >>> nt = f.read_data(1, 1, index=0)['signal'].shape[1]
+        >>> nfreq, nframes = spectrogram_shape(nt, nperseg=512,
+        ...                                    noverlap=256)
+        >>> out_file = h5py.File('spectrograms.hdf5', 'w')
+        >>> out = out_file.create_dataset(
+        ...     'spectrogram', shape=(nshots, nfreq, nframes),
+        ...     dtype=np.float32, chunks=(1, nfreq, nframes))
+        >>>
+        >>> # board 1, channel 1, every shot
+        >>> # - this is equivalent to
+        >>> #   f.read_spectrogram(1, 1, by='shotnum', nperseg=512,
+        >>> #                      noverlap=256, out=out)
+        >>> spec = HDFReadSpectrogram(f, 1, 1, by='shotnum',
+        ...                           nperseg=512, noverlap=256,
+        ...                           out=out)
+        >>> spec.dtype.names
+        ('shotnum', 'nshots')
+        >>> spec.info['out'] is out
+        True
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                board: int, channel: int,
+                by: Union[None, str, Iterable[str]] = None,
+                nperseg=256,
+                noverlap=None,
+                window='hann',
+                detrend='constant',
+                scaling='density',
+                mode='psd',
+                out=None,
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                add_controls=None,
+                chunk_size=None,
+                prefetch=1,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param by: name of the control device field(s), or control
+            device(s) in :data:`add_controls`, the shots are grouped
+            by (see :func:`~.helpers.condition_by`).
+            :code:`'shotnum'` computes the spectrogram of every shot
+            and :code:`None` (DEFAULT) averages all shots together.
+        :param int nperseg: length of each segment (DEFAULT
+            :code:`256`, limited to the number of samples per shot)
+        :param noverlap: see :func:`scipy.signal.spectrogram`
+        :param window: see :func:`scipy.signal.spectrogram`
+        :param detrend: see :func:`scipy.signal.spectrogram`
+        :param scaling: see :func:`scipy.signal.spectrogram`
+        :param str mode: :code:`'psd'` (DEFAULT), :code:`'complex'`,
+            or :code:`'magnitude'` (see
+            :func:`scipy.signal.spectrogram`)
+        :param out: array-like (e.g. :class:`numpy.ndarray` or
+            :class:`h5py.Dataset`) of shape
+            :code:`(>= ngroups, nfreq, nframes)` the spectrograms are
+            written to (see :func:`spectrogram_shape`), :code:`None`
+            (DEFAULT) returns them in the :code:`'spectrogram'` field.
+            Per-shot spectrograms are written block by block, grouped
+            spectrograms once all shots are summed.
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`.
+        """
+        # ---- Condition `by`, `mode`, and `out`                    ----
+        per_shot = by == 'shotnum'
+        if per_shot:
+            by = ('shotnum',)
+        elif by is not None:
+            if not bool(add_controls):
+                raise ValueError(
+                    "`add_controls` must specify the control "
+                    "device(s) recording the `by` field(s)")
+            by = condition_by(hdf_file, by, add_controls)
+        if mode not in ('psd', 'complex', 'magnitude'):
+            raise ValueError(
+                "`mode` must be 'psd', 'complex', or 'magnitude', "
+                "got {}".format(mode))
+        if out is not None and (not hasattr(out, 'shape')
+                                or len(out.shape) != 3):
+            raise ValueError(
+                "`out` must be a 3D array-like of shape "
+                "(ngroups, nfreq, nframes)")
+
+        # ---- Build block iterator                                 ----
+        data_iter = HDFIterData(hdf_file, board, channel,
+                                index=index,
+                                shotnum=shotnum,
+                                digitizer=digitizer,
+                                config_name=config_name,
+                                adc=adc,
+                                keep_bits=keep_bits,
+                                add_controls=add_controls,
+                                chunk_size=chunk_size,
+                                prefetch=prefetch,
+                                silent=silent)
+        nshots = data_iter.shotnum.shape[0]
+        if per_shot and out is not None and out.shape[0] < nshots:
+            raise ValueError(
+                "`out` has {} rows for ".format(out.shape[0])
+                + "{} shots".format(nshots))
+
+        # ---- Stream blocks                                        ----
+        gids = {}  # type: Dict[bytes, int]
+        keys = None
+        result = None
+        sums = None  # type: Union[None, Dict[str, np.ndarray]]
+        info = None
+        freq = None
+        times = None
+        skwargs = {'window': window, 'noverlap': noverlap,
+                   'detrend': detrend, 'scaling': scaling,
+                   'mode': mode, 'axis': -1}
+        start = 0
+        for data in data_iter:
+            if info is None:
+                info = copy.deepcopy(data.info)
+                dt = data.dt
+                if dt is None:
+                    warn("Unable to calculate the time step size..."
+                         "frequencies are in cycles per sample")
+                    fs = 1.0
+                else:
+                    fs = 1.0 / dt.to(u.s).value
+                skwargs.update({
+                    'fs': fs,
+                    'nperseg': min(nperseg, data['signal'].shape[1]),
+                })
+
+            # group keys
+            bkeys = build_group_keys(data, by)
+
+            # spectrograms of the block
+            freq, times, sxx = sps.spectrogram(data['signal'],
+                                               **skwargs)
+            if out is not None and out.shape[1:] != sxx.shape[1:]:
+                raise ValueError(
+                    "`out` must have shape (ngroups, "
+                    "{}, {}), got {}".format(*sxx.shape[1:],
+                                             out.shape))
+
+            if per_shot:
+                # every shot is its own group
+                # - write the rows straight into the result (or `out`)
+                #   in place of accumulating them
+                stop = start + data.shape[0]
+                if result is None:
+                    result = _build_result(bkeys.dtype, by, nshots,
+                                           sxx.shape[1:], mode, out)
+                    result['nshots'] = 1
+                    out_rows = out if out is not None \
+                        else result['spectrogram']
+                result['shotnum'][start:stop] = bkeys['shotnum']
+                out_rows[start:stop] = sxx
+                start = stop
+                continue
+
+            # add new groups and accumulate
+            row_gids, new = group_keys(bkeys, gids)
+            if sums is None:
+                keys = bkeys[:0]
+                sums = {
+                    'nshots': np.zeros(0, dtype=np.int64),
+                    'spectrogram': np.zeros(
+                        (0,) + sxx.shape[1:],
+                        dtype=np.result_type(sxx.dtype, np.float64)),
+                }
+            if new.shape[0] != 0:
+                keys = np.concatenate((keys, bkeys[new]))
+            sums['nshots'] = add_to_groups(
+                sums['nshots'], row_gids,
+                np.ones(data.shape[0], dtype=np.int64))
+            sums['spectrogram'] = add_to_groups(sums['spectrogram'],
+                                                row_gids, sxx)
+
+        if info is None:
+            raise ValueError("No shots to compute spectrograms for.")
+
+        # ---- Build spectrogram array                              ----
+        if per_shot:
+            data = result
+            counts = data['nshots']
+        else:
+            counts = sums['nshots']
+            if out is not None and out.shape[0] < counts.shape[0]:
+                raise ValueError(
+                    "`out` has {} rows for ".format(out.shape[0])
+                    + "{} groups".format(counts.shape[0]))
+            fields = () if by is None else by
+            data = _build_result(keys.dtype, fields, counts.shape[0],
+                                 (freq.shape[0], times.shape[0]),
+                                 mode, out)
+            for field in fields:
+                data[field] = keys[field]
+            data['nshots'] = counts
+
+            # group means, divided in place
+            mean = sums['spectrogram']
+            mean /= counts.reshape(-1, 1, 1).astype(np.float64)
+            if out is None:
+                data['spectrogram'] = mean
+            else:
+                out[0:counts.shape[0]] = mean
+
+        obj = data.view(cls)
+        info.update({
+            'by': by,
+            'frequency': freq if dt is None else freq * u.Hz,
+            'time': times if dt is None else times * u.s,
+            'nperseg': skwargs['nperseg'],
+            'noverlap': noverlap,
+            'window': window,
+            'scaling': scaling,
+            'mode': mode,
+            'nshots': int(np.sum(counts)),
+            'out': out,
+        })
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'by': None,
+            'frequency': None,
+            'time': None,
+            'nperseg': None,
+            'noverlap': None,
+            'window': None,
+            'scaling': None,
+            'mode': None,
+            'nshots': None,
+            'out': None,
+        })
+
+    @property
+    def info(self) -> dict:
+        """
+        A dictionary of metadata for the spectrograms.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data,
+        plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'by'`", "
+            tuple of the field names the shots were grouped by
+            (:code:`None` if not grouped)
+            "
+            ":code:`'frequency'`", "
+            frequencies of the spectrograms (in Hz, unless the time
+            step size is unknown)
+            "
+            ":code:`'time'`", "
+            center times of the frames, from the start of the shot
+            (in seconds, unless the time step size is unknown)
+            "
+            ":code:`'nperseg'`, :code:`'noverlap'`, :code:`'window'`,
+            :code:`'scaling'`, :code:`'mode'`", "
+            parameters of :func:`scipy.signal.spectrogram`
+            "
+            ":code:`'nshots'`", "
+            total number of shots
+            "
+            ":code:`'out'`", "
+            array-like the spectrograms were written to
+            (:code:`None` if returned in the array)
+            "
+        """
+        return self._info
+
+
+def spectrogram_shape(nt: int, nperseg=256,
+                      noverlap=None) -> Tuple[int, int]:
+    """
+    Number of frequencies and frames of the spectrogram of a
+    :data:`nt` samples long (real) shot, e.g. to allocate the
+    :data:`out` array of :class:`HDFReadSpectrogram`.
+
+    :param nt: number of samples per shot
+    :param nperseg: length of each segment (DEFAULT :code:`256`,
+        limited to :data:`nt`)
+    :param noverlap: number of samples overlapping between segments
+        (DEFAULT :code:`nperseg // 8`)
+    :return: :code:`(nfreq, nframes)`
+
+    :Example:
+
+        >>> spectrogram_shape(10000, nperseg=512, noverlap=256)
+        (257, 38)
+    """
+    nperseg = min(nperseg, nt)
+    if noverlap is None:
+        noverlap = nperseg // 8
+    return nperseg // 2 + 1, (nt - noverlap) // (nperseg - noverlap)
+
+
+# add example to __new__ docstring
+HDFReadSpectrogram.__new__.__doc__ += "\n"
+for line in HDFReadSpectrogram.__example_doc__.splitlines():
+    HDFReadSpectrogram.__new__.__doc__ += "    " + line + "\n"
@@ -0,0 +1,250 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import copy
+import numpy as np
+
+from typing import Tuple
+from warnings import warn
+
+from .file import File
+from .hdfiterdata import HDFIterData
+
+
+class HDFSignalStats(np.ndarray):
+    """
+    Computes per-shot statistics of a digitizer signal without
+    materializing the shot number by time array.  The shots are
+    streamed in blocks (see :class:`~.hdfiterdata.HDFIterData`) in the
+    raw ADC dtype and every statistic is a vectorized reduction over
+    the time axis of the block, so no voltage (float32) copy of the
+    signal is ever made.
+
+    The returned array is a 1D structured array with one entry per shot
+    and fields:
+
+    .. csv-table::
+        :header: "Field", "Description"
+        :widths: 20, 60
+
+        ":code:`'shotnum'`", "
+        HDF5 shot number
+        "
+        ":code:`'min'`, :code:`'max'`", "
+        minimum and maximum of the signal
+        "
+        ":code:`'mean'`", "
+        mean of the signal
+        "
+        ":code:`'rms'`", "
+        root-mean-square of the signal
+        "
+        ":code:`'saturated'`", "
+        :code:`True` if the signal reached either rail of the ADC
+        (see :func:`adc_rails`)
+        "
+
+    .. note::
+
+        * With :code:`keep_bits=False` (DEFAULT) the statistics are
+          converted to voltage from the integer sums, i.e. the same
+          values as computed on :meth:`~.file.File.read_data` voltages.
+        * The statistics of one channel do not depend on any other, so
+          all channels of a run can be computed concurrently with
+          :meth:`~.file.File.asignal_stats`.
+    """
+    __example_doc__ = """
+    :Example: Here the statistics of every shot are computed:
+
+        >>> # open HDF5 file
+        >>> f = bapsflib.lapd.File('test.hdf5')
+        >>>
+        >>> # board 1, channel 1
+        >>> # - this is equivalent to f.signal_stats(1, 1)
+        >>> stats = HDFSignalStats(f, 1, 1)
+        >>> stats.dtype
+        dtype([('shotnum', '<u4'), ('min', '<f8'), ('max', '<f8'),
+               ('mean', '<f8'), ('rms', '<f8'), ('saturated', '?')])
+        >>> stats['shotnum'][stats['saturated']]
+        array([12, 13], dtype=uint32)
+    """
+
+    def __new__(cls,
+                hdf_file: File,
+                board: int, channel: int,
+                index=slice(None),
+                shotnum=slice(None),
+                digitizer=None,
+                config_name=None,
+                adc=None,
+                keep_bits=False,
+                chunk_size=None,
+                prefetch=1,
+                silent=False):
+        """
+        :param hdf_file: HDF5 file object
+        :param board: analog-digital-converter board number
+        :param channel: analog-digital-converter channel number
+        :param bool keep_bits: set :code:`True` to keep the
+            statistics in bits, :code:`False` (DEFAULT) to convert
+            them to voltage
+        :param chunk_size: number of shots read per block (see
+            :class:`~.hdfiterdata.HDFIterData`)
+        :param int prefetch: number of blocks read ahead by a
+            background thread (DEFAULT :code:`1`)
+
+        All other parameters follow
+        :class:`~.hdfiterdata.HDFIterData`.
+        """
+        # ---- Stream blocks                                        ----
+        # - blocks are always read in bits
+        data_iter = HDFIterData(hdf_file, board, channel,
+                                index=index,
+                                shotnum=shotnum,
+                                digitizer=digitizer,
+                                config_name=config_name,
+                                adc=adc,
+                                keep_bits=True,
+                                chunk_size=chunk_size,
+                                prefetch=prefetch,
+                                silent=silent)
+        nshots = data_iter.shotnum.shape[0]
+        vdtype = None
+        info = None
+        start = 0
+        for data in data_iter:
+            signal = data['signal']
+            if info is None:
+                info = copy.deepcopy(data.info)
+                dv = data.dv
+                vdtype = signal.dtype if keep_bits or dv is None \
+                    else np.float64
+                stats = np.empty(nshots, dtype=[
+                    ('shotnum', np.uint32),
+                    ('min', vdtype),
+                    ('max', vdtype),
+                    ('mean', np.float64),
+                    ('rms', np.float64),
+                    ('saturated', bool),
+                ])
+                lower, upper = adc_rails(signal.dtype, info['bit'])
+
+            stop = start + signal.shape[0]
+            block = stats[start:stop]
+            block['shotnum'] = data['shotnum']
+            bmin = signal.min(axis=1)
+            bmax = signal.max(axis=1)
+            block['min'] = bmin
+            block['max'] = bmax
+            nt = signal.shape[1]
+            block['mean'] = np.sum(signal, axis=1, dtype=np.int64) / nt
+
+            # the squares of a block are the only temporary
+            # - int64 holds the square of any ADC value exactly
+            sq = np.square(signal, dtype=np.int64)
+            block['rms'] = np.sum(sq, axis=1) / nt
+            del sq
+
+            block['saturated'] = (bmin <= lower) | (bmax >= upper)
+            start = stop
+
+        if info is None:
+            raise ValueError("No shots to compute statistics for.")
+        stats = stats[:start]
+
+        # ---- Convert to voltage                                   ----
+        # - the 'rms' field holds the mean square (in bits) until here
+        if not keep_bits:
+            if dv is None:
+                warn("Unable to calculated voltage step size..."
+                     "statistics remain as bits")
+            else:
+                dv = dv.value
+                offset = abs(info['voltage offset'].value)
+                msq = stats['rms']
+                stats['rms'] = dv ** 2 * msq \
+                    - 2.0 * dv * offset * stats['mean'] + offset ** 2
+                stats['min'] = dv * stats['min'] - offset
+                stats['max'] = dv * stats['max'] - offset
+                stats['mean'] = dv * stats['mean'] - offset
+                info['signal units'] = u.volt
+        stats['rms'] = np.sqrt(np.maximum(stats['rms'], 0.0))
+
+        obj = stats.view(cls)
+        info.pop('controls', None)
+        info['nshots'] = start
+        obj._info = info
+
+        return obj
+
+    def __array_finalize__(self, obj):
+        if obj is None or obj.__class__ is np.ndarray:
+            return
+
+        self._info = getattr(obj, '_info', {
+            'nshots': None,
+            'signal units': None,
+        })
+
+    @property
+    def info(self) -> dict:
+        """
+        A dictionary of metadata for the statistics.  Contains the
+        :attr:`~.hdfreaddata.HDFReadData.info` items of the read data
+        (minus :code:`'controls'`), with :code:`'signal units'` the
+        units of the statistics, plus:
+
+        .. csv-table::
+            :header: "Key", "Description"
+            :widths: 20, 60
+
+            ":code:`'nshots'`", "
+            number of shots
+            "
+        """
+        return self._info
+
+
+# add example to __new__ docstring
+HDFSignalStats.__new__.__doc__ += "\n"
+for line in HDFSignalStats.__example_doc__.splitlines():
+    HDFSignalStats.__new__.__doc__ += "    " + line + "\n"
+
+
+def adc_rails(dtype, bit=None) -> Tuple[int, int]:
+    """
+    The lower and upper rails (in bits) of an ADC of bit resolution
+    **bit** whose samples are stored with the integer **dtype**.
+
+    * Unsigned dtypes hold the offset-binary codes
+      :code:`0` to :code:`2 ** bit - 1`.
+    * Signed dtypes wider than **bit** hold the same offset-binary
+      codes (the BaPSF convention, see
+      :attr:`~.hdfreaddata.HDFReadData.dv`).
+    * Signed dtypes no wider than **bit** can not hold those codes,
+      they hold two's complement codes :code:`-2 ** (bit - 1)` to
+      :code:`2 ** (bit - 1) - 1`.
+
+    Both rails are limited to the range of **dtype**, which is the full
+    range if **bit** is :code:`None`.
+
+    :param dtype: integer dtype of the digitizer dataset
+    :param int bit: bit resolution of the ADC
+    """
+    iinfo = np.iinfo(dtype)
+    if bit is None:
+        return int(iinfo.min), int(iinfo.max)
+    bit = int(bit)
+    if iinfo.min < 0 and bit >= iinfo.bits:
+        lower, upper = -(1 << (bit - 1)), (1 << (bit - 1)) - 1
+    else:
+        lower, upper = 0, (1 << bit) - 1
+    return max(lower, int(iinfo.min)), min(upper, int(iinfo.max))
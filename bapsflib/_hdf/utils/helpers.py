@@ -24,6 +24,96 @@ from .file import File
 # define type aliases
 ControlMap = Union[HDFMapControlTemplate, HDFMapControlCLTemplate]
 IndexDict = Dict[str, np.ndarray]
+WhereCondition = Tuple[str, str, Any]
+
+#: Comparison operators supported in a :code:`where` condition.
+WHERE_OPS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    'in': np.isin,
+    'not in': lambda vals, value: np.isin(vals, value, invert=True),
+}
+
+#: Group key dtype of a grouped reader when the shots are not grouped
+#: (all keys are zero, so every shot falls into one group).
+NO_GROUP_KEY = np.dtype([('group', np.uint8)])
+
+
+def add_to_groups(sums: np.ndarray, row_gids: np.ndarray,
+                  values: np.ndarray) -> np.ndarray:
+    """
+    Adds the rows of **values** into the rows of **sums** given by
+    their group ids **row_gids** (see :func:`group_keys`).  If a group
+    id is beyond the rows of **sums**, then **sums** is extended with
+    zero rows.
+
+    :param sums: running sums, one row per group
+    :param row_gids: group id of each row of **values**
+    :param values: rows to be added
+    :return: **sums**, or the extended copy of **sums**
+
+    :Example:
+
+        >>> sums = np.zeros((0, 2))
+        >>> add_to_groups(sums, np.array([0, 1, 0]), np.ones((3, 2)))
+        array([[2., 2.],
+               [1., 1.]])
+    """
+    if row_gids.shape[0] == 0:
+        return sums
+    ngroups = int(row_gids.max()) + 1
+    if ngroups > sums.shape[0]:
+        sums = np.concatenate(
+            (sums, np.zeros((ngroups - sums.shape[0],) + sums.shape[1:],
+                            dtype=sums.dtype)))
+    order = np.argsort(row_gids, kind='stable')
+    gids, starts = np.unique(row_gids[order], return_index=True)
+    sums[gids] += np.add.reduceat(values[order], starts, axis=0)
+    return sums
+
+
+def build_group_keys(data: np.ndarray,
+                     by: Union[None, Tuple[str, ...]]) -> np.ndarray:
+    """
+    Builds the group key of each row of the read data **data** for
+    the grouped readers (e.g.
+    :class:`~.hdfreadaveraged.HDFReadAveraged`).
+
+    :param data: structured array of read data
+    :param by: field names the rows are grouped by (see
+        :func:`condition_by`), :code:`None` puts all rows in one
+        group
+    :return: 1D packed structured array with the **by** fields of
+        each row, or of dtype :data:`NO_GROUP_KEY` if **by** is
+        :code:`None`
+
+    :Example:
+
+        >>> data = np.zeros(3, dtype=[('shotnum', np.uint32),
+        ...                           ('xyz', np.float32, 3)])
+        >>> build_group_keys(data, ('xyz',)).dtype
+        dtype([('xyz', '<f4', (3,))])
+    """
+    if by is None:
+        return np.zeros(data.shape[0], dtype=NO_GROUP_KEY)
+
+    missing = [field for field in by if field not in data.dtype.names]
+    if len(missing) != 0:
+        raise ValueError(
+            "`by` field(s) {} ".format(missing)
+            + "not in the read data, available fields "
+            "are {}".format(data.dtype.names))
+
+    # copy the fields into a packed array, so keys compare byte-wise
+    keys = np.empty(data.shape[0],
+                    dtype=[(field, data.dtype[field]) for field in by])
+    for field in by:
+        keys[field] = data[field]
+    return keys
 
 
 def build_shotnum_dset_relation(
@@ -353,6 +443,135 @@ def build_sndr_for_complex_dset(
     return index.view(), sni.view()
 
 
+def check_memory_budget(nbytes: int, max_memory: Union[None, int],
+                        what: str, hint=''):
+    """
+    Raises a :code:`MemoryError` if the estimated memory **nbytes** of
+    a read exceeds the budget **max_memory**.  The check is done before
+    the read allocates its array.
+
+    :param int nbytes: estimated peak memory of the read (in bytes)
+    :param max_memory: memory budget (in bytes), :code:`None` for no
+        budget (see :func:`condition_max_memory`)
+    :param str what: description of the read (for the error message)
+    :param str hint: how to read with less memory (for the error
+        message)
+    """
+    if max_memory is None or nbytes <= max_memory:
+        return
+    msg = ("{} needs an estimated {} bytes ".format(what, nbytes)
+           + "({:.1f} MiB), exceeding `max_memory` ".format(
+               nbytes / 2**20)
+           + "of {} bytes ({:.1f} MiB)".format(max_memory,
+                                               max_memory / 2**20))
+    if hint:
+        msg += ", " + hint
+    raise MemoryError(msg)
+
+
+def condition_by(hdf_file: File, by: Any,
+                 add_controls: Any) -> Tuple[str, ...]:
+    """
+    Conditions the **by** argument of the grouped readers (e.g.
+    :class:`~.hdfreadaveraged.HDFReadAveraged`) into a tuple of field
+    names.
+
+    :param hdf_file: HDF5 object instance
+    :param by: a field name, a control device in **add_controls**, or
+        a list of them
+    :param add_controls: the control devices added to the read (see
+        :func:`condition_controls`)
+    :return: tuple of field names
+
+    :Example:
+
+        >>> from bapsflib import lapd
+        >>> f = lapd.File('sample.hdf5')
+        >>> condition_by(f, ('xyz', 'Waveform'),
+        ...              ['6K Compumotor', 'Waveform'])
+        ('xyz', 'FREQ')
+
+    .. admonition:: Condition Criteria
+
+        #. Input **by** must be a string or a list of strings and/or
+           :code:`(name, configuration name)` tuples.
+        #. A control device (name or tuple) in **add_controls** is
+           expanded into all of the state value fields of that
+           configuration.
+        #. Any other string is taken as a field name.
+    """
+    by = (by,) if isinstance(by, str) else tuple(by)
+    if len(by) == 0 or not all(isinstance(item, (str, tuple))
+                               for item in by):
+        raise ValueError(
+            "`by` must be a field name or a list of field names")
+
+    controls = condition_controls(hdf_file, add_controls)
+    _cmap = hdf_file.file_map.controls
+    fields = {}  # type: Dict[Any, List[str]]
+    for cname, cconfn in controls:
+        svals = list(_cmap[cname].configs[cconfn]['state values'])
+        fields[cname] = svals
+        fields[(cname, cconfn)] = svals
+
+    expanded = []  # type: List[str]
+    for item in by:
+        for field in fields.get(item, [item]):
+            if not isinstance(field, str):
+                raise ValueError(
+                    "`by` entry {} is not a field ".format(item)
+                    + "name or a device in `add_controls`")
+            if field not in expanded:
+                expanded.append(field)
+    return tuple(expanded)
+
+
+def condition_control_shotnum(
+        hdf_file: File,
+        controls: List[Tuple[str, Any]],
+        shotnum: np.ndarray,
+        intersection_set: bool) -> Tuple[np.ndarray, IndexDict,
+                                         IndexDict]:
+    """
+    Relates the conditioned shot numbers **shotnum** to the datasets of
+    the conditioned control devices **controls** (see
+    :func:`condition_controls`), reading only the shot number column
+    of each dataset (no state values).  Follows
+    :class:`~.hdfreadcontrols.HDFReadControls`.
+
+    :param hdf_file: HDF5 object instance
+    :param controls: conditioned control devices
+    :param shotnum: conditioned HDF5 shot numbers
+    :param intersection_set: :code:`True` to intersect the shot
+        numbers with the shot numbers of every control dataset
+    :return: the (intersected) shot numbers, and the :code:`index`
+        and :code:`sni` arrays of every control device (keyed by
+        device name)
+    """
+    _fmap = hdf_file.file_map
+    cdset_dict = {}  # type: Dict[str, h5py.Dataset]
+    shotnumkey_dict = {}  # type: Dict[str, str]
+    for cname, cconfn in controls:
+        cconfig = _fmap.controls[cname].configs[cconfn]
+        cdset_dict[cname] = hdf_file.get(cconfig['dset paths'][0])
+        shotnumkey_dict[cname] = cconfig['shotnum']['dset field'][0]
+    shotnum = condition_shotnum(shotnum.copy(), cdset_dict,
+                                shotnumkey_dict)
+
+    index_dict = {}  # type: IndexDict
+    sni_dict = {}  # type: IndexDict
+    for cname, cconfn in controls:
+        index_dict[cname], sni_dict[cname] = \
+            build_shotnum_dset_relation(shotnum, cdset_dict[cname],
+                                        shotnumkey_dict[cname],
+                                        _fmap.controls[cname], cconfn)
+    if intersection_set:
+        shotnum, sni_dict, index_dict = \
+            do_shotnum_intersection(shotnum, sni_dict, index_dict)
+
+    return shotnum, index_dict, sni_dict
+
+
 def condition_controls(hdf_file: File,
                        controls: Any) -> List[Tuple[str, Any]]:
     """
@@ -473,6 +692,121 @@ def condition_controls(hdf_file: File,
     return controls
 
 
+def condition_index(index: Any, size: int) -> np.ndarray:
+    """
+    Conditions the digitizer dataset row index **index** of
+    :class:`~.hdfreaddata.HDFReadData` into a sorted array of unique,
+    non-negative indices.
+
+    :param index: dataset row index
+    :param size: number of rows in the dataset
+
+    .. admonition:: Condition Criteria
+
+        #. Input **index** should be
+           :code:`Union[int, List[int,...], slice, Ellipsis,
+           np.ndarray]`
+        #. Negative indices count back from the end of the dataset.
+        #. A :code:`ValueError` will be thrown if an index is out of
+           range.
+    """
+    if isinstance(index, int):
+        index = np.array([index], dtype=np.int32)
+    elif isinstance(index, list):
+        index = np.array(index, dtype=np.int32)
+    elif isinstance(index, slice):
+        start, stop, step = index.indices(size)
+        index = np.arange(start, stop, step, dtype=np.int32)
+    elif isinstance(index, type(Ellipsis)):
+        index = np.arange(0, size, 1, dtype=np.int32)
+    elif isinstance(index, np.ndarray):
+        index = index.astype(np.int32)
+    else:
+        raise TypeError("Valid `index` type not passed.")
+
+    # convert (VALID) negative indices to positive
+    neg_index_mask = (index < 0) & (index >= -size)
+    if np.any(neg_index_mask):
+        index[neg_index_mask] = index[neg_index_mask] % size
+    if np.any(index < 0) or np.any(index >= size):
+        raise ValueError("`index` is out of range for the "
+                         "digitizer dataset")
+
+    return np.unique(index)
+
+
+def condition_index_shotnum(
+        index: Any, shotnum: Any,
+        dheader: h5py.Dataset, shotnumkey: str,
+        intersection_set: bool) -> Tuple[np.ndarray, np.ndarray,
+                                         np.ndarray]:
+    """
+    Conditions the **index** and **shotnum** arguments of
+    :class:`~.hdfreaddata.HDFReadData` against the digitizer header
+    dataset **dheader**.  The shots are selected by :code:`shotnum`
+    if :code:`index` is :code:`slice(None)` (the default) and
+    :code:`shotnum` is not, otherwise by :code:`index`.
+
+    :param index: digitizer dataset row index (see
+        :func:`condition_index`)
+    :param shotnum: HDF5 shot numbers (see :func:`condition_shotnum`)
+    :param dheader: digitizer header dataset
+    :param str shotnumkey: field name of the shot numbers in
+        **dheader**
+    :param bool intersection_set: :code:`True` to drop the shot
+        numbers not recorded by the digitizer
+    :return: :code:`index`, :code:`shotnum`, and :code:`sni` numpy
+        arrays, such that
+        :code:`shotnum[sni] = dheader[index, shotnumkey]`
+    """
+    index_with_shotnum = isinstance(index, slice) \
+        and index == slice(None) \
+        and (not isinstance(shotnum, slice) or shotnum != slice(None))
+
+    if not index_with_shotnum:
+        index = condition_index(index, dheader.shape[0])
+        shotnum = np.asarray(dheader[index.tolist(), shotnumkey],
+                             dtype=np.uint32)
+        sni = np.ones(shotnum.shape[0], dtype=bool)
+    else:
+        shotnum = condition_shotnum(shotnum,
+                                    {'digi': dheader},
+                                    {'digi': shotnumkey})
+        index, sni = build_sndr_for_simple_dset(shotnum, dheader,
+                                                shotnumkey)
+        if intersection_set:
+            shotnum, sni_dict, index_dict = \
+                do_shotnum_intersection(shotnum, {'digi': sni},
+                                        {'digi': index})
+            sni = sni_dict['digi']
+            index = index_dict['digi']
+
+    return index, shotnum, sni
+
+
+def condition_max_memory(max_memory: Any) -> Union[None, int]:
+    """
+    Conditions the **max_memory** argument of
+    :class:`~bapsflib._hdf.utils.file.File` and the readers.
+
+    :param max_memory: memory budget (in bytes) of a read
+    :return: :code:`None` (no budget) or the budget as an int
+
+    .. admonition:: Condition Criteria
+
+        #. Input **max_memory** must be :code:`None` or an int
+           :math:`\\ge 1`.
+    """
+    if max_memory is None:
+        return None
+    if not isinstance(max_memory, (int, np.integer)) \
+            or isinstance(max_memory, bool) or max_memory < 1:
+        raise ValueError(
+            "`max_memory` must be None or an int >= 1 (bytes), got "
+            "{}".format(max_memory))
+    return int(max_memory)
+
+
 def condition_shotnum(shotnum: Any,
                       dset_dict: Dict[str, h5py.Dataset],
                       shotnumkey_dict: Dict[str, str]) -> np.ndarray:
@@ -584,6 +918,78 @@ def condition_shotnum(shotnum: Any,
     return shotnum
 
 
+def condition_where(
+        hdf_file: File,
+        where: Dict[Any, Any]) -> List[Tuple[Tuple[str, Any],
+                                             List[WhereCondition]]]:
+    """
+    Conditions the **where** argument of
+    :meth:`~bapsflib._hdf.utils.file.File.read_data`.
+
+    :param hdf_file: HDF5 object instance
+    :param where: dictionary of control device conditions
+    :return: list of pairs of the conditioned control device (see
+        :func:`condition_controls`) and its list of
+        :code:`(field, op, value)` conditions
+
+    :Example:
+
+        >>> from bapsflib import lapd
+        >>> f = lapd.File('sample.hdf5')
+        >>> where = {'Waveform': ('FREQ', '==', 50000.),
+        ...          'N5700_PS': [('VOLT', '>', 20.),
+        ...                       ('VOLT', '<=', 40.)]}
+        >>> condition_where(f, where)
+        [(('Waveform', 'config01'), [('FREQ', '==', 50000.)]),
+         (('N5700_PS', 'config01'), [('VOLT', '>', 20.),
+                                     ('VOLT', '<=', 40.)])]
+
+    .. admonition:: Condition Criteria
+
+        #. Input **where** should be a :code:`dict` keyed by control
+           device (as accepted by :func:`condition_controls`) with a
+           :code:`(field, op, value)` condition, or a list of
+           conditions, as values.
+        #. :code:`field` must be a state value of the control device
+           configuration (e.g. :code:`'FREQ'` or :code:`'xyz'`).
+        #. :code:`op` must be in :data:`WHERE_OPS`.
+    """
+    if not isinstance(where, dict) or len(where) == 0:
+        raise TypeError(
+            "`where` must be a non-empty dict of control device "
+            "conditions")
+
+    _fmap = hdf_file.file_map
+    conditioned = []
+    for control, conditions in where.items():
+        key = condition_controls(hdf_file, [control])[0]
+        svals = _fmap.controls[key[0]].configs[key[1]]['state values']
+        if isinstance(conditions, tuple):
+            conditions = [conditions]
+        elif not isinstance(conditions, list):
+            raise TypeError(
+                "Conditions for '{}' must be a ".format(key[0])
+                + "(field, op, value) tuple or a list of tuples")
+
+        for cond in conditions:
+            if not isinstance(cond, tuple) or len(cond) != 3:
+                raise TypeError(
+                    "Condition {} is not a ".format(cond)
+                    + "(field, op, value) tuple")
+            if cond[0] not in svals:
+                raise ValueError(
+                    "Field '{}' is not a state value ".format(cond[0])
+                    + "of '{}', ".format(key[0])
+                    + "available fields are {}".format(list(svals)))
+            if cond[1] not in WHERE_OPS:
+                raise ValueError(
+                    "Operator '{}' not among ".format(cond[1])
+                    + "{}".format(list(WHERE_OPS)))
+        conditioned.append((key, list(conditions)))
+
+    return conditioned
+
+
 def do_shotnum_intersection(
         shotnum: np.ndarray,
         sni_dict: IndexDict,
@@ -626,3 +1032,132 @@ def do_shotnum_intersection(
 
     # return
     return shotnum, sni_dict, index_dict
+
+
+def group_keys(keys: np.ndarray,
+               gids: Dict[bytes, int]) -> Tuple[np.ndarray,
+                                                np.ndarray]:
+    """
+    Maps each entry of the structured array **keys** to a group id.
+    Keys are compared byte-wise, so NaN fields group together.  Keys
+    not yet in **gids** are added to it (in order of first
+    appearance) with the next free group ids.
+
+    :param keys: 1D structured array of group keys
+    :param gids: mapping of the bytes of a key to its group id,
+        updated in place
+    :return: the group id of each entry of **keys**, and the indices
+        of the entries of **keys** that started new groups
+
+    :Example:
+
+        >>> gids = {}
+        >>> keys = np.array([(1.,), (2.,), (1.,)],
+        ...                 dtype=[('FREQ', float)])
+        >>> group_keys(keys, gids)
+        (array([0, 1, 0]), array([0, 1]))
+        >>> group_keys(keys[::-1], gids)
+        (array([0, 1, 0]), array([], dtype=int64))
+    """
+    kvoid = np.ascontiguousarray(keys).view(
+        np.dtype((np.void, keys.dtype.itemsize)))
+    ukeys, first, inv = np.unique(kvoid, return_index=True,
+                                  return_inverse=True)
+    new = np.sort(first[[ii for ii, key in enumerate(ukeys)
+                         if key.tobytes() not in gids]])
+    for ii in new:
+        gids[kvoid[ii].tobytes()] = len(gids)
+    ugids = np.array([gids[key.tobytes()] for key in ukeys],
+                     dtype=np.intp)
+    return ugids[inv.reshape(-1)], new.astype(np.intp)
+
+
+def select_shotnum_where(hdf_file: File, where: Dict[Any, Any],
+                         shotnum=slice(None)) -> np.ndarray:
+    """
+    Evaluates the control device conditions **where** (see
+    :func:`condition_where`) against the control device datasets and
+    returns the shot numbers satisfying all conditions.  Each
+    condition is evaluated on the dataset of its own control device
+    (so devices sharing a field name do not collide) and only the
+    shot number column and the dataset columns of the conditioned
+    fields are read.
+
+    :param hdf_file: HDF5 object instance
+    :param where: dictionary of control device conditions
+    :param shotnum: HDF5 shot numbers to select from
+        (DEFAULT all shot numbers)
+    :return: sorted array of the selected shot numbers (can be empty)
+
+    :Example:
+
+        >>> from bapsflib import lapd
+        >>> f = lapd.File('sample.hdf5')
+        >>> sn = select_shotnum_where(
+        ...     f, {'Waveform': ('FREQ', '==', 50000.)})
+        >>> data = f.read_data(1, 1, shotnum=sn)
+    """
+    _fmap = hdf_file.file_map
+    selected = shotnum
+    for key, conditions in condition_where(hdf_file, where):
+        cmap = _fmap.controls[key[0]]
+        cconfig = cmap.configs[key[1]]
+        cdset = hdf_file.get(cconfig['dset paths'][0])
+        shotnumkey = cconfig['shotnum']['dset field'][0]
+
+        # shot numbers recorded by the control device
+        # - every device narrows down the shots of the previous ones
+        sn = condition_shotnum(selected, {key[0]: cdset},
+                               {key[0]: shotnumkey})
+        index, sni = build_shotnum_dset_relation(sn, cdset, shotnumkey,
+                                                 cmap, key[1])
+        selected = sn[sni]
+        if selected.shape[0] == 0:
+            break
+        index = index.tolist()
+
+        mask = np.ones(selected.shape[0], dtype=bool)
+        for field, op, value in conditions:
+            vals = _read_state_value(cdset, index, cmap,
+                                     cconfig['state values'][field])
+            cond_mask = WHERE_OPS[op](vals, value)
+            if cond_mask.ndim != 1:
+                # e.g. a condition on a vector field such as 'xyz'
+                raise ValueError(
+                    "Condition ({}, {}, {}) ".format(field, op, value)
+                    + "does not evaluate to one value per shot")
+            mask &= cond_mask
+        selected = selected[mask]
+        if selected.shape[0] == 0:
+            break
+
+    return np.asarray(selected, dtype=np.uint32)
+
+
+def _read_state_value(cdset: h5py.Dataset, index: List[int],
+                      cmap: ControlMap, fconfig: dict) -> np.ndarray:
+    """
+    Read the control device state value mapped by **fconfig** (an
+    entry of the configuration :code:`'state values'`) for the rows
+    **index** of the control dataset **cdset**, reading only the
+    mapped dataset field(s).
+    """
+    arr = np.zeros((len(index),) + fconfig['shape'],
+                   dtype=fconfig['dtype'])
+    for npi, df_name in enumerate(fconfig['dset field']):
+        if df_name == '':
+            # field not recorded by the dataset (see HDFReadControls)
+            continue
+        vals = cdset[index, df_name]
+        if cmap.has_command_list:
+            # map command indices to command values
+            cvals = np.zeros(vals.shape, dtype=arr.dtype)
+            for ci, command in enumerate(fconfig['command list']):
+                cvals[vals == ci] = command
+            vals = cvals
+        if fconfig['shape'] != ():
+            arr[:, npi] = vals
+        else:
+            arr[...] = vals
+
+    return arr
@@ -0,0 +1,238 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import numpy as np
+
+from scipy import signal as sps
+from typing import (Dict, Tuple)
+
+#: Filter band types accepted by :class:`SignalFilter`.
+FILTER_BTYPES = ('lowpass', 'highpass', 'bandpass', 'bandstop')
+
+#: Filter design types accepted by :class:`SignalFilter`.
+FILTER_FTYPES = ('butter', 'bessel', 'cheby1', 'cheby2', 'ellip',
+                 'fir')
+
+#: Targeted size (in bytes) of the float64 rows filtered at a time.
+_FILTER_NBYTES = 8 * 1024 ** 2
+
+
+class SignalFilter(object):
+    """
+    Digital filter applied along the time axis of digitizer signals.
+    The filter is specified in physical frequencies and designed
+    (with :mod:`scipy.signal`) for the time step size
+    :attr:`~.hdfreaddata.HDFReadData.dt` of the data it is applied to,
+    so the same filter can be passed to reads of digitizers with
+    different clock rates.  IIR filters are designed as second-order
+    sections, FIR filters with :func:`scipy.signal.firwin`.
+
+    Every shot (row) is filtered independently, either with zero phase
+    (forward-backward, DEFAULT) or causally, and the result is written
+    back into the signal array, so no second shot number by time array
+    is allocated.
+
+    :Example:
+
+        >>> # 4th order Butterworth band-pass from 10 kHz to 1 MHz
+        >>> filt = SignalFilter('bandpass', (1e4, 1e6))
+        >>>
+        >>> # filter the data as it is read
+        >>> data = f.read_data(1, 1, filter=filt)
+        >>>
+        >>> # or filter a signal array (in place)
+        >>> filt.apply(signal, dt=1e-7)
+    """
+
+    def __init__(self, btype: str, cutoff, order=4, ftype='butter',
+                 numtaps=None, rp=None, rs=None, zero_phase=True):
+        """
+        :param str btype: band type, :code:`'lowpass'`,
+            :code:`'highpass'`, :code:`'bandpass'`, or
+            :code:`'bandstop'`
+        :param cutoff: cutoff frequency (in Hz, or a frequency
+            :class:`~astropy.units.Quantity`), or the
+            :code:`(low, high)` pair of a band filter
+        :param int order: order of an IIR filter (DEFAULT :code:`4`)
+        :param str ftype: :code:`'butter'` (DEFAULT),
+            :code:`'bessel'`, :code:`'cheby1'`, :code:`'cheby2'`,
+            :code:`'ellip'`, or :code:`'fir'`
+        :param int numtaps: number of taps of a FIR filter (DEFAULT
+            :code:`16 * order + 1`)
+        :param rp: passband ripple (dB) of :code:`'cheby1'` and
+            :code:`'ellip'` filters
+        :param rs: stopband attenuation (dB) of :code:`'cheby2'` and
+            :code:`'ellip'` filters
+        :param bool zero_phase: :code:`True` (DEFAULT) to filter
+            forward and backward for zero phase shift, :code:`False`
+            to filter causally
+        """
+        if btype not in FILTER_BTYPES:
+            raise ValueError(
+                "`btype` must be among {}, ".format(FILTER_BTYPES)
+                + "got {}".format(btype))
+        if ftype not in FILTER_FTYPES:
+            raise ValueError(
+                "`ftype` must be among {}, ".format(FILTER_FTYPES)
+                + "got {}".format(ftype))
+
+        # ---- Condition `cutoff`                                   ----
+        if isinstance(cutoff, u.Quantity):
+            cutoff = cutoff.to(u.Hz).value
+        cutoff = np.atleast_1d(np.asarray(cutoff, dtype=np.float64))
+        ncutoff = 2 if btype in ('bandpass', 'bandstop') else 1
+        if cutoff.shape != (ncutoff,) or np.any(cutoff <= 0) \
+                or np.any(np.diff(cutoff) <= 0):
+            raise ValueError(
+                "`cutoff` of a '{}' filter must be ".format(btype)
+                + "{} increasing positive ".format(ncutoff)
+                + "frequency(ies), got {}".format(cutoff))
+
+        if not isinstance(order, (int, np.integer)) or order < 1:
+            raise ValueError("`order` must be an int >= 1")
+        if numtaps is None:
+            numtaps = 16 * order + 1
+
+        self._btype = btype
+        self._cutoff = tuple(cutoff.tolist())
+        self._order = int(order)
+        self._ftype = ftype
+        self._numtaps = int(numtaps)
+        self._rp = rp
+        self._rs = rs
+        self._zero_phase = bool(zero_phase)
+
+        # designed coefficients, keyed by time step size
+        self._designs = {}  # type: Dict[float, np.ndarray]
+
+    @staticmethod
+    def _condition_dt(dt) -> float:
+        """Convert **dt** to seconds."""
+        if dt is None:
+            raise ValueError(
+                "The time step size `dt` is unknown, can not design "
+                "the filter")
+        if isinstance(dt, u.Quantity):
+            dt = dt.to(u.s).value
+        return float(dt)
+
+    def apply(self, signal: np.ndarray, dt) -> np.ndarray:
+        """
+        Filter the rows of **signal** along its last axis, in place.
+
+        :param signal: 1D or 2D (shots by time) floating point array
+            (a field view of a structured array is also accepted)
+        :param dt: time step size (in sec, or a time
+            :class:`~astropy.units.Quantity`)
+        :return: **signal**
+        """
+        if signal.ndim not in (1, 2):
+            raise ValueError("`signal` must be a 1D or 2D array")
+        if not np.issubdtype(signal.dtype, np.floating):
+            raise TypeError(
+                "Only floating point signals can be filtered in "
+                "place, got dtype {}".format(signal.dtype))
+        coeffs = self.design(dt)
+        if signal.size == 0:
+            return signal
+        if self._zero_phase:
+            padlen = self.padlen(dt)
+            if signal.shape[-1] <= padlen:
+                raise ValueError(
+                    "Zero phase filtering needs signals longer than "
+                    "the edge padding of {} samples, ".format(padlen)
+                    + "got {} samples".format(signal.shape[-1]))
+
+        # filter the rows in blocks
+        # - the float64 work arrays of scipy are then block sized
+        rows = signal.reshape(1, -1) if signal.ndim == 1 else signal
+        nblock = max(_FILTER_NBYTES // (8 * rows.shape[1]), 1)
+        for start in range(0, rows.shape[0], nblock):
+            block = rows[start:start + nblock]
+            if self._ftype == 'fir':
+                if self._zero_phase:
+                    block[...] = sps.filtfilt(coeffs, 1.0, block,
+                                              axis=-1)
+                else:
+                    block[...] = sps.lfilter(coeffs, 1.0, block,
+                                             axis=-1)
+            elif self._zero_phase:
+                block[...] = sps.sosfiltfilt(coeffs, block, axis=-1)
+            else:
+                block[...] = sps.sosfilt(coeffs, block, axis=-1)
+
+        return signal
+
+    @property
+    def cutoff(self) -> Tuple[float, ...]:
+        """Cutoff frequency(ies) in Hz."""
+        return self._cutoff
+
+    def design(self, dt) -> np.ndarray:
+        """
+        Design (or get the cached design of) the filter for time step
+        size **dt**.
+
+        :param dt: time step size (in sec, or a time
+            :class:`~astropy.units.Quantity`)
+        :return: second-order sections of an IIR filter, or the taps
+            of a FIR filter
+        """
+        dt = self._condition_dt(dt)
+        if dt in self._designs:
+            return self._designs[dt]
+
+        fs = 1.0 / dt
+        if self._cutoff[-1] >= fs / 2.0:
+            raise ValueError(
+                "`cutoff` {} Hz is not below the ".format(self._cutoff)
+                + "Nyquist frequency {} Hz".format(fs / 2.0))
+
+        # normalize to the Nyquist frequency
+        # - the `fs` keyword of the scipy design functions needs
+        #   scipy >= 1.2
+        wn = np.array(self._cutoff) / (fs / 2.0)
+        if wn.size == 1:
+            wn = wn[0]
+        if self._ftype == 'fir':
+            coeffs = sps.firwin(
+                self._numtaps, wn,
+                pass_zero=self._btype in ('lowpass', 'bandstop'))
+        else:
+            coeffs = sps.iirfilter(self._order, wn, rp=self._rp,
+                                   rs=self._rs, btype=self._btype,
+                                   ftype=self._ftype, output='sos')
+        self._designs[dt] = coeffs
+        return coeffs
+
+    def padlen(self, dt) -> int:
+        """
+        Number of samples the signal edges are padded with by the
+        zero phase filtering (:func:`scipy.signal.filtfilt` or
+        :func:`scipy.signal.sosfiltfilt`).  The filtered signals must
+        be longer than this.
+
+        :param dt: time step size (in sec, or a time
+            :class:`~astropy.units.Quantity`)
+        """
+        coeffs = self.design(dt)
+        if self._ftype == 'fir':
+            return 3 * coeffs.size
+
+        # same default as scipy.signal.sosfiltfilt
+        nzeros = min(int((coeffs[:, 2] == 0).sum()),
+                     int((coeffs[:, 5] == 0).sum()))
+        return 3 * (2 * coeffs.shape[0] + 1 - nzeros)
+
+    @property
+    def zero_phase(self) -> bool:
+        """:code:`True` if the filter is applied with zero phase."""
+        return self._zero_phase
@@ -0,0 +1,192 @@
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+
+from scipy.spatial import cKDTree
+from typing import (Any, Dict, Iterable, Tuple, Union)
+
+from .file import File
+from .hdfreadcontrols import HDFReadControls
+from .helpers import condition_controls
+
+#: Index of each axis in the :code:`'xyz'` field.
+_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+class SpatialIndex(object):
+    """
+    Spatial index of the probe positions (the :code:`'xyz'` field)
+    recorded by a control device configuration.  The shot numbers and
+    positions are read once from the control device dataset, and
+    region queries are answered from :class:`scipy.spatial.cKDTree`
+    trees (built on first use for each combination of axes).  Every
+    query returns a sorted array of shot numbers that can be passed
+    straight to :meth:`~.file.File.read_data` as :code:`shotnum`, so
+    only the matching digitizer rows are read.
+
+    Shots with a non-finite position are not indexed.
+
+    :Example:
+
+        >>> f = File('sample.hdf5')
+        >>> sindex = f.spatial_index('6K Compumotor')
+        >>>
+        >>> # all shots within 1 cm of (x, y) = (0, 0)
+        >>> sn = sindex.query_radius((0., 0.), 1., axes='xy')
+        >>> data = f.read_data(1, 1, shotnum=sn,
+        ...                    add_controls=['6K Compumotor'])
+        >>>
+        >>> # all shots in the z = 0 plane
+        >>> sn = sindex.query_plane('z', 0.)
+    """
+
+    def __init__(self, hdf_file: File, control: Any):
+        """
+        :param hdf_file: HDF5 file object
+        :param control: name of the control device, or a
+            :code:`(name, configuration name)` tuple if the device
+            has more than one configuration
+        """
+        if not isinstance(hdf_file, File):
+            raise TypeError(
+                "`hdf_file` is NOT type `"
+                + File.__module__ + "." + File.__qualname__ + "`")
+        controls = condition_controls(hdf_file, [control])
+        cname, cconfn = controls[0]
+        cconfig = hdf_file.file_map.controls[cname].configs[cconfn]
+        if 'xyz' not in cconfig['state values']:
+            raise ValueError(
+                "Control '{}' does not record ".format(cname)
+                + "probe positions (the 'xyz' field)")
+
+        cdata = HDFReadControls(hdf_file, controls)
+        xyz = np.asarray(cdata['xyz'], dtype=np.float64)
+        valid = np.all(np.isfinite(xyz), axis=1)
+        self._control = (cname, cconfn)
+        self._shotnum = np.asarray(cdata['shotnum'][valid],
+                                   dtype=np.uint32)
+        self._xyz = xyz[valid]
+        self._nrows = hdf_file.get(cconfig['dset paths'][0]).shape[0]
+        self._trees = {}  # type: Dict[str, cKDTree]
+
+    def __len__(self):
+        return self._shotnum.shape[0]
+
+    @staticmethod
+    def _condition_axes(axes: str) -> Tuple[int, ...]:
+        """Convert **axes** (e.g. :code:`'xy'`) to field indices."""
+        if not isinstance(axes, str) or len(axes) == 0 \
+                or len(set(axes)) != len(axes) \
+                or not set(axes).issubset(_AXES):
+            raise ValueError(
+                "`axes` must be a combination of 'x', 'y', and 'z', "
+                "got {}".format(axes))
+        return tuple(_AXES[axis] for axis in axes)
+
+    def _shotnums(self, index: Union[np.ndarray, list]) -> np.ndarray:
+        """Sorted shot numbers of the indexed rows **index**."""
+        return np.unique(self._shotnum[np.asarray(index, dtype=int)])
+
+    def _tree(self, axes: str) -> cKDTree:
+        """Get (or build) the tree over **axes**."""
+        if axes not in self._trees:
+            cols = self._condition_axes(axes)
+            self._trees[axes] = cKDTree(self._xyz[:, cols])
+        return self._trees[axes]
+
+    @property
+    def control(self) -> Tuple[str, Any]:
+        """Indexed control device name and configuration name."""
+        return self._control
+
+    @property
+    def nrows(self) -> int:
+        """Number of rows in the control dataset when indexed."""
+        return self._nrows
+
+    def query_box(self, xlim=None, ylim=None, zlim=None) -> np.ndarray:
+        """
+        Shot numbers of the positions inside an axis-aligned box.
+
+        :param xlim: :code:`(min, max)` bounds along x (inclusive),
+            :code:`None` (DEFAULT) is unbounded
+        :param ylim: :code:`(min, max)` bounds along y
+        :param zlim: :code:`(min, max)` bounds along z
+        :return: sorted array of shot numbers
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for axis, lim in zip('xyz', (xlim, ylim, zlim)):
+            if lim is None:
+                continue
+            coords = self._xyz[:, _AXES[axis]]
+            mask &= (coords >= lim[0]) & (coords <= lim[1])
+
+        return self._shotnums(np.nonzero(mask)[0])
+
+    def query_nearest(self, point: Iterable[float], k=1,
+                      axes='xyz') -> np.ndarray:
+        """
+        Shot numbers of the **k** positions nearest to **point**.
+
+        :param point: coordinates along :data:`axes`
+        :param int k: number of neighbors (DEFAULT :code:`1`)
+        :param str axes: axes of :data:`point` (DEFAULT :code:`'xyz'`)
+        :return: sorted array of shot numbers
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return np.array([], dtype=np.uint32)
+        dist, index = self._tree(axes).query(np.asarray(point), k=k)
+        return self._shotnums(np.atleast_1d(index))
+
+    def query_plane(self, axis: str, value: float,
+                    tol=1e-6) -> np.ndarray:
+        """
+        Shot numbers of the positions in the plane
+        :code:`axis = value`.
+
+        :param str axis: :code:`'x'`, :code:`'y'`, or :code:`'z'`
+        :param value: plane coordinate
+        :param tol: tolerance on the plane coordinate
+            (DEFAULT :code:`1e-6`)
+        :return: sorted array of shot numbers
+        """
+        if not isinstance(axis, str) or axis not in _AXES:
+            raise ValueError(
+                "`axis` must be one of 'x', 'y', or 'z', "
+                "got {}".format(axis))
+        lims = {axis + 'lim': (value - tol, value + tol)}
+        return self.query_box(**lims)
+
+    def query_radius(self, point: Iterable[float], radius: float,
+                     axes='xyz') -> np.ndarray:
+        """
+        Shot numbers of the positions within **radius** of **point**.
+
+        :param point: coordinates along :data:`axes`
+        :param radius: search radius
+        :param str axes: axes of :data:`point`, e.g. :code:`'xy'`
+            ignores z (DEFAULT :code:`'xyz'`)
+        :return: sorted array of shot numbers
+        """
+        index = self._tree(axes).query_ball_point(np.asarray(point),
+                                                  radius)
+        return self._shotnums(index)
+
+    @property
+    def shotnum(self) -> np.ndarray:
+        """Shot numbers of the indexed positions."""
+        return self._shotnum
+
+    @property
+    def xyz(self) -> np.ndarray:
+        """Indexed positions, :code:`(nshots, 3)`."""
+        return self._xyz
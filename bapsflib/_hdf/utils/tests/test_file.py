@@ -11,21 +11,54 @@
 # License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
 #   license terms and contributor agreement.
 #
+import asyncio
 import h5py
+import multiprocessing as mp
+import numpy as np
 import os
+import pickle
+import shutil
+import tempfile
 import unittest as ut
 
 from bapsflib._hdf import HDFMap
 from unittest import mock
 
 from . import (TestBase, with_bf)
-from ..file import File
+from ..file import (File, FileSpec)
 from ..hdfoverview import HDFOverview
 from ..hdfreadcontrols import HDFReadControls
 from ..hdfreaddata import HDFReadData
 from ..hdfreadmsi import HDFReadMSI
 
 
+def _swmr_writer(filename, source, commands, done):
+    """
+    Simulates the DAQ appending shots to the datasets in **source**
+    of a SWMR file.  Each integer put on **commands** appends that
+    many shots, a :code:`(nshots, paths)` tuple appends them to the
+    datasets **paths** only, and :code:`None` stops the writer.
+    """
+    with h5py.File(filename, 'a', libver='latest') as f:
+        f.swmr_mode = True
+        done.put(0)
+        while True:
+            nshots = commands.get()
+            if nshots is None:
+                break
+            paths = list(source)
+            if isinstance(nshots, tuple):
+                nshots, paths = nshots
+            for path in paths:
+                data = source[path]
+                dset = f[path]
+                start = dset.shape[0]
+                dset.resize(start + nshots, axis=0)
+                dset[start:] = data[start:start + nshots]
+                dset.flush()
+            done.put(nshots)
+
+
 class TestFile(TestBase):
     """Test case for :class:`~bapsflib._hdf.utils.file.File`."""
 
@@ -106,6 +139,7 @@ class TestFile(TestBase):
             extras = {
                 'shotnum': 2,
                 'intersection_set': True,
+                'missing': 'mask',
             }
             cdata = _bf.read_controls(['control'], **extras,
                                       silent=False)
@@ -127,6 +161,10 @@ class TestFile(TestBase):
                 'keep_bits': True,
                 'add_controls': ['control'],
                 'intersection_set': True,
+                'filter': None,
+                'layout': 'columns',
+                'missing': 'mask',
+                'max_memory': 2**30,
             }
             data = _bf.read_data(1, 2, **extras, silent=False)
             self.assertTrue(mock_rd.called)
@@ -140,7 +178,8 @@ class TestFile(TestBase):
             mdata = _bf.read_msi('Discharge', silent=False)
             self.assertTrue(mock_rm.called)
             self.assertEqual(mdata, 'read msi')
-            mock_rm.assert_called_once_with(_bf, 'Discharge')
+            mock_rm.assert_called_once_with(_bf, 'Discharge',
+                                            max_memory=None)
 
         # __init__ calling                                          ----
         # methods `_build_info` and `_map_file` should be called in
@@ -179,6 +218,417 @@ class TestFile(TestBase):
             _bf2 = File(self.f.filename, mode='w')
             _bf2.close()
 
+        # no `cache_policy` leaves the chunk cache untouched
+        self.assertIsInstance(type(_bf).chunk_cache, property)
+        self.assertEqual(_bf.chunk_cache, {})
+
+    def test_cache_policy(self):
+        """Test chunk cache sizing from `cache_policy`."""
+        # setup HDF5 with a chunked digitizer dataset
+        # - 100 shots x 1000 samples of int16, chunked 10 x 100
+        # - one chunk = 2000 bytes, one chunk band = 10 chunks
+        self.f.add_module('SIS 3301', {'n_configs': 1, 'sn_size': 100,
+                                       'nt': 1000})
+        dset_path = 'Raw data + config/SIS 3301/config01 [0:0]'
+        data = self.f[dset_path][...]
+        del self.f[dset_path]
+        self.f.create_dataset(dset_path, data=data, chunks=(10, 100))
+        self.f.flush()
+        fkwargs = {'control_path': 'Raw data + config',
+                   'digitizer_path': 'Raw data + config',
+                   'msi_path': 'MSI',
+                   'silent': True}
+
+        # cache is never smaller than the HDF5 default
+        for policy, w0 in (('auto', 0.75),
+                           ('sequential', 1.0),
+                           ('random', 0.75)):
+            settings = File._build_chunk_cache(
+                self.f.filename, 'Raw data + config', policy)
+            self.assertEqual(settings['policy'], policy)
+            self.assertEqual(settings['rdcc_nbytes'], 1024 ** 2)
+            self.assertEqual(settings['rdcc_w0'], w0)
+            self.assertNotIn('page_buf_size', settings)
+
+        # large chunks scale the cache
+        # - one chunk = 200000 bytes, one chunk band = 10 chunks
+        data = np.zeros((100, 100000), dtype=np.int16)
+        del self.f[dset_path]
+        self.f.create_dataset(dset_path, data=data,
+                              chunks=(10, 10000))
+        self.f.flush()
+        for policy, nbytes in (('auto', 10 * 200000),
+                               ('sequential', 20 * 200000),
+                               ('random', 100 * 200000)):
+            settings = File._build_chunk_cache(
+                self.f.filename, 'Raw data + config', policy)
+            self.assertEqual(settings['rdcc_nbytes'], nbytes)
+            nslots = settings['rdcc_nslots']
+            self.assertGreaterEqual(nslots, 100 * nbytes // 200000)
+            self.assertTrue(all(nslots % ii for ii in range(2, nslots)))
+
+        # settings are passed on to h5py.File
+        settings = File._build_chunk_cache(
+            self.f.filename, 'Raw data + config', 'sequential')
+        with mock.patch.object(File, '_build_chunk_cache',
+                               return_value=settings) as mock_bcc, \
+                mock.patch.object(h5py.File, '__init__', autospec=True,
+                                  side_effect=h5py.File.__init__) \
+                as mock_file:
+            _bf = File(self.f.filename, cache_policy='sequential',
+                       **fkwargs)
+            mock_bcc.assert_called_once_with(
+                self.f.filename, 'Raw data + config', 'sequential')
+            mock_file.assert_any_call(
+                _bf, self.f.filename, mode='r',
+                rdcc_nbytes=settings['rdcc_nbytes'],
+                rdcc_nslots=settings['rdcc_nslots'],
+                rdcc_w0=settings['rdcc_w0'])
+            self.assertEqual(_bf.chunk_cache, settings)
+            _bf.close()
+
+            # explicit keywords take precedence
+            mock_file.reset_mock()
+            _bf = File(self.f.filename, cache_policy='sequential',
+                       rdcc_nbytes=2 * 1024 ** 2, **fkwargs)
+            self.assertEqual(
+                mock_file.call_args_list[0][1]['rdcc_nbytes'],
+                2 * 1024 ** 2)
+            _bf.close()
+
+        # the file-level total caps the per-dataset cache
+        with mock.patch(File.__module__ + '._RDCC_MAX_FILE_NBYTES',
+                        4 * 1024 ** 2):
+            settings = File._build_chunk_cache(
+                self.f.filename, 'Raw data + config', 'random')
+        self.assertEqual(settings['rdcc_nbytes'], 20 * 200000)
+
+        # re-opening from a spec reuses the derived keywords instead
+        # of inspecting the layout again
+        _bf = File(self.f.filename, cache_policy='random', **fkwargs)
+        spec = _bf.spec()
+        _bf.close()
+        self.assertEqual(spec.kwargs['rdcc_nbytes'], 100 * 200000)
+        with mock.patch.object(File, '_build_chunk_cache') as mock_bcc:
+            _bf = spec.open()
+            self.assertFalse(mock_bcc.called)
+        self.assertEqual(_bf.chunk_cache['rdcc_nbytes'], 100 * 200000)
+        _bf.close()
+
+        # keywords not supported by the installed h5py are dropped
+        with mock.patch.object(h5py.version, 'version_tuple',
+                               (2, 8, 0)), \
+                mock.patch.object(h5py.File, '__init__', autospec=True,
+                                  side_effect=h5py.File.__init__) \
+                as mock_file:
+            with self.assertWarns(UserWarning):
+                _bf = File(self.f.filename, cache_policy='random',
+                           **{**fkwargs, 'silent': False})
+            for key in ('rdcc_nbytes', 'rdcc_nslots', 'rdcc_w0'):
+                self.assertNotIn(key, mock_file.call_args_list[0][1])
+                self.assertNotIn(key, _bf.spec().kwargs)
+            self.assertEqual(_bf.chunk_cache, {'policy': 'random'})
+            _bf.close()
+
+        # invalid policy
+        with self.assertRaises(ValueError):
+            File(self.f.filename, cache_policy='fast', **fkwargs)
+
+    @with_bf
+    def test_async_reads(self, _bf: File):
+        """Test the `aread_*` coroutines."""
+        self.f.add_module('SIS 3301', {'n_configs': 1, 'sn_size': 20,
+                                       'nt': 100})
+        _bf._map_file()  # re-map file
+        dkwargs = {'digitizer': 'SIS 3301', 'adc': 'SIS 3301',
+                   'config_name': 'config01'}
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        # executor is created on first use and bounds the reads
+        self.assertIsNone(_bf._async_executor)
+        self.assertEqual(_bf.async_executor._max_workers, 2)
+        with self.assertRaises(ValueError):
+            File(self.f.filename, max_async_reads=0)
+
+        # `aread_data` matches `read_data`
+        data = _bf.read_data(0, 0, **dkwargs)
+        for chunk_size in (None, 3):
+            with self.subTest(chunk_size=chunk_size):
+                adata = loop.run_until_complete(
+                    _bf.aread_data(0, 0, chunk_size=chunk_size,
+                                   **dkwargs))
+                self.assertIsInstance(adata, HDFReadData)
+                self.assertEqual(adata.info, data.info)
+                for field in data.dtype.names:
+                    np.testing.assert_array_equal(adata[field],
+                                                  data[field])
+
+        # no blocks to read
+        adata = loop.run_until_complete(
+            _bf.aread_data(0, 0, index=[], **dkwargs))
+        self.assertIsInstance(adata, HDFReadData)
+        self.assertEqual(adata.shape, (0,))
+        self.assertEqual(adata.dtype, data.dtype)
+
+        # whole-read keywords are forwarded to `read_data`
+        with mock.patch.object(File, 'read_data',
+                               return_value=data) as mock_read:
+            adata = loop.run_until_complete(
+                _bf.aread_data(0, 0, layout='columns', max_memory=2**30,
+                               **dkwargs))
+            self.assertIs(adata, data)
+            self.assertEqual(mock_read.call_args[1]['layout'], 'columns')
+            self.assertEqual(mock_read.call_args[1]['max_memory'],
+                             2**30)
+
+        # cancelling `aread_data` stops reading at a block boundary
+        async def cancel_read():
+            task = loop.create_task(
+                _bf.aread_data(0, 0, chunk_size=1, **dkwargs))
+            while mock_read.call_count == 0:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfiterdata.HDFReadData',
+                side_effect=lambda *args, **kwargs:
+                data[0:1]) as mock_read:
+            loop.run_until_complete(cancel_read())
+            self.assertLess(mock_read.call_count, 20)
+
+        # `aread_controls` and `aread_msi` wrap the synchronous reads
+        for method, args in (('read_controls', (['control'],)),
+                             ('read_msi', ('Discharge',))):
+            with self.subTest(method=method), \
+                    mock.patch.object(File, method,
+                                      return_value=method) as mock_read:
+                coro = getattr(_bf, 'a' + method)(*args, silent=True)
+                self.assertEqual(loop.run_until_complete(coro), method)
+                self.assertEqual(mock_read.call_args[0], args)
+                self.assertTrue(mock_read.call_args[1]['silent'])
+
+        # closing the file shuts down the executor
+        executor = _bf.async_executor
+        _bf.close()
+        self.assertIsNone(_bf._async_executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+
+        # closing from an executor thread does not deadlock
+        _bf = File(self.f.filename, control_path='Raw data + config',
+                   digitizer_path='Raw data + config',
+                   msi_path='MSI', silent=True)
+        executor = _bf.async_executor
+        executor.submit(_bf.close).result(timeout=5)
+        self.assertIsNone(_bf._async_executor)
+        executor.shutdown(wait=True)
+
+    @with_bf
+    def test_max_memory(self, _bf: File):
+        """Test the default memory budget `max_memory`."""
+        self.f.add_module('SIS 3301', {'n_configs': 1, 'sn_size': 20,
+                                       'nt': 100})
+        self.f.add_module('Discharge')
+        _bf._map_file()  # re-map file
+        self.assertIsNone(_bf.max_memory)
+        for max_memory in (0, 1.5, True):
+            with self.subTest(max_memory=max_memory), \
+                    self.assertRaises(ValueError):
+                File(self.f.filename, max_memory=max_memory)
+
+        # reads fail early with the file default, unless overridden
+        _bf2 = File(self.f.filename, control_path='Raw data + config',
+                    digitizer_path='Raw data + config',
+                    msi_path='MSI', silent=True, max_memory=1024)
+        self.addCleanup(_bf2.close)
+        self.assertEqual(_bf2.max_memory, 1024)
+        self.assertEqual(_bf2.spec().kwargs['max_memory'], 1024)
+        with self.assertRaises(MemoryError):
+            _bf2.read_data(0, 0, silent=True)
+        with self.assertRaises(MemoryError):
+            _bf2.read_msi('Discharge')
+        data = _bf2.read_data(0, 0, max_memory=2**30, silent=True)
+        self.assertEqual(data.shape, (20,))
+        mdata = _bf2.read_msi('Discharge', max_memory=2**30)
+        self.assertEqual(mdata.shape[0], _bf.read_msi('Discharge').size)
+
+        # plans execute within the file default
+        plan = _bf2.plan_read(0, 0, silent=True)
+        self.assertGreater(plan.estimates['peak memory'], 1024)
+        with self.assertRaises(MemoryError):
+            plan.execute()
+
+    @with_bf
+    def test_refresh(self, _bf: File):
+        """Test `refresh()` updates the file mapping in place."""
+        fmap = _bf.file_map
+        self.assertNotIn('SIS 3301', _bf.digitizers)
+
+        self.f.add_module('SIS 3301', {'n_configs': 1, 'sn_size': 20,
+                                       'nt': 100})
+        changes = _bf.refresh(silent=True)
+        self.assertEqual(changes['added'], ['SIS 3301'])
+        self.assertIs(_bf.file_map, fmap)
+        self.assertIn('SIS 3301', _bf.digitizers)
+        data = _bf.read_data(0, 0, silent=True)
+        self.assertEqual(data.shape, (20,))
+
+    @with_bf
+    def test_spec(self, _bf: File):
+        """Test `spec()` and pickling of the file."""
+        self.f.add_module('SIS 3301', {'n_configs': 1, 'sn_size': 20,
+                                       'nt': 100})
+        _bf._map_file()  # re-map file
+
+        # `file_map` must be a HDFMap
+        with self.assertRaises(TypeError):
+            File(self.f.filename, file_map='not a map')
+
+        spec = _bf.spec()
+        self.assertIsInstance(spec, FileSpec)
+        self.assertIs(spec.file_class, File)
+        self.assertEqual(spec.name, os.path.abspath(_bf.filename))
+        self.assertEqual(spec.kwargs['digitizer_path'],
+                         'Raw data + config')
+        spec = pickle.loads(pickle.dumps(spec))
+
+        # re-opening attaches the snapshot instead of re-mapping
+        with mock.patch.object(File, '_map_file') as mock_mf:
+            _bf2 = spec.open()
+            self.assertFalse(mock_mf.called)
+        self.assertIsInstance(_bf2, File)
+        self.assertEqual(_bf2.CONTROL_PATH, _bf.CONTROL_PATH)
+        self.assertEqual(list(_bf2.digitizers), ['SIS 3301'])
+        self.assertIsInstance(_bf2.digitizers['SIS 3301'].group,
+                              h5py.Group)
+        data = _bf.read_data(0, 0, silent=True)
+        data2 = _bf2.read_data(0, 0, silent=True)
+        self.assertTrue(np.array_equal(data['signal'], data2['signal']))
+        _bf2.close()
+
+        # pickling the file pickles its spec
+        _bf2 = pickle.loads(pickle.dumps(_bf))
+        self.assertIsInstance(_bf2, File)
+        self.assertEqual(_bf2.filename, _bf.filename)
+        self.assertEqual(list(_bf2.digitizers), ['SIS 3301'])
+        _bf2.close()
+
+    def test_swmr(self):
+        """Test following a file in SWMR mode."""
+        self.f.add_module('SIS 3301', {'n_configs': 1, 'sn_size': 20,
+                                       'nt': 100})
+        self.f.add_module('6K Compumotor', {'sn_size': 20})
+        fkwargs = {'control_path': self.control_path,
+                   'digitizer_path': self.digitizer_path,
+                   'msi_path': self.msi_path,
+                   'silent': True}
+
+        # SWMR only reads
+        with self.assertRaises(ValueError):
+            File(self.f.filename, mode='r+', swmr=True, **fkwargs)
+
+        # copy faux file with resizable digitizer datasets that
+        # hold the first 5 shots
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        filename = os.path.join(tmpdir, 'swmr.hdf5')
+        gpath = '/Raw data + config/SIS 3301/'
+        dpath = gpath + 'config01 [0:0]'
+        dhpath = gpath + 'config01 [0:0] headers'
+        cgroup = self.f['/Raw data + config/6K Compumotor']
+        cpath = [dset.name for dset in cgroup.values()
+                 if isinstance(dset, h5py.Dataset)][0]
+        source = {}
+        with h5py.File(filename, 'w', libver='latest') as f:
+            for name in self.f:
+                self.f.copy(name, f)
+            for path in (dpath, dhpath, cpath):
+                data = self.f[path][...]
+                source[path] = data
+                del f[path]
+                f.create_dataset(path, data=data[:5], chunks=True,
+                                 maxshape=(None,) + data.shape[1:])
+
+        # start writer
+        ctx = mp.get_context('spawn')
+        commands = ctx.Queue()
+        done = ctx.Queue()
+        writer = ctx.Process(target=_swmr_writer,
+                             args=(filename, source, commands, done))
+        writer.start()
+        self.assertEqual(done.get(timeout=30), 0)
+        try:
+            _bf = File(filename, swmr=True, **fkwargs)
+            self.addCleanup(_bf.close)
+            setup = _bf.digitizers['SIS 3301'].configs['config01'][
+                'SIS 3301'][0][2]
+            self.assertEqual(setup['nshotnum'], 5)
+            self.assertEqual(_bf.poll_new_shots(), {})
+
+            # new shots update extents and 'nshotnum'
+            commands.put(3)
+            done.get(timeout=30)
+            self.assertEqual(_bf.poll_new_shots(),
+                             {dpath: (5, 8), dhpath: (5, 8),
+                              cpath: (5, 8)})
+            self.assertEqual(setup['nshotnum'], 8)
+
+            # follow from the start of the datasets
+            data_iter = _bf.iter_new_data(0, 0, from_start=True,
+                                          keep_bits=True, interval=0.01,
+                                          timeout=0.1, silent=True)
+            data = next(data_iter)
+            np.testing.assert_array_equal(
+                data['shotnum'], source[dhpath]['Shot'][:8])
+
+            # only newly written shots are yielded
+            commands.put(2)
+            done.get(timeout=30)
+            with mock.patch.object(
+                    File, 'read_data',
+                    side_effect=File.read_data,
+                    autospec=True) as mock_rd:
+                data = next(data_iter)
+                np.testing.assert_array_equal(
+                    mock_rd.call_args[1]['index'], [8, 9])
+            np.testing.assert_array_equal(
+                data['shotnum'], source[dhpath]['Shot'][8:10])
+            np.testing.assert_array_equal(data['signal'],
+                                          source[dpath][8:10])
+            self.assertEqual(setup['nshotnum'], 10)
+
+            # no new shots until timeout
+            self.assertEqual(list(data_iter), [])
+            self.assertEqual(
+                list(_bf.iter_new_data(0, 0, interval=0.01,
+                                       timeout=0.1, silent=True)),
+                [])
+
+            # digitizer rows written ahead of the control device are
+            # held back until the control device records their shots
+            commands.put((2, [dpath, dhpath]))
+            done.get(timeout=30)
+            data_iter = _bf.iter_new_data(
+                0, 0, add_controls=['6K Compumotor'], from_start=True,
+                keep_bits=True, interval=0.01, timeout=0.1, silent=True)
+            data = next(data_iter)
+            np.testing.assert_array_equal(
+                data['shotnum'], source[dhpath]['Shot'][:10])
+            commands.put(2)
+            done.get(timeout=30)
+            data = next(data_iter)
+            np.testing.assert_array_equal(
+                data['shotnum'], source[dhpath]['Shot'][10:12])
+            np.testing.assert_array_equal(data['signal'],
+                                          source[dpath][10:12])
+            self.assertEqual(list(data_iter), [])
+        finally:
+            commands.put(None)
+            writer.join(timeout=30)
+
 
 if __name__ == '__main__':
     ut.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import os
+import unittest as ut
+
+from bapsflib._hdf.maps import FauxHDFBuilder
+from unittest import mock
+
+from . import TestBase
+from ..file import File
+from ..filepool import (default_pool, FilePool)
+
+
+class TestFilePool(TestBase):
+    """Test case for :class:`~bapsflib._hdf.utils.filepool.FilePool`."""
+
+    def setUp(self):
+        super().setUp()
+        self.settings = {'control_path': self.control_path,
+                         'digitizer_path': self.digitizer_path,
+                         'msi_path': self.msi_path,
+                         'silent': True}
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test_raises(self):
+        """Test exceptions."""
+        for max_open in (0, 1.5, True):
+            with self.subTest(max_open=max_open), \
+                    self.assertRaises(ValueError):
+                FilePool(max_open=max_open)
+
+        # releasing a file not in the pool
+        pool = FilePool()
+        with File(self.filename, **self.settings) as bf:
+            self.assertRaises(ValueError, pool.release, bf)
+
+    def test_reuse(self):
+        """Test files are re-used and reference counted."""
+        self.assertIsInstance(default_pool, FilePool)
+        pool = FilePool(max_open=2)
+        self.assertEqual(pool.max_open, 2)
+
+        with mock.patch.object(File, '_map_file',
+                               side_effect=File._map_file,
+                               autospec=True) as mock_mf:
+            bf = pool.acquire(File, self.filename, **self.settings)
+            bf2 = pool.acquire(File, self.filename, **self.settings)
+            self.assertIs(bf, bf2)
+            self.assertEqual(mock_mf.call_count, 1)
+            self.assertIn(bf, pool)
+            self.assertEqual(len(pool), 1)
+            self.assertEqual(pool.refcount(bf), 2)
+
+            # relative and absolute paths share a key
+            cwd = os.getcwd()
+            os.chdir(os.path.dirname(self.filename))
+            try:
+                bf3 = pool.acquire(File, os.path.basename(self.filename),
+                                   **self.settings)
+            finally:
+                os.chdir(cwd)
+            self.assertIs(bf3, bf)
+            self.assertEqual(pool.refcount(bf), 3)
+
+            # different settings are a different file
+            with pool.open(File, self.filename, silent=True) as bf4:
+                self.assertIsNot(bf4, bf)
+                self.assertEqual(bf4.CONTROL_PATH, '/')
+                self.assertEqual(pool.refcount(bf4), 1)
+            self.assertEqual(pool.refcount(bf4), 0)
+            self.assertEqual(mock_mf.call_count, 2)
+
+        # released files stay open
+        for _ in range(3):
+            pool.release(bf)
+        self.assertEqual(pool.refcount(bf), 0)
+        self.assertTrue(bool(bf))
+        self.assertEqual(len(pool), 2)
+
+        # a file closed outside of the pool is re-opened
+        bf.close()
+        with pool.open(File, self.filename, **self.settings) as bf5:
+            self.assertIsNot(bf5, bf)
+            self.assertTrue(bool(bf5))
+
+        pool.close_all()
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(bool(bf5))
+        self.assertFalse(bool(bf4))
+
+    def test_lru_close(self):
+        """Test the least recently used, unreferenced files are closed."""
+        pool = FilePool(max_open=1)
+        f2 = FauxHDFBuilder()
+        self.addCleanup(f2.cleanup)
+
+        bf = pool.acquire(File, self.filename, silent=True)
+        bf2 = pool.acquire(File, f2.filename, silent=True)
+
+        # referenced files are never closed
+        self.assertEqual(len(pool), 2)
+        self.assertTrue(bool(bf))
+        self.assertTrue(bool(bf2))
+
+        # releasing the LRU file closes it
+        pool.release(bf)
+        self.assertEqual(len(pool), 1)
+        self.assertFalse(bool(bf))
+        self.assertNotIn(bf, pool)
+
+        # last file is kept open
+        pool.release(bf2)
+        self.assertEqual(len(pool), 1)
+        self.assertTrue(bool(bf2))
+        pool.close_all()
+
+
+if __name__ == '__main__':
+    ut.main()
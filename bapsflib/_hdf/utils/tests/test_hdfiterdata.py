@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import numpy as np
+import threading
+import unittest as ut
+
+from scipy import signal as sps
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfiterdata import (HDFIterChannels, HDFIterData)
+from ..hdfreaddata import HDFReadData
+
+
+class TestHDFIterData(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfiterdata.HDFIterData`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        _mod = self.f.modules['SIS 3301']
+        self.config_name = _mod.knobs.active_config[0]
+        brds, chs = np.where(_mod.knobs.active_brdch)
+        self.brd = brds[0]
+        self.ch = chs[0]
+        dset_name = self.config_name + " [{}:{}]".format(self.brd,
+                                                         self.ch)
+        dset_path = 'Raw data + config/SIS 3301/' + dset_name
+        data = np.arange(50 * 100, dtype=np.int16).reshape(50, 100)
+        self.f[dset_path][...] = data
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': self.config_name}
+
+    def tearDown(self):
+        super().tearDown()
+
+    def assertBlocksEqual(self, blocks, data):
+        """Assert the concatenated blocks equal **data**."""
+        blocks = np.concatenate([np.asarray(block) for block in blocks])
+        self.assertEqual(blocks.dtype, data.dtype)
+        for field in data.dtype.names:
+            np.testing.assert_array_equal(blocks[field], data[field])
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        # `hdf_file` is not a bapsflib File
+        with self.assertRaises(TypeError):
+            HDFIterData(self.f, self.brd, self.ch, **self.kwargs)
+
+        # `chunk_size` and `prefetch` are not valid
+        for kwargs in ({'chunk_size': 0}, {'chunk_size': 2.5},
+                       {'prefetch': -1}, {'prefetch': True}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFIterData(_bf, self.brd, self.ch, **kwargs,
+                            **self.kwargs)
+
+        # `index` out of range
+        with self.assertRaises(ValueError):
+            HDFIterData(_bf, self.brd, self.ch, index=[1, 100],
+                        **self.kwargs)
+
+    @with_bf
+    def test_blocks(self, _bf: File):
+        """Test the blocks match a single read."""
+        # (index, shotnum, intersection_set)
+        cases = [
+            (slice(None), slice(None), True),
+            ([-1, 3, 5, 6, 7, 40], slice(None), True),
+            (slice(None), [0, 2, 3, 48, 60, 70], True),
+            (slice(None), [0, 2, 3, 48, 60, 70], False),
+        ]
+        for index, shotnum, intersection_set in cases:
+            for chunk_size, prefetch in ((7, 0), (7, 2), (None, 1)):
+                with self.subTest(index=index, shotnum=shotnum,
+                                  intersection_set=intersection_set,
+                                  chunk_size=chunk_size,
+                                  prefetch=prefetch):
+                    data = _bf.read_data(
+                        self.brd, self.ch, index=index,
+                        shotnum=shotnum,
+                        intersection_set=intersection_set,
+                        **self.kwargs)
+                    data_iter = _bf.iter_data(
+                        self.brd, self.ch, index=index,
+                        shotnum=shotnum,
+                        intersection_set=intersection_set,
+                        chunk_size=chunk_size, prefetch=prefetch,
+                        **self.kwargs)
+                    self.assertIsInstance(data_iter, HDFIterData)
+                    self.assertEqual(data_iter.prefetch, prefetch)
+                    self.assertTrue(np.array_equal(
+                        data_iter.shotnum, data['shotnum']))
+
+                    blocks = list(data_iter)
+                    self.assertEqual(len(blocks), len(data_iter))
+                    for block in blocks:
+                        self.assertIsInstance(block, HDFReadData)
+                        self.assertLessEqual(block.shape[0],
+                                             data_iter.chunk_size)
+                    self.assertBlocksEqual(blocks, data)
+
+    @with_bf
+    def test_default_chunk_size(self, _bf: File):
+        """Test the default block size."""
+        # dataset is small, so everything is read in one block
+        data_iter = _bf.iter_data(self.brd, self.ch, **self.kwargs)
+        self.assertEqual(len(data_iter), 1)
+        self.assertEqual(data_iter.blocks[0].shape, (50,))
+
+        # block size is aligned to the dataset chunks
+        dset_path = 'Raw data + config/SIS 3301/{} [{}:{}]'.format(
+            self.config_name, self.brd, self.ch)
+        data = self.f[dset_path][...]
+        del self.f[dset_path]
+        self.f.create_dataset(dset_path, data=data, chunks=(3, 100))
+        data_iter = _bf.iter_data(self.brd, self.ch, keep_bits=True,
+                                  **self.kwargs)
+        self.assertEqual(data_iter.chunk_size % 3, 0)
+
+    @with_bf
+    def test_add_controls(self, _bf: File):
+        """Test control device shot numbers are intersected up-front."""
+        self.f.add_module('Waveform', {'n_configs': 1, 'sn_size': 30})
+        _bf._map_file()  # re-map file
+
+        data = _bf.read_data(self.brd, self.ch,
+                             add_controls=['Waveform'], **self.kwargs)
+        data_iter = _bf.iter_data(self.brd, self.ch,
+                                  add_controls=['Waveform'],
+                                  chunk_size=4, prefetch=1,
+                                  **self.kwargs)
+        self.assertEqual(data_iter.shotnum.shape, (30,))
+        self.assertEqual(len(data_iter), 8)
+        blocks = list(data_iter)
+        self.assertTrue(all(block.shape[0] != 0 for block in blocks))
+        self.assertBlocksEqual(blocks, data)
+
+    @with_bf
+    def test_prefetch(self, _bf: File):
+        """Test the background thread behavior."""
+        nthreads = threading.active_count()
+
+        # breaking early stops the background thread
+        data_iter = _bf.iter_data(self.brd, self.ch, chunk_size=5,
+                                  prefetch=2, **self.kwargs)
+        gen = iter(data_iter)
+        next(gen)
+        gen.close()
+        self.assertEqual(threading.active_count(), nthreads)
+
+        # read errors are raised in the consumer's thread
+        with mock.patch('bapsflib._hdf.utils.hdfiterdata.HDFReadData',
+                        side_effect=[np.zeros(5), OSError('oops')]):
+            gen = iter(data_iter)
+            self.assertEqual(next(gen).shape, (5,))
+            self.assertRaises(OSError, next, gen)
+        self.assertEqual(threading.active_count(), nthreads)
+
+
+class TestHDFIterChannels(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfiterdata.HDFIterChannels`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        # - 3 active channels on board 0
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 20})
+        self.f.add_module('Waveform', {'n_configs': 1, 'sn_size': 40})
+        brdch = np.zeros((13, 8), dtype=bool)
+        brdch[0, 0:3] = True
+        self.f.modules['SIS 3301'].knobs.active_brdch = brdch
+        for ch in range(3):
+            dset = self.f['Raw data + config/SIS 3301/'
+                          'config01 [0:{}]'.format(ch)]
+            dset[...] = np.arange(50 * 20, dtype=np.int16).reshape(
+                50, 20) + 1000 * ch
+
+        # channel 2 recorded shots 6 to 55
+        dheader = self.f['Raw data + config/SIS 3301/'
+                         'config01 [0:2] headers']
+        hdata = dheader[...]
+        hdata['Shot'] += 5
+        dheader[...] = hdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for channels in ([], (0, 1), [(0, 0), 1], [(0, 0), (0, 0)]):
+            with self.subTest(channels=channels), \
+                    self.assertRaises(ValueError):
+                HDFIterChannels(_bf, channels, **self.kwargs)
+
+    @with_bf
+    def test_aligned(self, _bf: File):
+        """Test the blocks of all channels hold the same shots."""
+        channels = [(0, 0), (0, 2), (0, 1)]
+        data_iter = _bf.iter_channels(channels,
+                                      add_controls=['Waveform'],
+                                      chunk_size=7, prefetch=1,
+                                      **self.kwargs)
+        self.assertIsInstance(data_iter, HDFIterChannels)
+        self.assertEqual(data_iter.channels, channels)
+        self.assertEqual(data_iter.chunk_size, 7)
+        self.assertEqual(len(data_iter.iters), 3)
+        np.testing.assert_array_equal(data_iter.shotnum,
+                                      np.arange(6, 41))
+        self.assertEqual(len(data_iter), 5)
+        nshots = 0
+        for blocks in data_iter:
+            self.assertEqual(len(blocks), 3)
+            self.assertIn('FREQ', blocks[0].dtype.names)
+            for (brd, ch), block in zip(channels, blocks):
+                np.testing.assert_array_equal(block['shotnum'],
+                                              blocks[0]['shotnum'])
+                data = _bf.read_data(brd, ch,
+                                     shotnum=block['shotnum'],
+                                     **self.kwargs)
+                np.testing.assert_array_equal(block['signal'],
+                                              data['signal'])
+            nshots += blocks[0].shape[0]
+        self.assertEqual(nshots, 35)
+
+        # a single channel is the same as HDFIterData
+        data_iter = HDFIterChannels(_bf, [(0, 1)], shotnum=[2, 4],
+                                    **self.kwargs)
+        blocks = list(data_iter)
+        self.assertEqual(len(blocks), 1)
+        np.testing.assert_array_equal(blocks[0][0]['shotnum'], [2, 4])
+
+
+class TestHDFIterChannelsResample(TestBase):
+    """
+    Test Case for the resampling of
+    :class:`~bapsflib._hdf.utils.hdfiterdata.HDFIterChannels`
+    """
+    #
+    # Notes:
+    # - tests are performed on digitizer 'SIS crate' with the
+    #   'SIS 3302' (100 MHz, 2x sample averaged) and 'SIS 3305'
+    #   (1.25 GHz) channels of board 1, channel 1
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        # - both channels record a 1 MHz sine
+        self.f.add_module('SIS crate',
+                          {'n_configs': 1, 'sn_size': 20, 'nt': 500})
+        group = self.f['Raw data + config/SIS crate']
+        group['config01/SIS crate 3302 configurations[0]'].attrs[
+            'Sample averaging (hardware)'] = np.uint32(1)
+        for name, dt in (('config01 [Slot 5: SIS 3302 ch 1]', 2e-8),
+                         ('config01 [Slot 13: SIS 3305 FPGA 1 ch 1]',
+                          8e-10)):
+            time = np.arange(500) * dt
+            group[name][...] = np.tile(
+                np.round(100 * np.sin(2e6 * np.pi * time) + 500),
+                (20, 1)).astype(np.int16)
+
+        self.channels = [(1, 1, 'SIS 3302'), (1, 1, 'SIS 3305')]
+        self.kwargs = {'digitizer': 'SIS crate',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for kwargs in ({'resample_to': (1, 2, 'SIS 3302')},
+                       {'resample_to': -1.},
+                       {'resample_to': 'SIS 3302'},
+                       {'resample_to': 1e8, 'keep_bits': True}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFIterChannels(_bf, self.channels, **kwargs,
+                                **self.kwargs)
+
+    @with_bf
+    def test_resample(self, _bf: File):
+        """Test channels are resampled to a common time step."""
+        data = [_bf.read_data(*spec[0:2], adc=spec[2], **self.kwargs)
+                for spec in self.channels]
+        np.testing.assert_allclose(
+            [data[0].dt.to(u.s).value, data[1].dt.to(u.s).value],
+            [2e-8, 8e-10])
+
+        # 'SIS 3305' to the 'SIS 3302' time base, and vice versa
+        for resample_to, rate, ratios in (
+                (self.channels[0], self.channels[0], [(1, 1), (1, 25)]),
+                (1.25 * u.GHz, 1.25e9, [(25, 1), (1, 1)]),
+                (1e8, 1e8, [(2, 1), (2, 25)])):
+            with self.subTest(resample_to=resample_to):
+                data_iter = _bf.iter_channels(self.channels,
+                                              resample_to=resample_to,
+                                              chunk_size=6,
+                                              **self.kwargs)
+                self.assertEqual(data_iter.resample_to, rate)
+                nshots = 0
+                for blocks in data_iter:
+                    dts = [block.dt.to(u.s).value for block in blocks]
+                    np.testing.assert_allclose(dts, dts[0])
+                    for block, orig, (up, down) in zip(blocks, data,
+                                                       ratios):
+                        self.assertIsInstance(block, HDFReadData)
+                        self.assertEqual(block.dtype.names,
+                                         orig.dtype.names)
+                        if up != down:
+                            self.assertIsNone(
+                                block.info['sample average'])
+                        np.testing.assert_allclose(
+                            block.dt.to(u.s).value,
+                            orig.dt.to(u.s).value * down / up)
+                        rows = orig['shotnum'] >= block['shotnum'][0]
+                        rows &= orig['shotnum'] <= block['shotnum'][-1]
+                        np.testing.assert_allclose(
+                            block['signal'],
+                            sps.resample_poly(orig['signal'][rows], up,
+                                              down, axis=-1),
+                            rtol=1e-5, atol=1e-6)
+                    nshots += blocks[0].shape[0]
+                self.assertEqual(nshots, 20)
+
+        # the 'SIS 3305' sine on the 'SIS 3302' time base
+        blocks = next(iter(_bf.iter_channels(
+            self.channels, resample_to=self.channels[0],
+            **self.kwargs)))
+        self.assertEqual(blocks[1]['signal'].shape, (20, 20))
+        time = np.arange(20) * 2e-8
+        sine = blocks[1].dv.value \
+            * (100 * np.sin(2e6 * np.pi * time) + 500) - 1.0
+        np.testing.assert_allclose(blocks[1]['signal'][:, 2:18],
+                                   np.tile(sine[2:18], (20, 1)),
+                                   atol=5e-3)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadaveraged import HDFReadAveraged
+
+
+class TestHDFReadAveraged(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadaveraged.HDFReadAveraged`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301' and
+    #   controls '6K Compumotor' and 'Waveform'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        self.f.add_module('6K Compumotor')
+        self.f.add_module('Waveform')
+        dset_path = 'Raw data + config/SIS 3301/config01 [0:0]'
+        rng = np.random.RandomState(0)
+        self.f[dset_path][...] = rng.randint(
+            0, 2 ** 10, size=(50, 100)).astype(np.int16)
+
+        # 5 probe positions, visited in a repeating pattern
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        cdset = [cgroup[name] for name in cgroup
+                 if name.startswith('XY[')][0]
+        cdata = cdset[...]
+        cdata['x'] = (cdata['Shot number'] - 1) % 5
+        cdata['y'] = -1.5
+        cdset[...] = cdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01',
+                       'add_controls': ['6K Compumotor']}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        # invalid `by` and `stats`
+        for kwargs in ({'by': ()}, {'by': [1]}, {'stats': ()},
+                       {'stats': ('mean', 'median')}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFReadAveraged(_bf, 0, 0, **kwargs, **self.kwargs)
+
+        # no control devices to group by
+        kwargs = self.kwargs.copy()
+        del kwargs['add_controls']
+        with self.assertRaises(ValueError):
+            HDFReadAveraged(_bf, 0, 0, silent=True, **kwargs)
+
+        # `by` field not in the read data
+        with self.assertRaises(ValueError):
+            HDFReadAveraged(_bf, 0, 0, by='foo', **self.kwargs)
+
+        # `by` device tuple not in `add_controls`
+        with self.assertRaises(ValueError):
+            HDFReadAveraged(_bf, 0, 0, by=[('Waveform', 'config01')],
+                            **self.kwargs)
+
+    @with_bf
+    def test_averaged(self, _bf: File):
+        """Test grouping and statistics against a full read."""
+        data = _bf.read_data(0, 0, silent=True, **self.kwargs)
+        xvals = (data['shotnum'] - 1) % 5
+        stats = ('mean', 'std', 'var', 'min', 'max')
+        for chunk_size, prefetch in ((None, 0), (7, 0), (7, 2)):
+            with self.subTest(chunk_size=chunk_size,
+                              prefetch=prefetch):
+                avg = HDFReadAveraged(_bf, 0, 0, stats=stats,
+                                      chunk_size=chunk_size,
+                                      prefetch=prefetch,
+                                      **self.kwargs)
+                self.assertIsInstance(avg, HDFReadAveraged)
+                self.assertEqual(
+                    avg.dtype.names,
+                    ('xyz', 'nshots', 'mean', 'std', 'var', 'min',
+                     'max'))
+                self.assertEqual(avg.shape, (5,))
+                self.assertEqual(avg['mean'].shape, (5, 100))
+                self.assertEqual(avg.info['by'], ('xyz',))
+                self.assertEqual(avg.info['stats'], stats)
+                self.assertEqual(avg.info['nshots'], 50)
+                self.assertEqual(avg.info['board'], 0)
+
+                # groups in order of first appearance
+                np.testing.assert_array_equal(avg['xyz'][:, 0],
+                                              np.arange(5))
+                np.testing.assert_array_equal(avg['xyz'][:, 1], -1.5)
+                np.testing.assert_array_equal(avg['nshots'], 10)
+                for ii in range(5):
+                    signal = data['signal'][xvals == ii]
+                    np.testing.assert_allclose(
+                        avg['mean'][ii], signal.mean(axis=0),
+                        rtol=1e-6)
+                    np.testing.assert_allclose(
+                        avg['std'][ii], signal.std(axis=0),
+                        rtol=1e-5)
+                    np.testing.assert_allclose(
+                        avg['var'][ii], signal.var(axis=0),
+                        rtol=1e-5)
+                    np.testing.assert_array_equal(
+                        avg['min'][ii], signal.min(axis=0))
+                    np.testing.assert_array_equal(
+                        avg['max'][ii], signal.max(axis=0))
+
+        # min/max keep the signal dtype
+        avg = HDFReadAveraged(_bf, 0, 0, stats=('mean', 'max'),
+                              keep_bits=True, **self.kwargs)
+        self.assertEqual(avg.dtype['max'].base, np.int16)
+        self.assertEqual(avg.dtype['mean'].base, np.float64)
+
+        # grouping by several fields
+        avg = HDFReadAveraged(_bf, 0, 0, by=('xyz', 'ptip_rot_theta'),
+                              stats='mean', **self.kwargs)
+        self.assertEqual(avg.dtype.names,
+                         ('xyz', 'ptip_rot_theta', 'nshots', 'mean'))
+        self.assertEqual(avg.shape, (5,))
+
+        # subset of shots
+        avg = HDFReadAveraged(_bf, 0, 0, shotnum=[1, 2, 6],
+                              **self.kwargs)
+        np.testing.assert_array_equal(avg['nshots'], [2, 1])
+
+    @with_bf
+    def test_command_list(self, _bf: File):
+        """Test grouping by the command list state of a device."""
+        kwargs = self.kwargs.copy()
+        kwargs['add_controls'] = ['Waveform']
+        data = _bf.read_data(0, 0, silent=True, **kwargs)
+        freqs = np.unique(data['FREQ'])
+        for by in ('Waveform', [('Waveform', 'config01')], 'FREQ'):
+            with self.subTest(by=by):
+                avg = HDFReadAveraged(_bf, 0, 0, by=by,
+                                      stats=('mean', 'var'),
+                                      chunk_size=7, **kwargs)
+                self.assertEqual(avg.dtype.names,
+                                 ('FREQ', 'nshots', 'mean', 'var'))
+                self.assertEqual(avg.info['by'], ('FREQ',))
+                np.testing.assert_array_equal(np.sort(avg['FREQ']),
+                                              freqs)
+                for entry in avg:
+                    signal = data['signal'][
+                        data['FREQ'] == entry['FREQ']]
+                    self.assertEqual(entry['nshots'],
+                                     signal.shape[0])
+                    np.testing.assert_allclose(
+                        entry['mean'], signal.mean(axis=0),
+                        rtol=1e-6)
+                    np.testing.assert_allclose(
+                        entry['var'], signal.var(axis=0), rtol=1e-5)
+
+        # devices expand next to plain fields
+        kwargs['add_controls'] = ['Waveform', '6K Compumotor']
+        avg = HDFReadAveraged(_bf, 0, 0, by=('xyz', 'Waveform'),
+                              stats='mean', **kwargs)
+        self.assertEqual(avg.info['by'], ('xyz', 'FREQ'))
+        self.assertEqual(avg.shape, (5 * freqs.size,))
+
+    @with_bf
+    def test_read_averaged(self, _bf: File):
+        """Test `File.read_averaged`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadaveraged.HDFReadAveraged',
+                side_effect=HDFReadAveraged) as mock_ra:
+            avg = _bf.read_averaged(0, 0, stats=('mean',),
+                                    chunk_size=10, **self.kwargs)
+            self.assertTrue(mock_ra.called)
+            self.assertEqual(mock_ra.call_args[1]['chunk_size'], 10)
+        self.assertIsInstance(avg, HDFReadAveraged)
+        self.assertEqual(avg.shape, (5,))
+
+
+if __name__ == '__main__':
+    ut.main()
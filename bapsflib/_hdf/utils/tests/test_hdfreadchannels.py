@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadchannels import HDFReadChannels
+
+
+class TestHDFReadChannels(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadchannels.HDFReadChannels`
+    """
+    #
+    # Notes:
+    # - tests are performed on digitizers 'SIS 3301' (shot numbers
+    #   1-20) and 'SIS crate' (shot numbers 6-25 on the 'SIS 3302',
+    #   1-20 on the 'SIS 3305'), and control '6K Compumotor'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 20, 'nt': 100})
+        self.f.add_module('SIS crate',
+                          {'n_configs': 1, 'sn_size': 20, 'nt': 50})
+        self.f.add_module('6K Compumotor')
+        group = self.f['Raw data + config/SIS crate']
+        for name in ('config01 [Slot 5: SIS 3302 ch 1]',
+                     'config01 [Slot 5: SIS 3302 ch 1] headers'):
+            dset = group[name]
+            if name.endswith('headers'):
+                dheader = dset[...]
+                dheader['Shot number'] += 5
+                dset[...] = dheader
+            else:
+                dset[...] = np.arange(20, dtype=np.int16)[:, None]
+
+        self.channels = [
+            {'board': 0, 'channel': 0, 'digitizer': 'SIS 3301'},
+            (1, 1, 'SIS 3302'),
+        ]
+        self.kwargs = {'digitizer': 'SIS crate',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for channels in ([],
+                         (0, 0),
+                         [(1,)],
+                         [(1, 1, 1)],
+                         [{'board': 1}],
+                         [{'board': 1, 'channel': 1, 'foo': 1}],
+                         [(1, 1, 'SIS 3302'),
+                          {'board': 1, 'channel': 1,
+                           'adc': 'SIS 3302'}],
+                         [{'board': 0, 'channel': 0,
+                           'digitizer': 'foo'}]):
+            with self.subTest(channels=channels), \
+                    self.assertRaises(ValueError):
+                HDFReadChannels(_bf, channels, **self.kwargs)
+
+        with self.assertRaises(TypeError):
+            HDFReadChannels(self.f, self.channels, **self.kwargs)
+
+    @with_bf
+    def test_intersection(self, _bf: File):
+        """Test reading the shots recorded on every channel."""
+        data = HDFReadChannels(_bf, self.channels,
+                               add_controls=['6K Compumotor'],
+                               **self.kwargs)
+        self.assertEqual(len(data), 2)
+        self.assertEqual(
+            data.channels,
+            [{'board': 0, 'channel': 0, 'digitizer': 'SIS 3301',
+              'config_name': 'config01', 'adc': 'SIS 3301'},
+             {'board': 1, 'channel': 1, 'digitizer': 'SIS crate',
+              'config_name': 'config01', 'adc': 'SIS 3302'}])
+        np.testing.assert_array_equal(data.shotnum, np.arange(6, 21))
+        np.testing.assert_array_equal(data.controls['shotnum'],
+                                      data.shotnum)
+        self.assertEqual(data.controls.info['controls'].keys(),
+                         {'6K Compumotor'})
+
+        # every channel matches its own read
+        for spec, ddata in zip(data.channels, data):
+            ref = _bf.read_data(spec['board'], spec['channel'],
+                                shotnum=data.shotnum,
+                                digitizer=spec['digitizer'],
+                                adc=spec['adc'], silent=True)
+            np.testing.assert_array_equal(ddata['shotnum'],
+                                          data.shotnum)
+            np.testing.assert_array_equal(ddata['signal'],
+                                          ref['signal'])
+            self.assertEqual(ddata.info['digitizer'],
+                             spec['digitizer'])
+            self.assertTrue(np.all(np.isnan(ddata['xyz'])))
+        self.assertEqual(data[0]['signal'].shape, (15, 100))
+        self.assertEqual(data[1]['signal'].shape, (15, 50))
+        self.assertIs(data.data[1], data[1])
+
+        # channels of different lengths can not be stacked
+        with self.assertRaises(ValueError):
+            data.stack()
+
+        # requested shot numbers
+        data = HDFReadChannels(_bf, self.channels,
+                               shotnum=[2, 8, 10, 22],
+                               **self.kwargs)
+        np.testing.assert_array_equal(data.shotnum, [8, 10])
+        self.assertIsNone(data.controls)
+
+    @with_bf
+    def test_union(self, _bf: File):
+        """Test reading the union of shot numbers."""
+        data = HDFReadChannels(_bf, self.channels,
+                               add_controls=['6K Compumotor'],
+                               intersection_set=False,
+                               **self.kwargs)
+        np.testing.assert_array_equal(data.shotnum, np.arange(1, 26))
+        self.assertEqual(data.controls.shape, (25,))
+        for ddata, present in zip(data, (data.shotnum <= 20,
+                                         data.shotnum >= 6)):
+            signal = ddata['signal']
+            self.assertTrue(np.all(np.isnan(signal[~present])))
+            self.assertFalse(np.any(np.isnan(signal[present])))
+
+    @with_bf
+    def test_read_channels(self, _bf: File):
+        """Test `File.read_channels`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadchannels.HDFReadChannels',
+                side_effect=HDFReadChannels) as mock_rc:
+            data = _bf.read_channels(self.channels,
+                                     intersection_set=False,
+                                     **self.kwargs)
+            self.assertTrue(mock_rc.called)
+            self.assertFalse(mock_rc.call_args[1]['intersection_set'])
+        self.assertIsInstance(data, HDFReadChannels)
+
+
+if __name__ == '__main__':
+    ut.main()
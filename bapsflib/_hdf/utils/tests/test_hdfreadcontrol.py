@@ -101,6 +101,64 @@ class TestHDFReadControl(TestBase):
                                assume_controls_conditioned=False)
         self.assertCDataObj(data, _bf, control_plus)
 
+    @with_bf
+    def test_missing_mask(self, _bf: File):
+        """Test behavior of keyword `missing`."""
+        # setup HDF5 file
+        self.f.add_module('6K Compumotor', {'sn_size': 40})
+        _bf._map_file()  # re-map file
+        controls = ['6K Compumotor']
+        sn = np.arange(31, 51, dtype=np.uint32)
+
+        # invalid `missing`
+        with self.assertRaises(ValueError):
+            HDFReadControls(_bf, controls, shotnum=sn, missing='drop')
+
+        # no mask for missing='fill'
+        ref = HDFReadControls(_bf, controls, shotnum=sn,
+                              intersection_set=False)
+        self.assertIsNone(ref.info['valid'])
+
+        # mask replaces the NaN fill
+        # - only the recorded shot numbers are stored
+        data = HDFReadControls(_bf, controls, shotnum=sn,
+                               intersection_set=False, missing='mask')
+        valid = sn <= 40
+        self.assertEqual(list(data.info['valid']), ['6K Compumotor'])
+        np.testing.assert_array_equal(
+            data.info['valid']['6K Compumotor'], np.ones(10, dtype=bool))
+        np.testing.assert_array_equal(data['shotnum'], sn[valid])
+        np.testing.assert_array_equal(data['xyz'], ref['xyz'][valid])
+        self.assertTrue(np.all(np.isnan(ref['xyz'][~valid])))
+
+        # entries missing in one of several devices are zero
+        self.f.add_module('Waveform', {'n_configs': 1, 'sn_size': 45})
+        _bf._map_file()  # re-map file
+        controls = ['6K Compumotor', 'Waveform']
+        ref = HDFReadControls(_bf, controls, shotnum=sn,
+                              intersection_set=False)
+        data = HDFReadControls(_bf, controls, shotnum=sn,
+                               intersection_set=False, missing='mask')
+        recorded = sn <= 45
+        np.testing.assert_array_equal(data['shotnum'], sn[recorded])
+        np.testing.assert_array_equal(
+            data.info['valid']['6K Compumotor'], valid[recorded])
+        np.testing.assert_array_equal(
+            data.info['valid']['Waveform'], np.ones(15, dtype=bool))
+        np.testing.assert_array_equal(data['FREQ'],
+                                      ref['FREQ'][recorded])
+        cvalid = data.info['valid']['6K Compumotor']
+        np.testing.assert_array_equal(data['xyz'][cvalid],
+                                      ref['xyz'][recorded][cvalid])
+        self.assertTrue(np.all(data['xyz'][~cvalid] == 0))
+
+        # with intersection_set=True every entry is valid
+        data = HDFReadControls(_bf, controls, shotnum=sn,
+                               missing='mask')
+        np.testing.assert_array_equal(data['shotnum'], sn[valid])
+        for cvalid in data.info['valid'].values():
+            self.assertTrue(np.all(cvalid))
+
     @with_bf
     @mock.patch.object(HDFMap, 'controls',
                        new_callable=mock.PropertyMock)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import numpy as np
+import unittest as ut
+
+from scipy import signal as sps
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadcorrelation import HDFReadCorrelation
+
+
+class TestHDFReadCorrelation(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadcorrelation.HDFReadCorrelation`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301' and
+    #   control '6K Compumotor'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        # - channel 1 is channel 0 delayed by 3 samples and channel 2
+        #   is channel 0 advanced by 5 samples
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 30, 'nt': 256})
+        self.f.add_module('6K Compumotor')
+        brdch = np.zeros((13, 8), dtype=bool)
+        brdch[0, 0:3] = True
+        self.f.modules['SIS 3301'].knobs.active_brdch = brdch
+        rng = np.random.RandomState(0)
+        noise = rng.randint(-500, 500, size=(30, 300))
+        for ch, shift in enumerate((0, 3, -5)):
+            dset = self.f['Raw data + config/SIS 3301/'
+                          'config01 [0:{}]'.format(ch)]
+            dset[...] = (noise[:, 20 - shift:276 - shift]
+                         + 2 ** 13).astype(np.int16)
+
+        # 3 probe positions, visited in a repeating pattern
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        cdset = [cgroup[name] for name in cgroup
+                 if name.startswith('XY[')][0]
+        cdata = cdset[...]
+        cdata['x'] = (cdata['Shot number'] - 1) % 3
+        cdset[...] = cdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for kwargs in ({'channels': [(0, 0)]},
+                       {'channels': [(0, 0), (0, 1)], 'maxlag': -1},
+                       {'channels': [(0, 0), (0, 1)], 'by': 'xyz'},
+                       {'channels': [(0, 0), (0, 1)], 'by': 'foo',
+                        'add_controls': ['6K Compumotor']}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFReadCorrelation(_bf, **kwargs, **self.kwargs)
+
+    @with_bf
+    def test_per_shot(self, _bf: File):
+        """Test per-shot estimates against a direct computation."""
+        signals = [_bf.read_data(0, ch, **self.kwargs)['signal']
+                   for ch in range(3)]
+        signals = [sig.astype(np.float64) for sig in signals]
+        signals = [sig - sig.mean(axis=1, keepdims=True)
+                   for sig in signals]
+        dt = _bf.read_data(0, 0, **self.kwargs).dt.to(u.s).value
+        for chunk_size in (None, 7):
+            with self.subTest(chunk_size=chunk_size):
+                corr = HDFReadCorrelation(_bf,
+                                          [(0, 0), (0, 1), (0, 2)],
+                                          by='shotnum', maxlag=10,
+                                          nperseg=64,
+                                          chunk_size=chunk_size,
+                                          **self.kwargs)
+                self.assertIsInstance(corr, HDFReadCorrelation)
+                self.assertEqual(
+                    corr.dtype.names,
+                    ('shotnum', 'nshots', 'xcorr', 'peak', 'delay',
+                     'coherence'))
+                self.assertEqual(corr.shape, (30,))
+                self.assertEqual(corr['xcorr'].shape, (30, 3, 21))
+                self.assertEqual(corr['coherence'].shape, (30, 3, 33))
+                self.assertEqual(corr.info['pairs'],
+                                 [((0, 0), (0, 1)), ((0, 0), (0, 2)),
+                                  ((0, 1), (0, 2))])
+                self.assertEqual(corr.info['nshots'], 30)
+                np.testing.assert_allclose(
+                    corr.info['lags'].to(u.s).value,
+                    np.arange(-10, 11) * dt)
+                np.testing.assert_array_equal(corr['shotnum'],
+                                              np.arange(1, 31))
+                np.testing.assert_array_equal(corr['nshots'], 1)
+
+                # delays of the shifted signals
+                np.testing.assert_allclose(
+                    corr['delay'] / dt,
+                    np.tile([-3., 5., 8.], (30, 1)), atol=0.5)
+
+                # correlation and coherence of each pair
+                for ip, (ia, ib) in enumerate(((0, 1), (0, 2),
+                                               (1, 2))):
+                    sa, sb = signals[ia], signals[ib]
+                    for ii in (0, 17):
+                        full = np.correlate(sa[ii], sb[ii], 'full')
+                        full /= np.sqrt(np.sum(sa[ii] ** 2)
+                                        * np.sum(sb[ii] ** 2))
+                        np.testing.assert_allclose(
+                            corr['xcorr'][ii, ip],
+                            full[255 - 10:255 + 11], atol=1e-12)
+                        np.testing.assert_allclose(
+                            corr['peak'][ii, ip],
+                            full[255 - 10:255 + 11].max())
+                    coh = sps.coherence(sa, sb, fs=1.0 / dt,
+                                        nperseg=64, axis=-1)[1]
+                    np.testing.assert_allclose(
+                        corr['coherence'][:, ip], coh, atol=1e-10)
+
+    @with_bf
+    def test_grouped(self, _bf: File):
+        """Test estimates averaged per probe position."""
+        corr = HDFReadCorrelation(_bf, [(0, 0), (0, 1)], by='xyz',
+                                  nperseg=64,
+                                  add_controls=['6K Compumotor'],
+                                  chunk_size=4, **self.kwargs)
+        shots = HDFReadCorrelation(_bf, [(0, 0), (0, 1)],
+                                   by='shotnum', nperseg=64,
+                                   **self.kwargs)
+        self.assertEqual(corr.shape, (3,))
+        self.assertEqual(corr['xcorr'].shape, (3, 1, 511))
+        np.testing.assert_array_equal(corr['xyz'][:, 0], np.arange(3))
+        np.testing.assert_array_equal(corr['nshots'], 10)
+        dt = corr.info['lags'][1] - corr.info['lags'][0]
+        np.testing.assert_allclose(corr['delay'] / dt.to(u.s).value,
+                                   -3., atol=0.5)
+        for ii in range(3):
+            np.testing.assert_allclose(
+                corr['xcorr'][ii],
+                shots['xcorr'][ii::3].mean(axis=0))
+
+        # coherence of the averaged spectra is not the average
+        # coherence
+        data = [_bf.read_data(0, ch, **self.kwargs)['signal']
+                for ch in range(2)]
+        data = [sig.astype(np.float64) for sig in data]
+        ex = sps.csd(data[0][0::3], data[1][0::3], nperseg=64,
+                     axis=-1)[1].mean(axis=0)
+        pa = sps.welch(data[0][0::3], nperseg=64,
+                       axis=-1)[1].mean(axis=0)
+        pb = sps.welch(data[1][0::3], nperseg=64,
+                       axis=-1)[1].mean(axis=0)
+        np.testing.assert_allclose(corr['coherence'][0, 0],
+                                   np.abs(ex) ** 2 / (pa * pb),
+                                   atol=1e-10)
+
+        # all shots together
+        corr = HDFReadCorrelation(_bf, [(0, 0), (0, 2)],
+                                  **self.kwargs)
+        self.assertEqual(corr.dtype.names[0], 'nshots')
+        self.assertEqual(corr['nshots'][0], 30)
+        self.assertIsNone(corr.info['by'])
+
+    @with_bf
+    def test_read_correlation(self, _bf: File):
+        """Test `File.read_correlation`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadcorrelation.'
+                'HDFReadCorrelation',
+                side_effect=HDFReadCorrelation) as mock_rc:
+            corr = _bf.read_correlation([(0, 0), (0, 1)], maxlag=5,
+                                        chunk_size=10, **self.kwargs)
+            self.assertTrue(mock_rc.called)
+            self.assertEqual(mock_rc.call_args[1]['chunk_size'], 10)
+        self.assertIsInstance(corr, HDFReadCorrelation)
+        self.assertEqual(corr['xcorr'].shape, (1, 1, 11))
+
+
+if __name__ == '__main__':
+    ut.main()
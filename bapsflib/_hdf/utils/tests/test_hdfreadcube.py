@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadcube import HDFReadCube
+
+
+class TestHDFReadCube(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadcube.HDFReadCube`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301' and
+    #   control '6K Compumotor'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        self.f.add_module('6K Compumotor')
+        dset_path = 'Raw data + config/SIS 3301/config01 [0:0]'
+        rng = np.random.RandomState(0)
+        self.f[dset_path][...] = rng.randint(
+            0, 2 ** 10, size=(50, 100)).astype(np.int16)
+
+        # 3 x 2 grid
+        # - x = -1, 1, 3
+        # - y = -0.25, 0.25
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        mlgroup = [cgroup[name] for name in cgroup
+                   if name.startswith('Motion list')][0]
+        mlgroup.attrs.update({
+            'Nx': np.uint32(3), 'Ny': np.uint32(2),
+            'Delta x': np.float64(2.0), 'Delta y': np.float64(0.5),
+            'Grid center x': np.float64(1.0),
+            'Grid center y': np.float64(0.0),
+        })
+
+        # shots raster the grid (y fastest) with some jitter
+        # - shot 8 is off the grid
+        cdset = [cgroup[name] for name in cgroup
+                 if name.startswith('XY[')][0]
+        cdata = cdset[...]
+        cell = (cdata['Shot number'] - 1) % 6
+        cdata['x'] = -1.0 + 2.0 * (cell // 2) \
+            + rng.uniform(-0.1, 0.1, size=cell.shape)
+        cdata['y'] = -0.25 + 0.5 * (cell % 2)
+        cdata['x'][cdata['Shot number'] == 8] = 0.0
+        cdset[...] = cdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for kwargs in ({'reduce': 'median'}, {'tol': -0.1},
+                       {'tol': 0.5}, {'motion_list': 'foo'}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFReadCube(_bf, 0, 0, ['6K Compumotor'], **kwargs,
+                            **self.kwargs)
+
+        # controls must define motion lists
+        with self.assertRaises(ValueError):
+            HDFReadCube(_bf, 0, 0, None, **self.kwargs)
+
+        # `hdf_file` is not a bapsflib File
+        with self.assertRaises(TypeError):
+            HDFReadCube(self.f, 0, 0, ['6K Compumotor'],
+                        **self.kwargs)
+
+    @with_bf
+    def test_cube(self, _bf: File):
+        """Test cube assembly against a full read."""
+        data = _bf.read_data(0, 0, add_controls=['6K Compumotor'],
+                             silent=True, **self.kwargs)
+        cell = (data['shotnum'] - 1) % 6
+        on_grid = data['shotnum'] != 8
+        for chunk_size in (None, 7):
+            with self.subTest(chunk_size=chunk_size), \
+                    self.assertWarns(UserWarning):
+                cube = HDFReadCube(_bf, 0, 0, ['6K Compumotor'],
+                                   chunk_size=chunk_size,
+                                   **self.kwargs)
+                self.assertIsInstance(cube, HDFReadCube)
+                self.assertEqual(cube.shape, (3, 2, 1, 9, 100))
+                np.testing.assert_array_equal(cube.info['x'],
+                                              [-1., 1., 3.])
+                np.testing.assert_array_equal(cube.info['y'],
+                                              [-0.25, 0.25])
+                np.testing.assert_array_equal(
+                    cube.info['counts'][..., 0],
+                    [[9, 8], [8, 8], [8, 8]])
+                self.assertEqual(cube.info['shotnum'].shape,
+                                 (3, 2, 1, 9))
+
+                for ii in range(6):
+                    ix, iy = divmod(ii, 2)
+                    mask = (cell == ii) & on_grid
+                    nshots = np.count_nonzero(mask)
+                    np.testing.assert_array_equal(
+                        cube.info['shotnum'][ix, iy, 0, :nshots],
+                        data['shotnum'][mask])
+                    np.testing.assert_array_equal(
+                        cube[ix, iy, 0, :nshots], data['signal'][mask])
+                    self.assertTrue(
+                        np.all(np.isnan(cube[ix, iy, 0, nshots:])))
+
+        # averaged cube
+        cube = _bf.read_cube(0, 0, ['6K Compumotor'], reduce='mean',
+                             chunk_size=7, silent=True, **self.kwargs)
+        self.assertEqual(cube.shape, (3, 2, 1, 100))
+        for ii in range(6):
+            ix, iy = divmod(ii, 2)
+            mask = (cell == ii) & on_grid
+            np.testing.assert_allclose(
+                cube[ix, iy, 0], data['signal'][mask].mean(axis=0),
+                rtol=1e-6)
+
+        # tighter tolerance drops the jittered shots
+        cube = _bf.read_cube(0, 0, ['6K Compumotor'], tol=0.01,
+                             keep_bits=True, silent=True,
+                             **self.kwargs)
+        self.assertLess(cube.info['counts'].sum(), 49)
+        self.assertEqual(cube.dtype, np.int16)
+
+    @with_bf
+    def test_read_cube(self, _bf: File):
+        """Test `File.read_cube`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadcube.HDFReadCube',
+                side_effect=HDFReadCube) as mock_rc:
+            cube = _bf.read_cube(0, 0, ['6K Compumotor'],
+                                 reduce='mean', silent=True,
+                                 **self.kwargs)
+            self.assertTrue(mock_rc.called)
+            self.assertEqual(mock_rc.call_args[1]['reduce'], 'mean')
+        self.assertIsInstance(cube, HDFReadCube)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -24,10 +24,11 @@ from unittest import mock
 from . import (TestBase, with_bf)
 from ..file import File
 from ..hdfreadcontrols import HDFReadControls
-from ..hdfreaddata import (build_sndr_for_simple_dset,
-                           condition_shotnum,
-                           do_shotnum_intersection,
+from ..hdfreaddata import (estimate_read_memory,
+                           HDFDataColumns,
                            HDFReadData)
+from ..helpers import (build_sndr_for_simple_dset, condition_shotnum,
+                       do_shotnum_intersection)
 
 
 class TestHDFReadData(TestBase):
@@ -505,7 +506,7 @@ class TestHDFReadData(TestBase):
 
     @with_bf
     @mock.patch(
-        'bapsflib._hdf.utils.hdfreaddata.do_shotnum_intersection',
+        'bapsflib._hdf.utils.helpers.do_shotnum_intersection',
         side_effect=do_shotnum_intersection)
     def test_kwarg_intersection_set(self, _bf: File, mock_inter):
         """Test behavior of keyword `intersection_set`."""
@@ -608,6 +609,191 @@ class TestHDFReadData(TestBase):
         self.assertFalse(mock_inter.called)
         mock_inter.reset_mock()
 
+    @with_bf
+    def test_kwarg_layout(self, _bf: File):
+        """Test behavior of keyword `layout`."""
+        # setup
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        self.f.add_module('6K Compumotor', {'sn_size': 40})
+        _bf._map_file()  # re-map file
+        kwargs = {'digitizer': 'SIS 3301',
+                  'adc': 'SIS 3301',
+                  'config_name': 'config01',
+                  'add_controls': ['6K Compumotor']}
+
+        # invalid layout
+        with self.assertRaises(ValueError):
+            HDFReadData(_bf, 0, 0, layout='rows', **kwargs)
+
+        # columns hold the same values as the records
+        for extra in ({},
+                      {'intersection_set': False},
+                      {'keep_bits': True},
+                      {'index': [3, 7]}):
+            with self.subTest(**extra):
+                ref = HDFReadData(_bf, 0, 0, **extra, **kwargs)
+                data = HDFReadData(_bf, 0, 0, layout='columns',
+                                   **extra, **kwargs)
+                self.assertIsInstance(data, HDFDataColumns)
+                self.assertEqual(data.names, ref.dtype.names)
+                self.assertEqual(data.shape, ref.shape)
+                self.assertEqual(len(data), ref.shape[0])
+                self.assertIn('xyz', data)
+                for name in ref.dtype.names:
+                    self.assertTrue(
+                        data[name].flags['C_CONTIGUOUS'])
+                    self.assertEqual(data[name].dtype,
+                                     ref.dtype[name].base)
+                    np.testing.assert_array_equal(data[name],
+                                                  ref[name])
+                self.assertEqual(data.info.keys(), ref.info.keys())
+                self.assertEqual(data.info['signal units'],
+                                 ref.info['signal units'])
+                self.assertEqual(data.dt, ref.dt)
+                self.assertEqual(data.dv, ref.dv)
+
+                # back to records
+                records = data.to_records()
+                self.assertIsInstance(records, HDFReadData)
+                self.assertEqual(records.dtype, ref.dtype)
+                np.testing.assert_array_equal(records['signal'],
+                                              ref['signal'])
+                self.assertEqual(records.info.keys(),
+                                 ref.info.keys())
+                self.assertIsNot(records.info, data.info)
+                self.assertIn('gamma', records._plasma)
+
+        # columns must have the same length
+        with self.assertRaises(ValueError):
+            HDFDataColumns({'shotnum': np.arange(3),
+                            'signal': np.zeros((2, 5))})
+
+    @with_bf
+    def test_kwarg_missing(self, _bf: File):
+        """Test behavior of keyword `missing`."""
+        # setup
+        # - the digitizer records shot numbers 1-50 and the control
+        #   device 1-40
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        self.f.add_module('6K Compumotor', {'sn_size': 40})
+        _bf._map_file()  # re-map file
+        kwargs = {'digitizer': 'SIS 3301',
+                  'adc': 'SIS 3301',
+                  'config_name': 'config01',
+                  'add_controls': ['6K Compumotor'],
+                  'shotnum': np.arange(1, 61),
+                  'intersection_set': False}
+
+        # invalid `missing`, or not with layout='columns'
+        with self.assertRaises(ValueError):
+            HDFReadData(_bf, 0, 0, missing='drop', **kwargs)
+        with self.assertRaises(ValueError):
+            HDFReadData(_bf, 0, 0, missing='mask', **kwargs)
+
+        # masked union matches the NULL filled union
+        ref = HDFReadData(_bf, 0, 0, **kwargs)
+        data = HDFReadData(_bf, 0, 0, layout='columns',
+                           missing='mask', **kwargs)
+        self.assertIsInstance(data, HDFDataColumns)
+        self.assertEqual(data.shape, (60,))
+        np.testing.assert_array_equal(data['shotnum'], ref['shotnum'])
+        self.assertEqual(list(data.valid),
+                         ['SIS 3301', '6K Compumotor'])
+        np.testing.assert_array_equal(data.valid['SIS 3301'],
+                                      ref['shotnum'] <= 50)
+        np.testing.assert_array_equal(data.valid['6K Compumotor'],
+                                      ref['shotnum'] <= 40)
+
+        # only the recorded signals are stored
+        present = data.valid['SIS 3301']
+        self.assertEqual(data['signal'].shape, (50, 100))
+        np.testing.assert_array_equal(data.signal_rows[present],
+                                      np.arange(50))
+        self.assertTrue(np.all(data.signal_rows[~present] == -1))
+        np.testing.assert_array_equal(data['signal'],
+                                      ref['signal'][present])
+
+        # control fields are zero where not recorded
+        cvalid = data.valid['6K Compumotor']
+        np.testing.assert_array_equal(data['xyz'][cvalid],
+                                      ref['xyz'][cvalid])
+        self.assertTrue(np.all(data['xyz'][~cvalid] == 0))
+
+        # expanding to records restores the NULL fill
+        records = data.to_records()
+        np.testing.assert_array_equal(records['signal'], ref['signal'])
+
+        # no masks without missing='mask'
+        data = HDFReadData(_bf, 0, 0, layout='columns', **kwargs)
+        self.assertIsNone(data.valid)
+        self.assertIsNone(data.signal_rows)
+
+        # `signal_rows` must match the 'signal' rows
+        with self.assertRaises(ValueError):
+            HDFDataColumns({'shotnum': np.arange(3),
+                            'signal': np.zeros((3, 5))},
+                           signal_rows=np.array([0, -1, 1]))
+
+    @with_bf
+    def test_kwarg_max_memory(self, _bf: File):
+        """Test behavior of keyword `max_memory`."""
+        # setup
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 20, 'nt': 100})
+        _bf._map_file()  # re-map file
+        kwargs = {'digitizer': 'SIS 3301',
+                  'adc': 'SIS 3301',
+                  'config_name': 'config01'}
+        data = HDFReadData(_bf, 0, 0, **kwargs)
+        dset = _bf.get(data.info['device dataset path'])
+
+        # output plus the voltage conversion temporaries
+        nbytes = estimate_read_memory(data.dtype, 20, 20, dset, 20,
+                                      False)
+        self.assertEqual(nbytes, data.nbytes + 2 * 20 * 100 * 4)
+        self.assertEqual(
+            estimate_read_memory(data.dtype, 20, 20, dset, 20, True),
+            data.nbytes + 20 * 100 * dset.dtype.itemsize)
+
+        # within and over the budget
+        data = HDFReadData(_bf, 0, 0, max_memory=nbytes, **kwargs)
+        self.assertEqual(data.shape, (20,))
+        with self.assertRaisesRegex(MemoryError,
+                                    r'20 shots x 100 samples'):
+            HDFReadData(_bf, 0, 0, max_memory=nbytes - 1, **kwargs)
+
+        # fewer shots fit the budget
+        data = HDFReadData(_bf, 0, 0, shotnum=slice(1, 11),
+                           max_memory=nbytes // 2, **kwargs)
+        self.assertEqual(data.shape, (10,))
+
+        # the budget is checked before the control data is read
+        self.f.add_module('6K Compumotor', {'sn_size': 20})
+        _bf._map_file()  # re-map file
+        with mock.patch('bapsflib._hdf.utils.hdfreaddata.'
+                        'HDFReadControls') as mock_rc, \
+                self.assertRaises(MemoryError):
+            HDFReadData(_bf, 0, 0, add_controls=['6K Compumotor'],
+                        max_memory=nbytes, **kwargs)
+        self.assertFalse(mock_rc.called)
+        data = HDFReadData(_bf, 0, 0, add_controls=['6K Compumotor'],
+                           **kwargs)
+        cdata = HDFReadControls(_bf, ['6K Compumotor'])
+        nbytes = estimate_read_memory(data.dtype, 20, 20, dset, 20,
+                                      False) + cdata.nbytes
+        data = HDFReadData(_bf, 0, 0, add_controls=['6K Compumotor'],
+                           max_memory=nbytes, **kwargs)
+        self.assertEqual(data.shape, (20,))
+
+        # invalid budgets
+        for max_memory in (0, 1.5, True, '1GB'):
+            with self.subTest(max_memory=max_memory), \
+                    self.assertRaises(ValueError):
+                HDFReadData(_bf, 0, 0, max_memory=max_memory,
+                            **kwargs)
+
     @with_bf
     def test_misc_behavior(self, _bf: File):
         """Test miscellaneous behavior"""
@@ -866,13 +1052,13 @@ class TestHDFReadData(TestBase):
             self.assertDataObj(data, _bf)
 
     @with_bf
-    @mock.patch('bapsflib._hdf.utils.hdfreaddata.condition_shotnum',
+    @mock.patch('bapsflib._hdf.utils.helpers.condition_shotnum',
                 side_effect=condition_shotnum)
     @mock.patch(
-        'bapsflib._hdf.utils.hdfreaddata.build_sndr_for_simple_dset',
+        'bapsflib._hdf.utils.helpers.build_sndr_for_simple_dset',
         side_effect=build_sndr_for_simple_dset)
     @mock.patch(
-        'bapsflib._hdf.utils.hdfreaddata.do_shotnum_intersection',
+        'bapsflib._hdf.utils.helpers.do_shotnum_intersection',
         side_effect=do_shotnum_intersection)
     def test_read_w_shotnum(self, _bf: File, mock_inter,
                             mock_build_sndr, mock_cs):
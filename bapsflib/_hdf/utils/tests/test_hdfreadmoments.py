@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import pickle
+import unittest as ut
+
+from scipy import stats as sps
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadmoments import (HDFReadMoments, SignalMoments)
+
+
+class TestSignalMoments(ut.TestCase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadmoments.SignalMoments`
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.values = rng.gamma(2.0, 1.5, size=(60, 40)) + 100.0
+        self.keys = np.zeros(60, dtype=[('FREQ', np.float64)])
+        self.keys['FREQ'] = np.arange(60) % 3
+        self.edges = np.linspace(100.0, 110.0, 21)
+
+    def assert_moments(self, moments: SignalMoments, values):
+        """Compare group 0 of **moments** to scipy.stats."""
+        samples = values.ravel()
+        self.assertEqual(moments.count[0], samples.size)
+        np.testing.assert_allclose(moments.mean[0], samples.mean())
+        np.testing.assert_allclose(moments.var[0], samples.var())
+        np.testing.assert_allclose(moments.std[0], samples.std())
+        np.testing.assert_allclose(moments.skewness[0],
+                                   sps.skew(samples))
+        np.testing.assert_allclose(moments.kurtosis[0],
+                                   sps.kurtosis(samples))
+        self.assertEqual(moments.min[0], samples.min())
+        self.assertEqual(moments.max[0], samples.max())
+        if moments.hist is not None:
+            np.testing.assert_array_equal(
+                moments.hist[0],
+                np.histogram(samples, bins=moments.bin_edges)[0])
+
+    def test_raises(self):
+        """Test exceptions."""
+        for kwargs in ({'key_dtype': np.float64},
+                       {'bins': 10},
+                       {'bins': 0, 'hist_range': (0., 1.)},
+                       {'bins': 10, 'hist_range': (1., 0.)},
+                       {'bins': [0., 1., 1.]},
+                       {'bins': [1.]},
+                       {'order': 5},
+                       {'bins': self.edges, 'sample_shape': (40,)}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                SignalMoments(**kwargs)
+
+        # keys must match the key dtype
+        moments = SignalMoments(key_dtype=self.keys.dtype)
+        with self.assertRaises(ValueError):
+            moments.update(self.values)
+        with self.assertRaises(ValueError):
+            moments.update(self.values, self.keys[:-1])
+
+        # only like accumulators are merged
+        with self.assertRaises(ValueError):
+            moments.merge(SignalMoments())
+        with self.assertRaises(ValueError):
+            SignalMoments(bins=self.edges).merge(SignalMoments())
+        with self.assertRaises(ValueError):
+            SignalMoments().merge(SignalMoments(order=2))
+
+        # rows must match the sample shape
+        with self.assertRaises(ValueError):
+            SignalMoments(sample_shape=(30,)).update(self.values)
+
+        # moments above `order` are not accumulated
+        moments = SignalMoments(order=2)
+        moments.update(self.values)
+        self.assertIsNone(moments.m3)
+        with self.assertRaises(ValueError):
+            moments.skewness
+
+    def test_ungrouped(self):
+        """Test block and merge invariance of one group."""
+        # one block
+        moments = SignalMoments(bins=self.edges)
+        moments.update(self.values)
+        self.assertEqual(len(moments), 1)
+        self.assert_moments(moments, self.values)
+
+        # many blocks
+        moments = SignalMoments(bins=20, hist_range=(100., 110.))
+        np.testing.assert_allclose(moments.bin_edges, self.edges)
+        for start in range(0, 60, 7):
+            moments.update(self.values[start:start + 7])
+        moments.update(self.values[:0])
+        self.assert_moments(moments, self.values)
+
+        # merged workers, including a pickled (process) worker
+        parts = []
+        for rows in (slice(0, 10), slice(10, 45), slice(45, None)):
+            part = SignalMoments(bins=self.edges)
+            part.update(self.values[rows])
+            parts.append(pickle.loads(pickle.dumps(part)))
+        moments = SignalMoments(bins=self.edges)
+        for part in parts:
+            moments.merge(part)
+        moments.merge(SignalMoments(bins=self.edges))
+        self.assert_moments(moments, self.values)
+
+    def test_sample_shape(self):
+        """Test moments kept per sample position."""
+        moments = SignalMoments(key_dtype=self.keys.dtype,
+                                sample_shape=(40,))
+        for start in range(0, 60, 7):
+            moments.update(self.values[start:start + 7],
+                           self.keys[start:start + 7])
+        self.assertEqual(moments.mean.shape, (3, 40))
+        for ii in range(3):
+            values = self.values[self.keys['FREQ'] == ii]
+            self.assertEqual(moments.count[ii], values.shape[0])
+            np.testing.assert_allclose(moments.mean[ii],
+                                       values.mean(axis=0))
+            np.testing.assert_allclose(moments.var[ii],
+                                       values.var(axis=0))
+            np.testing.assert_allclose(moments.skewness[ii],
+                                       sps.skew(values, axis=0))
+            np.testing.assert_allclose(moments.kurtosis[ii],
+                                       sps.kurtosis(values, axis=0))
+            np.testing.assert_array_equal(moments.min[ii],
+                                          values.min(axis=0))
+            np.testing.assert_array_equal(moments.max[ii],
+                                          values.max(axis=0))
+
+    def test_grouped(self):
+        """Test grouping by key."""
+        moments = SignalMoments(key_dtype=self.keys.dtype)
+        moments.update(self.values[30:], self.keys[30:])
+        other = SignalMoments(key_dtype=self.keys.dtype)
+        other.update(self.values[:30][::-1], self.keys[:30][::-1])
+        moments.merge(other)
+
+        # groups in order of first appearance
+        np.testing.assert_array_equal(moments.keys['FREQ'],
+                                      [0., 1., 2.])
+        for ii in range(3):
+            group = SignalMoments()
+            group.update(self.values[self.keys['FREQ'] == ii])
+            for name in ('count', 'mean', 'var', 'skewness',
+                         'kurtosis', 'min', 'max'):
+                np.testing.assert_allclose(
+                    getattr(moments, name)[ii],
+                    getattr(group, name)[0])
+
+
+class TestHDFReadMoments(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadmoments.HDFReadMoments`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301' and
+    #   control '6K Compumotor'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        self.f.add_module('6K Compumotor')
+        dset_path = 'Raw data + config/SIS 3301/config01 [0:0]'
+        rng = np.random.RandomState(0)
+        self.f[dset_path][...] = rng.randint(
+            0, 2 ** 10, size=(50, 100)).astype(np.int16)
+
+        # 5 probe positions, visited in a repeating pattern
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        cdset = [cgroup[name] for name in cgroup
+                 if name.startswith('XY[')][0]
+        cdata = cdset[...]
+        cdata['x'] = (cdata['Shot number'] - 1) % 5
+        cdset[...] = cdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        # `by` without control devices
+        with self.assertRaises(ValueError):
+            HDFReadMoments(_bf, 0, 0, by='xyz', **self.kwargs)
+
+        # `by` field not in the read data
+        with self.assertRaises(ValueError):
+            HDFReadMoments(_bf, 0, 0, by='foo',
+                           add_controls=['6K Compumotor'],
+                           **self.kwargs)
+
+    @with_bf
+    def test_moments(self, _bf: File):
+        """Test grouped moments against a full read."""
+        data = _bf.read_data(0, 0, add_controls=['6K Compumotor'],
+                             keep_bits=True, silent=True,
+                             **self.kwargs)
+        signal = data['signal'].astype(np.float64)
+        xvals = (data['shotnum'] - 1) % 5
+        for chunk_size in (None, 7):
+            with self.subTest(chunk_size=chunk_size):
+                mom = HDFReadMoments(_bf, 0, 0, by='xyz', bins=16,
+                                     hist_range=(0, 1024),
+                                     keep_bits=True,
+                                     add_controls=['6K Compumotor'],
+                                     chunk_size=chunk_size,
+                                     **self.kwargs)
+                self.assertIsInstance(mom, HDFReadMoments)
+                self.assertEqual(
+                    mom.dtype.names,
+                    ('xyz', 'nsamples', 'mean', 'var', 'skewness',
+                     'kurtosis', 'min', 'max', 'hist'))
+                self.assertEqual(mom.shape, (5,))
+                self.assertEqual(mom.info['by'], ('xyz',))
+                self.assertEqual(mom.info['nsamples'], 5000)
+                self.assertEqual(mom.info['bin edges'].shape, (17,))
+                np.testing.assert_array_equal(mom['xyz'][:, 0],
+                                              np.arange(5))
+                for ii in range(5):
+                    samples = signal[xvals == ii].ravel()
+                    self.assertEqual(mom['nsamples'][ii], 1000)
+                    np.testing.assert_allclose(mom['mean'][ii],
+                                               samples.mean())
+                    np.testing.assert_allclose(mom['var'][ii],
+                                               samples.var())
+                    np.testing.assert_allclose(mom['skewness'][ii],
+                                               sps.skew(samples))
+                    np.testing.assert_allclose(mom['kurtosis'][ii],
+                                               sps.kurtosis(samples))
+                    np.testing.assert_array_equal(
+                        mom['hist'][ii],
+                        np.histogram(samples, bins=16,
+                                     range=(0, 1024))[0])
+
+        # all shots pooled, no histogram
+        mom = HDFReadMoments(_bf, 0, 0, keep_bits=True, **self.kwargs)
+        self.assertEqual(mom.dtype.names,
+                         ('nsamples', 'mean', 'var', 'skewness',
+                          'kurtosis', 'min', 'max'))
+        self.assertEqual(mom.shape, (1,))
+        np.testing.assert_allclose(mom['kurtosis'][0],
+                                   sps.kurtosis(signal.ravel()))
+        self.assertIsNone(mom.info['by'])
+
+    @with_bf
+    def test_read_moments(self, _bf: File):
+        """Test `File.read_moments`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadmoments.HDFReadMoments',
+                side_effect=HDFReadMoments) as mock_rm:
+            mom = _bf.read_moments(0, 0, bins=[0., 0.5, 1.],
+                                   chunk_size=10, **self.kwargs)
+            self.assertTrue(mock_rm.called)
+            self.assertEqual(mock_rm.call_args[1]['chunk_size'], 10)
+        self.assertIsInstance(mom, HDFReadMoments)
+        self.assertEqual(mom['hist'].shape, (1, 2))
+
+
+if __name__ == '__main__':
+    ut.main()
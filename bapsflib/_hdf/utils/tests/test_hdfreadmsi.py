@@ -15,6 +15,8 @@ import numpy as np
 import os
 import unittest as ut
 
+from unittest import mock
+
 from . import (TestBase, with_bf)
 from ..file import File
 from ..hdfreadmsi import HDFReadMSI
@@ -103,6 +105,29 @@ class TestHDFReadMSI(TestBase):
         self.assertDataObj(self.read(_bf, 'Interferometer array'),
                            _bf, _map)
 
+    @with_bf
+    def test_max_memory(self, _bf: File):
+        """Test the memory budget `max_memory`."""
+        self.f.add_module('Discharge')
+        _bf._map_file()  # re-map file
+        data = HDFReadMSI(_bf, 'Discharge', max_memory=2**30)
+        self.assertEqual(data.shape,
+                         _bf.file_map.msi['Discharge'].configs['shape'])
+
+        # the budget is checked before the array is allocated
+        with mock.patch.object(np, 'empty',
+                               side_effect=np.empty) as mock_empty:
+            with self.assertRaises(MemoryError):
+                HDFReadMSI(_bf, 'Discharge', max_memory=data.nbytes - 1)
+            self.assertFalse(mock_empty.called)
+        HDFReadMSI(_bf, 'Discharge', max_memory=data.nbytes)
+
+        # invalid budgets
+        for max_memory in (0, -1, 1.5, True):
+            with self.subTest(max_memory=max_memory), \
+                    self.assertRaises(ValueError):
+                HDFReadMSI(_bf, 'Discharge', max_memory=max_memory)
+
     def assertDataObj(self, _data: HDFReadMSI, _bf, _map):
         # data is a structured numpy array
         self.assertIsInstance(_data, np.ndarray)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreaddata import HDFDataColumns
+from ..hdfreadplan import (HDFReadPlan, _count_chunks)
+
+
+class TestHDFReadPlan(TestBase):
+    """
+    Test Case for :class:`~bapsflib._hdf.utils.hdfreadplan.HDFReadPlan`
+    """
+    #
+    # Notes:
+    # - tests are performed on digitizer 'SIS 3301' (shot numbers 1-20,
+    #   channels 0-2 of board 0) and control '6K Compumotor' (shot
+    #   numbers 1-15)
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 20, 'nt': 100})
+        self.f.add_module('6K Compumotor', {'sn_size': 15})
+        brdch = np.zeros((13, 8), dtype=bool)
+        brdch[0, 0:3] = True
+        self.f.modules['SIS 3301'].knobs.active_brdch = brdch
+        for ch in range(3):
+            dset = self.f['Raw data + config/SIS 3301/'
+                          'config01 [0:{}]'.format(ch)]
+            dset[...] = np.arange(20, dtype=np.int16)[:, None] + ch
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        with self.assertRaises(TypeError):
+            HDFReadPlan(self.f, 0, 0, **self.kwargs)
+        for kwargs in ({'layout': 'rows'},
+                       {'missing': 'drop'},
+                       {'missing': 'mask'},
+                       {'digitizer': 'foo'}):
+            with self.subTest(kwargs=kwargs), \
+                    self.assertRaises(ValueError):
+                HDFReadPlan(_bf, 0, 0, **{**self.kwargs, **kwargs})
+
+        # channel not sharing the planned layout
+        plan = HDFReadPlan(_bf, 0, 0, **self.kwargs)
+        dset = mock.MagicMock(shape=(20, 50),
+                              dtype=plan._dset.dtype)
+        with mock.patch.object(HDFReadPlan, '_get_dset',
+                               return_value=dset), \
+                self.assertRaises(ValueError):
+            plan.execute(channel=1)
+
+    @with_bf
+    def test_plan(self, _bf: File):
+        """Test planning and executing an intersection read."""
+        plan = HDFReadPlan(_bf, 0, 0, add_controls=['6K Compumotor'],
+                           **self.kwargs)
+        ref = _bf.read_data(0, 0, add_controls=['6K Compumotor'],
+                            silent=True, **self.kwargs)
+        np.testing.assert_array_equal(plan.shotnum, np.arange(1, 16))
+        np.testing.assert_array_equal(plan.index, np.arange(15))
+        self.assertEqual(plan.shape, ref.shape)
+        self.assertEqual(plan.dtype, ref.dtype)
+        self.assertEqual(plan.info['digitizer'], 'SIS 3301')
+        self.assertEqual(plan.info['adc'], 'SIS 3301')
+        self.assertEqual([name for name, _ in plan.info['controls']],
+                         ['6K Compumotor'])
+
+        # estimates
+        estimates = plan.estimates
+        self.assertEqual(set(estimates),
+                         {'bytes read', 'read calls', 'chunks',
+                          'output bytes', 'peak memory'})
+        self.assertEqual(estimates['output bytes'], ref.nbytes)
+        self.assertGreaterEqual(estimates['bytes read'], 15 * 100 * 2)
+        self.assertGreater(estimates['read calls'], 3)
+        self.assertGreater(estimates['peak memory'],
+                           estimates['output bytes'])
+
+        # execute planned and other channels
+        for ch in range(3):
+            with self.subTest(channel=ch):
+                data = plan.execute(channel=ch)
+                ref = _bf.read_data(0, ch,
+                                    add_controls=['6K Compumotor'],
+                                    silent=True, **self.kwargs)
+                self.assertEqual(data.info['channel'], ch)
+                np.testing.assert_array_equal(data, ref)
+
+        # the planned channel reuses the planned conditioning
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreaddata.condition_index_shotnum'
+        ) as mock_cis:
+            data = plan.execute()
+            self.assertFalse(mock_cis.called)
+        np.testing.assert_array_equal(data['shotnum'], plan.shotnum)
+
+        # keep_bits
+        plan = HDFReadPlan(_bf, 0, 0, keep_bits=True, **self.kwargs)
+        data = plan.execute()
+        self.assertEqual(plan.dtype, data.dtype)
+        self.assertEqual(plan.estimates['output bytes'], data.nbytes)
+
+    @with_bf
+    def test_union(self, _bf: File):
+        """Test planning a union read."""
+        kwargs = {'shotnum': np.arange(11, 26),
+                  'add_controls': ['6K Compumotor'],
+                  'intersection_set': False,
+                  'layout': 'columns'}
+        kwargs.update(self.kwargs)
+        plan = HDFReadPlan(_bf, 0, 0, **kwargs)
+        np.testing.assert_array_equal(plan.shotnum, np.arange(11, 26))
+        np.testing.assert_array_equal(plan.index, np.arange(10, 20))
+
+        ref = _bf.read_data(0, 1, silent=True, **kwargs)
+        data = plan.execute(channel=1)
+        self.assertIsInstance(data, HDFDataColumns)
+        for name in ref.names:
+            np.testing.assert_array_equal(data[name], ref[name])
+
+        # the masked 'signal' only holds the recorded shots
+        mplan = HDFReadPlan(_bf, 0, 0, missing='mask', **kwargs)
+        self.assertEqual(
+            plan.estimates['output bytes']
+            - mplan.estimates['output bytes'],
+            5 * plan.dtype['signal'].itemsize)
+        data = mplan.execute()
+        self.assertEqual(data['signal'].shape, (10, 100))
+
+    def test_count_chunks(self):
+        """Test counting of the chunks touched by a read."""
+        dset = self.f.create_dataset('chunked', shape=(100, 10),
+                                     chunks=(10, 4), dtype=np.int16)
+        self.assertEqual(_count_chunks(dset, np.array([0, 5, 15, 99])),
+                         9)
+        self.assertEqual(_count_chunks(dset, np.array([], dtype=int)),
+                         0)
+        dset = self.f.create_dataset('contiguous', shape=(100, 10),
+                                     dtype=np.int16)
+        self.assertEqual(_count_chunks(dset, np.arange(100)), 0)
+
+    @with_bf
+    def test_plan_read(self, _bf: File):
+        """Test `File.plan_read`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadplan.HDFReadPlan',
+                side_effect=HDFReadPlan) as mock_rp:
+            plan = _bf.plan_read(0, 0, shotnum=[1, 2], **self.kwargs)
+            self.assertTrue(mock_rp.called)
+            self.assertEqual(mock_rp.call_args[1]['shotnum'], [1, 2])
+        self.assertIsInstance(plan, HDFReadPlan)
+        np.testing.assert_array_equal(plan.shotnum, [1, 2])
+
+
+if __name__ == '__main__':
+    ut.main()
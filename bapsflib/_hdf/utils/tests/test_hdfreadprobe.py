@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadprobe import (HDFReadProbe, parse_probe_channels)
+
+
+class TestParseProbeChannels(ut.TestCase):
+    """
+    Test Case for
+    :func:`~bapsflib._hdf.utils.hdfreadprobe.parse_probe_channels`
+    """
+
+    def test_parse(self):
+        for value, expected in (
+                (None, []),
+                ('', []),
+                ('1:1, 1:2,1:3', [(1, 1), (1, 2), (1, 3)]),
+                ('[0:1] [2 : 7]', [(0, 1), (2, 7)]),
+                ('3:4, 3:4', [(3, 4)])):
+            with self.subTest(value=value):
+                self.assertEqual(parse_probe_channels(value), expected)
+
+
+class TestHDFReadProbe(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadprobe.HDFReadProbe`
+    """
+    #
+    # Notes:
+    # - tests are performed on digitizer 'SIS 3301' and control
+    #   '6K Compumotor' with probes on receptacles 1 and 2
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 20, 'nt': 100})
+        self.f.add_module('6K Compumotor',
+                          {'n_configs': 2, 'sn_size': 20})
+        brdch = np.zeros((13, 8), dtype=bool)
+        brdch[0, 0:3] = True
+        self.f.modules['SIS 3301'].knobs.active_brdch = brdch
+        for ch in range(3):
+            dset = self.f['Raw data + config/SIS 3301/'
+                          'config01 [0:{}]'.format(ch)]
+            dset[...] = np.full(dset.shape, ch, dtype=np.int16)
+
+        # receptacle 2 records on channels 1 and 2
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        cgroup['Probe: XY[2]: probe02'].attrs['Probe channels'] = \
+            np.bytes_('0:1, 0:2')
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        # receptacle not among the probe lists
+        with self.assertRaises(ValueError):
+            HDFReadProbe(_bf, 5, **self.kwargs)
+
+        # no 'probe channels' in the probe list
+        with self.assertRaises(ValueError):
+            HDFReadProbe(_bf, 1, **self.kwargs)
+
+        # no '6K Compumotor'
+        with mock.patch.object(
+                type(_bf.file_map.controls), '__getitem__',
+                side_effect=KeyError):
+            with self.assertRaises(ValueError):
+                HDFReadProbe(_bf, 2, **self.kwargs)
+
+        with self.assertRaises(TypeError):
+            HDFReadProbe(self.f, 2, **self.kwargs)
+
+    @with_bf
+    def test_read(self, _bf: File):
+        """Test reading the channels of a probe."""
+        data = HDFReadProbe(_bf, 2, **self.kwargs)
+        self.assertEqual(data.probe['probe name'], 'probe02')
+        self.assertEqual([(spec['board'], spec['channel'])
+                          for spec in data.channels],
+                         [(0, 1), (0, 2)])
+        self.assertEqual(data.controls.info['controls'].keys(),
+                         {'6K Compumotor'})
+        self.assertEqual(
+            data.controls.info['controls']['6K Compumotor'][
+                'configuration name'], 2)
+        for field in ('xyz', 'ptip_rot_theta', 'ptip_rot_phi'):
+            self.assertIn(field, data.controls.dtype.names)
+
+        ref = _bf.read_data(0, 1, add_controls=[('6K Compumotor', 2)],
+                            silent=True, **self.kwargs)
+        np.testing.assert_array_equal(data.shotnum, ref['shotnum'])
+        np.testing.assert_array_equal(data.controls['xyz'],
+                                      ref['xyz'])
+        for ddata in data:
+            self.assertEqual(ddata.info['probe name'], 'probe02')
+            self.assertEqual(ddata.info['port'], (27, None))
+
+        # stacked tips
+        ref2 = _bf.read_data(0, 2, silent=True, **self.kwargs)
+        signals = data.stack()
+        self.assertEqual(signals.shape, (2, 20, 100))
+        np.testing.assert_array_equal(signals[0], ref['signal'])
+        np.testing.assert_array_equal(signals[1], ref2['signal'])
+
+        # explicit channels override the probe list
+        data = HDFReadProbe(_bf, 1, channels=[(0, 0)], **self.kwargs)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0].info['probe name'], 'probe01')
+
+    @with_bf
+    def test_read_probe(self, _bf: File):
+        """Test `File.read_probe`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadprobe.HDFReadProbe',
+                side_effect=HDFReadProbe) as mock_rp:
+            data = _bf.read_probe(2, shotnum=[1, 2], **self.kwargs)
+            self.assertTrue(mock_rp.called)
+            self.assertEqual(mock_rp.call_args[1]['shotnum'], [1, 2])
+        self.assertIsInstance(data, HDFReadProbe)
+        np.testing.assert_array_equal(data.shotnum, [1, 2])
+
+
+if __name__ == '__main__':
+    ut.main()
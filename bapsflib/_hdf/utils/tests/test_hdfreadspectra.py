@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import numpy as np
+import unittest as ut
+
+from scipy import signal as sps
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadspectra import HDFReadSpectra
+
+
+class TestHDFReadSpectra(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadspectra.HDFReadSpectra`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301' and
+    #   control '6K Compumotor'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        # - 2 active channels on board 0
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 256})
+        brdch = np.zeros((13, 8), dtype=bool)
+        brdch[0, 0:2] = True
+        self.f.modules['SIS 3301'].knobs.active_brdch = brdch
+        self.f.add_module('6K Compumotor')
+        rng = np.random.RandomState(0)
+        noise = rng.randint(0, 2 ** 10, size=(50, 256))
+        for ch in range(2):
+            dset = self.f['Raw data + config/SIS 3301/'
+                          'config01 [0:{}]'.format(ch)]
+            dset[...] = (noise + rng.randint(0, 2 ** 8, size=(50, 256))
+                         ).astype(np.int16)
+
+        # 5 probe positions, visited in a repeating pattern
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        cdset = [cgroup[name] for name in cgroup
+                 if name.startswith('XY[')][0]
+        cdata = cdset[...]
+        cdata['x'] = (cdata['Shot number'] - 1) % 5
+        cdset[...] = cdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for kwargs in ({'by': 'xyz'}, {'cross': 1},
+                       {'cross': (0, 1, 2)}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFReadSpectra(_bf, 0, 0, **kwargs, **self.kwargs)
+
+    @with_bf
+    def test_spectra(self, _bf: File):
+        """Test spectra against scipy on a full read."""
+        data = [_bf.read_data(0, ch, add_controls=['6K Compumotor'],
+                              silent=True, **self.kwargs)
+                for ch in range(2)]
+        fs = 1.0 / data[0].dt.to(u.s).value
+        xvals = (data[0]['shotnum'] - 1) % 5
+        wkwargs = {'fs': fs, 'nperseg': 64, 'axis': -1}
+        for chunk_size in (None, 7):
+            with self.subTest(chunk_size=chunk_size):
+                spec = HDFReadSpectra(_bf, 0, 0, cross=(0, 1),
+                                      by='xyz', nperseg=64,
+                                      add_controls=['6K Compumotor'],
+                                      chunk_size=chunk_size,
+                                      **self.kwargs)
+                self.assertIsInstance(spec, HDFReadSpectra)
+                self.assertEqual(spec.dtype.names,
+                                 ('xyz', 'nshots', 'psd', 'psd2',
+                                  'csd'))
+                self.assertEqual(spec.shape, (5,))
+                self.assertEqual(spec.info['nshots'], 50)
+                self.assertEqual(spec.info['cross'], (0, 1))
+                freq = spec.info['frequency']
+                self.assertEqual(freq.unit, u.Hz)
+                self.assertEqual(freq.shape, (33,))
+                np.testing.assert_array_equal(spec['nshots'], 10)
+                for ii in range(5):
+                    mask = xvals == ii
+                    sig = [dat['signal'][mask] for dat in data]
+                    f, psd = sps.welch(sig[0], **wkwargs)
+                    np.testing.assert_allclose(freq.value, f)
+                    np.testing.assert_allclose(
+                        spec['psd'][ii], psd.mean(axis=0), rtol=1e-4)
+                    np.testing.assert_allclose(
+                        spec['psd2'][ii],
+                        sps.welch(sig[1], **wkwargs)[1].mean(axis=0),
+                        rtol=1e-4)
+                    np.testing.assert_allclose(
+                        spec['csd'][ii],
+                        sps.csd(sig[0], sig[1],
+                                **wkwargs)[1].mean(axis=0),
+                        rtol=1e-4)
+
+        # all shots averaged, nperseg limited to nt
+        spec = HDFReadSpectra(_bf, 0, 1, nperseg=1024, **self.kwargs)
+        self.assertEqual(spec.dtype.names, ('nshots', 'psd'))
+        self.assertEqual(spec.info['nperseg'], 256)
+        np.testing.assert_allclose(
+            spec['psd'][0],
+            sps.welch(data[1]['signal'], fs=fs,
+                      nperseg=256)[1].mean(axis=0),
+            rtol=1e-4)
+
+        # subset of shots
+        spec = HDFReadSpectra(_bf, 0, 0, cross=(0, 1),
+                              shotnum=[2, 4, 60], **self.kwargs)
+        self.assertEqual(spec['nshots'][0], 2)
+
+    @with_bf
+    def test_read_spectra(self, _bf: File):
+        """Test `File.read_spectra`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadspectra.HDFReadSpectra',
+                side_effect=HDFReadSpectra) as mock_rs:
+            spec = _bf.read_spectra(0, 0, nperseg=32, chunk_size=10,
+                                    **self.kwargs)
+            self.assertTrue(mock_rs.called)
+            self.assertEqual(mock_rs.call_args[1]['nperseg'], 32)
+        self.assertIsInstance(spec, HDFReadSpectra)
+
+
+if __name__ == '__main__':
+    ut.main()
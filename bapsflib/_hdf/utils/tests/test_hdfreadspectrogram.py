@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import h5py
+import numpy as np
+import unittest as ut
+
+from scipy import signal as sps
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreadspectrogram import (HDFReadSpectrogram,
+                                  spectrogram_shape)
+
+
+class TestHDFReadSpectrogram(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfreadspectrogram.HDFReadSpectrogram`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301' and
+    #   control '6K Compumotor'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 30, 'nt': 300})
+        self.f.add_module('6K Compumotor')
+        dset_path = 'Raw data + config/SIS 3301/config01 [0:0]'
+        rng = np.random.RandomState(0)
+        self.f[dset_path][...] = rng.randint(
+            0, 2 ** 14, size=(30, 300)).astype(np.int16)
+
+        # 3 probe positions, visited in a repeating pattern
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        cdset = [cgroup[name] for name in cgroup
+                 if name.startswith('XY[')][0]
+        cdata = cdset[...]
+        cdata['x'] = (cdata['Shot number'] - 1) % 3
+        cdset[...] = cdata
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    def read_signal(self, _bf: File):
+        """Read the full signal and its sample frequency."""
+        data = _bf.read_data(0, 0, **self.kwargs)
+        return data['signal'], 1.0 / data.dt.to(u.s).value
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        for kwargs in ({'by': 'xyz'},
+                       {'by': 'foo', 'add_controls': ['6K Compumotor']},
+                       {'mode': 'angle'},
+                       {'out': np.zeros((30, 33))},
+                       {'by': 'shotnum', 'out': np.zeros((29, 33, 5))},
+                       {'by': 'shotnum', 'out': np.zeros((30, 33, 4))},
+                       {'out': np.zeros((0, 33, 5))}):
+            with self.subTest(**kwargs), \
+                    self.assertRaises(ValueError):
+                HDFReadSpectrogram(_bf, 0, 0, nperseg=64, **kwargs,
+                                   **self.kwargs)
+
+    @with_bf
+    def test_per_shot(self, _bf: File):
+        """Test the spectrogram of every shot."""
+        signal, fs = self.read_signal(_bf)
+        freq, times, sxx = sps.spectrogram(signal, fs=fs, nperseg=64,
+                                           window='hann', axis=-1)
+        self.assertEqual(spectrogram_shape(300, nperseg=64),
+                         sxx.shape[1:])
+        self.assertEqual(spectrogram_shape(300, nperseg=500,
+                                           noverlap=0), (151, 1))
+
+        # returned in the array
+        spec = HDFReadSpectrogram(_bf, 0, 0, by='shotnum', nperseg=64,
+                                  chunk_size=7, **self.kwargs)
+        self.assertIsInstance(spec, HDFReadSpectrogram)
+        self.assertEqual(spec.dtype.names,
+                         ('shotnum', 'nshots', 'spectrogram'))
+        self.assertEqual(spec['spectrogram'].shape, (30, 33, 5))
+        np.testing.assert_array_equal(spec['shotnum'],
+                                      np.arange(1, 31))
+        np.testing.assert_allclose(spec['spectrogram'], sxx,
+                                   rtol=1e-5)
+        np.testing.assert_allclose(spec.info['frequency'].value, freq)
+        np.testing.assert_allclose(spec.info['time'].value, times)
+        self.assertEqual(spec.info['frequency'].unit, u.Hz)
+        self.assertIsNone(spec.info['out'])
+        self.assertEqual(spec.info['nshots'], 30)
+
+        # written to an HDF5 dataset, block by block
+        out_file = h5py.File('spectrograms.hdf5', 'w', driver='core',
+                             backing_store=False)
+        self.addCleanup(out_file.close)
+        out = out_file.create_dataset('spec', shape=(30, 33, 5),
+                                      dtype=np.float32)
+        writes = []
+
+        class Recorder(object):
+            shape = out.shape
+
+            def __setitem__(self, key, value):
+                writes.append(key)
+                out[key] = value
+
+        recorder = Recorder()
+        spec = HDFReadSpectrogram(_bf, 0, 0, by='shotnum', nperseg=64,
+                                  out=recorder, chunk_size=7,
+                                  **self.kwargs)
+        self.assertEqual(writes, [slice(0, 7), slice(7, 14),
+                                  slice(14, 21), slice(21, 28),
+                                  slice(28, 30)])
+        self.assertEqual(spec.dtype.names, ('shotnum', 'nshots'))
+        self.assertIs(spec.info['out'], recorder)
+        np.testing.assert_allclose(out[...], sxx, rtol=1e-5)
+
+        # complex STFT
+        spec = HDFReadSpectrogram(_bf, 0, 0, by='shotnum', nperseg=64,
+                                  mode='complex', shotnum=[4, 5],
+                                  **self.kwargs)
+        self.assertEqual(spec.dtype['spectrogram'].base,
+                         np.complex128)
+        np.testing.assert_allclose(
+            spec['spectrogram'],
+            sps.spectrogram(signal[3:5], fs=fs, nperseg=64,
+                            window='hann', mode='complex',
+                            axis=-1)[2],
+            rtol=1e-5, atol=1e-12)
+
+    @with_bf
+    def test_grouped(self, _bf: File):
+        """Test the ensemble averaged spectrograms."""
+        signal, fs = self.read_signal(_bf)
+        sxx = sps.spectrogram(signal.astype(np.float64), fs=fs,
+                              nperseg=64, noverlap=32, window='hann',
+                              axis=-1)[2]
+        for chunk_size in (None, 4):
+            with self.subTest(chunk_size=chunk_size):
+                spec = HDFReadSpectrogram(
+                    _bf, 0, 0, by='xyz', nperseg=64, noverlap=32,
+                    add_controls=['6K Compumotor'],
+                    chunk_size=chunk_size, **self.kwargs)
+                self.assertEqual(spec.dtype.names,
+                                 ('xyz', 'nshots', 'spectrogram'))
+                self.assertEqual(spec.shape, (3,))
+                self.assertEqual(spec.info['by'], ('xyz',))
+                np.testing.assert_array_equal(spec['xyz'][:, 0],
+                                              np.arange(3))
+                np.testing.assert_array_equal(spec['nshots'], 10)
+                for ii in range(3):
+                    np.testing.assert_allclose(
+                        spec['spectrogram'][ii],
+                        sxx[ii::3].mean(axis=0), rtol=1e-5)
+
+        # all shots together, written to a preallocated array
+        out = np.zeros((2, 33, 8))
+        spec = HDFReadSpectrogram(_bf, 0, 0, nperseg=64, noverlap=32,
+                                  out=out, **self.kwargs)
+        self.assertEqual(spec.dtype.names, ('nshots',))
+        np.testing.assert_allclose(out[0], sxx.mean(axis=0),
+                                   rtol=1e-5)
+        np.testing.assert_array_equal(out[1], 0.)
+
+    @with_bf
+    def test_read_spectrogram(self, _bf: File):
+        """Test `File.read_spectrogram`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadspectrogram.'
+                'HDFReadSpectrogram',
+                side_effect=HDFReadSpectrogram) as mock_rs:
+            spec = _bf.read_spectrogram(0, 0, nperseg=32,
+                                        chunk_size=10, **self.kwargs)
+            self.assertTrue(mock_rs.called)
+            self.assertEqual(mock_rs.call_args[1]['chunk_size'], 10)
+        self.assertIsInstance(spec, HDFReadSpectrogram)
+        self.assertEqual(spec['spectrogram'].shape, (1, 17, 10))
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import asyncio
+import astropy.units as u
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..hdfreaddata import HDFReadData
+from ..hdfsignalstats import (HDFSignalStats, adc_rails)
+
+
+class TestHDFSignalStats(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.hdfsignalstats.HDFSignalStats`
+    """
+    #
+    # Notes:
+    # - tests are currently performed on digitizer 'SIS 3301'
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        # - 3 active channels on board 0
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        brdch = np.zeros((13, 8), dtype=bool)
+        brdch[0, 0:3] = True
+        self.f.modules['SIS 3301'].knobs.active_brdch = brdch
+        rng = np.random.RandomState(0)
+        for ch in range(3):
+            dset = self.f['Raw data + config/SIS 3301/'
+                          'config01 [0:{}]'.format(ch)]
+            data = rng.randint(1, 2 ** 14 - 1,
+                               size=(50, 100)).astype(np.int16)
+
+            # saturate the lower rail on shot 3 and the upper
+            # rail on shot 7
+            data[2, 10] = 0
+            data[6, 20:30] = 2 ** 14 - 1
+            dset[...] = data
+
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_stats(self, _bf: File):
+        """Test statistics against a full read."""
+        for keep_bits in (True, False):
+            data = _bf.read_data(0, 1, keep_bits=keep_bits,
+                                 **self.kwargs)
+            signal = data['signal'].astype(np.float64)
+            for chunk_size in (None, 7):
+                with self.subTest(keep_bits=keep_bits,
+                                  chunk_size=chunk_size):
+                    stats = HDFSignalStats(_bf, 0, 1,
+                                           keep_bits=keep_bits,
+                                           chunk_size=chunk_size,
+                                           **self.kwargs)
+                    self.assertIsInstance(stats, HDFSignalStats)
+                    self.assertEqual(
+                        stats.dtype.names,
+                        ('shotnum', 'min', 'max', 'mean', 'rms',
+                         'saturated'))
+                    self.assertEqual(stats.shape, (50,))
+                    self.assertEqual(stats.info['nshots'], 50)
+                    self.assertNotIn('controls', stats.info)
+                    self.assertEqual(stats.info['signal units'],
+                                     u.bit if keep_bits else u.volt)
+                    np.testing.assert_array_equal(stats['shotnum'],
+                                                  data['shotnum'])
+                    np.testing.assert_allclose(
+                        stats['min'], signal.min(axis=1), rtol=1e-6)
+                    np.testing.assert_allclose(
+                        stats['max'], signal.max(axis=1), rtol=1e-6)
+                    np.testing.assert_allclose(
+                        stats['mean'], signal.mean(axis=1),
+                        rtol=1e-5)
+                    np.testing.assert_allclose(
+                        stats['rms'],
+                        np.sqrt(np.mean(signal ** 2, axis=1)),
+                        rtol=1e-5)
+                    np.testing.assert_array_equal(
+                        np.where(stats['saturated'])[0], [2, 6])
+
+        # min/max keep the raw dtype in bits
+        stats = HDFSignalStats(_bf, 0, 0, keep_bits=True,
+                               **self.kwargs)
+        self.assertEqual(stats.dtype['min'], np.int16)
+
+        # subset of shots
+        stats = HDFSignalStats(_bf, 0, 0, shotnum=[3, 7, 9],
+                               **self.kwargs)
+        np.testing.assert_array_equal(stats['shotnum'], [3, 7, 9])
+        np.testing.assert_array_equal(stats['saturated'],
+                                      [True, True, False])
+
+        # the voltage signal is never read
+        with mock.patch('bapsflib._hdf.utils.hdfiterdata.HDFReadData',
+                        wraps=HDFReadData) as mock_read:
+            HDFSignalStats(_bf, 0, 0, chunk_size=20, **self.kwargs)
+            self.assertEqual(mock_read.call_count, 3)
+            for call in mock_read.call_args_list:
+                self.assertTrue(call[1]['keep_bits'])
+
+    def test_signed_dtype(self):
+        """Test the saturation rails of a signed two's complement dtype."""
+        # the 14-bit ADC samples stored as int8 are two's complement
+        # and rail at the int8 limits
+        path = 'Raw data + config/SIS 3301/config01 [0:1]'
+        data = np.zeros((50, 100), dtype=np.int8)
+        data[3, 5] = -128
+        data[8, 50] = 127
+        data[9] = -5
+        del self.f[path]
+        self.f.create_dataset(path, data=data)
+
+        with File(self.filename,
+                  control_path=self.control_path,
+                  digitizer_path=self.digitizer_path,
+                  msi_path=self.msi_path) as _bf:
+            stats = HDFSignalStats(_bf, 0, 1, keep_bits=True,
+                                   **self.kwargs)
+        self.assertEqual(stats.dtype['min'], np.int8)
+        np.testing.assert_array_equal(stats['min'], data.min(axis=1))
+        np.testing.assert_array_equal(
+            np.where(stats['saturated'])[0], [3, 8])
+
+    def test_adc_rails(self):
+        """Test the ADC rails of each dtype and bit resolution."""
+        for dtype, bit, rails in (
+                (np.uint16, 14, (0, 2 ** 14 - 1)),
+                (np.int16, 14, (0, 2 ** 14 - 1)),
+                (np.int16, 16, (-2 ** 15, 2 ** 15 - 1)),
+                (np.int8, 14, (-128, 127)),
+                (np.uint8, 10, (0, 255)),
+                (np.int16, None, (-2 ** 15, 2 ** 15 - 1))):
+            with self.subTest(dtype=dtype, bit=bit):
+                self.assertEqual(adc_rails(dtype, bit), rails)
+
+    @with_bf
+    def test_signal_stats(self, _bf: File):
+        """Test `File.signal_stats` and `File.asignal_stats`."""
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfsignalstats.HDFSignalStats',
+                side_effect=HDFSignalStats) as mock_ss:
+            stats = _bf.signal_stats(0, 0, chunk_size=10,
+                                     **self.kwargs)
+            self.assertTrue(mock_ss.called)
+            self.assertEqual(mock_ss.call_args[1]['chunk_size'], 10)
+        self.assertIsInstance(stats, HDFSignalStats)
+
+        # all channels concurrently
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def all_channels():
+            return await asyncio.gather(
+                *[_bf.asignal_stats(0, ch, chunk_size=7,
+                                    **self.kwargs)
+                  for ch in range(3)])
+
+        results = loop.run_until_complete(all_channels())
+        for ch, astats in enumerate(results):
+            with self.subTest(channel=ch):
+                stats = _bf.signal_stats(0, ch, **self.kwargs)
+                for field in stats.dtype.names:
+                    np.testing.assert_array_equal(astats[field],
+                                                  stats[field])
+
+
+if __name__ == '__main__':
+    ut.main()
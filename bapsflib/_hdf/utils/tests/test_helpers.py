@@ -16,12 +16,71 @@ import unittest as ut
 
 from bapsflib._hdf.maps.controls.waveform import HDFMapControlWaveform
 from numpy.lib import recfunctions as rfn
+from unittest import mock
 
 from . import (TestBase, with_bf)
 from ..file import File
-from ..helpers import (build_shotnum_dset_relation,
-                       condition_controls, condition_shotnum,
-                       do_shotnum_intersection)
+from ..hdfreadcontrols import HDFReadControls
+from ..helpers import (add_to_groups, build_group_keys,
+                       build_shotnum_dset_relation, condition_by,
+                       condition_control_shotnum, condition_controls,
+                       condition_index, condition_index_shotnum,
+                       condition_shotnum, condition_where,
+                       do_shotnum_intersection, group_keys,
+                       select_shotnum_where)
+
+
+class TestAddToGroups(ut.TestCase):
+    """Test Case for add_to_groups"""
+
+    def test_add_to_groups(self):
+        """Test rows are summed by group id."""
+        values = np.arange(12.).reshape(4, 3)
+        sums = add_to_groups(np.zeros((0, 3)), np.array([1, 0, 1, 0]),
+                             values)
+        np.testing.assert_array_equal(sums, [[12., 14., 16.],
+                                             [6., 8., 10.]])
+
+        # sums are extended for new group ids, only
+        ext = add_to_groups(sums, np.array([3, 0]), values[:2])
+        self.assertEqual(ext.shape, (4, 3))
+        np.testing.assert_array_equal(ext[0], [15., 18., 21.])
+        np.testing.assert_array_equal(ext[2], [0., 0., 0.])
+        np.testing.assert_array_equal(ext[3], [0., 1., 2.])
+        self.assertIs(add_to_groups(ext, np.array([1]), values[:1]),
+                      ext)
+        self.assertIs(add_to_groups(ext, np.array([], dtype=int),
+                                    values[:0]), ext)
+
+
+class TestBuildGroupKeys(ut.TestCase):
+    """Test Case for build_group_keys"""
+
+    def test_build_group_keys(self):
+        """Test the keys are packed copies of the `by` fields."""
+        data = np.zeros(3, dtype=[('shotnum', np.uint32),
+                                  ('signal', np.int16, 4),
+                                  ('xyz', np.float32, 3),
+                                  ('FREQ', np.float64)])
+        data['xyz'][:, 0] = [1., 2., 1.]
+        data['FREQ'] = [5., 6., 5.]
+
+        keys = build_group_keys(data, ('FREQ', 'xyz'))
+        self.assertEqual(keys.dtype.names, ('FREQ', 'xyz'))
+        self.assertEqual(keys.dtype.itemsize, 8 + 3 * 4)
+        np.testing.assert_array_equal(keys['xyz'], data['xyz'])
+        np.testing.assert_array_equal(keys['FREQ'], data['FREQ'])
+        row_gids, _ = group_keys(keys, {})
+        np.testing.assert_array_equal(row_gids, [0, 1, 0])
+
+        # not grouped
+        keys = build_group_keys(data, None)
+        self.assertEqual(keys.dtype, np.dtype([('group', np.uint8)]))
+        np.testing.assert_array_equal(keys['group'], 0)
+
+        # missing field
+        with self.assertRaises(ValueError):
+            build_group_keys(data, ('xyz', 'Bx'))
 
 
 class TestBuildShotnumDsetRelation(TestBase):
@@ -220,6 +279,73 @@ class TestBuildShotnumDsetRelation(TestBase):
                 self.assertEqual(name.decode('utf-8'), cconfn)
 
 
+class TestConditionBy(TestBase):
+    """Test Case for condition_by"""
+
+    def setUp(self):
+        super().setUp()
+        self.f.add_module('Waveform')
+        self.f.add_module('6K Compumotor')
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_condition_by(self, _bf: File):
+        """Test expansion of `by` into field names."""
+        controls = ['Waveform', '6K Compumotor']
+        self.assertEqual(condition_by(_bf, 'xyz', controls), ('xyz',))
+        self.assertEqual(condition_by(_bf, 'Waveform', controls),
+                         ('FREQ',))
+        self.assertEqual(
+            condition_by(_bf, ['FREQ', ('Waveform', 'config01'),
+                               'xyz'], controls),
+            ('FREQ', 'xyz'))
+
+        # invalid `by`
+        for by in ((), [1], [('Waveform', 'foo')]):
+            with self.subTest(by=by), self.assertRaises(ValueError):
+                condition_by(_bf, by, controls)
+
+
+class TestConditionControlShotnum(TestBase):
+    """Test Case for condition_control_shotnum"""
+
+    def setUp(self):
+        super().setUp()
+        self.f.add_module('Waveform', {'n_configs': 1, 'sn_size': 45})
+        self.f.add_module('6K Compumotor', {'sn_size': 40})
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_condition_control_shotnum(self, _bf: File):
+        """Test relating shot numbers to the control datasets."""
+        controls = condition_controls(_bf, ['Waveform', '6K Compumotor'])
+        shotnum = np.arange(31, 51, dtype=np.uint32)
+
+        # union
+        sn, index_dict, sni_dict = condition_control_shotnum(
+            _bf, controls, shotnum, False)
+        np.testing.assert_array_equal(sn, shotnum)
+        self.assertEqual(set(index_dict), {'Waveform', '6K Compumotor'})
+        np.testing.assert_array_equal(sni_dict['Waveform'],
+                                      shotnum <= 45)
+        np.testing.assert_array_equal(sni_dict['6K Compumotor'],
+                                      shotnum <= 40)
+        np.testing.assert_array_equal(index_dict['6K Compumotor'],
+                                      np.arange(30, 40))
+
+        # intersection
+        sn, index_dict, sni_dict = condition_control_shotnum(
+            _bf, controls, shotnum, True)
+        np.testing.assert_array_equal(sn, np.arange(31, 41))
+        np.testing.assert_array_equal(index_dict['Waveform'],
+                                      np.arange(30, 40))
+        self.assertTrue(np.all(sni_dict['Waveform']))
+
+
 class TestConditionControls(TestBase):
     """Test Case for condition_controls"""
     # What to test:
@@ -546,6 +672,76 @@ class TestConditionControls(TestBase):
                           _bf, ['Waveform', '6K Compumotor'])
 
 
+class TestConditionIndex(ut.TestCase):
+    """Test Case for condition_index"""
+
+    def test_condition_index(self):
+        """Test conditioning of a digitizer dataset row index."""
+        for index, expected in (
+                (3, [3]),
+                ([5, -1, 5, 0], [0, 5, 9]),
+                (slice(2, 8, 3), [2, 5]),
+                (Ellipsis, np.arange(10)),
+                (np.array([4, -10]), [0, 4])):
+            with self.subTest(index=index):
+                _index = condition_index(index, 10)
+                np.testing.assert_array_equal(_index, expected)
+
+        # the input array is not modified
+        index = np.array([-1, 2])
+        condition_index(index, 10)
+        np.testing.assert_array_equal(index, [-1, 2])
+
+        # invalid index
+        with self.assertRaises(TypeError):
+            condition_index(1.5, 10)
+        for index in (10, [-11], np.array([0, 20])):
+            with self.subTest(index=index), \
+                    self.assertRaises(ValueError):
+                condition_index(index, 10)
+
+
+class TestConditionIndexShotnum(TestBase):
+    """Test Case for condition_index_shotnum"""
+
+    def setUp(self):
+        super().setUp()
+
+        # header dataset recording shot numbers 1-10 and 21-30
+        self.f.create_dataset(
+            'dheader', data=np.array(
+                list(zip(np.r_[1:11, 21:31])),
+                dtype=[('Shot number', np.uint32)]))
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test_condition_index_shotnum(self):
+        """Test conditioning of the `index` and `shotnum` arguments."""
+        dheader = self.f['dheader']
+        key = 'Shot number'
+
+        # by index
+        index, sn, sni = condition_index_shotnum(
+            [12, -1, 0], slice(None), dheader, key, True)
+        np.testing.assert_array_equal(index, [0, 12, 19])
+        np.testing.assert_array_equal(sn, [1, 23, 30])
+        self.assertTrue(np.all(sni))
+
+        # by shotnum
+        for intersection_set, esn, esni in (
+                (True, [9, 10, 21], [True, True, True]),
+                (False, [9, 10, 11, 21],
+                 [True, True, False, True])):
+            with self.subTest(intersection_set=intersection_set):
+                index, sn, sni = condition_index_shotnum(
+                    slice(None), [9, 10, 11, 21], dheader, key,
+                    intersection_set)
+                np.testing.assert_array_equal(index, [8, 9, 10])
+                np.testing.assert_array_equal(sn, esn)
+                np.testing.assert_array_equal(sni, esni)
+
+
 class TestConditionShotnum(TestBase):
     """Test Case for condition_shotnum"""
 
@@ -684,6 +880,47 @@ class TestConditionShotnum(TestBase):
                 _sn = condition_shotnum(shotnum, {}, {})
 
 
+class TestConditionWhere(TestBase):
+    """Test Case for condition_where"""
+
+    def setUp(self):
+        super().setUp()
+        self.f.add_module('Waveform')
+        self.f.add_module('N5700_PS')
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_condition_where(self, _bf: File):
+        """Test conditioning of `where`."""
+        where = {'Waveform': ('FREQ', '>', 50000.),
+                 'N5700_PS': [('VOLT', '>=', 0.),
+                              ('VOLT', 'in', [1., 2.])]}
+        cwhere = condition_where(_bf, where)
+        self.assertEqual(
+            cwhere,
+            [(('Waveform', 'config01'), [('FREQ', '>', 50000.)]),
+             (('N5700_PS', 'config01'), [('VOLT', '>=', 0.),
+                                         ('VOLT', 'in', [1., 2.])])])
+
+        # invalid `where`
+        for where in (None, {}, [('Waveform', ('FREQ', '>', 1.))],
+                      {'Waveform': 'FREQ > 1'},
+                      {'Waveform': [('FREQ', '>')]}):
+            with self.subTest(where=where), \
+                    self.assertRaises(TypeError):
+                condition_where(_bf, where)
+
+        # invalid field, operator, or control
+        for where in ({'Waveform': ('VOLT', '>', 1.)},
+                      {'Waveform': ('FREQ', '=~', 1.)},
+                      {'6K Compumotor': ('xyz', '==', 0.)}):
+            with self.subTest(where=where), \
+                    self.assertRaises(ValueError):
+                condition_where(_bf, where)
+
+
 class TestDoShotnumIntersection(ut.TestCase):
     """Test Case for do_shotnum_intersection"""
     def test_one_control(self):
@@ -750,5 +987,125 @@ class TestDoShotnumIntersection(ut.TestCase):
             self.assertTrue(np.array_equal(index_dict[key], [5, 6]))
 
 
+class TestGroupKeys(ut.TestCase):
+    """Test Case for group_keys"""
+
+    def test_group_keys(self):
+        """Test group ids assigned in order of first appearance."""
+        keys = np.zeros(5, dtype=[('FREQ', np.float64),
+                                  ('xyz', np.float32, 3)])
+        keys['FREQ'] = [2., 1., 2., np.nan, np.nan]
+        gids = {}
+        row_gids, new = group_keys(keys, gids)
+        np.testing.assert_array_equal(row_gids, [0, 1, 0, 2, 2])
+        np.testing.assert_array_equal(new, [0, 1, 3])
+        self.assertEqual(len(gids), 3)
+
+        # known keys keep their ids
+        keys['FREQ'][1] = 5.
+        row_gids, new = group_keys(keys[::-1], gids)
+        np.testing.assert_array_equal(row_gids, [2, 2, 0, 3, 0])
+        np.testing.assert_array_equal(new, [3])
+
+
+class TestSelectShotnumWhere(TestBase):
+    """Test Case for select_shotnum_where"""
+
+    def setUp(self):
+        super().setUp()
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 10})
+        self.f.add_module('Waveform')
+        self.f.add_module('N5700_PS')
+        self.f.add_module('6K Compumotor', {'sn_size': 30})
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_select(self, _bf: File):
+        """Test shot number selection against the control data."""
+        cdata = HDFReadControls(_bf, ['Waveform', 'N5700_PS'])
+        freq = np.unique(cdata['FREQ'])[1]
+        volt = np.unique(cdata['VOLT'])[0]
+
+        # one condition
+        sn = select_shotnum_where(
+            _bf, {'Waveform': ('FREQ', '==', freq)})
+        np.testing.assert_array_equal(
+            sn, cdata['shotnum'][cdata['FREQ'] == freq])
+        self.assertEqual(sn.dtype, np.uint32)
+
+        # conditions are ANDed and limited to `shotnum`
+        mask = (cdata['FREQ'] != freq) & (cdata['VOLT'] == volt) \
+            & (cdata['shotnum'] <= 40)
+        sn = select_shotnum_where(
+            _bf, {'Waveform': ('FREQ', 'not in', [freq]),
+                  'N5700_PS': [('VOLT', '<=', volt),
+                               ('VOLT', '>=', volt)]},
+            shotnum=slice(1, 41))
+        np.testing.assert_array_equal(sn, cdata['shotnum'][mask])
+
+        # no shot satisfies the conditions
+        sn = select_shotnum_where(
+            _bf, {'Waveform': ('FREQ', '<', 0.)})
+        self.assertEqual(sn.size, 0)
+        self.assertEqual(sn.dtype, np.uint32)
+
+        # fields without a command list, only recorded shots
+        cdata = HDFReadControls(_bf, ['6K Compumotor'])
+        theta = np.unique(cdata['ptip_rot_theta'])[0]
+        sn = select_shotnum_where(
+            _bf, {'6K Compumotor': ('ptip_rot_theta', '==', theta),
+                  'Waveform': ('FREQ', '==', freq)})
+        np.testing.assert_array_equal(
+            sn,
+            np.intersect1d(
+                cdata['shotnum'][cdata['ptip_rot_theta'] == theta],
+                select_shotnum_where(
+                    _bf, {'Waveform': ('FREQ', '==', freq)})))
+        self.assertNotEqual(sn.size, 0)
+
+        # only the conditioned fields are read, per device
+        with mock.patch(
+                'bapsflib._hdf.utils.hdfreadcontrols.HDFReadControls',
+                side_effect=HDFReadControls) as mock_rc:
+            select_shotnum_where(
+                _bf, {'Waveform': ('FREQ', '==', freq)})
+            self.assertFalse(mock_rc.called)
+
+        # vector fields do not evaluate to one value per shot
+        with self.assertRaises(ValueError):
+            select_shotnum_where(
+                _bf, {'6K Compumotor': ('xyz', '>', 0.)})
+
+    @with_bf
+    def test_read_data_where(self, _bf: File):
+        """Test `where` on `File.read_data`."""
+        cdata = HDFReadControls(_bf, ['Waveform'])
+        freq = np.unique(cdata['FREQ'])[0]
+        expected = cdata['shotnum'][cdata['FREQ'] == freq]
+        expected = expected[expected <= 50]
+        data = _bf.read_data(0, 0, add_controls=['Waveform'],
+                             where={'Waveform': ('FREQ', '==', freq)},
+                             silent=True)
+        np.testing.assert_array_equal(data['shotnum'], expected)
+        self.assertTrue(np.all(data['FREQ'] == freq))
+        np.testing.assert_array_equal(
+            data['signal'],
+            _bf.read_data(0, 0, shotnum=expected,
+                          silent=True)['signal'])
+
+        # `where` with `index`
+        with self.assertRaises(ValueError):
+            _bf.read_data(0, 0, index=[0, 1], silent=True,
+                          where={'Waveform': ('FREQ', '==', freq)})
+
+        # nothing satisfies `where`
+        with self.assertRaises(ValueError):
+            _bf.read_data(0, 0, silent=True,
+                          where={'Waveform': ('FREQ', '<', 0.)})
+
+
 if __name__ == '__main__':
     ut.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import astropy.units as u
+import numpy as np
+import unittest as ut
+
+from scipy import signal as sps
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..signalfilter import SignalFilter
+
+
+class TestSignalFilter(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.signalfilter.SignalFilter`
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 400})
+        dset_path = 'Raw data + config/SIS 3301/config01 [0:0]'
+        rng = np.random.RandomState(0)
+        self.f[dset_path][...] = rng.randint(
+            0, 2 ** 10, size=(50, 400)).astype(np.int16)
+        self.kwargs = {'digitizer': 'SIS 3301',
+                       'adc': 'SIS 3301',
+                       'config_name': 'config01'}
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test_design(self):
+        """Test filter design and input conditioning."""
+        for args, kwargs in (
+                (('lowpass', (1., 2.)), {}),
+                (('bandpass', 1.), {}),
+                (('bandpass', (2., 1.)), {}),
+                (('lowpass', -1.), {}),
+                (('notch', 1.), {}),
+                (('lowpass', 1.), {'ftype': 'kaiser'}),
+                (('lowpass', 1.), {'order': 0})):
+            with self.subTest(args=args, kwargs=kwargs), \
+                    self.assertRaises(ValueError):
+                SignalFilter(*args, **kwargs)
+
+        # IIR filters are second-order sections
+        filt = SignalFilter('bandpass', (1., 10.) * u.kHz, order=3)
+        self.assertEqual(filt.cutoff, (1e3, 1e4))
+        sos = filt.design(1e-6)
+        np.testing.assert_allclose(
+            sos, sps.butter(3, (2e-3, 2e-2), btype='bandpass',
+                            output='sos'))
+        self.assertIs(filt.design(1e-6 * u.s), sos)
+
+        # FIR filters are taps
+        filt = SignalFilter('highpass', 1e4, ftype='fir', numtaps=31)
+        np.testing.assert_allclose(
+            filt.design(1e-6),
+            sps.firwin(31, 2e-2, pass_zero=False))
+
+        # cutoff above Nyquist or unknown dt
+        with self.assertRaises(ValueError):
+            filt.design(1e-4)
+        with self.assertRaises(ValueError):
+            filt.design(None)
+
+    def test_apply(self):
+        """Test filtering in place."""
+        rng = np.random.RandomState(1)
+        signal = rng.normal(size=(5, 300))
+        for ftype, zero_phase in (('butter', True), ('butter', False),
+                                  ('fir', True), ('fir', False)):
+            with self.subTest(ftype=ftype, zero_phase=zero_phase):
+                filt = SignalFilter('lowpass', 0.1, ftype=ftype,
+                                    zero_phase=zero_phase)
+                coeffs = filt.design(1.0)
+                if ftype == 'fir':
+                    func = sps.filtfilt if zero_phase else sps.lfilter
+                    expected = func(coeffs, 1.0, signal, axis=-1)
+                else:
+                    func = sps.sosfiltfilt if zero_phase \
+                        else sps.sosfilt
+                    expected = func(coeffs, signal, axis=-1)
+
+                sig = signal.copy()
+                self.assertIs(filt.apply(sig, 1.0), sig)
+                np.testing.assert_allclose(sig, expected)
+
+                # rows filtered in blocks
+                sig = signal.copy()
+                with mock.patch(
+                        'bapsflib._hdf.utils.signalfilter'
+                        '._FILTER_NBYTES', 8 * 300 * 2):
+                    filt.apply(sig, 1.0)
+                np.testing.assert_allclose(sig, expected)
+
+        # 1D and structured field views
+        filt = SignalFilter('lowpass', 0.1)
+        expected = sps.sosfiltfilt(filt.design(1.0), signal, axis=-1)
+        sig = signal[0].copy()
+        filt.apply(sig, 1.0)
+        np.testing.assert_allclose(sig, expected[0])
+        data = np.zeros(5, dtype=[('shotnum', np.uint32),
+                                  ('signal', np.float64, (300,))])
+        data['signal'] = signal
+        filt.apply(data['signal'], 1.0)
+        np.testing.assert_allclose(data['signal'], expected)
+
+        # only float signals
+        with self.assertRaises(TypeError):
+            filt.apply(np.zeros((2, 300), dtype=np.int16), 1.0)
+
+        # zero phase filtering needs signals longer than the padding
+        for ftype in ('butter', 'fir'):
+            with self.subTest(ftype=ftype):
+                filt = SignalFilter('lowpass', 0.1, ftype=ftype)
+                padlen = filt.padlen(1.0)
+                sig = signal[:, :padlen + 1].copy()
+                filt.apply(sig, 1.0)
+                with self.assertRaises(ValueError):
+                    filt.apply(signal[:, :padlen].copy(), 1.0)
+        filt = SignalFilter('lowpass', 0.1, zero_phase=False)
+        filt.apply(signal[:, :5].copy(), 1.0)
+
+    @with_bf
+    def test_read_data_filter(self, _bf: File):
+        """Test `filter` on digitizer reads."""
+        data = _bf.read_data(0, 0, **self.kwargs)
+        dt = data.dt.to(u.s).value
+        filt = SignalFilter('lowpass', 0.05 / dt)
+        expected = sps.sosfiltfilt(filt.design(dt),
+                                   data['signal'].astype(np.float64),
+                                   axis=-1)
+
+        fdata = _bf.read_data(0, 0, filter=filt, **self.kwargs)
+        self.assertEqual(fdata.dtype, data.dtype)
+        np.testing.assert_allclose(fdata['signal'], expected,
+                                   rtol=1e-4, atol=1e-6)
+
+        # streamed blocks
+        blocks = [block['signal'] for block in
+                  _bf.iter_data(0, 0, chunk_size=7, filter=filt,
+                                **self.kwargs)]
+        np.testing.assert_allclose(np.concatenate(blocks), expected,
+                                   rtol=1e-4, atol=1e-6)
+
+        # invalid filter or signal in bits
+        with self.assertRaises(TypeError):
+            _bf.read_data(0, 0, filter='lowpass', **self.kwargs)
+        with self.assertRaises(ValueError):
+            _bf.read_data(0, 0, filter=filt, keep_bits=True,
+                          **self.kwargs)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This file is part of the bapsflib package, a Python toolkit for the
+# BaPSF group at UCLA.
+#
+# http://plasma.physics.ucla.edu/
+#
+# Copyright 2017-2018 Erik T. Everson and contributors
+#
+# License: Standard 3-clause BSD; see "LICENSES/LICENSE.txt" for full
+#   license terms and contributor agreement.
+#
+import numpy as np
+import unittest as ut
+
+from unittest import mock
+
+from . import (TestBase, with_bf)
+from ..file import File
+from ..spatialindex import SpatialIndex
+
+
+class TestSpatialIndex(TestBase):
+    """
+    Test Case for
+    :class:`~bapsflib._hdf.utils.spatialindex.SpatialIndex`
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        # setup HDF5
+        self.f.add_module('SIS 3301',
+                          {'n_configs': 1, 'sn_size': 50, 'nt': 100})
+        self.f.add_module('6K Compumotor')
+        self.f.add_module('Waveform')
+
+        # random positions
+        # - last shot has no position
+        cgroup = self.f['Raw data + config/6K Compumotor']
+        self.cdset = [cgroup[name] for name in cgroup
+                      if name.startswith('XY[')][0]
+        cdata = self.cdset[...]
+        rng = np.random.RandomState(0)
+        cdata['x'] = rng.uniform(-5., 5., size=cdata.shape)
+        cdata['y'] = rng.uniform(-5., 5., size=cdata.shape)
+        cdata['z'] = rng.randint(0, 2, size=cdata.shape)
+        cdata['x'][-1] = np.nan
+        self.cdset[...] = cdata
+        self.cdata = cdata[:-1]
+
+    def tearDown(self):
+        super().tearDown()
+
+    @with_bf
+    def test_raises(self, _bf: File):
+        """Test exceptions raised during instantiation."""
+        with self.assertRaises(TypeError):
+            SpatialIndex(self.f, '6K Compumotor')
+
+        # control does not record positions
+        with self.assertRaises(ValueError):
+            SpatialIndex(_bf, 'Waveform')
+
+        # invalid axes
+        sindex = SpatialIndex(_bf, '6K Compumotor')
+        for axes in ('', 'xx', 'w', None):
+            with self.subTest(axes=axes), \
+                    self.assertRaises(ValueError):
+                sindex.query_radius((0.,), 1., axes=axes)
+
+        # plane queries take a single axis
+        for axis in ('', 'xy', 'w', None):
+            with self.subTest(axis=axis), \
+                    self.assertRaises(ValueError):
+                sindex.query_plane(axis, 0.)
+
+    @with_bf
+    def test_queries(self, _bf: File):
+        """Test region queries against brute force masks."""
+        sindex = SpatialIndex(_bf, '6K Compumotor')
+        cdata = self.cdata
+        sn = cdata['Shot number']
+        self.assertEqual(len(sindex), cdata.shape[0])
+        self.assertEqual(sindex.nrows, cdata.shape[0] + 1)
+        self.assertEqual(sindex.control[0], '6K Compumotor')
+        np.testing.assert_array_equal(sindex.shotnum, sn)
+
+        # radius in the xy-plane
+        dist = np.hypot(cdata['x'] - 1., cdata['y'] + 1.)
+        result = sindex.query_radius((1., -1.), 2., axes='xy')
+        np.testing.assert_array_equal(result, sn[dist <= 2.])
+        self.assertEqual(result.dtype, np.uint32)
+        self.assertEqual(list(sindex._trees), ['xy'])
+
+        # radius in 3D
+        dist = np.sqrt((cdata['x'] - 1.) ** 2 + cdata['y'] ** 2
+                       + (cdata['z'] - 1.) ** 2)
+        np.testing.assert_array_equal(
+            sindex.query_radius((1., 0., 1.), 3.), sn[dist <= 3.])
+
+        # box and plane
+        mask = (cdata['x'] >= -1.) & (cdata['x'] <= 2.) \
+            & (cdata['z'] == 1.)
+        np.testing.assert_array_equal(
+            sindex.query_box(xlim=(-1., 2.), zlim=(1., 1.)), sn[mask])
+        np.testing.assert_array_equal(sindex.query_plane('z', 0.),
+                                      sn[cdata['z'] == 0.])
+
+        # nearest neighbors
+        dist = np.hypot(cdata['x'], cdata['y'])
+        np.testing.assert_array_equal(
+            sindex.query_nearest((0., 0.), k=3, axes='xy'),
+            np.sort(sn[np.argsort(dist)[:3]]))
+
+        # results feed `read_data`
+        result = sindex.query_radius((0., 0.), 3., axes='xy')
+        data = _bf.read_data(0, 0, shotnum=result, silent=True,
+                             add_controls=['6K Compumotor'])
+        expected = result[result <= 50]
+        np.testing.assert_array_equal(data['shotnum'], expected)
+        self.assertTrue(np.all(
+            np.hypot(data['xyz'][:, 0], data['xyz'][:, 1]) <= 3.))
+
+    @with_bf
+    def test_file_cache(self, _bf: File):
+        """Test `File.spatial_index` caches the index."""
+        with mock.patch('bapsflib._hdf.utils.spatialindex.SpatialIndex',
+                        side_effect=SpatialIndex) as mock_si:
+            sindex = _bf.spatial_index('6K Compumotor')
+            self.assertIs(_bf.spatial_index('6K Compumotor'), sindex)
+            self.assertEqual(mock_si.call_count, 1)
+
+            # re-mapped controls are re-indexed
+            with mock.patch.object(
+                    _bf.file_map, 'refresh',
+                    return_value={'added': [], 'removed': [],
+                                  'remapped': ['6K Compumotor'],
+                                  'extended': []}):
+                _bf.refresh()
+            self.assertIsNot(_bf.spatial_index('6K Compumotor'),
+                             sindex)
+            self.assertEqual(mock_si.call_count, 2)
+
+            # a grown dataset is re-indexed
+            sindex = _bf.spatial_index('6K Compumotor')
+            mock_si.reset_mock()
+            with mock.patch.object(SpatialIndex, 'nrows',
+                                   new_callable=mock.PropertyMock,
+                                   return_value=sindex.nrows - 1):
+                _bf.spatial_index('6K Compumotor')
+            self.assertEqual(mock_si.call_count, 1)
+
+
+if __name__ == '__main__':
+    ut.main()
@@ -19,11 +19,37 @@ import inspect
 from typing import Union
 
 
+def _open_file(file_class: type, filename: str, pool, **settings):
+    """
+    Context manager for opening the file for the decorators, either
+    directly or through a file pool.
+
+    :param file_class: class used to open the file
+    :param filename: name of the HDF5 file
+    :param pool: :code:`None`/:code:`False`, :code:`True`, or a
+        :class:`~bapsflib._hdf.utils.filepool.FilePool` instance
+    :param settings: keywords passed on to :data:`file_class`
+    """
+    if pool is None or pool is False:
+        return file_class(filename, **settings)
+
+    # import filepool here to avoid cyclical imports
+    from bapsflib._hdf.utils.filepool import (default_pool, FilePool)
+
+    if pool is True:
+        pool = default_pool
+    elif not isinstance(pool, FilePool):
+        raise TypeError("`pool` must be a bool or FilePool instance")
+
+    return pool.open(file_class, filename, **settings)
+
+
 def with_bf(wfunc=None, *,
             filename: Union[str, None] = None,
             control_path: Union[str, None] = None,
             digitizer_path: Union[str, None] = None,
-            msi_path: Union[str, None] = None):
+            msi_path: Union[str, None] = None,
+            pool=None):
     """
     Context decorator for managing the opening and closing BaPSF HDF5
     Files (:class:`bapsflib._hdf.utils.file.File`).  An instance of the
@@ -36,6 +62,10 @@ def with_bf(wfunc=None, *,
     :param control_path: internal HDF5 path for control devices
     :param digitizer_path: internal HDF5 path for digitizers
     :param msi_path: internal HDF5 path for MSI devices
+    :param pool: :code:`None` (DEFAULT) to open a new file on every
+        call, :code:`True` to share files through the
+        :data:`~bapsflib._hdf.utils.filepool.default_pool`, or a
+        :class:`~bapsflib._hdf.utils.filepool.FilePool` instance
 
     :example:
         The HDF5 file parameters (:data:`filename`, :data:`control_path`,
@@ -105,6 +135,16 @@ def with_bf(wfunc=None, *,
             >>> # function keywords will still take precedence
             >>> foo(filename='test_2.hdf5')
             'test_2.hdf5'
+
+        **Sharing mapped files between calls**::
+
+            >>> # the file is opened and mapped once, then re-used
+            >>> # by every call on the same file and settings
+            >>> @with_bf(pool=True)
+            ... def foo(bf, **kwargs):
+            ...     return bf.filename
+            >>> for ii in range(1000):
+            ...     foo(filename='test.hdf5')
     """
     # How to pass in file settings (listed in priority):
     # 1. function keywords
@@ -173,7 +213,7 @@ def with_bf(wfunc=None, *,
             fname = fsettings.pop('filename')
 
             # run function with in if statement
-            with File(fname, **fsettings) as bf:
+            with _open_file(File, fname, pool, **fsettings) as bf:
                 args += (bf,)
                 return func(*args, **kwargs)
 
@@ -187,7 +227,8 @@ def with_bf(wfunc=None, *,
         return decorator
 
 
-def with_lapdf(wfunc=None, *, filename: Union[str, None] = None):
+def with_lapdf(wfunc=None, *, filename: Union[str, None] = None,
+               pool=None):
     """
     Context decorator for managing the opening and closing LaPD HDF5
     Files (:class:`bapsflib.lapd._hdf.file.File`).  An instance of the
@@ -197,6 +238,10 @@ def with_lapdf(wfunc=None, *, filename: Union[str, None] = None):
 
     :param wfunc: function or method to be wrapped
     :param filename: name of the BaPSF HDF5 file
+    :param pool: :code:`None` (DEFAULT) to open a new file on every
+        call, :code:`True` to share files through the
+        :data:`~bapsflib._hdf.utils.filepool.default_pool`, or a
+        :class:`~bapsflib._hdf.utils.filepool.FilePool` instance
 
     :example:
         The HDF5 :data:`filename` can be passed to the decorator in three
@@ -325,7 +370,7 @@ def with_lapdf(wfunc=None, *, filename: Union[str, None] = None):
             fname = fsettings.pop('filename')
 
             # run function with in if statement
-            with File(fname) as lapdf:
+            with _open_file(File, fname, pool) as lapdf:
                 args += (lapdf,)
                 return func(*args, **kwargs)
 
@@ -13,6 +13,7 @@ import unittest as ut
 
 from bapsflib._hdf import File as BaPSFFile
 from bapsflib._hdf.maps import FauxHDFBuilder
+from bapsflib._hdf.utils.filepool import FilePool
 from bapsflib.lapd import File as LaPDFile
 from unittest import mock
 
@@ -307,6 +308,41 @@ class TestWithBF(ut.TestCase):
             inspect.signature(BaPSFFile).parameters['control_path'].default)
         mock_bf_class.reset_mock()
 
+    @mock.patch(BaPSFFile.__module__ + '.' + BaPSFFile.__qualname__,
+                side_effect=BaPSFFile, autospec=True)
+    def test_pool(self, mock_bf_class):
+        """Test sharing files through a file pool."""
+        pool = FilePool()
+        settings = {'filename': self.filename,
+                    'control_path': 'Raw data + config',
+                    'digitizer_path': 'Raw data + config',
+                    'msi_path': 'MSI'}
+
+        def foo(bf: BaPSFFile, **kwargs):
+            self.assertIsInstance(bf, BaPSFFile)
+            self.assertEqual(pool.refcount(bf), 1)
+            return bf
+
+        # file is opened once and stays open between calls
+        func = with_bf(foo, pool=pool, **settings)
+        bf = func()
+        self.assertIs(func(), bf)
+        self.assertEqual(mock_bf_class.call_count, 1)
+        self.assertTrue(bool(bf))
+        self.assertEqual(pool.refcount(bf), 0)
+        pool.close_all()
+        mock_bf_class.reset_mock()
+
+        # `pool=True` uses the default pool
+        with mock.patch(FilePool.__module__ + '.default_pool', pool):
+            bf = with_bf(foo, pool=True, **settings)()
+            self.assertIn(bf, pool)
+        pool.close_all()
+
+        # invalid pool
+        with self.assertRaises(TypeError):
+            with_bf(foo, pool='pool', **settings)()
+
 
 class TestWithLaPDF(ut.TestCase):
     """